@@ -0,0 +1,271 @@
+"""
+Formato nativo de documentos de QuicKual (.qkl).
+
+Estructura del archivo (enteros little-endian):
+
+    cabecera   MAGIA (8 bytes) | versión u16 | reservado u16 | nº de bloques u32
+    índice     una entrada por bloque, en orden de documento:
+               id u32 | tipo u8 | letra u8 | relleno u8 | borde u8 |
+               filas u32 | columnas u32 | desplazamiento u64
+    datos      por cada bloque: longitud u32 | carga comprimida con zlib
+
+La carga de un bloque de texto es el texto en UTF-8; la de una tabla, un JSON
+con las celdas, los estilos de celda y el descriptor de operación si lo tiene
+(la forma y la presentación ya están en el índice).
+
+Al abrir, el archivo se proyecta en memoria con `mmap` y solo se lee el
+índice: cada bloque se descomprime la primera vez que se pide
+(documento.BloquePendiente), así que abrir un documento largo no depende del
+tamaño de sus bloques. El archivo se cierra cuando ya no queda ningún bloque
+pendiente que lo use (ver `liberar_archivos`).
+"""
+
+import gc
+import json
+import mmap
+import os
+import struct
+import tempfile
+import weakref
+import zlib
+from functools import partial
+from typing import Callable, Dict, List, Tuple
+
+from documento import BloquePendiente, BloqueTabla, BloqueTexto, Documento, Operacion
+
+EXTENSION = ".qkl"
+MAGIA = b"QKUAL\r\n\x1a"
+VERSION = 1
+
+_CABECERA = struct.Struct("<8sHHI")
+_ENTRADA = struct.Struct("<IBBBBIIQ")
+_LONGITUD = struct.Struct("<I")
+
+_TIPOS = {"text": 0, "table": 1}
+_NOMBRES_TIPO = {v: k for k, v in _TIPOS.items()}
+
+
+class FormatoInvalido(ValueError):
+    """El archivo no es un documento de QuicKual o está dañado."""
+
+
+# ====
+# Codificación de bloques
+# ====
+
+
+def _carga(bloque) -> bytes:
+    if bloque.tipo == "text":
+        datos = bloque.texto.encode("utf-8")
+    else:
+        estilos = [[f, c, opciones] for (f, c), opciones in sorted(bloque.estilos.items())]
+        contenido = {"celdas": bloque.celdas, "estilos": estilos}
+        if bloque.operacion is not None:
+            op = bloque.operacion
+            contenido["operacion"] = [op.tipo, list(op.operandos), list(op.forma)]
+        datos = json.dumps(contenido, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(datos, 6)
+
+
+def _decodificar(entrada: Tuple, datos: bytes):
+    bloque_id, tipo, letra, relleno, borde, filas, columnas, _ = entrada
+    datos = zlib.decompress(datos)
+    if tipo == _TIPOS["text"]:
+        return BloqueTexto(bloque_id, datos.decode("utf-8"))
+
+    contenido = json.loads(datos.decode("utf-8"))
+    tabla = BloqueTabla(bloque_id, filas, columnas)
+    celdas = contenido["celdas"]
+    if len(celdas) != filas * columnas:
+        raise FormatoInvalido(f"La tabla {bloque_id} no tiene {filas}x{columnas} celdas")
+    tabla.celdas = celdas
+    tabla.estilos = {(f, c): opciones for f, c, opciones in contenido["estilos"]}
+    tabla.presentacion = (letra, relleno, borde)
+    if "operacion" in contenido:
+        tipo_op, operandos, forma = contenido["operacion"]
+        tabla.operacion = Operacion(tipo_op, tuple(operandos), tuple(forma))
+    return tabla
+
+
+# ====
+# Escritura
+# ====
+
+
+def codificar_bloque(bloque, ruta: str = None, cargar: Callable[[], object] = None) -> Tuple[Tuple, bytes]:
+    """
+    Entrada del índice (sin desplazamiento) y carga comprimida de `bloque` (un
+    bloque o un BloquePendiente). Los pendientes de un archivo distinto de
+    `ruta` se copian comprimidos tal cual, sin descomprimirlos; los demás se
+    leen con `cargar` (por defecto, su propio `cargar`).
+    """
+    if isinstance(bloque, BloquePendiente):
+        if isinstance(bloque.origen, ArchivoDocumento) and bloque.origen.ruta != ruta:
+            return _entrada(bloque), bloque.origen.carga_comprimida(bloque.id)
+        bloque = (cargar or bloque.cargar)()
+    return _entrada(bloque), _carga(bloque)
+
+
+def _entrada(bloque) -> Tuple:
+    letra, relleno, borde = bloque.presentacion if bloque.tipo == "table" else (0, 0, 0)
+    return (bloque.id, _TIPOS[bloque.tipo], letra, relleno, borde,
+            getattr(bloque, "filas", 0), getattr(bloque, "columnas", 0))
+
+
+def escribir_documento(ruta: str, bloques: List[Tuple[Tuple, bytes]], sincronizar: bool = False) -> None:
+    """
+    Escribe en `ruta` los bloques dados por `codificar_bloque`, en orden. Con
+    `sincronizar`, espera a que el archivo esté en disco (fsync) antes de
+    sustituir el anterior.
+    """
+    ruta = os.path.abspath(ruta)
+    desplazamiento = _CABECERA.size + _ENTRADA.size * len(bloques)
+    entradas = []
+    for entrada, carga in bloques:
+        entradas.append(entrada + (desplazamiento,))
+        desplazamiento += _LONGITUD.size + len(carga)
+
+    # Se escribe a un temporal y se sustituye, para no dejar archivos a medias
+    fd, temporal = tempfile.mkstemp(suffix=EXTENSION, dir=os.path.dirname(ruta))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_CABECERA.pack(MAGIA, VERSION, 0, len(entradas)))
+            f.writelines(_ENTRADA.pack(*e) for e in entradas)
+            for _, carga in bloques:
+                f.write(_LONGITUD.pack(len(carga)))
+                f.write(carga)
+            if sincronizar:
+                f.flush()
+                os.fsync(f.fileno())
+        if os.name == "nt":
+            # Windows no deja sustituir un archivo que sigue proyectado
+            _cerrar_abiertos(ruta)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def guardar_documento(documento: Documento, ruta: str) -> None:
+    """
+    Escribe el documento en `ruta`. Los bloques que siguen pendientes en su
+    archivo de origen se copian comprimidos tal cual, sin descomprimirlos.
+    """
+    ruta = os.path.abspath(ruta)
+    # Los pendientes del propio archivo que vamos a sobrescribir se leen y se
+    # quedan en el documento
+    escribir_documento(ruta, [codificar_bloque(documento.vistazo(bloque_id), ruta, partial(documento.get, bloque_id))
+                              for bloque_id in documento.ids()])
+
+
+# ====
+# Lectura perezosa
+# ====
+
+# Archivos proyectados en memoria, para poder cerrarlos antes de sobrescribirlos.
+# Las referencias son débiles: los bloques pendientes mantienen vivo su archivo
+# y, cuando ya no queda ninguno, el archivo se cierra al recogerlo.
+_abiertos: "weakref.WeakSet[ArchivoDocumento]" = weakref.WeakSet()
+
+
+def _cerrar_abiertos(ruta: str) -> None:
+    for archivo in list(_abiertos):
+        if archivo.ruta == ruta:
+            archivo.cerrar()
+
+
+def _cerrar_mapa(mapa: mmap.mmap, archivo) -> None:
+    mapa.close()
+    archivo.close()
+
+
+def liberar_archivos() -> None:
+    """
+    Cierra los archivos de los que ya no queda ningún bloque pendiente, p. ej.
+    al sustituir el documento que los usaba. El documento, su historial y su
+    índice se referencian entre sí, así que se pasa el recolector de ciclos.
+    """
+    gc.collect()
+
+
+class ArchivoDocumento:
+    """Archivo .qkl abierto con mmap; lee y descomprime bloques bajo demanda."""
+
+    def __init__(self, ruta: str) -> None:
+        self.ruta = os.path.abspath(ruta)
+        self._mapa = None
+        self._archivo = open(self.ruta, "rb")
+        try:
+            tamano = os.fstat(self._archivo.fileno()).st_size
+            if tamano < _CABECERA.size:
+                raise FormatoInvalido("El archivo está vacío o truncado")
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._archivo.close()
+            raise
+        self._cierre = weakref.finalize(self, _cerrar_mapa, self._mapa, self._archivo)
+
+        magia, version, _, total = _CABECERA.unpack_from(self._mapa, 0)
+        if magia != MAGIA:
+            self.cerrar()
+            raise FormatoInvalido("No es un documento de QuicKual")
+        if version > VERSION:
+            self.cerrar()
+            raise FormatoInvalido(f"Versión de archivo {version} no soportada")
+        if _CABECERA.size + total * _ENTRADA.size > tamano:
+            self.cerrar()
+            raise FormatoInvalido("El índice del archivo está truncado")
+
+        self.entradas: Dict[int, Tuple] = {}
+        self.orden: List[int] = []
+        for entrada in _ENTRADA.iter_unpack(self._mapa[_CABECERA.size:_CABECERA.size + total * _ENTRADA.size]):
+            if entrada[1] not in _NOMBRES_TIPO:
+                self.cerrar()
+                raise FormatoInvalido(f"Tipo de bloque desconocido: {entrada[1]}")
+            if entrada[0] in self.entradas:
+                self.cerrar()
+                raise FormatoInvalido(f"El bloque {entrada[0]} está repetido en el índice")
+            self.entradas[entrada[0]] = entrada
+            self.orden.append(entrada[0])
+        _abiertos.add(self)
+
+    def carga_comprimida(self, bloque_id: int) -> bytes:
+        if self._mapa is None:
+            raise FormatoInvalido("El archivo ya está cerrado")
+        desplazamiento = self.entradas[bloque_id][7]
+        (longitud,) = _LONGITUD.unpack_from(self._mapa, desplazamiento)
+        inicio = desplazamiento + _LONGITUD.size
+        if inicio + longitud > len(self._mapa):
+            raise FormatoInvalido(f"El bloque {bloque_id} está truncado")
+        return self._mapa[inicio:inicio + longitud]
+
+    def cargar(self, bloque_id: int):
+        """Lee y devuelve el bloque `bloque_id` completo."""
+        try:
+            return _decodificar(self.entradas[bloque_id], self.carga_comprimida(bloque_id))
+        except (zlib.error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as e:
+            raise FormatoInvalido(f"El bloque {bloque_id} está dañado: {e}") from None
+
+    def pendiente(self, bloque_id: int) -> BloquePendiente:
+        _, tipo, letra, relleno, borde, filas, columnas, _ = self.entradas[bloque_id]
+        return BloquePendiente(
+            bloque_id, _NOMBRES_TIPO[tipo], filas, columnas, (letra, relleno, borde),
+            partial(self.cargar, bloque_id), origen=self,
+        )
+
+    def cerrar(self) -> None:
+        self._mapa = None
+        self._cierre()
+
+
+def abrir_documento(ruta: str) -> Documento:
+    """
+    Abre un archivo .qkl y devuelve su documento con todos los bloques
+    pendientes: solo se lee el índice.
+    """
+    archivo = ArchivoDocumento(ruta)
+    documento = Documento()
+    for bloque_id in archivo.orden:
+        documento.agregar_pendiente(archivo.pendiente(bloque_id))
+    return documento
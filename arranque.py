@@ -0,0 +1,244 @@
+"""
+Medición del arranque de QuicKual y precarga de la exportación.
+
+`iniciar()` es lo primero que ejecuta main.py: desde ese momento se mide cuánto
+tarda en ejecutarse cada módulo que se importa (tiempo total, con sus propias
+importaciones, y tiempo propio). `al_primer_dibujo(root)` anota cuándo se ha
+dibujado la ventana por primera vez y, a continuación, importa los módulos de
+`PRECARGA` (la exportación con ReportLab, que ya no se importa al arrancar) en
+un hilo en segundo plano, para que la primera exportación no tenga que
+esperarlos.
+
+Variables de entorno:
+- QUICKUAL_ARRANQUE=1: escribe el informe en la salida de error al dibujar la
+  ventana (y otra vez al terminar la precarga);
+- QUICKUAL_ARRANQUE_JSON=ruta: guarda además el informe en JSON;
+- QUICKUAL_ARRANQUE_MS=n: presupuesto del primer dibujo; si se supera, se avisa
+  en la salida de error;
+- QUICKUAL_ARRANQUE_SALIR=1: cierra la aplicación en cuanto tiene el informe
+  completo (lo usa benchmarks/bench_arranque.py);
+- QUICKUAL_PRECARGA=0: no precargar nada.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from importlib import import_module
+from typing import Any, Dict, List, Optional
+
+# Módulos que se importan en segundo plano después del primer dibujo
+PRECARGA = ("export_pdf",)
+
+informar = os.environ.get("QUICKUAL_ARRANQUE", "") not in ("", "0")
+ruta_json = os.environ.get("QUICKUAL_ARRANQUE_JSON", "")
+presupuesto_ms = float(os.environ.get("QUICKUAL_ARRANQUE_MS", "0") or 0)
+salir = os.environ.get("QUICKUAL_ARRANQUE_SALIR", "") not in ("", "0")
+precargar_al_dibujar = os.environ.get("QUICKUAL_PRECARGA", "1") not in ("", "0")
+
+_lock = threading.Lock()
+_hilo = threading.local()
+_inicio: Optional[float] = None
+_primer_dibujo: Optional[float] = None
+_precarga: Optional[float] = None
+# (módulo, total_s, propio_s, segundos desde el inicio al terminar, hilo)
+_importaciones: List[tuple] = []
+_HILO_PRECARGA = "precargar-exportacion"
+
+
+# ====
+# Importaciones cronometradas
+# ====
+
+
+class _CargadorCronometrado:
+    """Envuelve el cargador de un módulo y mide su `exec_module`."""
+
+    def __init__(self, cargador, nombre: str) -> None:
+        self._cargador = cargador
+        self._nombre = nombre
+
+    def create_module(self, spec):
+        return self._cargador.create_module(spec)
+
+    def exec_module(self, modulo) -> None:
+        pila = getattr(_hilo, "pila", None)
+        if pila is None:
+            pila = _hilo.pila = []
+        pila.append(0.0)  # tiempo de las importaciones anidadas
+        inicio = time.perf_counter()
+        try:
+            self._cargador.exec_module(modulo)
+        finally:
+            fin = time.perf_counter()
+            total = fin - inicio
+            anidadas = pila.pop()
+            if pila:
+                pila[-1] += total
+            # El módulo queda con su cargador original
+            modulo.__loader__ = self._cargador
+            if getattr(modulo, "__spec__", None) is not None:
+                modulo.__spec__.loader = self._cargador
+            with _lock:
+                _importaciones.append((self._nombre, total, total - anidadas, fin - _inicio,
+                                       threading.current_thread().name))
+
+    def __getattr__(self, nombre):
+        return getattr(self._cargador, nombre)
+
+
+class _BuscadorCronometrado:
+    """Primer buscador de `sys.meta_path`: delega en los demás y envuelve el cargador."""
+
+    def find_spec(self, nombre, path, target=None):
+        for buscador in sys.meta_path:
+            if buscador is self or not hasattr(buscador, "find_spec"):
+                continue
+            spec = buscador.find_spec(nombre, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _CargadorCronometrado(spec.loader, nombre)
+            return spec
+        return None
+
+
+def iniciar() -> None:
+    """Empieza a medir el arranque (solo la primera vez que se llama)."""
+    global _inicio
+    if _inicio is not None:
+        return
+    _inicio = time.perf_counter()
+    sys.meta_path.insert(0, _BuscadorCronometrado())
+
+
+def _dejar_de_medir() -> None:
+    sys.meta_path[:] = [b for b in sys.meta_path if not isinstance(b, _BuscadorCronometrado)]
+
+
+# ====
+# Primer dibujo y precarga
+# ====
+
+
+def al_primer_dibujo(root) -> None:
+    """Anota el primer dibujo de `root` y, después, lanza la precarga."""
+    if _inicio is None:
+        iniciar()
+
+    def _mapeada(_=None):
+        root.unbind("<Map>", id_map)
+        root.after_idle(_dibujada)
+
+    def _dibujada():
+        global _primer_dibujo
+        root.update_idletasks()  # termina de dibujar lo pendiente
+        _primer_dibujo = time.perf_counter()
+        _fin_de_fase(primera=True)
+        hilo = None
+        if precargar_al_dibujar:
+            hilo = precargar()
+        else:
+            _dejar_de_medir()
+        if salir:
+            _salir_al_terminar(root, hilo)
+
+    id_map = root.bind("<Map>", _mapeada, add="+")
+
+
+def _salir_al_terminar(root, hilo: Optional[threading.Thread]) -> None:
+    if hilo is not None and hilo.is_alive():
+        root.after(20, _salir_al_terminar, root, hilo)
+    else:
+        root.destroy()
+
+
+def precargar() -> threading.Thread:
+    """Importa los módulos de `PRECARGA` en un hilo en segundo plano."""
+    def _importar():
+        global _precarga
+        inicio = time.perf_counter()
+        for nombre in PRECARGA:
+            try:
+                import_module(nombre)
+            except ImportError as e:
+                print(f"QuicKual: no se pudo precargar {nombre}: {e}", file=sys.stderr)
+        _precarga = time.perf_counter() - inicio
+        _dejar_de_medir()
+        _fin_de_fase(primera=False)
+
+    hilo = threading.Thread(target=_importar, name=_HILO_PRECARGA, daemon=True)
+    hilo.start()
+    return hilo
+
+
+def _fin_de_fase(primera: bool) -> None:
+    datos = informe()
+    if informar:
+        print(como_texto(datos), file=sys.stderr)
+    if ruta_json:
+        try:
+            with open(ruta_json, "w", encoding="utf-8") as f:
+                json.dump(datos, f, indent=2)
+        except OSError as e:
+            print(f"QuicKual: no se pudo guardar el informe de arranque: {e}", file=sys.stderr)
+    if primera and presupuesto_ms and datos["primer_dibujo_ms"] > presupuesto_ms:
+        print(f"QuicKual: primer dibujo a los {datos['primer_dibujo_ms']:.0f} ms, "
+              f"por encima del presupuesto de {presupuesto_ms:.0f} ms", file=sys.stderr)
+
+
+# ====
+# Informe
+# ====
+
+
+def informe() -> Dict[str, Any]:
+    """
+    {primer_dibujo_ms, precarga_ms, presupuesto_ms, importaciones}; las
+    importaciones van de más a menos tiempo propio y su `fase` es "arranque"
+    (antes del primer dibujo), "precarga" o "uso" (importadas después, al
+    usar alguna función).
+    """
+    with _lock:
+        importaciones = list(_importaciones)
+    limite = (_primer_dibujo - _inicio) if _primer_dibujo is not None and _inicio is not None else None
+    return {
+        "primer_dibujo_ms": 1000 * limite if limite is not None else None,
+        "precarga_ms": 1000 * _precarga if _precarga is not None else None,
+        "presupuesto_ms": presupuesto_ms or None,
+        "importaciones": [
+            {
+                "modulo": nombre,
+                "total_ms": 1000 * total,
+                "propio_ms": 1000 * propio,
+                "fase": _fase(fin, hilo, limite),
+            }
+            for nombre, total, propio, fin, hilo in sorted(importaciones, key=lambda x: -x[2])
+        ],
+    }
+
+
+def _fase(fin: float, hilo: str, limite: Optional[float]) -> str:
+    if hilo == _HILO_PRECARGA:
+        return "precarga"
+    if limite is None or fin <= limite:
+        return "arranque"
+    return "uso"
+
+
+def como_texto(datos: Dict[str, Any] = None, limite: int = 25) -> str:
+    """Resumen legible del informe: tiempos globales y los módulos más lentos."""
+    datos = datos or informe()
+    lineas = []
+    if datos["primer_dibujo_ms"] is not None:
+        lineas.append(f"Primer dibujo: {datos['primer_dibujo_ms']:.1f} ms")
+    if datos["precarga_ms"] is not None:
+        lineas.append(f"Precarga en segundo plano: {datos['precarga_ms']:.1f} ms")
+    antes = [i for i in datos["importaciones"] if i["fase"] == "arranque"]
+    lineas.append(f"Importaciones antes del primer dibujo: {len(antes)} módulos, "
+                  f"{sum(i['propio_ms'] for i in antes):.1f} ms")
+    lineas.append(f"{'módulo':40s} {'propio ms':>10s} {'total ms':>10s}  fase")
+    for i in datos["importaciones"][:limite]:
+        lineas.append(f"{i['modulo']:40s} {i['propio_ms']:10.2f} {i['total_ms']:10.2f}  {i['fase']}")
+    return "\n".join(lineas)
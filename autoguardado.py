@@ -0,0 +1,426 @@
+"""
+Autoguardado de la sesión y recuperación tras un cierre inesperado.
+
+Cada cambio del documento (los que avisa `historial.Historial` a sus
+`oyentes`) se apunta en un diario en disco. El hilo de Tk solo codifica los
+cambios de los últimos `INTERVALO_MS` y los deja en una cola; un hilo
+escritor los agrupa, los escribe y hace fsync, así que la interfaz nunca
+espera al disco.
+
+En la carpeta hay, por generación n:
+    instantanea-n.qkl   el documento entero en el formato nativo (.qkl)
+    diario-n.log        los cambios posteriores a esa instantánea
+
+Cada registro del diario es: longitud u32 | crc32 u32 | cuerpo, donde el
+cuerpo es una cabecera JSON y, en los bloques, una línea y la carga
+comprimida tal como la escribe `archivo_documento`:
+    ["bloque", id, antes_de, tipo, letra, relleno, borde, filas, columnas] + carga
+    ["eliminar", id]
+    ["mover", id, antes_de]
+    ["celda", id, fila, col, valor]
+    ["texto", id, texto]
+Los registros dan el estado final de lo que tocan, no la diferencia, de modo
+que aplicarlos dos veces da lo mismo que una.
+
+Cuando el diario pasa de `MAX_REGISTROS` registros se compacta: se empieza
+una generación nueva, se codifica el documento por tandas con `after` (como
+estaba al empezar) y el escritor escribe la instantánea con fsync y borra
+las generaciones anteriores. Lo que cambie mientras tanto va al diario nuevo
+y se vuelve a aplicar sobre la instantánea al recuperar.
+
+`recuperar` abre la última instantánea válida (solo el índice, ver
+`archivo_documento.abrir_documento`) y aplica los diarios de esa generación
+en adelante hasta el primer registro truncado o dañado, así que el tiempo no
+depende del tamaño de la sesión sino de lo que quedó sin compactar.
+
+Con QUICKUAL_AUTOGUARDADO=0 no se guarda nada; la carpeta es
+QUICKUAL_AUTOGUARDADO_DIR o ~/.quickual/autoguardado.
+"""
+
+import json
+import os
+import queue
+import re
+import struct
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from archivo_documento import (
+    FormatoInvalido, _decodificar, abrir_documento, codificar_bloque, escribir_documento,
+)
+from documento import Documento, documento_de
+from historial import Cambio, historial_de
+
+CARPETA = os.environ.get("QUICKUAL_AUTOGUARDADO_DIR") or os.path.join(
+    os.path.expanduser("~"), ".quickual", "autoguardado")
+ACTIVADO = os.environ.get("QUICKUAL_AUTOGUARDADO", "1") != "0"
+
+# Cada cuánto se pasan los cambios al escritor
+INTERVALO_MS = 500
+# Registros del diario a partir de los cuales se compacta
+MAX_REGISTROS = 5000
+# Bloques que se codifican por turno de `after` al compactar
+BLOQUES_POR_TURNO = 256
+
+_REGISTRO = struct.Struct("<II")
+_ARCHIVO = re.compile(r"^(instantanea|diario)-(\d+)\.(qkl|log)$")
+
+
+def _ruta_instantanea(carpeta: str, generacion: int) -> str:
+    return os.path.join(carpeta, f"instantanea-{generacion:08d}.qkl")
+
+
+def _ruta_diario(carpeta: str, generacion: int) -> str:
+    return os.path.join(carpeta, f"diario-{generacion:08d}.log")
+
+
+def _generaciones(carpeta: str) -> Tuple[Dict[int, str], Dict[int, str]]:
+    """Instantáneas y diarios de la carpeta: generación -> ruta."""
+    instantaneas, diarios = {}, {}
+    try:
+        nombres = os.listdir(carpeta)
+    except OSError:
+        return instantaneas, diarios
+    for nombre in nombres:
+        m = _ARCHIVO.match(nombre)
+        if m:
+            destino = instantaneas if m.group(1) == "instantanea" else diarios
+            destino[int(m.group(2))] = os.path.join(carpeta, nombre)
+    return instantaneas, diarios
+
+
+def _sincronizar_carpeta(carpeta: str) -> None:
+    """Lleva a disco las entradas de la carpeta (archivos creados o sustituidos)."""
+    if os.name == "nt":
+        return
+    fd = os.open(carpeta, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ====
+# Registros del diario
+# ====
+
+
+def codificar_registro(cabecera: list, carga: bytes = b"") -> bytes:
+    cuerpo = json.dumps(cabecera, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if carga:
+        cuerpo += b"\n" + carga
+    return _REGISTRO.pack(len(cuerpo), zlib.crc32(cuerpo)) + cuerpo
+
+
+def leer_registros(ruta: str) -> Iterator[Tuple[list, bytes]]:
+    """Registros del diario en orden, hasta el final o el primero truncado o dañado."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    pos = 0
+    while pos + _REGISTRO.size <= len(datos):
+        longitud, crc = _REGISTRO.unpack_from(datos, pos)
+        inicio = pos + _REGISTRO.size
+        cuerpo = datos[inicio:inicio + longitud]
+        if len(cuerpo) < longitud or zlib.crc32(cuerpo) != crc:
+            return
+        cabecera, _, carga = cuerpo.partition(b"\n")
+        try:
+            yield json.loads(cabecera.decode("utf-8")), carga
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return
+        pos = inicio + longitud
+
+
+def _registro(cambio: Cambio) -> Optional[bytes]:
+    """Registro del diario para un cambio del historial (None si no se puede codificar)."""
+    tipo = cambio[0]
+    if tipo == "insertar":
+        _, bloque, antes_de = cambio
+        try:
+            entrada, carga = codificar_bloque(bloque)
+        except (FormatoInvalido, OSError):
+            return None
+        return codificar_registro(["bloque", bloque.id, antes_de, *entrada[1:]], carga)
+    if tipo == "eliminar":
+        return codificar_registro(["eliminar", cambio[1].id])
+    if tipo == "mover":
+        return codificar_registro(["mover", cambio[1], cambio[3]])
+    if tipo == "celda":
+        _, tabla_id, fila, col, _, nuevo = cambio
+        return codificar_registro(["celda", tabla_id, fila, col, nuevo])
+    return codificar_registro(["texto", cambio[1].id, cambio[1].texto])
+
+
+def aplicar_registro(documento: Documento, cabecera: list, carga: bytes) -> None:
+    """Aplica un registro del diario; los que hablan de bloques que no existen no hacen nada."""
+    tipo, bloque_id = cabecera[0], cabecera[1]
+    if tipo in ("bloque", "mover"):
+        antes_de = cabecera[2]
+        if antes_de is not None and (antes_de == bloque_id or documento.vistazo(antes_de) is None):
+            antes_de = None
+        if tipo == "bloque":
+            try:
+                bloque = _decodificar((bloque_id, *cabecera[3:], 0), carga)
+            except (zlib.error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+                return
+            documento.eliminar(bloque_id)
+            documento.insertar(bloque, antes_de)
+        elif documento.vistazo(bloque_id) is not None:
+            documento.mover(bloque_id, antes_de)
+    elif tipo == "eliminar":
+        documento.eliminar(bloque_id)
+    elif tipo == "celda":
+        tabla = documento.get(bloque_id)
+        _, _, fila, col, valor = cabecera
+        if tabla is not None and tabla.tipo == "table" and fila < tabla.filas and col < tabla.columnas:
+            tabla.set(fila, col, valor)
+    elif tipo == "texto":
+        bloque = documento.get(bloque_id)
+        if bloque is not None and bloque.tipo == "text":
+            bloque.texto = cabecera[2]
+
+
+def recuperar(carpeta: str = CARPETA) -> Optional[Documento]:
+    """
+    Documento de la última sesión: la instantánea más reciente que se pueda
+    abrir y los diarios desde su generación. None si no hay nada guardado.
+    """
+    instantaneas, diarios = _generaciones(carpeta)
+    if not instantaneas and not diarios:
+        return None
+    documento, base = Documento(), 0
+    for generacion in sorted(instantaneas, reverse=True):
+        try:
+            documento = abrir_documento(instantaneas[generacion])
+        except (OSError, FormatoInvalido):
+            continue
+        base = generacion
+        break
+    for generacion in sorted(diarios):
+        if generacion < base:
+            continue
+        try:
+            for cabecera, carga in leer_registros(diarios[generacion]):
+                aplicar_registro(documento, cabecera, carga)
+        except OSError:
+            continue
+    return documento
+
+
+# ====
+# Hilo escritor
+# ====
+
+
+class _Escritor(threading.Thread):
+    """
+    Escribe en disco lo que le llega por `cola`. Todo lo que haya en la cola
+    se escribe de una vez y con un solo fsync. Tareas:
+        ("diario", generación, datos)
+        ("instantanea", generación, bloques)   bloques como en escribir_documento
+        ("descartar", generación)              borra esa generación y las anteriores
+        ("fin",)
+    """
+
+    def __init__(self, carpeta: str) -> None:
+        super().__init__(name="autoguardado", daemon=True)
+        self.carpeta = carpeta
+        self.cola: "queue.Queue[tuple]" = queue.Queue()
+        self.error: Optional[OSError] = None
+        self.sincronizaciones = 0
+        self._archivo = None
+        self._generacion: Optional[int] = None
+        self._sucio = False
+
+    def run(self) -> None:
+        while True:
+            tareas = [self.cola.get()]
+            while True:
+                try:
+                    tareas.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            for tarea in tareas:
+                try:
+                    if tarea[0] == "diario":
+                        self._escribir_diario(tarea[1], tarea[2])
+                    elif tarea[0] == "instantanea":
+                        self._escribir_instantanea(tarea[1], tarea[2])
+                    elif tarea[0] == "descartar":
+                        self._descartar(tarea[1])
+                    else:
+                        self._cerrar_diario()
+                        return
+                except OSError as e:
+                    self.error = e
+            try:
+                self._sincronizar()
+            except OSError as e:
+                self.error = e
+
+    def _escribir_diario(self, generacion: int, datos: bytes) -> None:
+        if generacion != self._generacion:
+            self._cerrar_diario()
+            self._archivo = open(_ruta_diario(self.carpeta, generacion), "ab")
+            self._generacion = generacion
+            _sincronizar_carpeta(self.carpeta)
+        self._archivo.write(datos)
+        self._sucio = True
+
+    def _escribir_instantanea(self, generacion: int, bloques: List[Tuple[Tuple, bytes]]) -> None:
+        escribir_documento(_ruta_instantanea(self.carpeta, generacion), bloques, sincronizar=True)
+        _sincronizar_carpeta(self.carpeta)
+        # Solo ahora que la instantánea está en disco sobran las anteriores
+        self._descartar(generacion - 1)
+
+    def _descartar(self, generacion: int) -> None:
+        if self._generacion is not None and self._generacion <= generacion:
+            self._cerrar_diario()
+        instantaneas, diarios = _generaciones(self.carpeta)
+        for n, ruta in list(instantaneas.items()) + list(diarios.items()):
+            if n <= generacion:
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass  # p. ej. una instantánea aún proyectada en Windows; se borrará en otra vuelta
+
+    def _sincronizar(self) -> None:
+        if self._sucio:
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+            self._sucio = False
+            self.sincronizaciones += 1
+
+    def _cerrar_diario(self) -> None:
+        if self._archivo is not None:
+            self._sincronizar()
+            self._archivo.close()
+            self._archivo = None
+            self._generacion = None
+
+
+# ====
+# Autoguardado de la sesión (hilo de Tk)
+# ====
+
+
+class Autoguardado:
+    """
+    Apunta en el diario los cambios del documento de `scrollable_frame`.
+    `root` solo se usa para `after`. Se empieza con `iniciar()`, se llama a
+    `documento_nuevo()` cuando el frame cambia de documento y a `cerrar()` al
+    salir.
+    """
+
+    def __init__(self, root, scrollable_frame, carpeta: str = CARPETA,
+                 intervalo_ms: int = INTERVALO_MS, max_registros: int = MAX_REGISTROS) -> None:
+        self.root = root
+        self.scrollable_frame = scrollable_frame
+        self.carpeta = carpeta
+        self.intervalo_ms = intervalo_ms
+        self.max_registros = max_registros
+        os.makedirs(carpeta, exist_ok=True)
+        instantaneas, diarios = _generaciones(carpeta)
+        self.generacion = max([0, *instantaneas, *diarios])
+        self._escritor = _Escritor(carpeta)
+        self._escritor.start()
+        self._historial = None
+        # Cambios aún no codificados, en orden
+        self._cambios: List[Cambio] = []
+        self._programado = None
+        # Registros en el diario de la generación actual
+        self.registros = 0
+        # (generación, bloques, codificados) de la compactación en curso
+        self._compactando = None
+
+    @property
+    def error(self) -> Optional[OSError]:
+        """Último error de disco del escritor (None si todo va bien)."""
+        return self._escritor.error
+
+    def iniciar(self, descartar_anterior: bool = False) -> None:
+        """
+        Empieza a guardar el documento actual con una instantánea nueva. Con
+        `descartar_anterior` se borra antes la sesión guardada que hubiera.
+        """
+        if descartar_anterior:
+            self._escritor.cola.put(("descartar", self.generacion))
+        self.documento_nuevo()
+
+    def documento_nuevo(self) -> None:
+        """El frame tiene otro documento (p. ej. al abrir un archivo): se guarda entero."""
+        self._volcar(compactar=False)
+        historial = historial_de(self.scrollable_frame)
+        if historial is not self._historial:
+            if self._historial is not None:
+                self._historial.oyentes.remove(self._anotar)
+            self._historial = historial
+            historial.oyentes.append(self._anotar)
+        self.compactar()
+
+    def _anotar(self, cambio: Cambio) -> None:
+        cambios = self._cambios
+        # Pulsaciones seguidas en la misma celda o el mismo texto: basta la última
+        if cambios and cambio[0] in ("celda", "texto") and cambios[-1][0] == cambio[0]:
+            if cambio[0] == "celda" and cambios[-1][1:4] == cambio[1:4]:
+                cambios[-1] = cambio
+                return
+            if cambio[0] == "texto" and cambios[-1][1] is cambio[1]:
+                return
+        cambios.append(cambio)
+        if self._programado is None:
+            self._programado = self.root.after(self.intervalo_ms, self._volcar)
+
+    def _volcar(self, compactar: bool = True) -> None:
+        """Codifica los cambios pendientes y se los pasa al escritor."""
+        self._programado = None
+        if not self._cambios:
+            return
+        # Las inserciones se codifican ahora, con lo que se haya rellenado después
+        registros = [r for r in map(_registro, self._cambios) if r is not None]
+        self._cambios = []
+        self._escritor.cola.put(("diario", self.generacion, b"".join(registros)))
+        self.registros += len(registros)
+        if compactar and self.registros >= self.max_registros and self._compactando is None:
+            self.compactar()
+
+    def compactar(self) -> None:
+        """
+        Empieza una generación nueva con una instantánea del documento tal como
+        está ahora; se codifica por tandas para no bloquear la interfaz.
+        """
+        self._volcar(compactar=False)
+        self.generacion += 1
+        self.registros = 0
+        documento = documento_de(self.scrollable_frame)
+        # Los objetos de ahora, por si se eliminan o cambian antes de codificarlos
+        bloques = [documento.vistazo(bloque_id) for bloque_id in documento.ids()]
+        self._compactando = (self.generacion, bloques, [])
+        self.root.after(0, self._compactar_tanda, self._compactando)
+
+    def _compactar_tanda(self, compactacion) -> None:
+        if compactacion is not self._compactando:
+            return  # la sustituyó otra compactación
+        generacion, bloques, codificados = compactacion
+        for bloque in bloques[len(codificados):len(codificados) + BLOQUES_POR_TURNO]:
+            try:
+                codificados.append(codificar_bloque(bloque))
+            except (FormatoInvalido, OSError):
+                # Sin este bloque la instantánea no vale: se queda la anterior
+                self._compactando = None
+                return
+        if len(codificados) < len(bloques):
+            self.root.after(0, self._compactar_tanda, compactacion)
+            return
+        self._compactando = None
+        self._escritor.cola.put(("instantanea", generacion, codificados))
+
+    def cerrar(self, espera: float = 5.0) -> None:
+        """Pasa al escritor lo pendiente y espera a que lo lleve a disco."""
+        if self._programado is not None:
+            self.root.after_cancel(self._programado)
+        self._volcar(compactar=False)
+        self._compactando = None
+        self._escritor.cola.put(("fin",))
+        self._escritor.join(espera)
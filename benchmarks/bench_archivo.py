@@ -0,0 +1,88 @@
+"""
+Benchmark del formato de documento (archivo_documento).
+
+Genera un documento de N bloques con todas las operaciones y bloques de texto,
+lo guarda y mide: guardar, abrir (solo el índice), leer los primeros bloques
+que caben en pantalla, leer el documento entero y volver a guardar un
+documento abierto sin leerlo (copia de cargas comprimidas).
+
+No necesita servidor gráfico:
+    python benchmarks/bench_archivo.py [--bloques 5000] [--json resultados.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archivo_documento import abrir_documento, guardar_documento  # noqa: E402
+from documento import Documento  # noqa: E402
+from operaciones import (  # noqa: E402
+    plantilla_suma, plantilla_resta, plantilla_multiplicacion, plantilla_division,
+    plantilla_factorial, plantilla_raiz, plantilla_binaria,
+)
+
+
+def _documento(bloques: int) -> Documento:
+    plantillas = [
+        plantilla_suma("1234,56", "789,1"), plantilla_resta("1000", "3,25"),
+        plantilla_multiplicacion(12345, 678), plantilla_division(987654, 32),
+        plantilla_factorial(720720), plantilla_raiz(2, 1764), plantilla_binaria("1000"),
+    ]
+    documento = Documento()
+    for i in range(bloques):
+        if i % 8 == 7:
+            documento.nuevo_texto(f"Ejercicio {i}: resuelve las operaciones anteriores.")
+            continue
+        plantilla = plantillas[i % len(plantillas)]
+        tabla = plantilla.en_documento(documento)
+        for key in plantilla.bloqueadas:
+            tabla.estilos[key] = {"state": "disabled"}
+    return documento
+
+
+def _medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, 1000 * (time.perf_counter() - inicio)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, default=5000)
+    parser.add_argument('--visibles', type=int, default=10, help="Bloques leídos al abrir")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    documento = _documento(args.bloques)
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'bench.qkl')
+        _, guardar_ms = _medir(lambda: guardar_documento(documento, ruta))
+        abierto, abrir_ms = _medir(lambda: abrir_documento(ruta))
+        _, visibles_ms = _medir(lambda: [abierto.get(b) for b in abierto.ids()[:args.visibles]])
+        _, copia_ms = _medir(lambda: guardar_documento(abrir_documento(ruta), os.path.join(carpeta, 'copia.qkl')))
+        _, todo_ms = _medir(lambda: list(abierto))
+        resultados = {
+            'bloques': args.bloques,
+            'tamano_kb': os.path.getsize(ruta) / 1024,
+            'guardar_ms': guardar_ms,
+            'abrir_ms': abrir_ms,
+            'leer_visibles_ms': visibles_ms,
+            'leer_todo_ms': todo_ms,
+            'guardar_sin_leer_ms': copia_ms,
+        }
+
+    for clave, valor in resultados.items():
+        print(f"{clave:22s} {valor:10.2f}" if isinstance(valor, float) else f"{clave:22s} {valor:10d}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark del arranque en frío de QuicKual (main.py).
+
+Lanza la aplicación N veces en procesos nuevos con QUICKUAL_ARRANQUE_SALIR=1:
+cada una se cierra sola en cuanto ha dibujado la ventana y ha terminado la
+precarga de la exportación. De cada arranque se lee el informe de `arranque`
+(QUICKUAL_ARRANQUE_JSON) y se da la mediana del tiempo hasta el primer dibujo,
+de la precarga y del tiempo propio de cada módulo importado antes del dibujo.
+
+Con --presupuesto-ms el programa termina con código 1 si la mediana del primer
+dibujo lo supera, o si ReportLab se ha importado antes del primer dibujo.
+
+Necesita un servidor gráfico; en una máquina sin pantalla:
+    xvfb-run python benchmarks/bench_arranque.py --arranques 10 --presupuesto-ms 800
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _arrancar(ruta_json: str, precarga: bool) -> dict:
+    entorno = dict(os.environ, QUICKUAL_ARRANQUE_SALIR="1", QUICKUAL_ARRANQUE_JSON=ruta_json,
+                   QUICKUAL_PRECARGA="1" if precarga else "0")
+    entorno.pop("QUICKUAL_ARRANQUE", None)
+    subprocess.run([sys.executable, os.path.join(RAIZ, "main.py")], cwd=RAIZ, env=entorno,
+                   check=True, timeout=120)
+    with open(ruta_json, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--arranques', type=int, default=5)
+    parser.add_argument('--sin-precarga', action='store_true', help="Arrancar con QUICKUAL_PRECARGA=0")
+    parser.add_argument('--presupuesto-ms', type=float, help="Máximo admitido para el primer dibujo")
+    parser.add_argument('--modulos', type=int, default=15, help="Módulos más lentos que se muestran")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    informes = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        for i in range(args.arranques):
+            informes.append(_arrancar(os.path.join(carpeta, f"arranque_{i}.json"), not args.sin_precarga))
+
+    propios = {}
+    reportlab_al_arrancar = set()
+    for informe in informes:
+        for importacion in informe["importaciones"]:
+            if importacion["fase"] != "arranque":
+                continue
+            propios.setdefault(importacion["modulo"], []).append(importacion["propio_ms"])
+            if importacion["modulo"].split(".")[0] == "reportlab":
+                reportlab_al_arrancar.add(importacion["modulo"])
+    modulos = sorted(((m, statistics.median(t)) for m, t in propios.items()), key=lambda x: -x[1])
+    precargas = [i["precarga_ms"] for i in informes if i["precarga_ms"] is not None]
+
+    resultados = {
+        'arranques': args.arranques,
+        'primer_dibujo_ms': statistics.median(i["primer_dibujo_ms"] for i in informes),
+        'precarga_ms': statistics.median(precargas) if precargas else None,
+        'importaciones_arranque_ms': sum(t for _, t in modulos),
+        'modulos_arranque': len(modulos),
+        'reportlab_al_arrancar': sorted(reportlab_al_arrancar),
+        'modulos': dict(modulos),
+    }
+
+    print(f"primer dibujo       {resultados['primer_dibujo_ms']:10.1f} ms (mediana de {args.arranques})")
+    if resultados['precarga_ms'] is not None:
+        print(f"precarga            {resultados['precarga_ms']:10.1f} ms (en segundo plano)")
+    print(f"importaciones       {resultados['importaciones_arranque_ms']:10.1f} ms en {len(modulos)} módulos")
+    for modulo, ms in modulos[:args.modulos]:
+        print(f"  {modulo:40s} {ms:8.2f} ms")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+    fallos = 0
+    if reportlab_al_arrancar:
+        print(f"ReportLab se importa antes del primer dibujo: {sorted(reportlab_al_arrancar)[:5]}",
+              file=sys.stderr)
+        fallos += 1
+    if args.presupuesto_ms is not None and resultados['primer_dibujo_ms'] > args.presupuesto_ms:
+        print(f"Primer dibujo por encima del presupuesto de {args.presupuesto_ms:.0f} ms", file=sys.stderr)
+        fallos += 1
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
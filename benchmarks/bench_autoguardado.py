@@ -0,0 +1,161 @@
+"""
+Benchmark del autoguardado (autoguardado.Autoguardado y recuperar).
+
+Genera un documento de N bloques, empieza a autoguardarlo en una carpeta
+temporal y hace M cambios al azar (los de bench_historial más ediciones de
+texto y algún deshacer), pasando los cambios al escritor cada
+`--cada` cambios como haría el `after` de Tk. Mide lo que cuesta en el hilo
+de Tk (el cambio no cuenta, solo anotarlo, codificarlo y compactar) y el
+turno más largo, cuántos fsync ha hecho el escritor y el tamaño del diario.
+Después cierra, recupera la sesión desde disco y compara el documento
+recuperado con el original. Con --truncar se corta además el último diario a
+medio registro y se comprueba que la recuperación sigue funcionando.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_autoguardado.py [--bloques 1000 10000] [--cambios 5000]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import autoguardado  # noqa: E402
+from autoguardado import Autoguardado, recuperar  # noqa: E402
+from documento import registrar_documento  # noqa: E402
+from historial import Historial  # noqa: E402
+from bench_historial import _cambiar, _documento, _estado  # noqa: E402
+
+
+class _Raiz:
+    """Hace de Tk para `Autoguardado`: `after` apunta la llamada y `correr` las ejecuta."""
+
+    def __init__(self) -> None:
+        self._llamadas = []
+        self.turno_maximo = 0.0
+
+    def after(self, _ms, funcion, *args):
+        self._llamadas.append((funcion, args))
+        return len(self._llamadas)
+
+    def after_cancel(self, _id) -> None:
+        pass
+
+    def correr(self) -> float:
+        total = 0.0
+        while self._llamadas:
+            funcion, args = self._llamadas.pop(0)
+            inicio = time.perf_counter()
+            funcion(*args)
+            turno = time.perf_counter() - inicio
+            self.turno_maximo = max(self.turno_maximo, turno)
+            total += turno
+        return total
+
+
+class _Frame:
+    """Clave del documento en el registro (en la aplicación es el frame scrollable)."""
+
+
+def _medir(bloques: int, cambios: int, cada: int, max_registros: int, semilla: int, truncar: bool) -> dict:
+    rng = random.Random(semilla)
+    carpeta = tempfile.mkdtemp(prefix="quickual-autoguardado-")
+    try:
+        frame, raiz = _Frame(), _Raiz()
+        documento = _documento(bloques, rng)
+        historial = Historial(documento)
+        registrar_documento(frame, documento)
+        guardado = Autoguardado(raiz, frame, carpeta, max_registros=max_registros)
+        guardado.iniciar()
+        raiz.correr()
+
+        anotar = 0.0
+        tk_s = 0.0
+        compactaciones = 0
+        for i in range(cambios):
+            tipo = rng.randrange(10)
+            if tipo == 0:
+                historial.deshacer()
+            elif tipo == 1:
+                bloque = documento.get(rng.choice([b for b in documento.ids()[:300]
+                                                   if documento.vistazo(b).tipo == "text"]))
+                for letra in " y otra cosa":
+                    bloque.texto += letra
+                    inicio = time.perf_counter()
+                    historial.texto(bloque)
+                    anotar += time.perf_counter() - inicio
+            else:
+                _cambiar(documento, historial, rng)
+            if (i + 1) % cada == 0:
+                generacion = guardado.generacion
+                tk_s += raiz.correr()
+                compactaciones += guardado.generacion - generacion
+        tk_s += raiz.correr()
+        # Lo que cuesta avisar a los oyentes va dentro de cada cambio; se estima con el de texto
+        guardado.cerrar()
+
+        _, diarios = autoguardado._generaciones(carpeta)
+        bytes_diario = sum(os.path.getsize(r) for r in diarios.values())
+        if truncar and diarios:
+            ultimo = diarios[max(diarios)]
+            tamano = os.path.getsize(ultimo)
+            with open(ultimo, "r+b") as f:
+                f.truncate(max(0, tamano - 7))
+
+        inicio = time.perf_counter()
+        recuperado = recuperar(carpeta)
+        recuperar_s = time.perf_counter() - inicio
+        igual = _estado(recuperado) == _estado(documento)
+        return {
+            'tk_us_por_cambio': 1e6 * (tk_s + anotar) / cambios,
+            'turno_maximo_ms': 1000 * raiz.turno_maximo,
+            'compactaciones': compactaciones,
+            'fsync': guardado._escritor.sincronizaciones,
+            'diario_kb': bytes_diario / 1024,
+            'recuperar_ms': 1000 * recuperar_s,
+            'igual': igual,
+            'error': repr(guardado.error) if guardado.error else None,
+        }
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--cambios', type=int, default=5000)
+    parser.add_argument('--cada', type=int, default=20, help="Cambios entre dos volcados al escritor")
+    parser.add_argument('--max-registros', type=int, default=autoguardado.MAX_REGISTROS)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--truncar', action='store_true', help="Cortar el último diario a medio registro")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    fallos = 0
+    for bloques in args.bloques:
+        r = _medir(bloques, args.cambios, args.cada, args.max_registros, args.semilla, args.truncar)
+        resultados[bloques] = r
+        print(f"{bloques:7d} bloques   Tk {r['tk_us_por_cambio']:7.1f} µs/cambio (turno máx. "
+              f"{r['turno_maximo_ms']:.1f} ms)   {r['compactaciones']} compactaciones   {r['fsync']} fsync   "
+              f"diario {r['diario_kb']:8.1f} KB   recuperar {r['recuperar_ms']:7.1f} ms   "
+              f"{'igual' if r['igual'] else 'DISTINTO'}")
+        if r['error']:
+            print(f"  error del escritor: {r['error']}")
+        # Con el diario truncado se pierde el último registro: no tiene por qué coincidir
+        if r['error'] or not (r['igual'] or args.truncar):
+            fallos += 1
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
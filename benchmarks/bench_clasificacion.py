@@ -0,0 +1,95 @@
+"""
+Benchmark de la clasificación de tablas en la exportación.
+
+Compara, sobre un documento de N tablas con operandos aleatorios, el coste de
+obtener los flags de operación con el descriptor de la tabla
+(documento.Operacion, O(1) por tabla) frente a la heurística que recorre las
+celdas (export_pdf._classify_table), y cuenta cuántas tablas clasifica mal la
+heurística.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_clasificacion.py [--tablas 5000] [--semilla 1]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documento import Documento  # noqa: E402
+from export_pdf import OPERATION_FLAGS, _classify_table, _table_flags  # noqa: E402
+from operaciones import (  # noqa: E402
+    plantilla_suma, plantilla_resta, plantilla_multiplicacion, plantilla_division,
+    plantilla_factorial, plantilla_raiz, plantilla_binaria,
+)
+
+
+def _plantilla_aleatoria(rng: random.Random):
+    tipo = rng.randrange(7)
+    if tipo == 0:
+        return plantilla_suma(str(rng.randrange(1, 10 ** 5)), f"{rng.randrange(1, 999)},{rng.randrange(10)}")
+    if tipo == 1:
+        return plantilla_resta(str(rng.randrange(1000, 10 ** 6)), str(rng.randrange(1, 999)))
+    if tipo == 2:
+        return plantilla_multiplicacion(rng.randrange(10, 10 ** 5), rng.randrange(2, 1000))
+    if tipo == 3:
+        return plantilla_division(rng.randrange(100, 10 ** 7), rng.randrange(2, 100))
+    if tipo == 4:
+        return plantilla_factorial(rng.randrange(2, 10 ** 6))
+    if tipo == 5:
+        return plantilla_raiz(rng.randrange(2, 4), rng.randrange(2, 10 ** 5))
+    return plantilla_binaria(str(rng.randrange(2, 10 ** 4)))
+
+
+def _flags_activos(flags):
+    return tuple(sorted(k for k, v in flags.items() if v))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tablas', type=int, default=5000)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.semilla)
+    documento = Documento()
+    for _ in range(args.tablas):
+        _plantilla_aleatoria(rng).en_documento(documento)
+    tablas = list(documento)
+
+    inicio = time.perf_counter()
+    for tabla in tablas:
+        _table_flags(tabla)
+    descriptor_s = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    heuristica = [_classify_table(tabla.matriz()) for tabla in tablas]
+    heuristica_s = time.perf_counter() - inicio
+
+    errores = {}
+    for tabla, flags in zip(tablas, heuristica):
+        if _flags_activos(flags) != _flags_activos(OPERATION_FLAGS[tabla.operacion.tipo]):
+            errores[tabla.operacion.tipo] = errores.get(tabla.operacion.tipo, 0) + 1
+
+    resultados = {
+        'tablas': args.tablas,
+        'descriptor_tablas_s': args.tablas / max(descriptor_s, 1e-9),
+        'heuristica_tablas_s': args.tablas / max(heuristica_s, 1e-9),
+        'errores_heuristica': errores,
+    }
+    print(f"descriptor  {resultados['descriptor_tablas_s']:12,.0f} tablas/s")
+    print(f"heurística  {resultados['heuristica_tablas_s']:12,.0f} tablas/s")
+    print(f"mal clasificadas por la heurística: {sum(errores.values())}/{args.tablas} {errores}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
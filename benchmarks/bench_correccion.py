@@ -0,0 +1,114 @@
+"""
+Benchmark de la corrección en vivo (correccion.Corrector).
+
+Genera un documento con N tablas aleatorias de todas las operaciones, mide lo
+que cuesta preparar la corrección (resolver todas las tablas una vez) y después
+simula a un alumno que rellena cada celda corregible cifra a cifra: primero un
+valor erróneo, lo borra y escribe el correcto. Cada cambio del valor de la
+celda es una llamada a `anotar`, como cada pulsación en el editor de la rejilla.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_correccion.py [--tablas 100]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from correccion import Corrector  # noqa: E402
+from documento import Documento  # noqa: E402
+from operaciones import (  # noqa: E402
+    plantilla_suma, plantilla_resta, plantilla_multiplicacion, plantilla_division,
+    plantilla_factorial, plantilla_raiz, plantilla_binaria,
+)
+
+
+def _documento(tablas: int, rng: random.Random) -> Documento:
+    generadores = [
+        lambda: plantilla_suma(f"{rng.randrange(10 ** 5)},{rng.randrange(100)}", str(rng.randrange(10 ** 4))),
+        lambda: plantilla_resta(str(rng.randrange(10 ** 6)), f"{rng.randrange(1000)},{rng.randrange(10)}"),
+        lambda: plantilla_multiplicacion(rng.randrange(10, 10 ** 5), rng.randrange(2, 10 ** 3)),
+        lambda: plantilla_division(rng.randrange(100, 10 ** 7), rng.randrange(2, 100)),
+        lambda: plantilla_factorial(rng.randrange(2, 10 ** 6)),
+        lambda: plantilla_raiz(rng.choice((2, 3)), rng.randrange(2, 10 ** 5)),
+        lambda: plantilla_binaria(str(rng.randrange(2, 10 ** 4))),
+    ]
+    documento = Documento()
+    for i in range(tablas):
+        plantilla = generadores[i % len(generadores)]()
+        tabla = plantilla.en_documento(documento)
+        for clave in plantilla.bloqueadas:
+            tabla.estilos[clave] = {"state": "disabled"}
+    return documento
+
+
+def _pulsaciones(corrector: Corrector, documento: Documento):
+    """Secuencia (tabla, fila, col, valor) de lo que teclea el alumno."""
+    secuencia = []
+    for tabla in documento:
+        puntuacion = corrector.puntuacion(tabla.id)
+        if puntuacion is None:
+            continue
+        for (fila, col), esperado in corrector._tablas[tabla.id].esperadas.items():
+            erroneo = "x" * len(esperado)
+            for i in range(1, len(erroneo) + 1):
+                secuencia.append((tabla, fila, col, erroneo[:i]))
+            for i in range(len(erroneo) - 1, -1, -1):
+                secuencia.append((tabla, fila, col, erroneo[:i]))
+            for i in range(1, len(esperado) + 1):
+                secuencia.append((tabla, fila, col, esperado[:i]))
+    return secuencia
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tablas', type=int, default=100)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    documento = _documento(args.tablas, random.Random(args.semilla))
+    corrector = Corrector(documento)
+    avisos = []
+    corrector.oyentes.append(avisos.append)
+
+    inicio = time.perf_counter()
+    corrector.preparar()
+    preparar_s = time.perf_counter() - inicio
+
+    secuencia = _pulsaciones(corrector, documento)
+    inicio = time.perf_counter()
+    for tabla, fila, col, valor in secuencia:
+        tabla.set(fila, col, valor)
+        corrector.anotar(tabla, fila, col, valor)
+    teclear_s = time.perf_counter() - inicio
+
+    if corrector.correctas != corrector.total or corrector.incorrectas:
+        print(f"Error: {corrector.correctas}/{corrector.total} correctas, "
+              f"{corrector.incorrectas} incorrectas", file=sys.stderr)
+        return 1
+
+    resultados = {
+        'tablas': args.tablas,
+        'celdas_corregibles': corrector.total,
+        'preparar_ms': 1000 * preparar_s,
+        'pulsaciones': len(secuencia),
+        'pulsacion_us': 1e6 * teclear_s / max(1, len(secuencia)),
+        'pulsaciones_s': len(secuencia) / max(teclear_s, 1e-9),
+        'avisos': len(avisos),
+    }
+    for clave, valor in resultados.items():
+        print(f"{clave:20s} {valor:14,.2f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
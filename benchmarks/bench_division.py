@@ -0,0 +1,93 @@
+"""
+Benchmark de la división larga (division_larga y operaciones.plantilla_division).
+
+Para dividendos al azar de N cifras y divisores de 1, 3 y 6 cifras mide el
+tiempo de los pasos de la división (una pasada por las cifras), el de su
+colocación en escalera y el de la plantilla completa (solo hasta
+MAX_CIFRAS_DIVIDENDO cifras, el máximo que admite), y comprueba cociente y
+resto con la división de enteros de Python. Si el coste es lineal, pasar de
+10^3 a 10^4 cifras multiplica los tiempos por unas 10 veces.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_division.py [--cifras 1000 10000] [--repeticiones 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from division_larga import Escalera, dividir  # noqa: E402
+from operaciones import MAX_CIFRAS_DIVIDENDO, plantilla_division  # noqa: E402
+
+
+def _mejor(funcion, repeticiones: int) -> float:
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def _medir(cifras: int, cifras_divisor: int, repeticiones: int, rng: random.Random) -> dict:
+    dividendo = str(rng.randrange(1, 10)) + ''.join(rng.choice('0123456789') for _ in range(cifras - 1))
+    divisor = str(rng.randrange(10 ** (cifras_divisor - 1), 10 ** cifras_divisor))
+    division = dividir(dividendo, divisor)
+    disposicion = Escalera(division)
+
+    # Comprobación con la división de Python (sin el límite de conversión a str)
+    limite = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        cociente, resto = divmod(int(dividendo), int(divisor))
+        correcta = division.cociente == str(cociente) and division.resto == resto
+    finally:
+        sys.set_int_max_str_digits(limite)
+
+    return {
+        'pasos': len(division.pasos),
+        'filas': disposicion.filas,
+        'celdas_escritas': len(disposicion.fijas) + len(disposicion.respuestas),
+        'dividir_ms': 1000 * _mejor(lambda: dividir(dividendo, divisor), repeticiones),
+        'escalera_ms': 1000 * _mejor(lambda: Escalera(division), repeticiones),
+        'plantilla_ms': (1000 * _mejor(lambda: plantilla_division(dividendo, divisor, resuelta=True), repeticiones)
+                         if cifras <= MAX_CIFRAS_DIVIDENDO else None),
+        'correcta': correcta,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cifras', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--divisores', type=int, nargs='+', default=[1, 3, 6],
+                        help="Cifras de los divisores")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.semilla)
+    resultados = {}
+    fallos = 0
+    for cifras in args.cifras:
+        for cifras_divisor in args.divisores:
+            r = _medir(cifras, cifras_divisor, args.repeticiones, rng)
+            resultados[f"{cifras}/{cifras_divisor}"] = r
+            fallos += not r['correcta']
+            plantilla = '      -   ' if r['plantilla_ms'] is None else f"{r['plantilla_ms']:7.2f} ms"
+            print(f"{cifras:6d} cifras : {cifras_divisor} cifras   {r['pasos']:6d} pasos  {r['filas']:6d} filas   "
+                  f"dividir {r['dividir_ms']:7.2f} ms   escalera {r['escalera_ms']:7.2f} ms   "
+                  f"plantilla {plantilla}   {'ok' if r['correcta'] else 'MAL'}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
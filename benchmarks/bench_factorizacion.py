@@ -0,0 +1,114 @@
+"""
+Benchmark del motor de factorización (factorizacion.factorizar).
+
+Para cada potencia de diez entre 10^6 y 10^30 mide tres tipos de entrada:
+- aleatorios: enteros uniformes en [10^k, 10^(k+1)) con semilla fija,
+- primo: el primer primo >= 10^k (peor caso de la división de prueba antigua),
+- semiprimo: producto de dos primos de tamaño parecido (peor caso de rho);
+  solo hasta 10^20, a partir de ahí rho suele agotar MAX_PASOS_RHO.
+
+En 10^6 se compara además con la división de prueba que usaba contar_filas
+(en 10^9 ya tarda más de un minuto por primo).
+Cada medición se hace con la caché vacía. Los números que rho no separa en
+MAX_PASOS_RHO pasos se cuentan como rechazados (factorizar lanza ValueError).
+
+Uso:
+    python benchmarks/bench_factorizacion.py [--muestras 20] [--json resultados.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factorizacion import _factorizar, es_primo, factorizar  # noqa: E402
+
+EXPONENTES = (6, 9, 12, 15, 18, 20, 24, 27, 30)
+MAX_SEMIPRIMO = 20
+MAX_DIVISION_PRUEBA = 6
+
+
+def _division_prueba(numero: int) -> int:
+    """Algoritmo original de contar_filas (d += 1)."""
+    n = numero
+    count = 0
+    d = 2
+    while n > 1:
+        if n % d == 0:
+            n //= d
+            count += 1
+        else:
+            d += 1
+    return count + 1
+
+
+def _siguiente_primo(n: int) -> int:
+    while not es_primo(n):
+        n += 1
+    return n
+
+
+def _medir(funcion, entradas):
+    tiempos = []
+    rechazados = 0
+    for n in entradas:
+        _factorizar.cache_clear()
+        inicio = time.perf_counter()
+        try:
+            funcion(n)
+        except ValueError:
+            rechazados += 1
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return {
+        'n': len(tiempos),
+        'media_ms': 1000 * sum(tiempos) / len(tiempos),
+        'mediana_ms': 1000 * tiempos[len(tiempos) // 2],
+        'max_ms': 1000 * tiempos[-1],
+        'rechazados': rechazados,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--muestras', type=int, default=20, help="Enteros aleatorios por potencia")
+    parser.add_argument('--semilla', type=int, default=12345)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.semilla)
+    resultados = []
+    print(f"{'entrada':>10} {'tipo':>10} {'algoritmo':>16} {'media ms':>10} {'mediana ms':>11} {'max ms':>10} {'rechazados':>11}")
+    for k in EXPONENTES:
+        casos = {
+            'aleatorio': [rng.randrange(10 ** k, 10 ** (k + 1)) for _ in range(args.muestras)],
+            'primo': [_siguiente_primo(10 ** k)],
+        }
+        if k <= MAX_SEMIPRIMO:
+            p = _siguiente_primo(10 ** (k // 2))
+            q = _siguiente_primo(p + 2)
+            casos['semiprimo'] = [p * q]
+
+        for tipo, entradas in casos.items():
+            algoritmos = [('pollard-brent', factorizar)]
+            if k <= MAX_DIVISION_PRUEBA:
+                algoritmos.append(('division-prueba', _division_prueba))
+            for nombre, funcion in algoritmos:
+                r = _medir(funcion, entradas)
+                r.update({'exponente': k, 'tipo': tipo, 'algoritmo': nombre})
+                resultados.append(r)
+                print(f"{'10^' + str(k):>10} {tipo:>10} {nombre:>16} "
+                      f"{r['media_ms']:10.3f} {r['mediana_ms']:11.3f} {r['max_ms']:10.3f} {r['rechazados']:11d}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark del generador de problemas al azar (generador.Generador).
+
+Para cada operación y nivel de dificultad pide N problemas y mide los
+candidatos sorteados por segundo (el objetivo es pasar de 100 000), los
+problemas aceptados por segundo y lo que cuesta llevarlos al documento con
+`operaciones.plantilla_problema`. Comprueba además que no hay problemas
+repetidos (tampoco entre dos tandas del mismo generador, como en las
+variantes por alumno) y que la misma semilla da los mismos problemas. Los
+niveles con menos problemas distintos que los pedidos (p. ej. binario de 2
+cifras) se indican como agotados, que es lo que debe pasar.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_generador.py [--problemas 2000] [--operaciones suma division]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documento import Documento  # noqa: E402
+from generador import DIFICULTADES, OPERACIONES, Generador  # noqa: E402
+from operaciones import plantilla_problema  # noqa: E402
+
+# Cifras para que haya problemas distintos de sobra en todos los niveles
+CIFRAS = {"multiplicacion": (4, 2), "factorial": 5, "raiz": 8, "binario": 5}
+
+
+def _medir(operacion: str, dificultad: int, problemas: int, semilla: int) -> dict:
+    restricciones = {"cifras": CIFRAS[operacion]} if operacion in CIFRAS else {}
+    if "cifras" in DIFICULTADES[operacion][dificultad]:
+        restricciones = {}
+    generador = Generador(operacion, dificultad, semilla, **restricciones)
+    inicio = time.perf_counter()
+    primera = generador.generar(problemas)
+    segundos = time.perf_counter() - inicio
+    segunda = generador.generar(problemas)
+
+    documento = Documento()
+    inicio = time.perf_counter()
+    for operandos in primera:
+        plantilla_problema(operacion, operandos).en_documento(documento)
+    documento_s = time.perf_counter() - inicio
+
+    claves = [tuple(sorted(p)) if operacion in ("suma", "multiplicacion") else p for p in primera + segunda]
+    distintos = len(set(claves)) == len(claves)
+    repetible = Generador(operacion, dificultad, semilla, **restricciones).generar(problemas) == primera
+    return {
+        'candidatos': generador.candidatos,
+        'candidatos_s': generador.candidatos / segundos if segundos else 0.0,
+        'problemas_s': problemas / segundos if segundos else 0.0,
+        'documento_ms': 1000 * documento_s,
+        'distintos': distintos,
+        'repetible': repetible,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--problemas', type=int, default=2000)
+    parser.add_argument('--operaciones', nargs='+', default=list(OPERACIONES), choices=OPERACIONES)
+    parser.add_argument('--dificultades', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    fallos = 0
+    for operacion in args.operaciones:
+        for dificultad in args.dificultades:
+            try:
+                r = _medir(operacion, dificultad, args.problemas, args.semilla)
+            except ValueError as e:
+                print(f"{operacion:15s} nivel {dificultad}   agotado: {e}")
+                continue
+            resultados[f"{operacion}/{dificultad}"] = r
+            fallos += not (r['distintos'] and r['repetible'])
+            print(f"{operacion:15s} nivel {dificultad}   {r['candidatos_s']:10.0f} candidatos/s   "
+                  f"{r['problemas_s']:9.0f} problemas/s   documento {r['documento_ms']:7.1f} ms   "
+                  f"{'distintos' if r['distintos'] else 'REPETIDOS'}   "
+                  f"{'repetible' if r['repetible'] else 'NO REPETIBLE'}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Benchmark del historial de deshacer/rehacer (historial.Historial).
+
+Para cada tamaño de documento se hacen M cambios al azar: eliminar o insertar
+un bloque en cualquier posición, mover un bloque y escribir cifra a cifra en
+una celda (una entrada por celda). Después se deshace todo y se rehace todo,
+comprobando que el documento vuelve exactamente a cada estado, y se da el
+tiempo medio por entrada y la memoria que ocupa el historial medida con
+tracemalloc. Si deshacer es proporcional al cambio, el tiempo no depende del
+número de bloques.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_historial.py [--bloques 1000 10000] [--cambios 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documento import Documento  # noqa: E402
+from historial import Historial  # noqa: E402
+from operaciones import plantilla_multiplicacion, plantilla_suma  # noqa: E402
+
+
+def _documento(bloques: int, rng: random.Random) -> Documento:
+    documento = Documento()
+    for i in range(bloques):
+        if i % 3 == 0:
+            documento.nuevo_texto(f"Ejercicio {i}")
+        elif i % 3 == 1:
+            plantilla_suma(str(rng.randrange(10 ** 6)), str(rng.randrange(10 ** 4))).en_documento(documento)
+        else:
+            plantilla_multiplicacion(rng.randrange(10, 10 ** 4), rng.randrange(2, 100)).en_documento(documento)
+    return documento
+
+
+def _estado(documento: Documento):
+    return [(b.id, tuple(b.celdas) if b.tipo == "table" else b.texto) for b in documento]
+
+
+def _cambiar(documento: Documento, historial: Historial, rng: random.Random) -> None:
+    ids = documento.ids()
+    tipo = rng.randrange(4)
+    if tipo == 0 and len(ids) > 1:
+        documento.eliminar(rng.choice(ids))
+    elif tipo == 1:
+        historial.abrir_grupo()
+        bloque = documento.nuevo_texto("nuevo")
+        documento.mover(bloque.id, rng.choice(ids))
+        historial.cerrar_grupo()
+    elif tipo == 2:
+        documento.mover(rng.choice(ids), rng.choice(ids + [None]))
+    else:
+        tabla = documento.get(rng.choice([b for b in ids[:200] if documento.vistazo(b).tipo == "table"]))
+        fila, col = rng.randrange(tabla.filas), rng.randrange(tabla.columnas)
+        valor = ""
+        for cifra in str(rng.randrange(10 ** 4)):
+            historial.celda(tabla, fila, col, tabla.get(fila, col), valor + cifra)
+            valor += cifra
+            tabla.set(fila, col, valor)
+        historial.cortar()
+
+
+def _medir(bloques: int, cambios: int, semilla: int, comprobar: bool) -> dict:
+    rng = random.Random(semilla)
+    documento = _documento(bloques, rng)
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    historial = Historial(documento, limite=cambios)
+    # Estado del documento antes de cada entrada (no cuenta como memoria del historial)
+    estados = []
+    ajeno = 0
+    for _ in range(cambios):
+        if comprobar:
+            medido = tracemalloc.get_traced_memory()[0]
+            estado = _estado(documento)
+            ajeno += tracemalloc.get_traced_memory()[0] - medido
+        entradas = len(historial)
+        _cambiar(documento, historial, rng)
+        if comprobar and len(historial) > entradas:
+            estados.append(estado)
+    memoria = tracemalloc.get_traced_memory()[0] - antes - ajeno
+    tracemalloc.stop()
+    final = _estado(documento) if comprobar else None
+
+    distintos = 0
+    inicio = time.perf_counter()
+    n = 0
+    while historial.deshacer():
+        n += 1
+        if comprobar and _estado(documento) != estados[-n]:
+            distintos += 1
+    deshacer_s = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    while historial.rehacer():
+        pass
+    rehacer_s = time.perf_counter() - inicio
+    if comprobar and _estado(documento) != final:
+        distintos += 1
+    return {
+        'entradas': n,
+        'deshacer_us': 1e6 * deshacer_s / max(1, n),
+        'rehacer_us': 1e6 * rehacer_s / max(1, n),
+        'memoria_kb': memoria / 1024,
+        'bytes_por_entrada': memoria / max(1, n),
+        'distintos': distintos,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--cambios', type=int, default=2000)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--comprobar', action='store_true',
+                        help="Comparar el documento con cada estado anterior (lento)")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for bloques in args.bloques:
+        r = _medir(bloques, args.cambios, args.semilla, args.comprobar)
+        resultados[bloques] = r
+        print(f"{bloques:7d} bloques  {r['entradas']:6d} entradas   deshacer {r['deshacer_us']:7.2f} µs   "
+              f"rehacer {r['rehacer_us']:7.2f} µs   historial {r['memoria_kb']:8.1f} KB "
+              f"({r['bytes_por_entrada']:.0f} B/entrada)")
+    fallos = sum(r['distintos'] for r in resultados.values())
+    if args.comprobar:
+        print(f"estados distintos de los originales: {fallos}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
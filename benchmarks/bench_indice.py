@@ -0,0 +1,168 @@
+"""
+Benchmark del índice de búsqueda de bloques (indice.IndiceBloques).
+
+Genera documentos de N bloques (textos con palabras y números y problemas al
+azar de todas las operaciones), construye el índice y mide el tiempo de
+varias consultas típicas ("división 7 cifras", un operando, una palabra, un
+prefijo) frente a recorrer el documento bloque a bloque. Después hace M
+cambios al azar (insertar, borrar, mover y editar textos, marcando cada uno
+como lo hacen el documento y el vínculo de los textos) y mide lo que cuesta
+ponerse al día y volver a consultar. Todas las respuestas se comparan con las
+del recorrido lineal.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_indice.py [--bloques 1000 10000 100000] [--cambios 1000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documento import Documento  # noqa: E402
+from generador import OPERACIONES, generar  # noqa: E402
+from indice import IndiceBloques, terminos_bloque  # noqa: E402
+from operaciones import plantilla_problema  # noqa: E402
+
+PALABRAS = ("resuelve las operaciones siguientes fracciones repaso tema examen división "
+            "ejercicio práctica mañana cálculo mental problemas casa").split()
+
+# Consulta y términos que deben tener todos sus bloques (para el recorrido lineal)
+CONSULTAS = [
+    ("división 7 cifras", [{"op:division", "pal:division"}, {"cifras:7"}]),
+    ("suma 4 cifras", [{"op:suma", "pal:suma"}, {"cifras:4"}]),
+    ("raíz", [{"op:raiz", "pal:raiz"}]),
+    ("fracciones", [{"pal:fracciones"}]),
+    ("tabla 5 cifras", [{"tipo:table"}, {"cifras:5"}]),
+    ("repaso cálc", [{"pal:repaso"}, "pal:calc"]),
+]
+
+
+def _documento(bloques: int, rng: random.Random) -> Documento:
+    documento = Documento()
+    generadores = {}
+    while len(documento) < bloques:
+        if rng.random() < 0.2:
+            documento.nuevo_texto(" ".join(rng.choice(PALABRAS) for _ in range(rng.randrange(3, 12)))
+                                  + f" {rng.randrange(10 ** 6)}")
+            continue
+        operacion = rng.choice(OPERACIONES)
+        cifras = rng.randrange(2, 8)
+        clave = (operacion, cifras)
+        if clave not in generadores:
+            restricciones = {"cifras": (cifras, 2) if operacion == "division" else cifras}
+            if operacion == "multiplicacion":
+                restricciones["cifras"] = (cifras, 2)
+            generadores[clave] = generar(operacion, 50, semilla=rng.random(), **restricciones)
+        operandos = rng.choice(generadores[clave])
+        plantilla_problema(operacion, operandos).en_documento(documento)
+    return documento
+
+
+def _lineal(documento: Documento, condiciones) -> list:
+    """Recorre el documento entero y se queda con los bloques que cumplen la consulta."""
+    encontrados = []
+    for bloque in documento:
+        terminos = terminos_bloque(bloque)
+        if all((any(t.startswith(c) for t in terminos) if isinstance(c, str) else terminos & c)
+               for c in condiciones):
+            encontrados.append(bloque.id)
+    return encontrados
+
+
+def _cambiar(documento: Documento, rng: random.Random) -> None:
+    ids = documento.ids()
+    tipo = rng.randrange(4)
+    if tipo == 0:
+        documento.nuevo_texto(f"{rng.choice(PALABRAS)} fracciones {rng.randrange(1000)}")
+    elif tipo == 1 and len(ids) > 1:
+        documento.eliminar(rng.choice(ids))
+    elif tipo == 2 and len(ids) > 1:
+        documento.mover(rng.choice(ids), rng.choice(ids + [None]))
+    else:
+        textos = [b for b in ids[:500] if documento.vistazo(b).tipo == "text"]
+        if textos:
+            bloque = documento.get(rng.choice(textos))
+            bloque.texto += " repaso cálculo"
+            # Lo que hace bloques._vincular_texto al editar
+            documento.indice.marcar(bloque.id)
+
+
+def _consultar(indice: IndiceBloques, documento: Documento, repeticiones: int) -> dict:
+    resultados = {}
+    for consulta, condiciones in CONSULTAS:
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            encontrados = indice.buscar(consulta)
+            tiempos.append(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        esperados = _lineal(documento, condiciones)
+        lineal = time.perf_counter() - inicio
+        tiempos.sort()
+        resultados[consulta] = {
+            'resultados': len(encontrados),
+            'indice_ms': 1000 * tiempos[len(tiempos) // 2],
+            'lineal_ms': 1000 * lineal,
+            'igual': encontrados == esperados,
+        }
+    return resultados
+
+
+def _medir(bloques: int, cambios: int, repeticiones: int, semilla: int) -> dict:
+    rng = random.Random(semilla)
+    documento = _documento(bloques, rng)
+    inicio = time.perf_counter()
+    indice = IndiceBloques(documento)
+    indice.actualizar()
+    construir = time.perf_counter() - inicio
+    antes = _consultar(indice, documento, repeticiones)
+
+    for _ in range(cambios):
+        _cambiar(documento, rng)
+    inicio = time.perf_counter()
+    indice.actualizar()
+    ponerse_al_dia = time.perf_counter() - inicio
+    despues = _consultar(indice, documento, repeticiones)
+    return {
+        'construir_ms': 1000 * construir,
+        'al_dia_ms': 1000 * ponerse_al_dia,
+        'antes': antes,
+        'despues': despues,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--cambios', type=int, default=1000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    fallos = 0
+    for bloques in args.bloques:
+        r = _medir(bloques, args.cambios, args.repeticiones, args.semilla)
+        resultados[bloques] = r
+        print(f"{bloques:7d} bloques   índice en {r['construir_ms']:8.1f} ms   "
+              f"{args.cambios} cambios al día en {r['al_dia_ms']:6.2f} ms")
+        for fase in ('antes', 'despues'):
+            for consulta, c in r[fase].items():
+                fallos += not c['igual']
+                print(f"    {fase:7s} {consulta!r:22s} {c['resultados']:6d} bloques   "
+                      f"índice {c['indice_ms']:7.3f} ms   lineal {c['lineal_ms']:8.1f} ms   "
+                      f"{'igual' if c['igual'] else 'DISTINTO'}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
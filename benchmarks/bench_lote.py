@@ -0,0 +1,94 @@
+"""
+Benchmark de inserción de bloques: uno a uno frente a bloques.LoteBloques.
+
+Uno a uno reproduce lo que hacen los constructores de dialogs.py (crear la
+tabla, `update_idletasks` del bloque y del canvas, recolocar los botones);
+el lote añade todo al modelo y hace una sola pasada de geometría al final.
+
+Necesita un servidor gráfico; en una máquina sin pantalla:
+    xvfb-run python benchmarks/bench_lote.py [--bloques 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bloques import LoteBloques, mover_botones_abajo, pool_de  # noqa: E402
+from dialogs import _rellenar_desde_plantilla  # noqa: E402
+from documento import documento_de  # noqa: E402
+from operaciones import plantilla_binaria, plantilla_multiplicacion  # noqa: E402
+
+PLANTILLAS = [plantilla_multiplicacion(1234, 567), plantilla_binaria("1000")]
+
+
+def _ventana():
+    root = tk.Tk()
+    canvas = tk.Canvas(root)
+    canvas.pack(fill="both", expand=True)
+    scrollable_frame = tk.Frame(canvas)
+    canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+    botones_frame = tk.Frame(scrollable_frame)
+    botones_frame.pack(side="top")
+    root.update()
+    return root, scrollable_frame, botones_frame, canvas
+
+
+def _uno_a_uno(bloques: int) -> float:
+    root, scrollable_frame, botones_frame, canvas = _ventana()
+    documento = documento_de(scrollable_frame)
+    pool = pool_de(scrollable_frame)
+    inicio = time.perf_counter()
+    for i in range(bloques):
+        plantilla = PLANTILLAS[i % len(PLANTILLAS)]
+        tabla = plantilla.en_documento(documento)
+        cascaron = pool.tomar_tabla(botones_frame, canvas, tabla)
+        _rellenar_desde_plantilla(cascaron.interior.celdas, plantilla)
+        cascaron.bloque.update_idletasks()
+        canvas.update_idletasks()
+        canvas.yview_moveto(1.0)
+        mover_botones_abajo(botones_frame, canvas)
+    root.update_idletasks()
+    segundos = time.perf_counter() - inicio
+    root.destroy()
+    return segundos
+
+
+def _lote(bloques: int) -> float:
+    root, scrollable_frame, botones_frame, canvas = _ventana()
+    inicio = time.perf_counter()
+    with LoteBloques(scrollable_frame, botones_frame, canvas) as lote:
+        for i in range(bloques):
+            lote.tabla(PLANTILLAS[i % len(PLANTILLAS)])
+    root.update_idletasks()
+    segundos = time.perf_counter() - inicio
+    root.destroy()
+    return segundos
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, default=200)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    resultados = {
+        'bloques': args.bloques,
+        'uno_a_uno_s': _uno_a_uno(args.bloques),
+        'lote_s': _lote(args.bloques),
+    }
+    print(f"{args.bloques} bloques: uno a uno {resultados['uno_a_uno_s']:.3f} s, "
+          f"lote {resultados['lote_s']:.3f} s "
+          f"(x{resultados['uno_a_uno_s'] / max(resultados['lote_s'], 1e-9):.1f})")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
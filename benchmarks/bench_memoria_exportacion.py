@@ -0,0 +1,120 @@
+"""
+Benchmark de memoria de la exportación a PDF: story completa frente a flujo.
+
+Genera un documento de N bloques (tablas de multiplicación, división y suma y
+párrafos de texto) y lo exporta con export_pdf.export_blocks_to_pdf de dos
+maneras, cada una en un proceso nuevo para que el pico de memoria sea solo
+suyo:
+- lista: document_to_blocks y la story entera antes de doc.build (lo de siempre);
+- flujo: iter_document_blocks y streaming=True.
+
+Se mide el tiempo y el pico de memoria residente del proceso por encima de lo
+que ocupaba antes de exportar. Los PDF se generan en modo invariante de
+ReportLab y se comprueba que son idénticos byte a byte.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_memoria_exportacion.py [--bloques 10000] [--sin-cache]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documento import Documento  # noqa: E402
+from operaciones import plantilla_division, plantilla_multiplicacion, plantilla_suma  # noqa: E402
+
+
+def _documento(bloques: int, rng: random.Random) -> Documento:
+    documento = Documento()
+    for i in range(bloques):
+        if i % 4 == 3:
+            documento.nuevo_texto(" ".join(f"Enunciado {i}" for _ in range(rng.randrange(1, 30))))
+        elif i % 4 == 0:
+            plantilla_multiplicacion(rng.randrange(10, 10 ** 5), rng.randrange(2, 1000)).en_documento(documento)
+        elif i % 4 == 1:
+            plantilla_division(rng.randrange(100, 10 ** 7), rng.randrange(2, 100)).en_documento(documento)
+        else:
+            plantilla_suma(str(rng.randrange(10 ** 6)), str(rng.randrange(10 ** 4))).en_documento(documento)
+    return documento
+
+
+def _pico_mb() -> float:
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux da KiB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def _hijo(modo: str, bloques: int, semilla: int, destino: str, sin_cache: bool) -> dict:
+    from reportlab import rl_config
+    rl_config.invariant = 1
+    from export_pdf import document_to_blocks, export_blocks_to_pdf, flowable_cache, iter_document_blocks
+
+    if sin_cache:
+        flowable_cache.max_entries = 0
+    documento = _documento(bloques, random.Random(semilla))
+    antes = _pico_mb()
+    inicio = time.perf_counter()
+    if modo == 'lista':
+        export_blocks_to_pdf(document_to_blocks(documento), destino, title="Benchmark")
+    else:
+        export_blocks_to_pdf(iter_document_blocks(documento), destino, title="Benchmark", streaming=True)
+    segundos = time.perf_counter() - inicio
+    with open(destino, 'rb') as f:
+        resumen = hashlib.sha256(f.read()).hexdigest()
+    return {
+        'segundos': segundos,
+        'memoria_antes_mb': antes,
+        'memoria_pico_mb': _pico_mb(),
+        'incremento_mb': _pico_mb() - antes,
+        'sha256': resumen,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, default=10000)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--sin-cache', action='store_true', help="Sin caché de flowables (max_entries=0)")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    parser.add_argument('--hijo', choices=('lista', 'flujo'), help=argparse.SUPPRESS)
+    parser.add_argument('--destino', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.hijo:
+        print(json.dumps(_hijo(args.hijo, args.bloques, args.semilla, args.destino, args.sin_cache)))
+        return 0
+
+    resultados = {'bloques': args.bloques, 'sin_cache': args.sin_cache}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for modo in ('lista', 'flujo'):
+            orden = [sys.executable, os.path.abspath(__file__), '--hijo', modo,
+                     '--bloques', str(args.bloques), '--semilla', str(args.semilla),
+                     '--destino', os.path.join(carpeta, f'{modo}.pdf')]
+            if args.sin_cache:
+                orden.append('--sin-cache')
+            salida = subprocess.run(orden, check=True, capture_output=True, text=True).stdout
+            resultados[modo] = json.loads(salida.strip().splitlines()[-1])
+    resultados['identicos'] = resultados['lista']['sha256'] == resultados['flujo']['sha256']
+
+    for modo in ('lista', 'flujo'):
+        r = resultados[modo]
+        print(f"{modo:6s} {r['segundos']:8.1f} s   pico {r['memoria_pico_mb']:8.1f} MB   "
+              f"(+{r['incremento_mb']:.1f} MB al exportar)")
+    print(f"PDF idénticos: {'sí' if resultados['identicos'] else 'NO'}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 0 if resultados['identicos'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
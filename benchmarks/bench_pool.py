@@ -0,0 +1,93 @@
+"""
+Benchmark del pool de bloques (bloques.PoolBloques).
+
+Simula una sesión de ejercicios: crea N tablas, las borra todas y las vuelve a
+crear, varias rondas. Compara la latencia de creación de bloque con el pool
+activo y con el pool desactivado (max_libres = 0, todo se destruye).
+
+Necesita un servidor gráfico; en una máquina sin pantalla:
+    xvfb-run python benchmarks/bench_pool.py [--bloques 50] [--rondas 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bloques import pool_de  # noqa: E402
+from dialogs import _rellenar_desde_plantilla  # noqa: E402
+from documento import documento_de  # noqa: E402
+from operaciones import plantilla_binaria, plantilla_multiplicacion  # noqa: E402
+
+
+def _sesion(max_libres: int, bloques: int, rondas: int) -> dict:
+    root = tk.Tk()
+    scrollable_frame = tk.Frame(root)
+    scrollable_frame.pack(fill="both", expand=True)
+    botones_frame = tk.Frame(scrollable_frame)
+    botones_frame.pack(side="top")
+    canvas = tk.Canvas(root)
+
+    documento = documento_de(scrollable_frame)
+    pool = pool_de(scrollable_frame)
+    pool.max_libres = max_libres
+    plantillas = [plantilla_multiplicacion(1234, 567), plantilla_binaria("1000")]
+
+    latencias = []
+    for _ in range(rondas):
+        cascarones = []
+        for i in range(bloques):
+            plantilla = plantillas[i % len(plantillas)]
+            # Lo mismo que dialogs._nueva_tabla + _rellenar_desde_plantilla
+            inicio = time.perf_counter()
+            tabla = plantilla.en_documento(documento)
+            cascaron = pool.tomar_tabla(botones_frame, canvas, tabla)
+            _rellenar_desde_plantilla(cascaron.interior.celdas, plantilla)
+            root.update_idletasks()
+            latencias.append(time.perf_counter() - inicio)
+            cascarones.append(cascaron)
+        # Borrar todo como haría la papelera
+        for cascaron in cascarones:
+            pool._eliminar(cascaron, botones_frame, canvas)
+        root.update_idletasks()
+
+    stats = pool.stats()
+    root.destroy()
+    latencias.sort()
+    return {
+        'max_libres': max_libres,
+        'bloques_creados': len(latencias),
+        'media_ms': 1000 * sum(latencias) / len(latencias),
+        'p50_ms': 1000 * latencias[len(latencias) // 2],
+        'p99_ms': 1000 * latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))],
+        'pool': stats,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, default=50)
+    parser.add_argument('--rondas', type=int, default=5)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    resultados = [
+        _sesion(0, args.bloques, args.rondas),
+        _sesion(args.bloques, args.bloques, args.rondas),
+    ]
+    for r in resultados:
+        print(f"max_libres={r['max_libres']:4d}  media {r['media_ms']:7.3f} ms  "
+              f"p50 {r['p50_ms']:7.3f} ms  p99 {r['p99_ms']:7.3f} ms  "
+              f"reutilización {r['pool']['tasa_reutilizacion']:.0%}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Prueba de carga del servicio de fichas (servidor_fichas) contra localhost.
+
+Arranca el servidor en este mismo proceso (con su pool de trabajadores ya
+caliente) en un puerto libre, o usa uno que ya esté en marcha con --url, y
+lanza N peticiones POST /fichas desde C conexiones keep-alive a la vez. Una
+parte de las especificaciones se repite (--repetidas) para medir la caché:
+las repetidas deben servirse como "hit" o "compartida" sin volver a
+maquetarse. Informa de peticiones por segundo, latencias del cliente, el
+reparto hit/compartida/miss y las métricas del propio servidor, y comprueba
+que todas las respuestas son PDF.
+
+    python benchmarks/bench_servidor.py [--peticiones 400] [--conexiones 16] [-j 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servidor_fichas import ServidorFichas, _percentiles  # noqa: E402
+
+
+def _especificacion(rng: random.Random, problemas: int) -> dict:
+    """Ficha con problemas fijos y otros al azar, distinta para cada semilla."""
+    return {
+        'title': "Ficha de carga",
+        'seed': rng.randrange(10 ** 9),
+        'problems': [
+            {'operation': 'texto', 'operands': ["Resuelve las operaciones"]},
+            {'operation': 'suma', 'operands': ["12,5", "3,75"]},
+            {'operation': 'suma', 'generate': problemas // 3, 'difficulty': 2},
+            {'operation': 'division', 'generate': problemas // 3, 'difficulty': 3},
+            {'operation': 'raiz', 'generate': problemas - 2 * (problemas // 3), 'difficulty': 1},
+        ],
+    }
+
+
+async def _peticion(lector, escritor, host: str, cuerpo: bytes):
+    escritor.write((f"POST /fichas HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\n\r\n").encode('latin-1') + cuerpo)
+    await escritor.drain()
+    estado = int((await lector.readline()).split()[1])
+    cabeceras = {}
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b""):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        cabeceras[nombre.strip().lower()] = valor.strip()
+    datos = await lector.readexactly(int(cabeceras.get('content-length', 0)))
+    return estado, cabeceras, datos
+
+
+async def _cliente(host: str, puerto: int, cuerpos: list, cola: asyncio.Queue, resultados: list) -> None:
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    try:
+        while True:
+            try:
+                i = cola.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            inicio = time.perf_counter()
+            estado, cabeceras, datos = await _peticion(lector, escritor, host, cuerpos[i])
+            resultados.append((time.perf_counter() - inicio, estado, cabeceras.get('x-cache'),
+                               datos.startswith(b"%PDF")))
+    finally:
+        escritor.close()
+
+
+async def _metricas(host: str, puerto: int) -> dict:
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    escritor.write(f"GET /metricas HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+    respuesta = await lector.read()
+    escritor.close()
+    return json.loads(respuesta.split(b"\r\n\r\n", 1)[1])
+
+
+async def _carga(args) -> dict:
+    servidor = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, puerto = url.hostname, url.port or 80
+        arranque_s = 0.0
+    else:
+        servidor = ServidorFichas("127.0.0.1", 0, args.jobs)
+        inicio = time.perf_counter()
+        await servidor.iniciar()
+        arranque_s = time.perf_counter() - inicio
+        host, puerto = servidor.host, servidor.puerto
+    try:
+        rng = random.Random(args.semilla)
+        distintas = max(1, round(args.peticiones * (1 - args.repetidas)))
+        unicas = [json.dumps(_especificacion(rng, args.problemas)).encode('utf-8') for _ in range(distintas)]
+        cuerpos = unicas + [rng.choice(unicas) for _ in range(args.peticiones - distintas)]
+        rng.shuffle(cuerpos)
+
+        cola: asyncio.Queue = asyncio.Queue()
+        for i in range(len(cuerpos)):
+            cola.put_nowait(i)
+        resultados: list = []
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_cliente(host, puerto, cuerpos, cola, resultados)
+                               for _ in range(args.conexiones)))
+        total_s = time.perf_counter() - inicio
+        metricas = await _metricas(host, puerto)
+    finally:
+        if servidor is not None:
+            await servidor.cerrar()
+
+    origenes = {}
+    for _, _, origen, _ in resultados:
+        origenes[origen] = origenes.get(origen, 0) + 1
+    return {
+        'arranque_s': arranque_s,
+        'peticiones': len(resultados),
+        'distintas': distintas,
+        'peticiones_s': len(resultados) / total_s,
+        'latencia': _percentiles([r[0] for r in resultados]),
+        'origenes': origenes,
+        'correctas': sum(1 for _, estado, _, pdf in resultados if estado == 200 and pdf),
+        'servidor': metricas,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--peticiones', type=int, default=400)
+    parser.add_argument('--conexiones', type=int, default=16)
+    parser.add_argument('--repetidas', type=float, default=0.5,
+                        help="Fracción de peticiones que repiten una especificación")
+    parser.add_argument('--problemas', type=int, default=30, help="Problemas por ficha")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--url', help="Servidor ya en marcha (p. ej. http://127.0.0.1:8765)")
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    r = asyncio.run(_carga(args))
+    lat = r['latencia']
+    print(f"arranque del pool {r['arranque_s']:.2f} s")
+    print(f"{r['peticiones']} peticiones ({r['distintas']} distintas) desde {args.conexiones} conexiones: "
+          f"{r['peticiones_s']:.1f} peticiones/s")
+    print(f"latencia cliente  p50 {lat['p50_ms']:.1f} ms   p95 {lat['p95_ms']:.1f} ms   "
+          f"p99 {lat['p99_ms']:.1f} ms   máx. {lat['max_ms']:.1f} ms")
+    print("caché             " + "   ".join(f"{k} {v}" for k, v in sorted(r['origenes'].items(), key=str)))
+    maquetar = r['servidor']['latencia']['maquetar']
+    print(f"maquetar (pool)   p50 {maquetar['p50_ms']:.1f} ms   p95 {maquetar['p95_ms']:.1f} ms")
+    print(f"correctas         {r['correctas']}/{r['peticiones']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(r, f, indent=2)
+    # Cada especificación distinta se maqueta una sola vez
+    return 0 if r['correctas'] == r['peticiones'] and r['origenes'].get('miss', 0) <= r['distintas'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
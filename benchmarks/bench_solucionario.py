@@ -0,0 +1,83 @@
+"""
+Benchmark del solucionario (solucionario.documento_solucionario).
+
+Genera un documento con N problemas aleatorios de todas las operaciones y mide
+el tiempo de resolverlos (con la caché de factorizaciones vacía) y, aparte, el
+de maquetar el PDF del solucionario.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_solucionario.py [--problemas 5000] [--pdf]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documento import Documento  # noqa: E402
+from export_pdf import document_to_blocks, export_blocks_to_pdf  # noqa: E402
+from factorizacion import _factorizar  # noqa: E402
+from operaciones import (  # noqa: E402
+    plantilla_suma, plantilla_resta, plantilla_multiplicacion, plantilla_division,
+    plantilla_factorial, plantilla_raiz, plantilla_binaria,
+)
+from solucionario import documento_solucionario  # noqa: E402
+
+
+def _documento(problemas: int, rng: random.Random) -> Documento:
+    generadores = [
+        lambda: plantilla_suma(f"{rng.randrange(10 ** 5)},{rng.randrange(100)}", str(rng.randrange(10 ** 4))),
+        lambda: plantilla_resta(str(rng.randrange(10 ** 6)), f"{rng.randrange(1000)},{rng.randrange(10)}"),
+        lambda: plantilla_multiplicacion(rng.randrange(10, 10 ** 5), rng.randrange(2, 10 ** 3)),
+        lambda: plantilla_division(rng.randrange(100, 10 ** 7), rng.randrange(2, 100)),
+        lambda: plantilla_factorial(rng.randrange(2, 10 ** 6)),
+        lambda: plantilla_raiz(rng.choice((2, 3)), rng.randrange(2, 10 ** 5)),
+        lambda: plantilla_binaria(str(rng.randrange(2, 10 ** 4))),
+    ]
+    documento = Documento()
+    for i in range(problemas):
+        generadores[i % len(generadores)]().en_documento(documento)
+    return documento
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--problemas', type=int, default=5000)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--pdf', action='store_true', help="Medir también la maquetación del PDF")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    documento = _documento(args.problemas, random.Random(args.semilla))
+    _factorizar.cache_clear()
+    inicio = time.perf_counter()
+    solucion = documento_solucionario(documento)
+    resolver_s = time.perf_counter() - inicio
+    resultados = {
+        'problemas': args.problemas,
+        'resolver_ms': 1000 * resolver_s,
+        'problemas_s': args.problemas / max(resolver_s, 1e-9),
+    }
+
+    if args.pdf:
+        with tempfile.TemporaryDirectory() as carpeta:
+            inicio = time.perf_counter()
+            export_blocks_to_pdf(document_to_blocks(solucion), os.path.join(carpeta, 'solucionario.pdf'),
+                                 title="Solucionario")
+            resultados['pdf_ms'] = 1000 * (time.perf_counter() - inicio)
+
+    for clave, valor in resultados.items():
+        print(f"{clave:12s} {valor:12,.1f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Benchmark de la vista previa del PDF (vista_previa.Maquetador y rasterizar).
+
+Genera un documento de N bloques, lo maqueta entero una vez y después simula
+ediciones: cambiar una cifra de una tabla al azar (no cambia el tamaño del
+bloque) y añadir unas palabras a un párrafo al azar (puede empujar el resto
+del documento). Después de cada edición se vuelve a maquetar de forma
+incremental y se anota el tiempo y cuántas páginas se han rehecho; con
+--comprobar, se compara además con una maquetación completa desde cero.
+Por último se mide el rasterizado de una página.
+
+No necesita servidor gráfico:
+    python benchmarks/bench_vista_previa.py [--bloques 2000] [--ediciones 50]
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export_pdf import document_to_blocks  # noqa: E402
+from vista_previa import Maquetador, rasterizar  # noqa: E402
+from bench_memoria_exportacion import _documento  # noqa: E402
+
+
+def _editar(blocks, rng: random.Random, en_tabla: bool):
+    """Copia de `blocks` con un bloque editado."""
+    tipo = 'table' if en_tabla else 'text'
+    i = rng.choice([k for k, b in enumerate(blocks) if b['type'] == tipo])
+    bloque = copy.deepcopy(blocks[i])
+    if en_tabla:
+        celdas = [(f, c) for f, fila in enumerate(bloque['content']) for c, v in enumerate(fila) if v.strip()]
+        f, c = rng.choice(celdas)
+        bloque['content'][f][c] = str(rng.randrange(10))
+    else:
+        bloque['content'] += " y algo más" * rng.randrange(1, 10)
+    editados = list(blocks)
+    editados[i] = bloque
+    return editados
+
+
+def _huella(paginas):
+    return [(p.primer_bloque, p.inicio, p.firma, p.operaciones) for p in paginas]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, default=2000)
+    parser.add_argument('--ediciones', type=int, default=50)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--comprobar', action='store_true', help="Comparar con una maquetación completa")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.semilla)
+    blocks = document_to_blocks(_documento(args.bloques, rng))
+    maquetador = Maquetador()
+    inicio = time.perf_counter()
+    paginas = maquetador.maquetar(blocks)
+    completa_s = time.perf_counter() - inicio
+
+    resultados = {'bloques': args.bloques, 'paginas': len(paginas), 'completa_ms': 1000 * completa_s}
+    fallos = 0
+    for nombre, en_tabla in (('celda', True), ('parrafo', False)):
+        tiempos, rehechas = [], []
+        for _ in range(args.ediciones):
+            blocks = _editar(blocks, rng, en_tabla)
+            inicio = time.perf_counter()
+            paginas = maquetador.maquetar(blocks)
+            tiempos.append(time.perf_counter() - inicio)
+            rehechas.append(maquetador.remaquetadas)
+            if args.comprobar and _huella(paginas) != _huella(Maquetador().maquetar(blocks)):
+                fallos += 1
+        resultados[nombre] = {
+            'mediana_ms': 1000 * statistics.median(tiempos),
+            'maximo_ms': 1000 * max(tiempos),
+            'paginas_rehechas_mediana': statistics.median(rehechas),
+            'paginas_rehechas_maximo': max(rehechas),
+        }
+
+    inicio = time.perf_counter()
+    for pagina in paginas[:20]:
+        rasterizar(pagina, 360)
+    resultados['rasterizar_ms'] = 1000 * (time.perf_counter() - inicio) / min(20, len(paginas))
+
+    print(f"{resultados['bloques']} bloques, {resultados['paginas']} páginas")
+    print(f"maquetación completa {resultados['completa_ms']:10.1f} ms")
+    for nombre in ('celda', 'parrafo'):
+        r = resultados[nombre]
+        print(f"edición de {nombre:8s}  {r['mediana_ms']:8.1f} ms (máx. {r['maximo_ms']:.1f})   "
+              f"páginas rehechas: mediana {r['paginas_rehechas_mediana']}, máx. {r['paginas_rehechas_maximo']}")
+    print(f"rasterizar una página {resultados['rasterizar_ms']:9.1f} ms")
+    if args.comprobar:
+        print(f"distintas de la maquetación completa: {fallos}")
+        resultados['distintas'] = fallos
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Suite de benchmarks de QuicKual: creación y borrado de bloques, scroll y exportación.
+
+Escenarios:
+- crear_<operación>: N bloques con los constructores reales
+  (dialogs.dibujar_tabla_* y bloques.agregar_bloque_texto) en la ventana de
+  main.py, con los diálogos sustituidos por respuestas fijas;
+- borrar: eliminar todos esos bloques con la papelera, de arriba abajo;
+- scroll: recorrer de arriba abajo el canvas de main.py con M bloques;
+- estructura_<n> / exportar_<n>: extract_document_structure y export_to_pdf
+  (con la caché de flowables vacía) con 10, 100 y 1.000 bloques.
+
+Todas las métricas son tiempos en ms (o recuentos): menos es mejor. Con
+--baseline se comparan con una ejecución guardada y el programa termina con
+código 1 si alguna empeora más que la tolerancia.
+
+Necesita un servidor gráfico; en una máquina sin pantalla:
+    xvfb-run python benchmarks/suite.py --json resultados.json --baseline benchmarks/baseline.json
+    xvfb-run python benchmarks/suite.py --guardar-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import runpy
+import statistics
+import sys
+import tempfile
+import time
+import tkinter as tk
+from tkinter import simpledialog
+from unittest import mock
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# main.py no debe ofrecer recuperar sesiones ni autoguardar durante las mediciones
+os.environ['QUICKUAL_AUTOGUARDADO'] = '0'
+
+import dialogs  # noqa: E402
+from bloques import LoteBloques, agregar_bloque_texto, pool_de  # noqa: E402
+from documento import documento_de  # noqa: E402
+from export_pdf import export_to_pdf, extract_document_structure, flowable_cache  # noqa: E402
+from operaciones import plantilla_binaria, plantilla_division, plantilla_multiplicacion  # noqa: E402
+
+# Respuestas de los diálogos de cada constructor: atributos que deja el
+# simpledialog.Dialog correspondiente, o valor de askinteger/askstring
+OPERACIONES = {
+    'suma': (dialogs.dibujar_tabla_suma, {'a_text': '1234,5', 'b_text': '67,25'}),
+    'resta': (dialogs.dibujar_tabla_resta, {'a_text': '10000', 'b_text': '3,75'}),
+    'multiplicacion': (dialogs.dibujar_tabla_multiplicacion, {'a': 12345, 'b': 678}),
+    'division': (dialogs.dibujar_tabla_division, {'dividendo': '987654', 'divisor': '32', 'resuelta': False}),
+    'factorial': (dialogs.dibujar_tabla_factorial, 720720),
+    'raiz': (dialogs.dibujar_tabla_raiz, {'indice': 2, 'radicando': 1764}),
+    'binario': (dialogs.dibujar_tabla_binaria, '1000'),
+    'texto': (None, None),
+}
+
+TOLERANCIA = 0.25
+
+
+class _RaizFalsa:
+    """Sustituye al tk.Tk() auxiliar que crean los constructores para sus diálogos."""
+
+    def withdraw(self):
+        pass
+
+    def destroy(self):
+        pass
+
+
+def _sin_dialogos(respuesta):
+    """Parches con los que los diálogos devuelven `respuesta` sin mostrarse."""
+    def _dialogo(self, parent, title=None):
+        self.__dict__.update(respuesta if isinstance(respuesta, dict) else {})
+
+    return [
+        mock.patch.object(simpledialog.Dialog, '__init__', _dialogo),
+        mock.patch.object(tk, 'Tk', _RaizFalsa),
+        mock.patch.multiple(simpledialog, askinteger=lambda *a, **k: respuesta,
+                            askstring=lambda *a, **k: respuesta),
+    ]
+
+
+def _ventana_principal():
+    """Ejecuta main.py sin entrar en el bucle de eventos y devuelve sus widgets."""
+    with mock.patch.object(tk.Tk, 'mainloop', lambda self, n=0: None):
+        g = runpy.run_path(os.path.join(RAIZ, 'main.py'))
+    root = g['root']
+    root.geometry('1024x768')
+    root.update()
+    return root, g['scrollable_frame'], g['botones_frame'], g['canvas']
+
+
+def _ventana_simple():
+    """Canvas con frame scrollable sin vista perezosa: todos los bloques son widgets."""
+    root = tk.Tk()
+    root.geometry('1024x768')
+    canvas = tk.Canvas(root)
+    canvas.pack(fill='both', expand=True)
+    scrollable_frame = tk.Frame(canvas)
+    canvas.create_window((0, 0), window=scrollable_frame, anchor='nw')
+    botones_frame = tk.Frame(scrollable_frame)
+    botones_frame.pack(side='top')
+    root.update()
+    return root, scrollable_frame, botones_frame, canvas
+
+
+def _resumen(tiempos):
+    tiempos = sorted(tiempos)
+    return {
+        'media_ms': 1000 * statistics.fmean(tiempos),
+        'p95_ms': 1000 * tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))],
+        'total_ms': 1000 * sum(tiempos),
+    }
+
+
+def _llenar(scrollable_frame, botones_frame, canvas, bloques: int) -> None:
+    plantillas = [plantilla_multiplicacion(12345, 678), plantilla_division(987654, 32), plantilla_binaria('1000')]
+    with LoteBloques(scrollable_frame, botones_frame, canvas, desplazar_al_final=False) as lote:
+        for i in range(bloques):
+            if i % 4 == 3:
+                lote.texto(f"Bloque {i}")
+            else:
+                lote.tabla(plantillas[i % len(plantillas)])
+
+
+# ====
+# Escenarios
+# ====
+
+
+def escenario_crear_y_borrar(bloques: int) -> dict:
+    root, scrollable_frame, botones_frame, canvas = _ventana_principal()
+    resultados = {}
+    for nombre, (constructor, respuesta) in OPERACIONES.items():
+        tiempos = []
+        parches = _sin_dialogos(respuesta)
+        for parche in parches:
+            parche.start()
+        try:
+            for _ in range(bloques):
+                inicio = time.perf_counter()
+                if constructor is None:
+                    agregar_bloque_texto(scrollable_frame, botones_frame, canvas)
+                else:
+                    constructor(scrollable_frame, botones_frame, canvas)
+                root.update_idletasks()
+                tiempos.append(time.perf_counter() - inicio)
+        finally:
+            for parche in reversed(parches):
+                parche.stop()
+        for clave, valor in _resumen(tiempos).items():
+            resultados[f'crear_{nombre}_{clave}'] = valor
+
+    # Papelera sobre el primer bloque, hasta vaciar el documento
+    documento = documento_de(scrollable_frame)
+    pool = pool_de(scrollable_frame)
+    canvas.yview_moveto(0.0)
+    root.update()
+    tiempos = []
+    for bloque_id in documento.ids():
+        inicio = time.perf_counter()
+        cascaron = pool.activos.get(bloque_id)
+        if cascaron is None and pool.vista is not None:
+            pool.vista.sincronizar()
+            cascaron = pool.activos.get(bloque_id)
+        if cascaron is None:
+            documento.eliminar(bloque_id)
+        else:
+            pool._eliminar(cascaron, botones_frame, canvas)
+        root.update_idletasks()
+        tiempos.append(time.perf_counter() - inicio)
+    for clave, valor in _resumen(tiempos).items():
+        resultados[f'borrar_{clave}'] = valor
+    root.destroy()
+    return resultados
+
+
+def escenario_scroll(bloques: int, max_pasos: int = 2000) -> dict:
+    root, scrollable_frame, botones_frame, canvas = _ventana_principal()
+    _llenar(scrollable_frame, botones_frame, canvas, bloques)
+    canvas.yview_moveto(0.0)
+    root.update()
+
+    tiempos = []
+    widgets = 0
+    while canvas.yview()[1] < 1.0 and len(tiempos) < max_pasos:
+        inicio = time.perf_counter()
+        canvas.yview_scroll(3, 'units')
+        root.update()
+        tiempos.append(time.perf_counter() - inicio)
+        widgets = max(widgets, len(scrollable_frame.winfo_children()))
+    root.destroy()
+
+    resultados = {f'scroll_{clave}': valor for clave, valor in _resumen(tiempos).items() if clave != 'total_ms'}
+    resultados['scroll_widgets_max'] = widgets
+    return resultados
+
+
+def escenario_exportar(tamanos) -> dict:
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for n in tamanos:
+            root, scrollable_frame, botones_frame, canvas = _ventana_simple()
+            _llenar(scrollable_frame, botones_frame, canvas, n)
+            root.update_idletasks()
+
+            inicio = time.perf_counter()
+            extract_document_structure(scrollable_frame)
+            resultados[f'estructura_{n}_ms'] = 1000 * (time.perf_counter() - inicio)
+
+            flowable_cache.clear()
+            inicio = time.perf_counter()
+            export_to_pdf(scrollable_frame, os.path.join(carpeta, f'bench_{n}.pdf'))
+            resultados[f'exportar_{n}_ms'] = 1000 * (time.perf_counter() - inicio)
+            root.destroy()
+    return resultados
+
+
+# ====
+# Comparación con la línea base
+# ====
+
+
+def comparar(actual: dict, base: dict, tolerancia: float = TOLERANCIA):
+    """Devuelve [(métrica, base, actual, cociente, empeora)] de las métricas comunes."""
+    filas = []
+    for metrica in sorted(set(actual) & set(base)):
+        anterior, ahora = base[metrica], actual[metrica]
+        cociente = ahora / anterior if anterior else (1.0 if not ahora else float('inf'))
+        filas.append((metrica, anterior, ahora, cociente, cociente > 1 + tolerancia))
+    return filas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bloques', type=int, default=50, help="Bloques por operación al crear/borrar")
+    parser.add_argument('--scroll', type=int, default=1000, help="Bloques del documento del escenario de scroll")
+    parser.add_argument('--tamanos', default='10,100,1000', help="Tamaños para estructura/exportar")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Se toma la mediana de cada métrica")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    parser.add_argument('--baseline', help="Comparar con esta línea base")
+    parser.add_argument('--guardar-baseline', help="Guardar los resultados como nueva línea base")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help="Empeoramiento relativo admitido (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+    tamanos = [int(t) for t in args.tamanos.split(',') if t.strip()]
+
+    ejecuciones = []
+    for _ in range(max(1, args.repeticiones)):
+        metricas = {}
+        metricas.update(escenario_crear_y_borrar(args.bloques))
+        metricas.update(escenario_scroll(args.scroll))
+        metricas.update(escenario_exportar(tamanos))
+        ejecuciones.append(metricas)
+    metricas = {k: statistics.median(e[k] for e in ejecuciones) for k in ejecuciones[0]}
+
+    informe = {
+        'entorno': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'tk': tk.TkVersion,
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'parametros': {'bloques': args.bloques, 'scroll': args.scroll, 'tamanos': tamanos,
+                       'repeticiones': args.repeticiones},
+        'metricas': metricas,
+    }
+    for metrica, valor in metricas.items():
+        print(f"{metrica:32s} {valor:12.3f}")
+
+    for ruta in (args.json, args.guardar_baseline):
+        if ruta:
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(informe, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        base = json.load(f)
+    if base.get('parametros') != informe['parametros']:
+        print(f"Aviso: la línea base usa otros parámetros: {base.get('parametros')}", file=sys.stderr)
+    filas = comparar(metricas, base['metricas'], args.tolerancia)
+    print(f"\n{'métrica':32s} {'base':>12s} {'actual':>12s} {'cociente':>9s}")
+    for metrica, anterior, ahora, cociente, empeora in filas:
+        marca = '  EMPEORA' if empeora else ''
+        print(f"{metrica:32s} {anterior:12.3f} {ahora:12.3f} {cociente:9.2f}{marca}")
+    regresiones = sum(1 for fila in filas if fila[4])
+    print(f"\n{regresiones} métrica(s) empeoran más de un {args.tolerancia:.0%}")
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,27 +1,46 @@
 import tkinter as tk
+import weakref
+from typing import Callable, Dict, List, Tuple
+
+from documento import BloqueTabla, BloqueTexto, Documento, documento_de, registrar_documento
+from perfilado import medir
+from rejilla import RejillaCanvas
 
 # Emoji para el botón de borrar. Si en tu sistema no se ve bien, cambia por "X" o "[borrar]".
 TRASH_EMOJI = "🗑️"
 
 
-def _add_header_with_trash(parent_block: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas) -> tk.Frame:
+def _add_header_with_trash(parent_block: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas,
+                           bloque_id: int = None, on_delete: Callable[[], None] = None,
+                           on_move: Callable[[int], None] = None) -> tk.Frame:
     """
     Añade una cabecera superior con un botón de papelera al bloque indicado y
     devuelve un frame 'content' donde debes colocar el contenido real
-    (Text o la tabla de Entry/Label).
+    (Text o la tabla de celdas).
+
+    Al pulsar la papelera, se elimina el bloque completo (también del modelo
+    del documento si se indica `bloque_id`) y se recolocan los botones
+    principales (Texto/+). Si se indica `on_delete`, se llama en su lugar
+    (lo usa el pool de bloques para recuperar los widgets). Con `on_move`
+    se añaden flechas para subir y bajar el bloque, que la llaman con -1 o 1.
 
-    Al pulsar la papelera, se elimina el bloque completo y se recolocan los
-    botones principales (Texto/+).
+    La etiqueta de la izquierda de la cabecera queda en `content.titulo`.
     """
     # Cabecera
     header = tk.Frame(parent_block, bg="#f7f7f7")
     header.pack(fill="x")
 
-    # Espaciador izquierdo (por si en el futuro quieres poner un título a la izquierda)
-    tk.Label(header, text="", bg="#f7f7f7").pack(side="left", padx=4, pady=2)
+    # Espaciador izquierdo (también muestra la puntuación de la corrección en vivo)
+    titulo = tk.Label(header, text="", bg="#f7f7f7", font=("Arial", 10))
+    titulo.pack(side="left", padx=4, pady=2)
 
     def _delete_block():
+        if on_delete is not None:
+            on_delete()
+            return
         # Destruye el bloque completo y recoloca los botones
+        if bloque_id is not None:
+            documento_de(parent_block.master).eliminar(bloque_id)
         parent_block.destroy()
         mover_botones_abajo(botones_frame, canvas)
 
@@ -36,20 +55,29 @@ def _add_header_with_trash(parent_block: tk.Frame, botones_frame: tk.Frame, canv
     )
     trash_btn.pack(side="right", padx=4, pady=2)
 
+    if on_move is not None:
+        for texto, desplazamiento in (("▼", 1), ("▲", -1)):
+            tk.Button(
+                header, text=texto, font=("Arial", 10), width=2, relief="flat", cursor="hand2",
+                command=lambda d=desplazamiento: on_move(d)
+            ).pack(side="right", pady=2)
+
     # Contenedor de contenido real del bloque
     content = tk.Frame(parent_block, bg="white")
     content.pack(fill="both", expand=True)
+    content.titulo = titulo
 
     return content
 
 
+@medir
 def agregar_bloque_texto(scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas) -> None:
     """
     Crea un bloque de texto con cabecera de papelera.
     """
-    bloque = tk.Frame(scrollable_frame, bd=3, relief="groove", bg="white")
-    bloque.pack(side="top", fill="x", pady=5)
-    bloque.pack_propagate(False)
+    modelo = documento_de(scrollable_frame).nuevo_texto()
+    cascaron = pool_de(scrollable_frame).tomar_texto(botones_frame, canvas, modelo)
+    bloque = cascaron.bloque
 
     # Altura aproximada (1/4 de la ventana) con fallback
     bloque.update_idletasks()
@@ -58,13 +86,7 @@ def agregar_bloque_texto(scrollable_frame: tk.Frame, botones_frame: tk.Frame, ca
         ventana_altura = 600
     bloque.config(height=int(ventana_altura * 0.25))
 
-    # Cabecera + contenedor
-    content = _add_header_with_trash(bloque, botones_frame, canvas)
-
-    # Text widget
-    text_widget = tk.Text(content, wrap="word", font=("Arial", 14), undo=True, borderwidth=0, bg="white")
-    text_widget.pack(fill="both", expand=True, padx=5, pady=5)
-    text_widget.focus_set()
+    cascaron.interior.focus_set()
 
     # Ajuste de scroll y recolocar botones
     bloque.update_idletasks()
@@ -73,10 +95,441 @@ def agregar_bloque_texto(scrollable_frame: tk.Frame, botones_frame: tk.Frame, ca
     mover_botones_abajo(botones_frame, canvas)
 
 
+@medir
 def mover_botones_abajo(botones_frame: tk.Frame, canvas: tk.Canvas) -> None:
     """
     Recoloca el frame de botones principales para que quede después del último bloque.
     """
     botones_frame.pack_forget()
     botones_frame.pack(side="top", pady=10)
-    canvas.update_idletasks()
\ No newline at end of file
+    canvas.update_idletasks()
+
+
+# ====
+# Sincronización widget -> modelo del documento
+# ====
+
+
+def _vincular_texto(text_widget: tk.Text, bloque: BloqueTexto, documento: Documento = None) -> None:
+    """
+    Copia el contenido del Text al modelo cada vez que se modifica y, si
+    cambió, lo avisa al historial y al índice de búsqueda del documento.
+    """
+
+    def _on_modified(_=None):
+        if text_widget.edit_modified():
+            texto = text_widget.get("1.0", "end-1c")
+            text_widget.edit_modified(False)
+            if texto != bloque.texto:
+                bloque.texto = texto
+                if documento is None:
+                    return
+                if documento.indice is not None:
+                    documento.indice.marcar(bloque.id)
+                if documento.historial is not None:
+                    documento.historial.texto(bloque)
+
+    text_widget.bind("<<Modified>>", _on_modified)
+
+
+# ====
+# Pool de bloques reutilizables
+# ====
+
+# Máximo de bloques libres que se guardan por tipo; el resto se destruye
+MAX_LIBRES = 16
+
+
+class Cascaron:
+    """
+    Widgets de un bloque: frame exterior, cabecera con papelera, contenedor e
+    interior (Text o RejillaCanvas). Al borrar el bloque se desmontan y quedan
+    listos para el siguiente bloque del mismo tipo.
+    """
+
+    __slots__ = ("tipo", "bd", "bloque", "content", "interior", "bloque_id")
+
+    def __init__(self, tipo: str, bd: int, bloque: tk.Frame) -> None:
+        self.tipo = tipo
+        self.bd = bd
+        self.bloque = bloque
+        self.content: tk.Frame = None
+        self.interior: tk.Widget = None
+        self.bloque_id: int = None
+
+
+class PoolBloques:
+    """
+    Pool de bloques desmontados de un frame scrollable. Los constructores piden
+    un cascarón con `tomar_texto`/`tomar_tabla` y la papelera lo devuelve en
+    lugar de destruirlo, hasta `max_libres` por tipo.
+
+    `activos` indica qué bloques del documento tienen widgets en este momento.
+    Con `corregir` se activa la corrección en vivo en sus tablas.
+    """
+
+    def __init__(self, scrollable_frame: tk.Frame, max_libres: int = MAX_LIBRES) -> None:
+        self.scrollable_frame = scrollable_frame
+        self.max_libres = max_libres
+        self._libres: Dict[Tuple[str, int], List[Cascaron]] = {}
+        self.activos: Dict[int, Cascaron] = {}
+        # Vista perezosa que decide qué bloques se realizan (si hay una)
+        self.vista = None
+        # correccion.Corrector activo (si hay uno)
+        self.corrector = None
+        self.creados = 0
+        self.reutilizados = 0
+        self.devueltos = 0
+        self.destruidos = 0
+
+    def stats(self) -> Dict[str, float]:
+        pedidos = self.creados + self.reutilizados
+        return {
+            'creados': self.creados,
+            'reutilizados': self.reutilizados,
+            'devueltos': self.devueltos,
+            'destruidos': self.destruidos,
+            'libres': sum(len(v) for v in self._libres.values()),
+            'activos': len(self.activos),
+            'max_libres': self.max_libres,
+            'tasa_reutilizacion': self.reutilizados / pedidos if pedidos else 0.0,
+        }
+
+    def _tomar(self, tipo: str, bd: int, botones_frame: tk.Frame, canvas: tk.Canvas) -> Tuple[Cascaron, bool]:
+        libres = self._libres.get((tipo, bd))
+        if libres:
+            cascaron = libres.pop()
+            cascaron.bloque.pack(side="top", fill="x", pady=5)
+            self.reutilizados += 1
+            return cascaron, True
+
+        bloque = tk.Frame(self.scrollable_frame, bd=bd, relief="groove", bg="white")
+        bloque.pack(side="top", fill="x", pady=5)
+        cascaron = Cascaron(tipo, bd, bloque)
+        cascaron.content = _add_header_with_trash(
+            bloque, botones_frame, canvas,
+            on_delete=lambda: self._eliminar(cascaron, botones_frame, canvas),
+            on_move=lambda d: self._mover(cascaron, d, botones_frame, canvas)
+        )
+        self.creados += 1
+        return cascaron, False
+
+    def tomar_texto(self, botones_frame: tk.Frame, canvas: tk.Canvas, modelo: BloqueTexto) -> Cascaron:
+        """Devuelve un bloque de texto vacío, empaquetado al final, enlazado a `modelo`."""
+        cascaron, reutilizado = self._tomar("texto", 3, botones_frame, canvas)
+        if not reutilizado:
+            cascaron.bloque.pack_propagate(False)
+            cascaron.interior = tk.Text(
+                cascaron.content, wrap="word", font=("Arial", 14), undo=True, borderwidth=0, bg="white"
+            )
+            cascaron.interior.pack(fill="both", expand=True, padx=5, pady=5)
+        _vincular_texto(cascaron.interior, modelo, documento_de(self.scrollable_frame))
+        cascaron.bloque_id = modelo.id
+        self.activos[modelo.id] = cascaron
+        return cascaron
+
+    def tomar_tabla(self, botones_frame: tk.Frame, canvas: tk.Canvas, tabla: BloqueTabla,
+                    font_size: int = 16, padding: int = 4, bd: int = 3) -> Cascaron:
+        """Devuelve un bloque de tabla, empaquetado al final, cuya rejilla muestra `tabla`."""
+        tabla.presentacion = (font_size, padding, bd)
+        cascaron, reutilizado = self._tomar("tabla", bd, botones_frame, canvas)
+        if reutilizado:
+            cascaron.interior.reiniciar(tabla, font_size=font_size, padding=padding)
+            cascaron.interior.pack_configure(padx=padding, pady=padding)
+        else:
+            cascaron.interior = RejillaCanvas(cascaron.content, tabla, font_size=font_size, padding=padding)
+            cascaron.interior.pack(fill="x", expand=True, padx=padding, pady=padding)
+        cascaron.bloque_id = tabla.id
+        self.activos[tabla.id] = cascaron
+        cascaron.interior.historial = documento_de(self.scrollable_frame).historial
+        if self.corrector is not None:
+            cascaron.interior.corrector = self.corrector
+            self._mostrar_puntuacion(tabla.id)
+        return cascaron
+
+    def devolver(self, cascaron: Cascaron) -> None:
+        """Desmonta el bloque y lo guarda para reutilizarlo (o lo destruye si sobran)."""
+        cascaron.bloque.pack_forget()
+        if self.activos.get(cascaron.bloque_id) is cascaron:
+            del self.activos[cascaron.bloque_id]
+        cascaron.bloque_id = None
+        cascaron.content.titulo.config(text="")
+        libres = self._libres.setdefault((cascaron.tipo, cascaron.bd), [])
+        if len(libres) >= self.max_libres:
+            cascaron.bloque.destroy()
+            self.destruidos += 1
+            return
+
+        if cascaron.tipo == "texto":
+            texto = cascaron.interior
+            texto.unbind("<<Modified>>")
+            texto.delete("1.0", "end")
+            texto.edit_reset()
+            texto.edit_modified(False)
+        else:
+            cascaron.interior.corrector = None
+            cascaron.interior.historial = None
+            cascaron.interior.reiniciar(BloqueTabla(0, 0, 0))
+        libres.append(cascaron)
+        self.devueltos += 1
+
+    def _eliminar(self, cascaron: Cascaron, botones_frame: tk.Frame, canvas: tk.Canvas) -> None:
+        if cascaron.bloque_id is not None:
+            documento_de(self.scrollable_frame).eliminar(cascaron.bloque_id)
+            if self.corrector is not None:
+                self.corrector.olvidar(cascaron.bloque_id)
+        self.devolver(cascaron)
+        mover_botones_abajo(botones_frame, canvas)
+
+    def _mover(self, cascaron: Cascaron, desplazamiento: int, botones_frame: tk.Frame, canvas: tk.Canvas) -> None:
+        """Sube (-1) o baja (1) el bloque una posición en el documento."""
+        documento = documento_de(self.scrollable_frame)
+        bloque_id = cascaron.bloque_id
+        if bloque_id is None:
+            return
+        if desplazamiento < 0:
+            anterior = documento.anterior(bloque_id)
+            if anterior is None:
+                return
+            documento.mover(bloque_id, anterior)
+        else:
+            siguiente = documento.siguiente(bloque_id)
+            if siguiente is None:
+                return
+            documento.mover(bloque_id, documento.siguiente(siguiente))
+        self.recolocar(botones_frame, canvas)
+
+    def recolocar(self, botones_frame: tk.Frame, canvas: tk.Canvas) -> None:
+        """Empaqueta los bloques realizados en el orden del documento."""
+        if self.vista is not None:
+            self.vista.programar()
+            return
+        for bloque_id in documento_de(self.scrollable_frame).ids():
+            cascaron = self.activos.get(bloque_id)
+            if cascaron is not None:
+                cascaron.bloque.pack_forget()
+                cascaron.bloque.pack(side="top", fill="x", pady=5)
+        mover_botones_abajo(botones_frame, canvas)
+
+    # ---- Corrección en vivo ----
+
+    def corregir(self, corrector) -> None:
+        """
+        Activa la corrección en vivo con `corrector` (un `correccion.Corrector`
+        ya preparado) o, con None, la desactiva y borra las marcas.
+        """
+        if self.corrector is not None:
+            self.corrector.desactivar()
+            self.corrector.oyentes.remove(self._mostrar_puntuacion)
+        self.corrector = corrector
+        if corrector is not None:
+            corrector.oyentes.append(self._mostrar_puntuacion)
+        for bloque_id, cascaron in self.activos.items():
+            if cascaron.tipo == "tabla":
+                cascaron.interior.corrector = corrector
+                cascaron.interior._dibujar()
+                self._mostrar_puntuacion(bloque_id)
+
+    def _mostrar_puntuacion(self, bloque_id: int) -> None:
+        cascaron = self.activos.get(bloque_id)
+        if cascaron is None:
+            return
+        puntuacion = self.corrector.puntuacion(bloque_id) if self.corrector is not None else None
+        if puntuacion is None:
+            cascaron.content.titulo.config(text="", fg="black")
+            return
+        correctas, incorrectas, total = puntuacion
+        cascaron.content.titulo.config(text=f"{correctas}/{total}",
+                                       fg="#b00000" if incorrectas else "#006000")
+
+
+def realizar_bloque(scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas,
+                    modelo, alto: int = None) -> Cascaron:
+    """
+    Crea (o recupera del pool) los widgets de un bloque que ya existe en el
+    documento y los rellena desde el modelo. Lo usa la vista perezosa cuando un
+    bloque vuelve a entrar en pantalla. El cascarón queda empaquetado al final;
+    quien llama decide su posición.
+    """
+    pool = pool_de(scrollable_frame)
+    if isinstance(modelo, BloqueTabla):
+        return pool.tomar_tabla(botones_frame, canvas, modelo, *modelo.presentacion)
+
+    cascaron = pool.tomar_texto(botones_frame, canvas, modelo)
+    texto = cascaron.interior
+    texto.insert("1.0", modelo.texto)
+    texto.edit_reset()
+    texto.edit_modified(False)
+    if alto:
+        cascaron.bloque.config(height=alto)
+    return cascaron
+
+
+_pools: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def pool_de(scrollable_frame: tk.Frame) -> PoolBloques:
+    """Devuelve el pool de bloques del frame, creándolo si aún no existe."""
+    pool = _pools.get(scrollable_frame)
+    if pool is None:
+        pool = PoolBloques(scrollable_frame)
+        _pools[scrollable_frame] = pool
+    return pool
+
+
+# ====
+# Inserción de bloques por lotes
+# ====
+
+
+class LoteBloques:
+    """
+    Inserta muchos bloques con una sola pasada de geometría.
+
+    Dentro del `with` los bloques solo se añaden al modelo del documento; al
+    salir se crean sus widgets sin forzar ningún `update_idletasks` intermedio
+    (o, si hay vista perezosa, solo los que caen cerca de la zona visible), se
+    recolocan los botones una vez y se recalcula la región de scroll una vez.
+
+        with LoteBloques(scrollable_frame, botones_frame, canvas) as lote:
+            lote.texto("Ejercicios")
+            for plantilla in plantillas:
+                lote.tabla(plantilla)
+
+    `lote.documento` permite además añadir bloques con cualquier función que
+    trabaje sobre el modelo (p. ej. compilar_fichas.agregar_problema).
+    """
+
+    def __init__(self, scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas,
+                 desplazar_al_final: bool = True) -> None:
+        self.scrollable_frame = scrollable_frame
+        self.botones_frame = botones_frame
+        self.canvas = canvas
+        self.desplazar_al_final = desplazar_al_final
+        self.documento = documento_de(scrollable_frame)
+        self._primer_id = self.documento.proximo_id
+
+    def __enter__(self) -> "LoteBloques":
+        self._primer_id = self.documento.proximo_id
+        # Todo el lote se deshace de una vez
+        if self.documento.historial is not None:
+            self.documento.historial.abrir_grupo()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        if self.documento.historial is not None:
+            self.documento.historial.cerrar_grupo()
+        # También se confirma si hubo una excepción, para no dejar bloques del
+        # modelo sin widgets
+        self.confirmar()
+        return False
+
+    def texto(self, texto: str = "") -> BloqueTexto:
+        return self.documento.nuevo_texto(texto)
+
+    def tabla(self, plantilla, font_size: int = 16, padding: int = 4, bd: int = 3,
+              **disabled_opts) -> BloqueTabla:
+        """Añade la tabla de una `operaciones.Plantilla` con sus celdas fijas bloqueadas."""
+        tabla = plantilla.en_documento(self.documento)
+        tabla.presentacion = (font_size, padding, bd)
+        for key in plantilla.bloqueadas:
+            tabla.estilos[key] = {"state": "disabled", **disabled_opts}
+        return tabla
+
+    def confirmar(self) -> None:
+        nuevos = [b for b in self.documento.ids() if b >= self._primer_id]
+        self._primer_id = self.documento.proximo_id
+        if nuevos:
+            _mostrar_bloques(self.scrollable_frame, self.botones_frame, self.canvas, nuevos,
+                             1.0 if self.desplazar_al_final else None)
+
+
+def _mostrar_bloques(scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas,
+                     ids: List[int], desplazar_a: float = None) -> None:
+    """
+    Crea los widgets de los bloques `ids` del documento (o deja que lo haga la
+    vista perezosa) con una sola pasada de geometría al final.
+    """
+    documento = documento_de(scrollable_frame)
+    pool = pool_de(scrollable_frame)
+    if pool.vista is None:
+        # Sin vista perezosa se crean todos, sin medir nada entre bloque y bloque
+        alto_ventana = canvas.winfo_toplevel().winfo_height()
+        alto_texto = int((alto_ventana if alto_ventana >= 100 else 600) * 0.25)
+        for bloque_id in ids:
+            realizar_bloque(scrollable_frame, botones_frame, canvas,
+                            documento.get(bloque_id), alto=alto_texto)
+
+    mover_botones_abajo(botones_frame, canvas)
+    canvas.configure(scrollregion=canvas.bbox("all"))
+    if desplazar_a is not None:
+        canvas.yview_moveto(desplazar_a)
+    if pool.vista is not None:
+        pool.vista.programar()
+
+
+def reemplazar_documento(scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas,
+                         documento: Documento) -> None:
+    """
+    Sustituye el documento del frame (p. ej. al abrir un archivo): recupera los
+    widgets de todos los bloques actuales y muestra los del nuevo documento.
+    """
+    pool = pool_de(scrollable_frame)
+    for cascaron in list(pool.activos.values()):
+        pool.devolver(cascaron)
+    registrar_documento(scrollable_frame, documento)
+    _mostrar_bloques(scrollable_frame, botones_frame, canvas, documento.ids(), desplazar_a=0.0)
+
+
+# ====
+# Deshacer / rehacer
+# ====
+
+
+def _mostrar_cambios(scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas,
+                     cambios) -> None:
+    """Actualiza los widgets después de aplicar `cambios` (ver `historial`) al documento."""
+    documento = documento_de(scrollable_frame)
+    pool = pool_de(scrollable_frame)
+    for cambio in cambios:
+        tipo = cambio[0]
+        if tipo == "eliminar":
+            bloque_id = cambio[1].id
+            cascaron = pool.activos.get(bloque_id)
+            if cascaron is not None:
+                pool.devolver(cascaron)
+            if pool.corrector is not None:
+                pool.corrector.olvidar(bloque_id)
+        elif tipo == "insertar":
+            bloque = cambio[1]
+            if pool.corrector is not None and isinstance(bloque, BloqueTabla):
+                pool.corrector.preparar([bloque])
+            if pool.vista is None:
+                realizar_bloque(scrollable_frame, botones_frame, canvas, documento.get(bloque.id))
+        elif tipo == "celda":
+            _, tabla_id, fila, col, _, nuevo = cambio
+            cascaron = pool.activos.get(tabla_id)
+            if cascaron is not None:
+                cascaron.interior._escribir(fila, col, nuevo)
+            elif pool.corrector is not None:
+                pool.corrector.anotar(documento.get(tabla_id), fila, col, nuevo)
+    if any(cambio[0] != "celda" for cambio in cambios):
+        pool.recolocar(botones_frame, canvas)
+
+
+@medir
+def deshacer(scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas) -> bool:
+    """Deshace el último cambio del documento; False si no había ninguno."""
+    historial = documento_de(scrollable_frame).historial
+    cambios = historial.deshacer() if historial is not None else ()
+    _mostrar_cambios(scrollable_frame, botones_frame, canvas, cambios)
+    return bool(cambios)
+
+
+@medir
+def rehacer(scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas) -> bool:
+    """Vuelve a hacer el último cambio deshecho; False si no había ninguno."""
+    historial = documento_de(scrollable_frame).historial
+    cambios = historial.rehacer() if historial is not None else ()
+    _mostrar_cambios(scrollable_frame, botones_frame, canvas, cambios)
+    return bool(cambios)
@@ -0,0 +1,174 @@
+"""
+Barra de búsqueda de bloques.
+
+Consulta el índice del documento (`indice.IndiceBloques`) mientras se escribe
+y lleva el canvas hasta el bloque encontrado con `yview_moveto`. La posición
+del bloque sale de la vista perezosa (sumas prefijas de las alturas de los
+bloques) o, sin ella, del propio widget del bloque en `PoolBloques.activos`:
+nunca se recorren los hijos del frame scrollable.
+
+El índice se pone al día por tandas con `after` en cuanto la barra recibe el
+foco, para que la primera búsqueda en un documento recién abierto no tenga
+que leerlo entero.
+"""
+
+import tkinter as tk
+from typing import List, Optional
+
+from bloques import pool_de
+from documento import documento_de
+from indice import indice_de
+
+# Bloques que se indexan por turno del bucle de Tk
+BLOQUES_POR_TURNO = 500
+# Tiempo que el bloque encontrado se queda resaltado
+DESTACAR_MS = 1200
+# Margen que deja pack encima de cada bloque (pady=5)
+MARGEN = 5
+
+
+def ir_a_bloque(scrollable_frame: tk.Frame, canvas: tk.Canvas, bloque_id: int) -> bool:
+    """Desplaza el canvas para que el bloque quede arriba. False si no se puede situar."""
+    pool = pool_de(scrollable_frame)
+    if pool.vista is not None:
+        y = pool.vista.posicion(bloque_id)
+    else:
+        cascaron = pool.activos.get(bloque_id)
+        y = None if cascaron is None else cascaron.bloque.winfo_y()
+    caja = canvas.bbox("all")
+    if y is None or not caja or caja[3] <= caja[1]:
+        return False
+    canvas.yview_moveto(max(0.0, (y - MARGEN) / (caja[3] - caja[1])))
+    return True
+
+
+class BarraBusqueda(tk.Frame):
+    """
+    Campo de búsqueda con el número de resultados y botones para ir al
+    anterior y al siguiente. Intro va al siguiente, Mayús+Intro al anterior
+    y Escape borra la búsqueda.
+    """
+
+    def __init__(self, master: tk.Misc, scrollable_frame: tk.Frame, canvas: tk.Canvas, **kwargs) -> None:
+        kwargs.setdefault("bg", "#f0f0f0")
+        super().__init__(master, **kwargs)
+        self.scrollable_frame = scrollable_frame
+        self.canvas = canvas
+        self.resultados: List[int] = []
+        self.actual = -1
+        self._consulta = ""
+        self._indexando = None
+        self._afinando = None
+
+        tk.Label(self, text="Buscar:", font=("Arial", 12), bg=self.cget("bg")).pack(side="left", padx=(10, 5))
+        self.entry = tk.Entry(self, font=("Arial", 12), width=30)
+        self.entry.pack(side="left")
+        tk.Button(self, text="▲", font=("Arial", 10), command=self.anterior).pack(side="left", padx=(5, 0))
+        tk.Button(self, text="▼", font=("Arial", 10), command=self.siguiente).pack(side="left")
+        self.estado = tk.Label(self, text="", font=("Arial", 11), bg=self.cget("bg"))
+        self.estado.pack(side="left", padx=10)
+
+        self.entry.bind("<FocusIn>", lambda e: self._indexar())
+        self.entry.bind("<KeyRelease>", self._al_escribir)
+        self.entry.bind("<Return>", lambda e: self.siguiente())
+        self.entry.bind("<Shift-Return>", lambda e: self.anterior())
+        self.entry.bind("<Escape>", lambda e: self.limpiar())
+
+    def enfocar(self) -> None:
+        self.entry.focus_set()
+        self.entry.select_range(0, "end")
+
+    # ---- Índice ----
+
+    def _indexar(self) -> None:
+        """Indexa los bloques pendientes por tandas, sin bloquear la interfaz."""
+        self._indexando = None
+        indice = indice_de(documento_de(self.scrollable_frame))
+        if indice.actualizar(BLOQUES_POR_TURNO):
+            self._indexando = self.after(1, self._indexar)
+
+    # ---- Búsqueda ----
+
+    def _al_escribir(self, event) -> None:
+        if event.keysym in ("Return", "KP_Enter", "Escape"):
+            return
+        consulta = self.entry.get().strip()
+        if consulta != self._consulta:
+            self._consulta = consulta
+            self.buscar(consulta)
+
+    def buscar(self, consulta: str) -> List[int]:
+        """Busca `consulta` y va al primer resultado."""
+        self._consulta = consulta
+        self.resultados = indice_de(documento_de(self.scrollable_frame)).buscar(consulta) if consulta else []
+        self.actual = -1
+        if self.resultados:
+            self._ir(0)
+        else:
+            self.estado.config(text="Sin resultados" if consulta else "")
+        return self.resultados
+
+    def _refrescar(self) -> Optional[int]:
+        """
+        Repite la consulta (el documento puede haber cambiado) y devuelve la
+        posición del resultado actual en la nueva lista, si sigue en ella.
+        """
+        anterior = self.resultados[self.actual] if 0 <= self.actual < len(self.resultados) else None
+        self.resultados = indice_de(documento_de(self.scrollable_frame)).buscar(self._consulta)
+        try:
+            return self.resultados.index(anterior)
+        except ValueError:
+            return None
+
+    def siguiente(self) -> None:
+        if not self._consulta:
+            return
+        actual = self._refrescar()
+        if self.resultados:
+            self._ir(0 if actual is None else (actual + 1) % len(self.resultados))
+        else:
+            self.estado.config(text="Sin resultados")
+
+    def anterior(self) -> None:
+        if not self._consulta:
+            return
+        actual = self._refrescar()
+        if self.resultados:
+            self._ir(len(self.resultados) - 1 if actual is None else (actual - 1) % len(self.resultados))
+        else:
+            self.estado.config(text="Sin resultados")
+
+    def limpiar(self) -> None:
+        self.entry.delete(0, "end")
+        self._consulta = ""
+        self.resultados = []
+        self.actual = -1
+        self.estado.config(text="")
+
+    def _ir(self, posicion: int) -> None:
+        self.actual = posicion
+        self.estado.config(text=f"{posicion + 1}/{len(self.resultados)}")
+        bloque_id = self.resultados[posicion]
+        ir_a_bloque(self.scrollable_frame, self.canvas, bloque_id)
+        # Cuando la vista perezosa haya creado y medido los bloques de la zona,
+        # se corrige el desplazamiento con las alturas reales y se resalta el bloque
+        if self._afinando is not None:
+            self.after_cancel(self._afinando)
+        self._afinando = self.after(50, self._afinar, bloque_id)
+
+    def _afinar(self, bloque_id: int) -> None:
+        self._afinando = None
+        ir_a_bloque(self.scrollable_frame, self.canvas, bloque_id)
+        cascaron = pool_de(self.scrollable_frame).activos.get(bloque_id)
+        if cascaron is None:
+            return
+        bloque = cascaron.bloque
+        bloque.config(relief="solid")
+
+        def _apagar():
+            try:
+                bloque.config(relief="groove")
+            except tk.TclError:
+                pass  # el bloque se destruyó mientras tanto
+
+        self.after(DESTACAR_MS, _apagar)
@@ -0,0 +1,234 @@
+"""
+Compilador de fichas por lotes, sin interfaz gráfica.
+
+Lee especificaciones de problemas en JSON o CSV y genera un PDF por archivo con
+las mismas disposiciones de tabla (módulo `operaciones`) y los mismos estilos
+que la exportación de la aplicación (`export_pdf`). No se crea ningún widget de
+Tkinter. Los archivos se reparten entre un pool de procesos.
+
+Formato JSON: un objeto `{"title": "...", "problems": [...]}` o directamente
+la lista de problemas, cada uno `{"operation": "suma", "operands": ["12,5", "3"]}`.
+En lugar de operandos, una entrada puede pedir problemas al azar (módulo
+`generador`): `{"operation": "resta", "generate": 10, "difficulty": 2,
+"digits": 4, "constraints": {"llevadas": [1, 2]}}`. La semilla sale de
+`"seed"` (de la entrada o del objeto), de la variante y de la posición de la
+entrada, así que la misma especificación da siempre las mismas fichas.
+
+Formato CSV: columnas `operation` y `operands` (operandos separados por
+espacios) y, opcionalmente, `title`; se usa el primer título no vacío.
+
+Con `--variantes K` se generan K fichas por especificación (`nombre-01.pdf`,
+`nombre-02.pdf`, ...), una por alumno, cada una con sus propios problemas al
+azar.
+
+Uso:
+    python compilar_fichas.py fichas/*.json -o salida/ -j 8 [--variantes 30]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Sequence, Tuple, Union
+
+from documento import Documento
+from export_pdf import document_to_blocks, export_blocks_to_pdf
+from generador import Generador
+from operaciones import plantilla_problema
+
+# Nombres aceptados para cada operación (incluidos los símbolos del submenú)
+ALIAS_OPERACIONES = {
+    'suma': 'suma', '+': 'suma',
+    'resta': 'resta', '−': 'resta', '-': 'resta',
+    'multiplicacion': 'multiplicacion', 'multiplicación': 'multiplicacion', 'x': 'multiplicacion',
+    'division': 'division', 'división': 'division', '÷': 'division',
+    'factorial': 'factorial', '|': 'factorial',
+    'raiz': 'raiz', 'raíz': 'raiz', '√': 'raiz',
+    'binario': 'binario', 'binaria': 'binario',
+    'texto': 'texto', 'text': 'texto',
+}
+
+# Número de operandos que necesita cada operación
+ARIDAD = {
+    'suma': 2, 'resta': 2, 'multiplicacion': 2, 'division': 2,
+    'factorial': 1, 'raiz': 2, 'binario': 1, 'texto': 1,
+}
+
+
+def agregar_problema(documento: Documento, operacion: str, operandos: Sequence[str]) -> None:
+    """
+    Añade al documento el bloque de un problema. Lanza ValueError si la
+    operación no existe o los operandos no son válidos para ella.
+    """
+    nombre = ALIAS_OPERACIONES.get(str(operacion).strip().lower())
+    if nombre is None:
+        raise ValueError(f"Operación desconocida: {operacion!r}")
+    operandos = [str(o).strip() for o in operandos]
+    if len(operandos) != ARIDAD[nombre]:
+        raise ValueError(f"'{nombre}' necesita {ARIDAD[nombre]} operando(s), recibió {len(operandos)}")
+
+    if nombre == 'texto':
+        documento.nuevo_texto(operandos[0])
+        return
+
+    plantilla_problema(nombre, operandos).en_documento(documento)
+
+
+# Un problema con sus operandos o una entrada JSON que pide problemas al azar
+Entrada = Union[Tuple[str, List[str]], dict]
+
+
+def leer_especificacion(ruta: str) -> Tuple[Optional[str], List[Entrada]]:
+    """
+    Devuelve (título, entradas) de un archivo JSON o CSV. Cada entrada es
+    (operación, operandos) o, si pide problemas al azar, el dict de la entrada
+    con la semilla del objeto si no trae la suya.
+    """
+    if ruta.lower().endswith('.csv'):
+        titulo = None
+        problemas = []
+        with open(ruta, newline='', encoding='utf-8') as f:
+            for fila in csv.DictReader(f):
+                if not titulo and (fila.get('title') or '').strip():
+                    titulo = fila['title'].strip()
+                problemas.append((fila['operation'], (fila.get('operands') or '').split()))
+        return titulo, problemas
+
+    with open(ruta, encoding='utf-8') as f:
+        return interpretar_especificacion(json.load(f))
+
+
+def interpretar_especificacion(datos) -> Tuple[Optional[str], List[Entrada]]:
+    """Como `leer_especificacion`, para una especificación JSON ya cargada."""
+    if isinstance(datos, list):
+        datos = {'problems': datos}
+    if not isinstance(datos, dict):
+        raise ValueError("La especificación debe ser un objeto o una lista de problemas")
+    problemas = []
+    for numero, p in enumerate(datos.get('problems', []), start=1):
+        if not isinstance(p, dict) or 'operation' not in p:
+            raise ValueError(f"problema {numero}: falta 'operation'")
+        if 'generate' in p:
+            problemas.append({**p, 'seed': p.get('seed', datos.get('seed'))})
+        else:
+            problemas.append((p['operation'], list(p.get('operands', []))))
+    return datos.get('title'), problemas
+
+
+def generar_problemas(entrada: dict, semilla: str) -> List[Tuple[str, List[str]]]:
+    """
+    Problemas al azar de una entrada `{"operation", "generate", "difficulty",
+    "digits", "constraints"}`. Lanza ValueError si la entrada no es válida.
+    """
+    nombre = ALIAS_OPERACIONES.get(str(entrada['operation']).strip().lower())
+    if nombre is None or nombre == 'texto':
+        raise ValueError(f"No se pueden generar problemas de {entrada['operation']!r}")
+    restricciones = dict(entrada.get('constraints') or {})
+    for clave, valor in restricciones.items():
+        # En JSON los rangos llegan como listas
+        if isinstance(valor, list):
+            restricciones[clave] = tuple(valor)
+    if entrada.get('digits') is not None:
+        cifras = entrada['digits']
+        restricciones['cifras'] = tuple(cifras) if isinstance(cifras, list) else cifras
+    try:
+        generador = Generador(nombre, entrada.get('difficulty'), semilla, **restricciones)
+    except TypeError as e:
+        raise ValueError(f"Restricciones no válidas: {e}") from None
+    return [(nombre, list(operandos)) for operandos in generador.generar(int(entrada['generate']))]
+
+
+def compilar_archivo(ruta: str, dir_salida: Optional[str] = None,
+                     variante: Optional[int] = None) -> Tuple[str, int, float]:
+    """
+    Genera el PDF de una especificación. Devuelve (ruta_pdf, problemas, segundos).
+    El PDF se escribe junto a la especificación salvo que se indique `dir_salida`;
+    con `variante` se llama `nombre-NN.pdf` y sus problemas al azar son otros.
+    """
+    inicio = time.perf_counter()
+    titulo, entradas = leer_especificacion(ruta)
+    documento, problemas = construir_documento(entradas, variante)
+
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    if variante is not None:
+        base += f"-{variante:02d}"
+    destino = os.path.join(dir_salida or os.path.dirname(ruta), base + '.pdf')
+    export_blocks_to_pdf(document_to_blocks(documento), destino, title=titulo)
+    return destino, problemas, time.perf_counter() - inicio
+
+
+def construir_documento(entradas: Sequence[Entrada], variante: Optional[int] = None) -> Tuple[Documento, int]:
+    """
+    Documento con los problemas de las entradas (generando los que se piden al
+    azar para `variante`). Devuelve (documento, problemas).
+    """
+    documento = Documento()
+    problemas = 0
+    for numero, entrada in enumerate(entradas, start=1):
+        try:
+            if isinstance(entrada, dict):
+                semilla = f"{entrada.get('seed')}:{variante or 0}:{numero}"
+                lista = generar_problemas(entrada, semilla)
+            else:
+                lista = [entrada]
+            for operacion, operandos in lista:
+                agregar_problema(documento, operacion, operandos)
+            problemas += len(lista)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"problema {numero}: {e}") from None
+    return documento, problemas
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Genera fichas PDF de QuicKual a partir de JSON/CSV.")
+    parser.add_argument('specs', nargs='+', help="Archivos de especificación (.json o .csv)")
+    parser.add_argument('-o', '--output-dir', help="Carpeta de salida (por defecto, junto a cada archivo)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help="Procesos en paralelo (por defecto, todos los núcleos)")
+    parser.add_argument('--variantes', type=int, default=0,
+                        help="Fichas por especificación, cada una con otros problemas al azar")
+    args = parser.parse_args(argv)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    inicio = time.perf_counter()
+    errores = 0
+
+    def _informar(ruta, resultado=None, error=None):
+        nonlocal errores
+        if error is not None:
+            errores += 1
+            print(f"ERROR  {ruta}: {error}", file=sys.stderr)
+            return
+        destino, problemas, segundos = resultado
+        print(f"{segundos:8.3f} s  {problemas:5d} problemas  {destino}")
+
+    variantes = range(1, args.variantes + 1) if args.variantes > 0 else [None]
+    tareas = [(ruta, variante) for ruta in args.specs for variante in variantes]
+    jobs = max(1, args.jobs or 1)
+    if jobs == 1 or len(tareas) == 1:
+        for ruta, variante in tareas:
+            try:
+                _informar(ruta, compilar_archivo(ruta, args.output_dir, variante))
+            except Exception as e:
+                _informar(ruta, error=e)
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tareas))) as pool:
+            futuros = {pool.submit(compilar_archivo, ruta, args.output_dir, variante): ruta
+                       for ruta, variante in tareas}
+            for futuro in as_completed(futuros):
+                try:
+                    _informar(futuros[futuro], futuro.result())
+                except Exception as e:
+                    _informar(futuros[futuro], error=e)
+
+    print(f"{len(tareas) - errores}/{len(tareas)} archivos en {time.perf_counter() - inicio:.3f} s")
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
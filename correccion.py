@@ -0,0 +1,163 @@
+"""
+Corrección en vivo de las celdas que rellenan los alumnos.
+
+Al activar la corrección se resuelven de una vez, por lotes, las tablas del
+documento (`solucionario.resolver_tablas`) y se guarda para cada tabla el
+valor esperado de cada una de sus celdas editables. Después, cada pulsación se
+comprueba con una sola búsqueda en ese diccionario: la celda queda marcada en
+`BloqueTabla.marcas` como correcta o incorrecta y las puntuaciones del bloque
+y del documento se actualizan sumando o restando uno, sin volver a recorrer la
+tabla.
+
+No depende de Tkinter: la rejilla llama a `Corrector.anotar` al escribir en
+una celda y el pool de bloques muestra la puntuación de cada bloque.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from documento import BloqueTabla, Documento
+from solucionario import resolver_tablas
+
+
+class CorreccionTabla:
+    """Valores esperados y recuentos de una tabla."""
+
+    __slots__ = ("tabla", "esperadas", "correctas", "incorrectas")
+
+    def __init__(self, tabla: BloqueTabla, esperadas: Dict[Tuple[int, int], str]) -> None:
+        self.tabla = tabla
+        self.esperadas = esperadas
+        self.correctas = 0
+        self.incorrectas = 0
+
+    @property
+    def total(self) -> int:
+        return len(self.esperadas)
+
+
+def _esperadas(tabla: BloqueTabla, celdas: Dict[Tuple[int, int], str]) -> Dict[Tuple[int, int], str]:
+    """Celdas de la solución que el alumno puede rellenar (dentro de la tabla y no bloqueadas)."""
+    esperadas = {}
+    for (fila, col), valor in celdas.items():
+        if not (0 <= fila < tabla.filas and 0 <= col < tabla.columnas):
+            continue
+        if tabla.estilos.get((fila, col), {}).get("state") == "disabled":
+            continue
+        esperadas[(fila, col)] = valor.strip()
+    return esperadas
+
+
+class Corrector:
+    """
+    Corrección en vivo de un documento. `oyentes` son funciones que reciben
+    el id del bloque cada vez que cambia su puntuación.
+    """
+
+    def __init__(self, documento: Documento) -> None:
+        self.documento = documento
+        # None para las tablas que no se pueden resolver
+        self._tablas: Dict[int, Optional[CorreccionTabla]] = {}
+        self.correctas = 0
+        self.incorrectas = 0
+        self.total = 0
+        self.oyentes: List[Callable[[int], None]] = []
+
+    def preparar(self, tablas: Iterable[BloqueTabla] = None) -> None:
+        """
+        Precalcula las celdas esperadas de `tablas` (por defecto, todas las del
+        documento) que aún no se conocían y corrige lo que ya tengan escrito.
+        """
+        if tablas is None:
+            tablas = (bloque for bloque in self.documento if bloque.tipo == "table")
+        nuevas = [tabla for tabla in tablas if tabla.id not in self._tablas]
+        soluciones = resolver_tablas(nuevas)
+        for tabla in nuevas:
+            solucion = soluciones.get(tabla.id)
+            if solucion is None:
+                self._tablas[tabla.id] = None
+                continue
+            correccion = CorreccionTabla(tabla, _esperadas(tabla, solucion[0]))
+            self._tablas[tabla.id] = correccion
+            self.total += correccion.total
+            tabla.marcas.clear()
+            for (fila, col), esperado in correccion.esperadas.items():
+                valor = tabla.get(fila, col).strip()
+                if valor:
+                    self._marcar(correccion, fila, col, valor == esperado)
+
+    def _marcar(self, correccion: CorreccionTabla, fila: int, col: int, marca: Optional[bool]) -> None:
+        marcas = correccion.tabla.marcas
+        anterior = marcas.get((fila, col))
+        if anterior is True:
+            correccion.correctas -= 1
+            self.correctas -= 1
+        elif anterior is False:
+            correccion.incorrectas -= 1
+            self.incorrectas -= 1
+
+        if marca is None:
+            marcas.pop((fila, col), None)
+            return
+        marcas[(fila, col)] = marca
+        if marca:
+            correccion.correctas += 1
+            self.correctas += 1
+        else:
+            correccion.incorrectas += 1
+            self.incorrectas += 1
+
+    def anotar(self, tabla: BloqueTabla, fila: int, col: int, valor: str,
+               preparar: bool = True) -> Optional[bool]:
+        """
+        Corrige el nuevo valor de una celda. Devuelve su marca: True/False, o
+        None si la celda está vacía o no se corrige. Una tabla que aún no se
+        conocía se prepara en ese momento, salvo con `preparar=False` (los
+        constructores escriben las celdas antes de bloquearlas).
+        """
+        correccion = self._tablas.get(tabla.id)
+        if correccion is None or correccion.tabla is not tabla:
+            if not preparar or (tabla.id in self._tablas and correccion is None):
+                return None
+            # Tabla nueva (o de un bloque recargado): se prepara una sola vez
+            self.olvidar(tabla.id)
+            self.preparar([tabla])
+            self._avisar(tabla.id)
+            return tabla.marcas.get((fila, col))
+
+        esperado = correccion.esperadas.get((fila, col))
+        if esperado is None:
+            return None
+        valor = valor.strip()
+        marca = (valor == esperado) if valor else None
+        if tabla.marcas.get((fila, col)) is not marca:
+            self._marcar(correccion, fila, col, marca)
+            self._avisar(tabla.id)
+        return marca
+
+    def _avisar(self, bloque_id: int) -> None:
+        for oyente in self.oyentes:
+            oyente(bloque_id)
+
+    def olvidar(self, bloque_id: int) -> None:
+        """Quita un bloque borrado de la puntuación del documento."""
+        correccion = self._tablas.pop(bloque_id, None)
+        if correccion is None:
+            return
+        self.correctas -= correccion.correctas
+        self.incorrectas -= correccion.incorrectas
+        self.total -= correccion.total
+        correccion.tabla.marcas.clear()
+        self._avisar(bloque_id)
+
+    def puntuacion(self, bloque_id: int) -> Optional[Tuple[int, int, int]]:
+        """(correctas, incorrectas, total) del bloque, o None si no se corrige."""
+        correccion = self._tablas.get(bloque_id)
+        if correccion is None:
+            return None
+        return correccion.correctas, correccion.incorrectas, correccion.total
+
+    def desactivar(self) -> None:
+        """Borra las marcas de todas las tablas corregidas."""
+        for correccion in self._tablas.values():
+            if correccion is not None:
+                correccion.tabla.marcas.clear()
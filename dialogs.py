@@ -1,153 +1,47 @@
 import tkinter as tk
 from tkinter import simpledialog, messagebox
-from decimal import Decimal, InvalidOperation
-from bloques import _add_header_with_trash, mover_botones_abajo
+from decimal import InvalidOperation
+from bloques import LoteBloques, mover_botones_abajo, pool_de
+from documento import documento_de
+from generador import DIFICULTADES, Generador
+from perfilado import medir
+from operaciones import (
+    Plantilla, _parse_decimal, contar_filas,
+    plantilla_suma, plantilla_resta, plantilla_multiplicacion, plantilla_division,
+    plantilla_factorial, plantilla_raiz, plantilla_binaria, plantilla_problema,
+)
 
 
 # ====
-# Utilidades para + y -
+# Utilidades de rejilla
 # ====
 
 
-def _normalize_decimal_input(text: str) -> str:
+def _rellenar_desde_plantilla(entries, plantilla: Plantilla, **disabled_opts) -> None:
     """
-    Normaliza la entrada:
-    - trim
-    - reemplaza ',' por '.'
+    Bloquea las celdas fijas de la plantilla con sus estilos. Los valores ya
+    los ha copiado `Plantilla.en_documento` al modelo (ver `_nueva_tabla`):
+    escribirlos otra vez en la celda los duplicaría.
     """
-    if text is None:
-        return None
-    text = text.strip()
-    if not text:
-        return None
-    return text.replace(",", ".")
+    for key in plantilla.bloqueadas:
+        e = entries.get(key)
+        if e is not None:
+            e.config(state="disabled", **disabled_opts)
 
 
-def _parse_decimal(text: str) -> Decimal:
-    """Parsea a Decimal tras normalizar. Lanza InvalidOperation si no es válido."""
-    norm = _normalize_decimal_input(text)
-    if norm is None:
-        raise InvalidOperation("Entrada vacía")
-    return Decimal(norm)
-
-
-def _split_parts_for_display(original_text: str) -> tuple[str, str, bool]:
-    """
-    Devuelve (entera, decimal, has_decimal) respetando lo que escribió el usuario.
-    Se usa coma para la visualización.
-    """
-    if original_text is None:
-        return "", "", False
-    txt = original_text.strip()
-    if not txt:
-        return "", "", False
-
-    # Mostrar coma en la UI
-    txt = txt.replace(".", ",")
-
-    if "," in txt:
-        left, right = txt.split(",", 1)
-        # Si left es "" o solo signo, convertimos a ±0
-        if left in ("", "+", "-"):
-            left = f"{'-' if left=='-' else ('+' if left=='+' else '')}0"
-        return left, right, True
-    return txt, "", False
-
-
-def _compute_widths_for_two_numbers(
-    a_ent: str, a_dec: str, a_has_dec: bool, b_ent: str, b_dec: str, b_has_dec: bool
-) -> tuple[int, int, bool]:
-    max_entera = max(len(a_ent), len(b_ent))
-    max_decimal = max(len(a_dec), len(b_dec))
-    show_comma = a_has_dec or b_has_dec
-    return max_entera, max_decimal, show_comma
-
-
-def _build_grid_for_addsub(
-    parent_content: tk.Frame, filas: int, columnas: int, font_size: int = 16, padding: int = 4
-) -> dict[tuple[int, int], tk.Entry]:
-    """
-    Construye una rejilla de Entries y devuelve un dict con claves (fila, col).
-    Asegura que existan exactamente `filas` x `columnas` entradas.
-    """
-    entries: dict[tuple[int, int], tk.Entry] = {}
-    for i in range(filas):
-        parent_content.grid_rowconfigure(i, weight=1)
-    for j in range(columnas):
-        parent_content.grid_columnconfigure(j, weight=1)
-
-    for i in range(filas):
-        for j in range(columnas):
-            e = tk.Entry(
-                parent_content, font=("Arial", font_size), justify="center", bd=2, relief="groove"
-            )
-            e.grid(row=i, column=j, sticky="nsew", padx=padding, pady=padding)
-            entries[(i, j)] = e
-    return entries
-
-
-def _place_number_into_entries(
-    entries: dict,
-    fila: int,
-    entera: str,
-    decimal: str,
-    max_entera: int,
-    max_decimal: int,
-    show_comma: bool,
-    has_decimal: bool,  # decide si escribir la coma visual
-    start_col: int = 0,
-    font_disable: bool = True,
-) -> None:
+@medir
+def _nueva_tabla(
+    scrollable_frame, botones_frame, canvas, plantilla: Plantilla, font_size=16, padding=4, bd=3
+):
     """
-    Inserta visualmente un número en la fila `fila` del grid representado por `entries`.
-
-    Convenciones:
-    - columna `start_col` se reserva para el símbolo de operación (por eso las partes comienzan en start_col + 1).
-    - la parte entera se alinea a la derecha ocupando `max_entera` columnas.
-    - si `show_comma` y `has_decimal` es True, se inserta la coma en la columna correspondiente.
-    - los decimales se colocan a la derecha de la coma hasta `max_decimal` posiciones.
-
-    La función es defensiva: si una celda esperada no existe en `entries`, la omite (evita KeyError).
+    Crea (o reutiliza del pool) el bloque con cabecera de papelera, su tabla
+    en el modelo y la rejilla de celdas. Devuelve (bloque, content, tabla, entries).
     """
-    # Normaliza la parte entera mínima
-    ent_str = entera
-    if ent_str in ("", "+", "-"):
-        ent_str = "0" if ent_str == "" else ent_str + "0"
-
-    # Inserta la parte entera (derecha -> izquierda lógica)
-    # Columnas reservadas: start_col es símbolo, las cifras empiezan en start_col+1
-    for i in range(max_entera):
-        col = start_col + 1 + i
-        # índice del carácter a insertar
-        idx_ent = len(ent_str) - (max_entera - i)
-        ch = ent_str[idx_ent] if 0 <= idx_ent < len(ent_str) else ""
-        key = (fila, col)
-        if key in entries:
-            entries[key].insert(0, ch)
-            if font_disable:
-                entries[key].config(state="disabled")
-
-    # Columna de la coma (si corresponde)
-    comma_col = start_col + 1 + max_entera
-    if show_comma and has_decimal:
-        key = (fila, comma_col)
-        if key in entries:
-            entries[key].insert(0, ",")
-            if font_disable:
-                entries[key].config(state="disabled")
-
-    # Decimales: a la derecha de la coma (si existe) o a continuación de la parte entera
-    for d in range(max_decimal):
-        if show_comma:
-            col = comma_col + 1 + d
-        else:
-            col = start_col + 1 + max_entera + d
-        ch = decimal[d] if d < len(decimal) else ""
-        key = (fila, col)
-        if key in entries:
-            entries[key].insert(0, ch)
-            if font_disable:
-                entries[key].config(state="disabled")
+    tabla = plantilla.en_documento(documento_de(scrollable_frame))
+    cascaron = pool_de(scrollable_frame).tomar_tabla(
+        botones_frame, canvas, tabla, font_size=font_size, padding=padding, bd=bd
+    )
+    return cascaron.bloque, cascaron.content, tabla, cascaron.interior.celdas
 
 
 # ====
@@ -155,11 +49,11 @@ def _place_number_into_entries(
 # ====
 
 
+@medir
 def agregar_bloque_texto(scrollable_frame, botones_frame, canvas):
-    bloque = tk.Frame(scrollable_frame, bd=3, relief="groove", bg="white")
-    bloque.pack(side="top", fill="x", pady=5)
-
-    bloque.pack_propagate(False)
+    modelo = documento_de(scrollable_frame).nuevo_texto()
+    cascaron = pool_de(scrollable_frame).tomar_texto(botones_frame, canvas, modelo)
+    bloque = cascaron.bloque
 
     bloque.update_idletasks()
     ventana_altura = bloque.winfo_toplevel().winfo_height()
@@ -167,13 +61,7 @@ def agregar_bloque_texto(scrollable_frame, botones_frame, canvas):
         ventana_altura = 600
     bloque.config(height=int(ventana_altura * 0.25))
 
-    content = _add_header_with_trash(bloque, botones_frame, canvas)
-
-    text_widget = tk.Text(
-        content, wrap="word", font=("Arial", 14), undo=True, borderwidth=0, bg="white"
-    )
-    text_widget.pack(fill="both", expand=True, padx=5, pady=5)
-
+    text_widget = cascaron.interior
     text_widget.focus_set()
     bloque.update_idletasks()
     canvas.update_idletasks()
@@ -234,6 +122,7 @@ class RestaDialog(simpledialog.Dialog):
 # ====
 
 
+@medir
 def dibujar_tabla_suma(scrollable_frame, botones_frame, canvas):
     # Un único diálogo para ambos sumandos
     root_aux = tk.Tk()
@@ -255,61 +144,11 @@ def dibujar_tabla_suma(scrollable_frame, botones_frame, canvas):
         )
         return
 
-    a_ent, a_dec, a_has_dec = _split_parts_for_display(a_text)
-    b_ent, b_dec, b_has_dec = _split_parts_for_display(b_text)
-
-    max_ent, max_dec, show_comma = _compute_widths_for_two_numbers(
-        a_ent, a_dec, a_has_dec, b_ent, b_dec, b_has_dec
-    )
-
-    columnas = 1 + max_ent + (1 if show_comma else 0) + max_dec
-    filas = 4  # estructura original
-
-    tabla_frame = tk.Frame(scrollable_frame, bd=2, relief="groove", bg="white")
-    tabla_frame.pack(side="top", fill="x", pady=5)
-
-    content = _add_header_with_trash(tabla_frame, botones_frame, canvas)
-    entries = _build_grid_for_addsub(content, filas, columnas, font_size=16, padding=4)
-
-    # Fila 1: primer sumando
-    _place_number_into_entries(
-        entries,
-        fila=1,
-        entera=a_ent,
-        decimal=a_dec,
-        max_entera=max_ent,
-        max_decimal=max_dec,
-        show_comma=show_comma,
-        has_decimal=a_has_dec,
-        start_col=0,
-        font_disable=True,
-    )
-
-    # Fila 2: símbolo + y segundo sumando (bloqueada)
-    entries[(2, 0)].insert(0, "+")
-    entries[(2, 0)].config(state="disabled")
-
-    _place_number_into_entries(
-        entries,
-        fila=2,
-        entera=b_ent,
-        decimal=b_dec,
-        max_entera=max_ent,
-        max_decimal=max_dec,
-        show_comma=show_comma,
-        has_decimal=b_has_dec,
-        start_col=0,
-        font_disable=True,
-    )
-
-    # Bloquear TODA la fila 2
-    for col in range(columnas):
-        try:
-            entries[(2, col)].config(state="disabled")
-        except Exception:
-            pass
-
-    # Fila 3: vacía (no mostramos resultado)
+    # Fila 1: primer sumando; fila 2: símbolo + y segundo sumando (bloqueada);
+    # fila 3: vacía (no mostramos resultado)
+    plantilla = plantilla_suma(a_text, b_text)
+    _, _, _, entries = _nueva_tabla(scrollable_frame, botones_frame, canvas, plantilla, bd=2)
+    _rellenar_desde_plantilla(entries, plantilla)
 
     scrollable_frame.update_idletasks()
     canvas.update_idletasks()
@@ -322,6 +161,7 @@ def dibujar_tabla_suma(scrollable_frame, botones_frame, canvas):
 # ====
 
 
+@medir
 def dibujar_tabla_resta(scrollable_frame, botones_frame, canvas):
     # Un único diálogo para minuendo y sustraendo
     root_aux = tk.Tk()
@@ -343,61 +183,11 @@ def dibujar_tabla_resta(scrollable_frame, botones_frame, canvas):
         )
         return
 
-    a_ent, a_dec, a_has_dec = _split_parts_for_display(a_text)
-    b_ent, b_dec, b_has_dec = _split_parts_for_display(b_text)
-
-    max_ent, max_dec, show_comma = _compute_widths_for_two_numbers(
-        a_ent, a_dec, a_has_dec, b_ent, b_dec, b_has_dec
-    )
-
-    columnas = 1 + max_ent + (1 if show_comma else 0) + max_dec
-    filas = 4
-
-    tabla_frame = tk.Frame(scrollable_frame, bd=2, relief="groove", bg="white")
-    tabla_frame.pack(side="top", fill="x", pady=5)
-
-    content = _add_header_with_trash(tabla_frame, botones_frame, canvas)
-    entries = _build_grid_for_addsub(content, filas, columnas, font_size=16, padding=4)
-
-    # Fila 1: minuendo
-    _place_number_into_entries(
-        entries,
-        fila=1,
-        entera=a_ent,
-        decimal=a_dec,
-        max_entera=max_ent,
-        max_decimal=max_dec,
-        show_comma=show_comma,
-        has_decimal=a_has_dec,
-        start_col=0,
-        font_disable=True,
-    )
-
-    # Fila 2: símbolo - y sustraendo (bloqueada)
-    entries[(2, 0)].insert(0, "-")
-    entries[(2, 0)].config(state="disabled")
-
-    _place_number_into_entries(
-        entries,
-        fila=2,
-        entera=b_ent,
-        decimal=b_dec,
-        max_entera=max_ent,
-        max_decimal=max_dec,
-        show_comma=show_comma,
-        has_decimal=b_has_dec,
-        start_col=0,
-        font_disable=True,
-    )
-
-    # Bloquear toda la fila 2
-    for col in range(columnas):
-        try:
-            entries[(2, col)].config(state="disabled")
-        except Exception:
-            pass
-
-    # Fila 3: vacía (no mostramos resultado)
+    # Fila 1: minuendo; fila 2: símbolo - y sustraendo (bloqueada);
+    # fila 3: vacía (no mostramos resultado)
+    plantilla = plantilla_resta(a_text, b_text)
+    _, _, _, entries = _nueva_tabla(scrollable_frame, botones_frame, canvas, plantilla, bd=2)
+    _rellenar_desde_plantilla(entries, plantilla)
 
     scrollable_frame.update_idletasks()
     canvas.update_idletasks()
@@ -410,6 +200,7 @@ def dibujar_tabla_resta(scrollable_frame, botones_frame, canvas):
 # ====
 
 
+@medir
 def dibujar_tabla_multiplicacion(scrollable_frame, botones_frame, canvas, font_size=16, padding=4):
     class MultiplicacionDialog(simpledialog.Dialog):
         def body(self, master):
@@ -443,55 +234,11 @@ def dibujar_tabla_multiplicacion(scrollable_frame, botones_frame, canvas, font_s
     if dialog.a is None or dialog.b is None:
         return
 
-    a, b = dialog.a, dialog.b
-
-    def calcular_filas_columnas(a_val, b_val):
-        filas_loc = 4
-        if len(str(b_val)) > 1:
-            filas_loc += len(str(b_val))
-        columnas_loc = len(str(a_val * b_val)) + 1
-        return filas_loc, columnas_loc
-
-    filas, columnas = calcular_filas_columnas(a, b)
-
-    bloque = tk.Frame(scrollable_frame, bd=3, relief="groove", bg="white")
-    bloque.pack(side="top", fill="x", pady=5)
-
-    content = _add_header_with_trash(bloque, botones_frame, canvas)
-
-    entries = {}
-    a_str = str(a)
-    b_str = str(b)
-
-    for i in range(filas):
-        content.grid_rowconfigure(i, weight=1)
-        for j in range(columnas):
-            content.grid_columnconfigure(j, weight=1)
-            e = tk.Entry(
-                content, font=("Arial", font_size), justify="center", bd=2, relief="groove"
-            )
-            e.grid(row=i, column=j, sticky="nsew", padx=padding, pady=padding)
-            entries[(i, j)] = e
-
-    start_col_a = columnas - len(a_str)
-    for j in range(columnas):
-        if j >= start_col_a and (1, j) in entries:
-            entries[(1, j)].insert(0, a_str[j - start_col_a])
-        if (1, j) in entries:
-            entries[(1, j)].config(state="disabled")
-
-    start_col_b = columnas - len(b_str)
-    for j in range(columnas):
-        if j == 0 and (2, j) in entries:
-            entries[(2, j)].insert(0, "X")
-        elif j >= start_col_b and (2, j) in entries:
-            entries[(2, j)].insert(0, b_str[j - start_col_b])
-        if (2, j) in entries:
-            entries[(2, j)].config(state="disabled")
-
-    if len(str(b)) > 1 and (filas - 2, 0) in entries:
-        entries[(filas - 2, 0)].insert(0, "+")
-        entries[(filas - 2, 0)].config(state="disabled")
+    plantilla = plantilla_multiplicacion(dialog.a, dialog.b)
+    bloque, _, _, entries = _nueva_tabla(
+        scrollable_frame, botones_frame, canvas, plantilla, font_size, padding
+    )
+    _rellenar_desde_plantilla(entries, plantilla)
 
     bloque.update_idletasks()
     canvas.update_idletasks()
@@ -506,6 +253,7 @@ def dibujar_tabla_multiplicacion(scrollable_frame, botones_frame, canvas, font_s
 # ====
 
 
+@medir
 def dibujar_tabla_division(scrollable_frame, botones_frame, canvas, font_size=16, padding=4):
     class DivisionDialog(simpledialog.Dialog):
         def body(self, master):
@@ -520,61 +268,37 @@ def dibujar_tabla_division(scrollable_frame, botones_frame, canvas, font_size=16
             self.entry_divisor = tk.Entry(master, font=("Arial", font_size))
             self.entry_dividendo.grid(row=0, column=1, padx=5, pady=5)
             self.entry_divisor.grid(row=1, column=1, padx=5, pady=5)
+            self.resuelta_var = tk.BooleanVar(value=False)
+            tk.Checkbutton(
+                master, text="Rellenar los pasos", font=("Arial", font_size), variable=self.resuelta_var
+            ).grid(row=2, column=0, columnspan=2, sticky="w", pady=5)
             return self.entry_dividendo
 
         def apply(self):
-            try:
-                self.dividendo = int(self.entry_dividendo.get())
-                self.divisor = int(self.entry_divisor.get())
-            except ValueError:
-                self.dividendo = None
-                self.divisor = None
+            # El dividendo se queda como cadena (ver MAX_CIFRAS_DIVIDENDO)
+            self.dividendo = self.entry_dividendo.get().strip()
+            self.divisor = self.entry_divisor.get().strip()
+            self.resuelta = self.resuelta_var.get()
 
     root_aux = tk.Tk()
     root_aux.withdraw()
     dialog = DivisionDialog(root_aux, title="Introduce los números")
     root_aux.destroy()
-    if dialog.dividendo is None or dialog.divisor is None:
+    dividendo = getattr(dialog, "dividendo", None)
+    divisor = getattr(dialog, "divisor", None)
+    if not dividendo or not divisor:
         return
-
-    dividendo = dialog.dividendo
-    divisor = dialog.divisor
-
-    n = len(str(dividendo))
-    m = len(str(divisor))
-    primeros_m = int(str(dividendo)[:m])
-    if primeros_m >= divisor:
-        filas = (n - m + 1) + 1
-    else:
-        filas = (n - m) + 1
-
-    bloque = tk.Frame(scrollable_frame, bd=3, relief="groove", bg="white")
-    bloque.pack(side="top", fill="x", pady=5)
-
-    content = _add_header_with_trash(bloque, botones_frame, canvas)
-
-    entries = {}
-    columnas = 2
-    for i in range(filas):
-        content.grid_rowconfigure(i, weight=1)
-        for j in range(columnas):
-            content.grid_columnconfigure(j, weight=1)
-            e = tk.Entry(
-                content, font=("Arial", font_size), justify="center", bd=2, relief="groove"
-            )
-            e.grid(row=i, column=j, sticky="nsew", padx=padding, pady=padding)
-            entries[(i, j)] = e
-
-    if (0, 0) in entries:
-        entries[(0, 0)].insert(0, str(dividendo))
-        entries[(0, 0)].config(
-            state="disabled", disabledbackground="#f0f0f0", disabledforeground="black"
-        )
-    if (0, 1) in entries:
-        entries[(0, 1)].insert(0, str(divisor))
-        entries[(0, 1)].config(
-            state="disabled", disabledbackground="#f0f0f0", disabledforeground="black"
-        )
+    try:
+        plantilla = plantilla_division(dividendo, divisor, resuelta=dialog.resuelta)
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return
+    bloque, _, _, entries = _nueva_tabla(
+        scrollable_frame, botones_frame, canvas, plantilla, font_size, padding
+    )
+    _rellenar_desde_plantilla(
+        entries, plantilla, disabledbackground="#f0f0f0", disabledforeground="black"
+    )
 
     bloque.update_idletasks()
     canvas.update_idletasks()
@@ -587,21 +311,7 @@ def dibujar_tabla_division(scrollable_frame, botones_frame, canvas, font_size=16
 # ====
 
 
-def contar_filas(numero: int) -> int:
-    if numero < 1:
-        return 1
-    n = numero
-    count = 0
-    d = 2
-    while n > 1:
-        if n % d == 0:
-            n //= d
-            count += 1
-        else:
-            d += 1
-    return count + 1
-
-
+@medir
 def dibujar_tabla_factorial(scrollable_frame, botones_frame, canvas, font_size=16, padding=4):
     numero = simpledialog.askinteger(
         "Recomposición factorial", "Introduce un número:", parent=scrollable_frame
@@ -609,25 +319,15 @@ def dibujar_tabla_factorial(scrollable_frame, botones_frame, canvas, font_size=1
     if numero is None:
         return
 
-    bloque = tk.Frame(scrollable_frame, bd=3, relief="groove", bg="white")
-    bloque.pack(side="top", fill="x", pady=5)
-
-    content = _add_header_with_trash(bloque, botones_frame, canvas)
-
-    filas = contar_filas(numero)
-    entries = {}
-    for i in range(filas):
-        content.grid_rowconfigure(i, weight=1)
-        for j in range(2):
-            content.grid_columnconfigure(j, weight=1)
-            e = tk.Entry(
-                content, font=("Arial", font_size), justify="center", bd=2, relief="groove"
-            )
-            e.grid(row=i, column=j, sticky="nsew", padx=padding, pady=padding)
-            entries[(i, j)] = e
-    if (0, 0) in entries:
-        entries[(0, 0)].insert(0, str(numero))
-        entries[(0, 0)].config(state="disabled")
+    try:
+        plantilla = plantilla_factorial(numero)
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return
+    bloque, _, _, entries = _nueva_tabla(
+        scrollable_frame, botones_frame, canvas, plantilla, font_size, padding
+    )
+    _rellenar_desde_plantilla(entries, plantilla)
 
     bloque.update_idletasks()
     canvas.update_idletasks()
@@ -663,6 +363,7 @@ class RaizDialog(simpledialog.Dialog):
             self.radicando = None
 
 
+@medir
 def dibujar_tabla_raiz(scrollable_frame, botones_frame, canvas, font_size=16, padding=4):
     root_aux = tk.Tk()
     root_aux.withdraw()
@@ -674,43 +375,22 @@ def dibujar_tabla_raiz(scrollable_frame, botones_frame, canvas, font_size=16, pa
     indice = dialog.indice
     radicando = dialog.radicando
 
-    bloque = tk.Frame(scrollable_frame, bd=3, relief="groove", bg="white")
-    bloque.pack(side="top", fill="x", pady=5)
-
-    content = _add_header_with_trash(bloque, botones_frame, canvas)
-
-    filas = contar_filas(radicando)
-    entries = {}
-    for i in range(filas):
-        content.grid_rowconfigure(i, weight=1)
-        for j in range(3):
-            content.grid_columnconfigure(j, weight=1)
-            if (i, j) == (0, 0):
-                frame_super = tk.Frame(content, bg="#e0e0e0")
-                frame_super.grid(row=i, column=j, sticky="nsew", padx=padding, pady=padding)
-                label_super = tk.Label(
-                    frame_super, text=str(indice), font=("Arial", font_size), bg="#e0e0e0"
-                )
-                label_super.place(relx=0.9, rely=0.2, anchor="ne")
-                entries[(i, j)] = frame_super
-            else:
-                e = tk.Entry(
-                    content, font=("Arial", font_size), justify="center", bd=2, relief="groove"
-                )
-                e.grid(row=i, column=j, sticky="nsew", padx=padding, pady=padding)
-                entries[(i, j)] = e
-
-    for i in range(1, filas):
-        if isinstance(entries[(i, 0)], tk.Entry) and (i, 0) in entries:
-            entries[(i, 0)].config(
-                state="disabled", disabledbackground="#e0e0e0", disabledforeground="black"
-            )
+    try:
+        plantilla = plantilla_raiz(indice, radicando)
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return
+    bloque, _, _, entries = _nueva_tabla(
+        scrollable_frame, botones_frame, canvas, plantilla, font_size, padding
+    )
+    _rellenar_desde_plantilla(
+        entries, plantilla, disabledbackground="#f0f0f0", disabledforeground="black"
+    )
 
-    if (0, 1) in entries:
-        entries[(0, 1)].insert(0, str(radicando))
-        entries[(0, 1)].config(
-            state="disabled", disabledbackground="#f0f0f0", disabledforeground="black"
-        )
+    # Columna 0 en gris; el índice va arriba a la derecha de la celda (0, 0)
+    for i in range(plantilla.filas):
+        entries[(i, 0)].config(disabledbackground="#e0e0e0")
+    entries[(0, 0)].config(anchor="ne")
 
     bloque.update_idletasks()
     canvas.update_idletasks()
@@ -723,6 +403,7 @@ def dibujar_tabla_raiz(scrollable_frame, botones_frame, canvas, font_size=16, pa
 # ====
 
 
+@medir
 def dibujar_tabla_binaria(scrollable_frame, botones_frame, canvas, font_size=16, padding=4):
     numero_str = simpledialog.askstring(
         "Código binario", "Introduce un número:", parent=scrollable_frame
@@ -730,51 +411,100 @@ def dibujar_tabla_binaria(scrollable_frame, botones_frame, canvas, font_size=16,
     if not numero_str:
         return
     try:
-        numero = int(numero_str)
+        plantilla = plantilla_binaria(numero_str)
     except ValueError:
         messagebox.showerror("Error", "Debes introducir un número válido.")
         return
 
-    def calcular_filas(valor: int) -> int:
-        filas_loc = 1
-        while valor > 1:
-            valor //= 2
-            filas_loc += 1
-        return filas_loc
-
-    filas = calcular_filas(numero)
-    columnas = filas
-
-    bloque = tk.Frame(scrollable_frame, bd=3, relief="groove", bg="white")
-    bloque.pack(side="top", fill="x", pady=5)
-
-    content = _add_header_with_trash(bloque, botones_frame, canvas)
-
-    entries = {}
-    fixed = {}
-    if filas > 0 and columnas > 0:
-        fixed[(0, 0)] = numero_str
-        if columnas > 1:
-            fixed[(0, 1)] = "2"
-        for i in range(1, filas):
-            col = i + 1
-            if col < columnas:
-                fixed[(i, col)] = "2"
-
-    for i in range(filas):
-        content.grid_rowconfigure(i, weight=1)
-        for j in range(columnas):
-            content.grid_columnconfigure(j, weight=1)
-            e = tk.Entry(
-                content, font=("Arial", font_size), justify="center", bd=2, relief="groove"
-            )
-            e.grid(row=i, column=j, sticky="nsew", padx=padding, pady=padding)
-            entries[(i, j)] = e
-            if (i, j) in fixed:
-                e.insert(0, fixed[(i, j)])
-                e.config(state="disabled")
+    bloque, _, _, entries = _nueva_tabla(
+        scrollable_frame, botones_frame, canvas, plantilla, font_size, padding
+    )
+    _rellenar_desde_plantilla(entries, plantilla)
 
     bloque.update_idletasks()
     canvas.update_idletasks()
     canvas.yview_moveto(1.0)
-    mover_botones_abajo(botones_frame, canvas)
\ No newline at end of file
+    mover_botones_abajo(botones_frame, canvas)
+
+
+# ====
+# Ficha al azar
+# ====
+
+
+class GeneradorDialog(simpledialog.Dialog):
+    def __init__(self, parent, operacion, title=None):
+        self.operacion = operacion
+        super().__init__(parent, title=title)
+
+    def body(self, master):
+        etiquetas = ["Número de problemas:", "Cifras (vacío: por defecto):",
+                     "Dificultad (1, 2 o 3):", "Semilla (vacío: al azar):"]
+        for i, texto in enumerate(etiquetas):
+            tk.Label(master, text=texto, font=("Arial", 14)).grid(row=i, column=0, sticky="w", pady=5)
+        self.entry_cantidad = tk.Entry(master, font=("Arial", 14))
+        self.entry_cifras = tk.Entry(master, font=("Arial", 14))
+        self.entry_dificultad = tk.Entry(master, font=("Arial", 14))
+        self.entry_semilla = tk.Entry(master, font=("Arial", 14))
+        self.entry_cantidad.insert(0, "10")
+        self.entry_dificultad.insert(0, "1")
+        for i, entry in enumerate((self.entry_cantidad, self.entry_cifras,
+                                   self.entry_dificultad, self.entry_semilla)):
+            entry.grid(row=i, column=1, padx=10, pady=5)
+        return self.entry_cantidad
+
+    def validate(self):
+        try:
+            self.cantidad = int(self.entry_cantidad.get())
+            cifras = self.entry_cifras.get().split()
+            self.cifras = tuple(int(c) for c in cifras) if len(cifras) > 1 else (int(cifras[0]) if cifras else None)
+            dificultad = self.entry_dificultad.get().strip()
+            self.dificultad = int(dificultad) if dificultad else None
+        except ValueError:
+            messagebox.showerror("Error", "Cantidad, cifras y dificultad deben ser números enteros.")
+            return False
+        if self.cantidad <= 0 or (self.dificultad is not None and self.dificultad not in DIFICULTADES[self.operacion]):
+            messagebox.showerror("Error", "La cantidad debe ser positiva y la dificultad 1, 2 o 3.")
+            return False
+        self.semilla = self.entry_semilla.get().strip() or None
+        return True
+
+    def apply(self):
+        self.aceptado = True
+
+
+@medir
+def generar_ficha(operacion, scrollable_frame, botones_frame, canvas, font_size=16, padding=4):
+    """
+    Pide cuántos problemas de `operacion` generar (y sus cifras, dificultad y
+    semilla) y los añade al documento de una vez con `LoteBloques`.
+    """
+    root_aux = tk.Tk()
+    root_aux.withdraw()
+    dialog = GeneradorDialog(root_aux, operacion, title="Ficha al azar")
+    root_aux.destroy()
+    if not getattr(dialog, "aceptado", False):
+        return
+
+    restricciones = {} if dialog.cifras is None else {"cifras": dialog.cifras}
+    try:
+        problemas = Generador(operacion, dialog.dificultad, dialog.semilla, **restricciones).generar(dialog.cantidad)
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return
+
+    with LoteBloques(scrollable_frame, botones_frame, canvas) as lote:
+        for operandos in problemas:
+            if operacion in ("division", "raiz"):
+                tabla = lote.tabla(plantilla_problema(operacion, operandos), font_size, padding,
+                                   disabledbackground="#f0f0f0", disabledforeground="black")
+            elif operacion in ("suma", "resta"):
+                # Mismo borde que dibujar_tabla_suma y dibujar_tabla_resta
+                tabla = lote.tabla(plantilla_problema(operacion, operandos), font_size, padding, bd=2)
+            else:
+                tabla = lote.tabla(plantilla_problema(operacion, operandos), font_size, padding)
+            if operacion == "raiz":
+                # Como en dibujar_tabla_raiz: columna 0 en gris y el índice arriba a la derecha
+                for i in range(tabla.filas):
+                    tabla.estilos.setdefault((i, 0), {})["disabledbackground"] = "#e0e0e0"
+                tabla.estilos.setdefault((0, 0), {})["anchor"] = "ne"
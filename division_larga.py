@@ -0,0 +1,154 @@
+"""
+División larga paso a paso, para dividendos de cualquier número de cifras.
+
+`dividir` recorre las cifras del dividendo una sola vez, de izquierda a
+derecha, como se hace a mano: baja una cifra, mira cuántas veces cabe el
+divisor, resta y sigue con el resto. El dividendo se trata como cadena de
+cifras y nunca se convierte entero a int, así que el coste es lineal en su
+número de cifras (cada paso opera con números del tamaño del divisor) y no
+choca con el límite de conversión int <-> str de Python (4300 cifras).
+
+`escalera` coloca los pasos en una rejilla de una cifra por celda:
+
+    columna 0       signos "-" de las restas
+    columnas 1..n   cifras del dividendo (fila 0) y, debajo, en escalera, cada
+                    producto parcial (subrayado) y su resto con las cifras
+                    que se bajan a su derecha
+    columna n + 1   divisor (fila 0) y cociente (fila 1), en una celda cada uno
+
+Los pasos cuya cifra del cociente es 0 no se escriben: su cifra se baja junto
+al resto anterior, en la misma fila.
+"""
+
+from typing import Dict, List, Tuple, Union
+
+Celdas = Dict[Tuple[int, int], str]
+
+
+class Paso:
+    """
+    Un paso de la división: el dividendo parcial que termina en la cifra
+    `columna` del dividendo, la cifra del cociente, el producto que se resta
+    y el resto.
+    """
+
+    __slots__ = ("columna", "parcial", "cifra", "producto", "resto")
+
+    def __init__(self, columna: int, parcial: int, cifra: int, producto: int, resto: int) -> None:
+        self.columna = columna
+        self.parcial = parcial
+        self.cifra = cifra
+        self.producto = producto
+        self.resto = resto
+
+    def __repr__(self) -> str:
+        return f"Paso({self.columna}, {self.parcial}, {self.cifra}, {self.producto}, {self.resto})"
+
+
+class DivisionLarga:
+    """Dividendo (cadena de cifras sin ceros a la izquierda), divisor, cociente, resto y pasos."""
+
+    __slots__ = ("dividendo", "divisor", "cociente", "resto", "pasos")
+
+    def __init__(self, dividendo: str, divisor: int, cociente: str, resto: int, pasos: List[Paso]) -> None:
+        self.dividendo = dividendo
+        self.divisor = divisor
+        self.cociente = cociente
+        self.resto = resto
+        self.pasos = pasos
+
+
+def dividir(dividendo: Union[str, int], divisor: Union[str, int]) -> DivisionLarga:
+    """
+    Divide `dividendo` entre `divisor` paso a paso. Lanza ValueError si el
+    dividendo no es un entero no negativo o el divisor no es positivo.
+    """
+    cifras = str(dividendo).strip()
+    if not (cifras.isascii() and cifras.isdigit()):
+        raise ValueError(f"El dividendo debe ser un entero no negativo: {cifras[:20]!r}")
+    cifras = cifras.lstrip("0") or "0"
+    try:
+        divisor = int(divisor)
+    except ValueError:
+        raise ValueError(f"El divisor debe ser un entero positivo: {str(divisor)[:20]!r}") from None
+    if divisor <= 0:
+        raise ValueError("El divisor debe ser positivo")
+
+    cociente = []
+    pasos = []
+    parcial = 0
+    for columna, cifra in enumerate(cifras.encode("ascii")):
+        parcial = parcial * 10 + cifra - 48
+        # Las cifras del principio se juntan hasta que el parcial llega al divisor
+        if pasos or parcial >= divisor:
+            # parcial < 10 * divisor: el cociente parcial es una sola cifra
+            q = parcial // divisor
+            producto = q * divisor
+            pasos.append(Paso(columna, parcial, q, producto, parcial - producto))
+            cociente.append(q)
+            parcial -= producto
+    return DivisionLarga(cifras, divisor, "".join(map(str, cociente)) or "0", parcial, pasos)
+
+
+class Escalera:
+    """
+    Disposición de una división larga en la rejilla (ver el docstring del
+    módulo). `fijas` son las celdas del enunciado (dividendo, divisor y
+    signos), `respuestas` las que rellena el alumno y `subrayados` las filas
+    de los productos como (fila, primera columna, última columna).
+    """
+
+    __slots__ = ("filas", "columnas", "fijas", "respuestas", "subrayados")
+
+    def __init__(self, division: DivisionLarga) -> None:
+        n = len(division.dividendo)
+        derecha = n + 1
+        fijas: Celdas = {(0, col + 1): cifra for col, cifra in enumerate(division.dividendo)}
+        fijas[(0, derecha)] = str(division.divisor)
+        respuestas: Celdas = {(1, derecha): division.cociente}
+        subrayados: List[Tuple[int, int, int]] = []
+
+        # Fila del resto en curso y cifras escritas en ella hasta la columna actual
+        fila, ancho = 0, 0
+        for paso in division.pasos:
+            fin = paso.columna + 1
+            if not subrayados:
+                # El primer parcial son las primeras cifras del propio dividendo
+                ancho = fin
+            else:
+                respuestas[(fila, fin)] = division.dividendo[paso.columna]
+                ancho += 1
+            if paso.cifra == 0:
+                continue
+            producto = str(paso.producto)
+            fila += 1
+            _escribir(respuestas, fila, fin, producto)
+            signo = fin - len(producto)
+            fijas[(fila, signo)] = "-"
+            subrayados.append((fila, min(signo, fin - ancho + 1), fin))
+            resto = str(paso.resto)
+            fila += 1
+            _escribir(respuestas, fila, fin, resto)
+            ancho = len(resto)
+        if not division.pasos:
+            # Dividendo menor que el divisor: el resto es el propio dividendo
+            fila = 1
+            _escribir(respuestas, fila, n, division.dividendo)
+
+        self.filas = fila + 1
+        self.columnas = n + 2
+        self.fijas = fijas
+        self.respuestas = respuestas
+        self.subrayados = subrayados
+
+
+def _escribir(celdas: Celdas, fila: int, ultima_col: int, texto: str) -> None:
+    """Escribe `texto` cifra a cifra en `fila`, terminando en `ultima_col`."""
+    inicio = ultima_col - len(texto) + 1
+    for j, cifra in enumerate(texto):
+        celdas[(fila, inicio + j)] = cifra
+
+
+def escalera(dividendo: Union[str, int], divisor: Union[str, int]) -> Escalera:
+    """Divide y coloca la división en la rejilla."""
+    return Escalera(dividir(dividendo, divisor))
@@ -0,0 +1,303 @@
+"""
+Modelo en memoria del documento de QuicKual.
+
+Cada bloque que se crea en la interfaz (texto o tabla) tiene aquí un registro
+equivalente que los constructores mantienen al día mientras el usuario crea,
+edita y borra bloques. La exportación lee este modelo directamente, sin tocar
+ningún widget de Tkinter.
+"""
+
+import weakref
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+
+class BloqueTexto:
+    """Bloque de texto libre."""
+
+    __slots__ = ("id", "texto")
+    tipo = "text"
+
+    def __init__(self, bloque_id: int, texto: str = "") -> None:
+        self.id = bloque_id
+        self.texto = texto
+
+
+class Operacion:
+    """
+    Descriptor de la operación de una tabla, fijado al crearla: tipo
+    ("suma", "resta", "multiplicacion", "division", "factorial", "raiz" o
+    "binario"), operandos tal como se introdujeron y forma (filas, columnas)
+    con la que se creó.
+    """
+
+    __slots__ = ("tipo", "operandos", "forma")
+
+    def __init__(self, tipo: str, operandos: Tuple[str, ...], forma: Tuple[int, int]) -> None:
+        self.tipo = tipo
+        self.operandos = tuple(operandos)
+        self.forma = forma
+
+    def __repr__(self) -> str:
+        return f"Operacion({self.tipo!r}, {self.operandos!r}, {self.forma!r})"
+
+
+class BloqueTabla:
+    """
+    Bloque de tabla. Las celdas se guardan en un único array plano de
+    `filas * columnas` cadenas (fila mayor), de modo que leer la tabla entera
+    es lineal en el número de celdas.
+
+    `estilos` guarda, solo para las celdas que lo necesitan, las opciones de
+    presentación (estado bloqueado, colores, anclaje) y `presentacion` el
+    tamaño de letra, el relleno y el borde del bloque, de modo que la rejilla
+    se puede reconstruir desde el modelo en cualquier momento.
+
+    `operacion` es el descriptor de la operación (None en tablas antiguas o
+    creadas a mano); la exportación lo usa en lugar de adivinarla.
+
+    `marcas` son las marcas de la corrección en vivo (ver `correccion`):
+    (fila, col) -> True si el valor es correcto, False si no. No se guardan.
+    """
+
+    __slots__ = ("id", "filas", "columnas", "celdas", "estilos", "presentacion", "operacion", "marcas")
+    tipo = "table"
+
+    def __init__(self, bloque_id: int, filas: int, columnas: int) -> None:
+        self.id = bloque_id
+        self.filas = filas
+        self.columnas = columnas
+        self.celdas: List[str] = [""] * (filas * columnas)
+        self.estilos: Dict[Tuple[int, int], Dict[str, str]] = {}
+        self.presentacion: Tuple[int, int, int] = (16, 4, 3)
+        self.operacion: Optional[Operacion] = None
+        self.marcas: Dict[Tuple[int, int], bool] = {}
+
+    def get(self, fila: int, col: int) -> str:
+        return self.celdas[fila * self.columnas + col]
+
+    def set(self, fila: int, col: int, valor: str) -> None:
+        self.celdas[fila * self.columnas + col] = valor
+
+    def matriz(self) -> List[List[str]]:
+        """Devuelve las celdas como lista de filas."""
+        cols = self.columnas
+        celdas = self.celdas
+        return [celdas[i:i + cols] for i in range(0, len(celdas), cols)]
+
+
+Bloque = Union[BloqueTexto, BloqueTabla]
+
+
+class BloquePendiente:
+    """
+    Bloque de un archivo que todavía no se ha leído. Guarda lo que dice el
+    índice del archivo (tipo y forma) para poder estimar su tamaño en pantalla;
+    `cargar()` devuelve el bloque completo y `origen` es el archivo abierto del
+    que procede.
+    """
+
+    __slots__ = ("id", "tipo", "filas", "columnas", "presentacion", "cargar", "origen")
+
+    def __init__(self, bloque_id: int, tipo: str, filas: int, columnas: int,
+                 presentacion: Tuple[int, int, int], cargar: Callable[[], Bloque], origen=None) -> None:
+        self.id = bloque_id
+        self.tipo = tipo
+        self.filas = filas
+        self.columnas = columnas
+        self.presentacion = presentacion
+        self.cargar = cargar
+        self.origen = origen
+
+
+class Documento:
+    """
+    Lista ordenada de bloques con acceso por id. El orden es una lista
+    doblemente enlazada por id, de modo que insertar, eliminar o mover un
+    bloque en cualquier posición no depende del tamaño del documento.
+
+    Si tiene `historial` (ver `historial.Historial`), cada inserción,
+    eliminación o movimiento se anota en él para poder deshacerlo. Si tiene
+    `indice` (ver `indice.IndiceBloques`), se le marcan los bloques que se
+    insertan o eliminan.
+    """
+
+    def __init__(self) -> None:
+        self._bloques: Dict[int, Bloque] = {}
+        # Orden: id -> id del bloque siguiente / anterior (None en los extremos)
+        self._siguientes: Dict[int, Optional[int]] = {}
+        self._anteriores: Dict[int, Optional[int]] = {}
+        self._primero: Optional[int] = None
+        self._ultimo: Optional[int] = None
+        self._orden: List[int] = []
+        self._version_orden = 0
+        self._siguiente_id = 1
+        # Cambia cada vez que se añade, elimina o mueve un bloque
+        self.version = 0
+        self.historial = None
+        self.indice = None
+
+    @property
+    def proximo_id(self) -> int:
+        """Id que recibirá el siguiente bloque; los ids nunca se reutilizan."""
+        return self._siguiente_id
+
+    def _nuevo_id(self) -> int:
+        bloque_id = self._siguiente_id
+        self._siguiente_id += 1
+        return bloque_id
+
+    def _enlazar(self, bloque_id: int, antes_de: Optional[int]) -> None:
+        anterior = self._ultimo if antes_de is None else self._anteriores[antes_de]
+        self._anteriores[bloque_id] = anterior
+        self._siguientes[bloque_id] = antes_de
+        if anterior is None:
+            self._primero = bloque_id
+        else:
+            self._siguientes[anterior] = bloque_id
+        if antes_de is None:
+            self._ultimo = bloque_id
+        else:
+            self._anteriores[antes_de] = bloque_id
+
+    def _desenlazar(self, bloque_id: int) -> Optional[int]:
+        """Saca el bloque del orden y devuelve el id del que lo seguía."""
+        anterior = self._anteriores.pop(bloque_id)
+        siguiente = self._siguientes.pop(bloque_id)
+        if anterior is None:
+            self._primero = siguiente
+        else:
+            self._siguientes[anterior] = siguiente
+        if siguiente is None:
+            self._ultimo = anterior
+        else:
+            self._anteriores[siguiente] = anterior
+        return siguiente
+
+    def insertar(self, bloque: Union[Bloque, BloquePendiente], antes_de: Optional[int] = None) -> None:
+        """Añade un bloque ya creado delante de `antes_de` (al final si es None)."""
+        self._bloques[bloque.id] = bloque
+        self._enlazar(bloque.id, antes_de)
+        self._siguiente_id = max(self._siguiente_id, bloque.id + 1)
+        self.version += 1
+        if self.indice is not None:
+            self.indice.marcar(bloque.id)
+        if self.historial is not None:
+            self.historial.anotar(("insertar", bloque, antes_de))
+
+    def nuevo_texto(self, texto: str = "") -> BloqueTexto:
+        bloque = BloqueTexto(self._nuevo_id(), texto)
+        self.insertar(bloque)
+        return bloque
+
+    def nueva_tabla(self, filas: int, columnas: int) -> BloqueTabla:
+        bloque = BloqueTabla(self._nuevo_id(), filas, columnas)
+        self.insertar(bloque)
+        return bloque
+
+    def agregar_pendiente(self, pendiente: BloquePendiente) -> None:
+        """Añade al final un bloque que se leerá la primera vez que se pida."""
+        self.insertar(pendiente)
+
+    def pendientes(self) -> int:
+        """Número de bloques que aún no se han leído del archivo."""
+        return sum(1 for b in self._bloques.values() if isinstance(b, BloquePendiente))
+
+    def eliminar(self, bloque_id: int) -> None:
+        bloque = self._bloques.pop(bloque_id, None)
+        if bloque is None:
+            return
+        siguiente = self._desenlazar(bloque_id)
+        self.version += 1
+        if self.indice is not None:
+            self.indice.marcar(bloque_id)
+        if self.historial is not None:
+            self.historial.anotar(("eliminar", bloque, siguiente))
+
+    def mover(self, bloque_id: int, antes_de: Optional[int]) -> None:
+        """Lleva el bloque delante de `antes_de` (al final si es None)."""
+        if bloque_id == antes_de or self._siguientes[bloque_id] == antes_de:
+            return
+        antes_era = self._desenlazar(bloque_id)
+        self._enlazar(bloque_id, antes_de)
+        self.version += 1
+        if self.historial is not None:
+            self.historial.anotar(("mover", bloque_id, antes_era, antes_de))
+
+    def siguiente(self, bloque_id: int) -> Optional[int]:
+        """Id del bloque que va después de `bloque_id` (None si es el último)."""
+        return self._siguientes[bloque_id]
+
+    def anterior(self, bloque_id: int) -> Optional[int]:
+        """Id del bloque que va antes de `bloque_id` (None si es el primero)."""
+        return self._anteriores[bloque_id]
+
+    def ids(self) -> List[int]:
+        """Ids de los bloques en orden de documento."""
+        if self._version_orden != self.version:
+            orden = []
+            bloque_id = self._primero
+            while bloque_id is not None:
+                orden.append(bloque_id)
+                bloque_id = self._siguientes[bloque_id]
+            self._orden = orden
+            self._version_orden = self.version
+        return list(self._orden)
+
+    def get(self, bloque_id: int) -> Optional[Bloque]:
+        bloque = self._bloques.get(bloque_id)
+        if isinstance(bloque, BloquePendiente):
+            bloque = bloque.cargar()
+            self._bloques[bloque_id] = bloque
+        return bloque
+
+    def vistazo(self, bloque_id: int) -> Union[Bloque, BloquePendiente, None]:
+        """Como `get`, pero sin leer del archivo los bloques pendientes."""
+        return self._bloques.get(bloque_id)
+
+    def recorrer(self) -> Iterator[Bloque]:
+        """
+        Recorre los bloques en orden leyendo del archivo los pendientes sin
+        guardarlos en el documento, de modo que la memoria no crece con el
+        número de bloques recorridos (p. ej. al exportar un documento enorme).
+        """
+        for bloque_id in self.ids():
+            bloque = self._bloques.get(bloque_id)
+            if isinstance(bloque, BloquePendiente):
+                bloque = bloque.cargar()
+            if bloque is not None:
+                yield bloque
+
+    def __iter__(self) -> Iterator[Bloque]:
+        for bloque_id in self.ids():
+            bloque = self.get(bloque_id)
+            if bloque is not None:
+                yield bloque
+
+    def __len__(self) -> int:
+        return len(self._bloques)
+
+
+# ====
+# Registro documento <-> frame scrollable
+# ====
+
+_documentos: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def documento_de(scrollable_frame) -> Documento:
+    """Devuelve el documento asociado al frame, creándolo si aún no existe."""
+    documento = _documentos.get(scrollable_frame)
+    if documento is None:
+        documento = Documento()
+        _documentos[scrollable_frame] = documento
+    return documento
+
+
+def documento_registrado(scrollable_frame) -> Optional[Documento]:
+    """Devuelve el documento asociado al frame o None si nunca se creó."""
+    return _documentos.get(scrollable_frame)
+
+
+def registrar_documento(scrollable_frame, documento: Documento) -> None:
+    """Asocia `documento` al frame en lugar del que tuviera (p. ej. al abrir un archivo)."""
+    _documentos[scrollable_frame] = documento
@@ -1,15 +1,26 @@
 """
 Módulo para exportar el contenido de QuicKual a PDF usando ReportLab.
-Extrae bloques de texto y tablas del frame de Tkinter y los renderiza con estilos específicos.
+Lee los bloques de texto y tablas del modelo del documento (o, para contenido
+antiguo, del frame de Tkinter) y los renderiza con estilos específicos.
 """
 
+import copy
+import hashlib
+import threading
 import tkinter as tk
+from collections import OrderedDict, deque
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import mm
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from division_larga import escalera
+from documento import Documento, documento_registrado
+from perfilado import medir, tramo
 
 
 def _safe_get_text(widget: tk.Widget) -> str:
@@ -30,6 +41,146 @@ def _safe_get_text(widget: tk.Widget) -> str:
         return ""
 
 
+@medir
+def _classify_table(matrix: List[List[str]]) -> Dict[str, bool]:
+    """
+    Adivina la operación de una tabla a partir de su contenido.
+
+    Args:
+        matrix: Celdas de la tabla como lista de filas.
+
+    Returns:
+        Diccionario con los flags de operación usados por export_to_pdf.
+    """
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+
+    # Heurísticas de detección (reiniciar flags)
+    is_division = False
+    is_suma = False
+    is_resta = False
+    is_factorial = False
+    is_raiz = False
+    is_binario = False
+    is_multiplicacion = False
+
+    # Utilidades
+    def is_int_str(s: str) -> bool:
+        s = s.strip()
+        if not s:
+            return False
+        if s.startswith('-'):
+            s = s[1:]
+        return s.isdigit()
+
+    def digits_only(s: str) -> str:
+        return ''.join(ch for ch in s if ch.isdigit())
+
+    # Conteos útiles
+    flat = [str(matrix[r][c]).strip() for r in range(rows) for c in range(cols)]
+    count_twos = sum(1 for v in flat if v == '2')
+    has_sqrt_symbol = any('√' in v for v in flat)
+
+    # División: 2 columnas y primera fila con números
+    if cols == 2 and rows >= 1:
+        c0_text = matrix[0][0].strip()
+        c1_text = matrix[0][1].strip()
+        if is_int_str(c0_text) and is_int_str(c1_text):
+            is_division = True
+    # División larga en escalera: primera celda vacía, una cifra del
+    # dividendo por celda y el divisor en la última columna
+    elif cols >= 3 and rows >= 2:
+        row0 = [str(v).strip() for v in matrix[0]]
+        if not row0[0] and is_int_str(row0[-1]) and all(len(v) == 1 and v.isdigit() for v in row0[1:-1]):
+            is_division = True
+
+    # Suma/Resta: símbolo en primera col (± en primeras filas); los "-" de
+    # la división en escalera son sus restas
+    for r in range(0 if is_division else min(rows, 4)):
+        sym = matrix[r][0].strip() if cols > 0 else ""
+        if sym == "+":
+            is_suma = True
+        if sym == "-":
+            is_resta = True
+
+    # Multiplicación: 'X' o 'x' en primera columna
+    for r in range(rows):
+        if cols > 0 and ('X' in str(matrix[r][0]) or 'x' in str(matrix[r][0])):
+            is_multiplicacion = True
+            break
+
+    # Factorial: cualquier '!'
+    is_factorial = any('!' in v for v in flat)
+
+    # BINARIO - detección fuerte
+    first_row_is_int = cols > 0 and rows > 0 and is_int_str(matrix[0][0])
+    rows_with_two = {r for r in range(rows) if any((str(matrix[r][c]).strip() == '2') for c in range(cols))}
+    first_row_col1_is_two_or_empty = (cols > 1 and (matrix[0][1].strip() in ('', '2'))) or (cols == 1)
+    binario_strong = (first_row_is_int and count_twos >= 2 and len(rows_with_two) >= 2 and first_row_col1_is_two_or_empty)
+
+    # RAÍZ - detección estricta si no hay símbolo √
+    raiz_strict = False
+    if not has_sqrt_symbol:
+        if cols >= 3 and rows >= 1:
+            c00_digits = digits_only(matrix[0][0])
+            c01_digits = digits_only(matrix[0][1]) if cols > 1 else ''
+            looks_like_index = 1 <= len(c00_digits) <= 2
+            looks_like_radicand = len(c01_digits) >= 1
+            # verificar "barra vertical" en col 2: contenido no vacío en ≥2 filas contiguas
+            streak = 0
+            max_streak = 0
+            for rr in range(rows):
+                if matrix[rr][2].strip() != '':
+                    streak += 1
+                    max_streak = max(max_streak, streak)
+                else:
+                    streak = 0
+            has_vertical_bar = max_streak >= 2
+            raiz_strict = looks_like_index and looks_like_radicand and has_vertical_bar
+
+    # Prioridad y decisión final
+    if has_sqrt_symbol and not binario_strong:
+        is_raiz = True
+    elif binario_strong:
+        is_binario = True
+    elif raiz_strict:
+        is_raiz = True
+
+    return {
+        'division': is_division,
+        'suma': is_suma,
+        'resta': is_resta,
+        'factorial': is_factorial,
+        'raiz': is_raiz,
+        'binario': is_binario,
+        'multiplicacion': is_multiplicacion
+    }
+
+
+# Flags de cada tipo de operación (documento.Operacion) sin mirar las celdas
+OPERATION_FLAGS: Dict[str, Dict[str, bool]] = {
+    tipo: {flag: flag == tipo for flag in
+           ('division', 'suma', 'resta', 'factorial', 'raiz', 'binario', 'multiplicacion')}
+    for tipo in ('division', 'suma', 'resta', 'factorial', 'raiz', 'binario', 'multiplicacion')
+}
+
+
+@medir("export_pdf.clasificar")
+def _table_flags(tabla) -> Dict[str, bool]:
+    """
+    Flags de operación de una tabla del modelo. Si la tabla lleva descriptor
+    de operación (y conserva la forma con la que se creó) se usan sus flags
+    directamente; si no, se recurre a la heurística sobre las celdas.
+    """
+    operacion = tabla.operacion
+    if operacion is not None and operacion.forma == (tabla.filas, tabla.columnas):
+        flags = OPERATION_FLAGS.get(operacion.tipo)
+        if flags is not None:
+            return flags
+    return _classify_table(tabla.matriz())
+
+
+@medir
 def extract_document_structure(scrollable_frame: tk.Frame) -> List[Dict[str, Any]]:
     """
     Extrae la estructura del documento desde el frame scrollable de Tkinter.
@@ -112,123 +263,432 @@ def extract_document_structure(scrollable_frame: tk.Frame) -> List[Dict[str, Any
         cols = max_col + 1
         matrix = [['' for _ in range(cols)] for _ in range(rows)]
 
-        # Heurísticas de detección (reiniciar flags)
-        is_division = False
-        is_suma = False
-        is_resta = False
-        is_factorial = False
-        is_raiz = False
-        is_binario = False
-        is_multiplicacion = False
-
         # Rellenar matriz
         for r, c, w in cell_widgets:
             txt = _safe_get_text(w)
             matrix[r][c] = txt
 
-        # Utilidades
-        def is_int_str(s: str) -> bool:
-            s = s.strip()
-            if not s:
-                return False
-            if s.startswith('-'):
-                s = s[1:]
-            return s.isdigit()
-
-        def digits_only(s: str) -> str:
-            return ''.join(ch for ch in s if ch.isdigit())
-
-        # Conteos útiles
-        flat = [str(matrix[r][c]).strip() for r in range(rows) for c in range(cols)]
-        count_twos = sum(1 for v in flat if v == '2')
-        has_sqrt_symbol = any('√' in v for v in flat)
-
-        # División: 2 columnas y primera fila con números
-        if cols == 2 and rows >= 1:
-            c0_text = matrix[0][0].strip()
-            c1_text = matrix[0][1].strip()
-            if is_int_str(c0_text) and is_int_str(c1_text):
-                is_division = True
-
-        # Suma/Resta: símbolo en primera col (± en primeras filas)
-        for r in range(min(rows, 4)):
-            sym = matrix[r][0].strip() if cols > 0 else ""
-            if sym == "+":
-                is_suma = True
-            if sym == "-":
-                is_resta = True
-
-        # Multiplicación: 'X' o 'x' en primera columna
-        for r in range(rows):
-            if cols > 0 and ('X' in str(matrix[r][0]) or 'x' in str(matrix[r][0])):
-                is_multiplicacion = True
-                break
-
-        # Factorial: cualquier '!'
-        is_factorial = any('!' in v for v in flat)
-
-        # BINARIO - detección fuerte
-        first_row_is_int = cols > 0 and rows > 0 and is_int_str(matrix[0][0])
-        rows_with_two = {r for r in range(rows) if any((str(matrix[r][c]).strip() == '2') for c in range(cols))}
-        first_row_col1_is_two_or_empty = (cols > 1 and (matrix[0][1].strip() in ('', '2'))) or (cols == 1)
-        binario_strong = (first_row_is_int and count_twos >= 2 and len(rows_with_two) >= 2 and first_row_col1_is_two_or_empty)
-
-        # RAÍZ - detección estricta si no hay símbolo √
-        raiz_strict = False
-        if not has_sqrt_symbol:
-            if cols >= 3 and rows >= 1:
-                c00_digits = digits_only(matrix[0][0])
-                c01_digits = digits_only(matrix[0][1]) if cols > 1 else ''
-                looks_like_index = 1 <= len(c00_digits) <= 2
-                looks_like_radicand = len(c01_digits) >= 1
-                # verificar "barra vertical" en col 2: contenido no vacío en ≥2 filas contiguas
-                streak = 0
-                max_streak = 0
-                for rr in range(rows):
-                    if matrix[rr][2].strip() != '':
-                        streak += 1
-                        max_streak = max(max_streak, streak)
-                    else:
-                        streak = 0
-                has_vertical_bar = max_streak >= 2
-                raiz_strict = looks_like_index and looks_like_radicand and has_vertical_bar
-
-        # Prioridad y decisión final
-        if has_sqrt_symbol and not binario_strong:
-            is_raiz = True
-        elif binario_strong:
-            is_binario = True
-        elif raiz_strict:
-            is_raiz = True
-
-        blocks.append({
-            'type': 'table',
-            'content': matrix,
-            'division': is_division,
-            'suma': is_suma,
-            'resta': is_resta,
-            'factorial': is_factorial,
-            'raiz': is_raiz,
-            'binario': is_binario,
-            'multiplicacion': is_multiplicacion
-        })
+        block = {'type': 'table', 'content': matrix}
+        block.update(_classify_table(matrix))
+        blocks.append(block)
 
     return blocks
 
 
-def export_to_pdf(scrollable_frame: tk.Frame, output_path: str = "document.pdf",
-                  title: str = None, page_size=letter) -> None:
+def document_to_blocks(documento: Documento) -> List[Dict[str, Any]]:
     """
-    Exporta el contenido del frame scrollable a un archivo PDF.
+    Convierte el modelo en memoria al formato de bloques de la exportación.
+    El coste es lineal en el número de celdas y no accede a ningún widget.
+
+    Args:
+        documento: Modelo del documento mantenido por los constructores de bloques.
+
+    Returns:
+        Lista de diccionarios representando cada bloque (texto o tabla).
+    """
+    return list(iter_document_blocks(documento, retener=True))
+
+
+def iter_document_blocks(documento: Documento, retener: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Genera los bloques de la exportación de uno en uno, para la exportación
+    en flujo. Salvo con `retener`, los bloques pendientes de un archivo .qkl
+    se leen sin quedarse en el documento (ver Documento.recorrer).
+    """
+    for bloque in (documento if retener else documento.recorrer()):
+        if bloque.tipo == 'text':
+            yield {'type': 'text', 'content': bloque.texto}
+            continue
+        block = {'type': 'table', 'content': bloque.matriz()}
+        block.update(_table_flags(bloque))
+        yield block
+
+
+@lru_cache(maxsize=1024)
+def _staircase(dividendo: str, divisor: str) -> Tuple[int, Tuple[Tuple[int, int, int], ...]]:
+    """
+    Cifras de la columna del divisor y el cociente y subrayados de las restas
+    de una división larga (ver division_larga.Escalera). Los operandos salen
+    de la fila 0 de la tabla, que va bloqueada.
+    """
+    disposicion = escalera(dividendo, divisor)
+    derecha = max(len(disposicion.fijas[(0, disposicion.columnas - 1)]),
+                  len(disposicion.respuestas[(1, disposicion.columnas - 1)]))
+    return derecha, tuple(disposicion.subrayados)
+
+
+# ====
+# Estilos precompilados
+# ====
+
+# Comandos comunes a todas las tablas de operaciones
+_FONT = [
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+]
+_PADDING = [
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ('TOPPADDING', (0, 0), (-1, -1), 5),
+]
+# Raíz y binario: sin ningún borde y con paddings compactos
+_NO_LINES = [
+    ('BOX', (0, 0), (-1, -1), 0, colors.white),
+    ('GRID', (0, 0), (-1, -1), 0, colors.white),
+    ('LINEABOVE', (0, 0), (-1, -1), 0, colors.white),
+    ('LINEBELOW', (0, 0), (-1, -1), 0, colors.white),
+    ('LINEBEFORE', (0, 0), (-1, -1), 0, colors.white),
+    ('LINEAFTER', (0, 0), (-1, -1), 0, colors.white),
+]
+_COMPACT = [
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+]
+
+# Comandos de cada tipo de tabla que no dependen de su forma
+_TABLE_COMMANDS: Dict[str, List[tuple]] = {
+    'division': [
+        ('BOX', (0, 0), (-1, -1), 0, colors.white),
+        ('LINEAFTER', (0, 0), (0, 0), 1.2, colors.black),
+        ('LINEBELOW', (1, 0), (1, 0), 1.2, colors.black),
+        ('LEFTPADDING', (0, 0), (-1, -1), 6),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 5),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ] + _FONT,
+    # División larga: una cifra por celda y divisor y cociente en la última columna
+    'escalera': _NO_LINES + _FONT + _COMPACT + [
+        ('LINEBEFORE', (-1, 0), (-1, 1), 1.2, colors.black),
+        ('LINEBELOW', (-1, 0), (-1, 0), 1.2, colors.black),
+        ('ALIGN', (-1, 0), (-1, -1), 'LEFT'),
+        ('LEFTPADDING', (-1, 0), (-1, -1), 6),
+    ],
+    'suma_resta': [
+        ('BOX', (0, 0), (-1, -1), 0, colors.white),
+        ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+    ] + _FONT + _PADDING,
+    'multiplicacion': [
+        ('BOX', (0, 0), (-1, -1), 0, colors.white),
+        ('LINEBELOW', (0, 2), (-1, 2), 1, colors.black),
+        ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+    ] + _FONT + _PADDING,
+    'factorial': [
+        ('BOX', (0, 0), (-1, -1), 0, colors.white),
+        ('LINEABOVE', (0, 0), (-1, 0), 1, colors.black),
+        ('LINEBELOW', (0, -1), (-1, -1), 1, colors.black),
+    ] + _FONT + _PADDING,
+    'raiz': _NO_LINES + _FONT + _COMPACT + [
+        ('LINEAFTER', (0, 0), (0, 0), 1.2, colors.black),
+        ('LINEABOVE', (1, 0), (1, 0), 1.2, colors.black),
+        ('LINEBEFORE', (2, 0), (2, -1), 1.2, colors.black),
+    ],
+    'binario': _NO_LINES + _FONT + _COMPACT,
+    'normal': [
+        ('GRID', (0, 0), (-1, -1), 0.6, colors.black),
+    ] + _FONT + _PADDING + [
+        ('WORDWRAP', (0, 0), (-1, -1), 'CJK'),
+    ],
+}
+
+# Tipos cuyo estilo depende de la forma de la tabla
+_SHAPED_KINDS = {'binario'}
+
+
+def _table_kind(block: Dict[str, Any]) -> str:
+    """Tipo de estilo de un bloque de tabla según sus flags de operación."""
+    if block.get('division', False):
+        content = block['content']
+        return 'escalera' if content and len(content[0]) > 2 else 'division'
+    if block.get('suma', False) or block.get('resta', False):
+        return 'suma_resta'
+    if block.get('multiplicacion', False):
+        return 'multiplicacion'
+    if block.get('factorial', False):
+        return 'factorial'
+    if block.get('raiz', False):
+        return 'raiz'
+    if block.get('binario', False):
+        return 'binario'
+    return 'normal'
+
+
+def _binary_lines(num_rows: int, num_cols: int) -> List[tuple]:
+    """
+    Líneas de las divisiones sucesivas entre 2. El constructor
+    (operaciones.plantilla_binaria) pone cada divisor "2" en la celda
+    (fila, fila + 1): se subraya esa celda y se traza el borde derecho de la
+    de su izquierda.
+    """
+    commands = []
+    for r in range(min(num_rows, num_cols - 1)):
+        commands.append(('LINEBELOW', (r + 1, r), (r + 1, r), 1.0, colors.black))
+        commands.append(('LINEAFTER', (r, r), (r, r), 1.0, colors.black))
+    return commands
+
+
+def table_style(kind: str, num_rows: int, num_cols: int,
+                underlines: Tuple[Tuple[int, int, int], ...] = ()) -> TableStyle:
+    """
+    Estilo de tabla de un tipo (ver _table_kind) y forma. Se compila una sola
+    vez por tipo, o por tipo y forma si depende de ella, y se comparte entre
+    tablas y exportaciones: ReportLab no modifica el TableStyle al aplicarlo.
+    `underlines` son los subrayados (fila, primera col, última col) de las
+    restas de una división larga.
+    """
+    if kind not in _SHAPED_KINDS:
+        num_rows = num_cols = 0
+    return _compiled_table_style(kind, num_rows, num_cols, underlines)
+
+
+@lru_cache(maxsize=256)
+def _compiled_table_style(kind: str, num_rows: int, num_cols: int,
+                          underlines: Tuple[Tuple[int, int, int], ...]) -> TableStyle:
+    """
+    Compila el estilo de table_style. La caché está acotada: las formas y los
+    subrayados cambian con cada ficha y el servicio de fichas no se reinicia.
+    """
+    commands = list(_TABLE_COMMANDS[kind])
+    if kind == 'binario':
+        commands += _binary_lines(num_rows, num_cols)
+    commands += [('LINEBELOW', (c0, r), (c1, r), 0.8, colors.black) for r, c0, c1 in underlines]
+    return TableStyle(commands)
+
+
+_paragraph_styles: Dict[str, ParagraphStyle] = {}
+_paragraph_styles_lock = threading.Lock()
+
+
+def paragraph_styles() -> Dict[str, ParagraphStyle]:
+    """
+    Estilos de párrafo de la exportación ('normal' y 'title'), creados una
+    sola vez a partir de la hoja de estilos de ejemplo de ReportLab sin
+    modificarla. Se pueden pedir desde los hilos de exportación.
+    """
+    if not _paragraph_styles:
+        with _paragraph_styles_lock:
+            if not _paragraph_styles:
+                sample = getSampleStyleSheet()
+                normal = ParagraphStyle('QuicKualNormal', parent=sample['Normal'],
+                                        fontName='Helvetica', fontSize=12, leading=14)
+                _paragraph_styles.update(normal=normal, title=sample['Title'])
+    return _paragraph_styles
+
+
+@medir("export_pdf.estilo")
+def _build_block_flowables(block: Dict[str, Any], normal, usable_width: float) -> List[Any]:
+    """
+    Construye los flowables de ReportLab (párrafo o tabla + espaciador) de un bloque.
+
+    Args:
+        block: Bloque en el formato de document_to_blocks.
+        normal: Estilo de párrafo para los bloques de texto.
+        usable_width: Ancho útil de la página en puntos.
+
+    Returns:
+        Lista de flowables; vacía si el bloque no produce contenido.
+    """
+    if block['type'] == 'text':
+        text = block['content'].strip()
+        if not text:
+            return []
+        para = Paragraph(escape(text).replace('\n', '<br/>'), normal)
+        return [para, Spacer(1, 10)]
+
+    if block['type'] != 'table':
+        return []
+
+    data = block['content'] or []
+    if not data:
+        return []
+
+    # Asegurar strings
+    table_data = [[("" if cell is None else str(cell)) for cell in row] for row in data]
+
+    num_cols = max(1, len(table_data[0]))
+    num_rows = len(table_data)
+
+    kind = _table_kind(block)
+    underlines = ()
+    if kind == 'division':
+        colw = [usable_width / 2.0, usable_width / 2.0]
+    elif kind == 'escalera':
+        try:
+            right_digits, underlines = _staircase(''.join(table_data[0][1:-1]), table_data[0][-1])
+        except ValueError:
+            right_digits, underlines = len(table_data[0][-1]), ()
+        # Ancho de cifra de Helvetica a 11 pt más los paddings
+        right = min(usable_width / 2.0, right_digits * 6.2 + 12)
+        digit = min(14.0, (usable_width - right) / (num_cols - 1))
+        colw = [digit] * (num_cols - 1) + [right]
+    else:
+        colw = [usable_width / num_cols] * num_cols
+    table = Table(table_data, colWidths=colw, hAlign='CENTER')
+    table.setStyle(table_style(kind, num_rows, num_cols, underlines))
+    return [table, Spacer(1, 10)]
+
+
+# ====
+# Caché de flowables por bloque
+# ====
+
+
+class FlowableCache:
+    """
+    Caché LRU de flowables construidos, indexada por el hash del contenido de
+    cada bloque. Entre exportaciones sucesivas solo se reconstruyen los
+    bloques que han cambiado.
+    """
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, List[Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: bytes, build: Callable[[], List[Any]], store: bool = True) -> List[Any]:
+        """
+        Devuelve copias de los flowables guardados para `key` o los construye
+        con `build` y los guarda (salvo con `store=False`). Se entregan copias
+        superficiales porque ReportLab anota el tamaño calculado sobre cada
+        flowable al maquetar.
+        """
+        with self._lock:
+            flowables = self._entries.get(key)
+            if flowables is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return [copy.copy(f) for f in flowables]
+            self.misses += 1
+
+        flowables = build()
+        if not store:
+            return flowables
+        with self._lock:
+            self._entries[key] = flowables
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return [copy.copy(f) for f in flowables]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+flowable_cache = FlowableCache()
+
+
+def _block_key(block: Dict[str, Any], usable_width: float) -> bytes:
+    """Hash del contenido de un bloque: tipo, celdas, flags y ancho útil."""
+    flags = tuple(sorted((k, v) for k, v in block.items() if k not in ('type', 'content')))
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((block['type'], usable_width, flags, block['content'])).encode('utf-8'))
+    return h.digest()
+
+
+class ExportCancelled(Exception):
+    """Se lanza desde el callback de progreso para abortar una exportación."""
+
+
+# Flowables que la story en flujo mantiene por delante de la maquetación
+STREAM_LOOKAHEAD = 64
+
+
+class _StreamingStory(list):
+    """
+    Story de ReportLab que se rellena desde un generador de pares
+    (bloques completos, flowable) a medida que doc.build la consume.
+
+    doc.build consulta len(story) antes de maquetar cada flowable; en ese
+    momento se retiran los ya maquetados y se completa el búfer hasta
+    `lookahead` flowables. Así en memoria solo hay una ventana de flowables y
+    no los del documento entero. `blocks_done` es el número de bloques ya
+    maquetados (para el progreso).
+    """
+
+    def __init__(self, source: Iterator[Tuple[int, Any]], lookahead: int = STREAM_LOOKAHEAD) -> None:
+        super().__init__()
+        self._source = source
+        self._lookahead = lookahead
+        self._owners: deque = deque()
+        self._pulled = 0
+        self._retired = 0
+        self.blocks_done = 0
+
+    def __len__(self) -> int:
+        size = list.__len__(self)
+        consumed = self._pulled - size
+        while self._retired < consumed and self._owners:
+            self.blocks_done = self._owners.popleft()
+            self._retired += 1
+        while size < self._lookahead and self._source is not None:
+            try:
+                owner, flowable = next(self._source)
+            except StopIteration:
+                self._source = None
+                break
+            self.append(flowable)
+            self._owners.append(owner)
+            self._pulled += 1
+            size += 1
+        return size
+
+
+@medir("export_pdf.extraer")
+def snapshot_blocks(scrollable_frame: tk.Frame) -> List[Dict[str, Any]]:
+    """
+    Toma una instantánea de los bloques del documento. Debe llamarse desde el
+    hilo de Tk; el resultado son datos planos que pueden maquetarse en otro hilo.
 
     Args:
         scrollable_frame: Frame de Tkinter con el contenido a exportar.
+
+    Returns:
+        Lista de diccionarios representando cada bloque (texto o tabla).
+    """
+    documento = documento_registrado(scrollable_frame)
+    if documento is not None:
+        return document_to_blocks(documento)
+    return extract_document_structure(scrollable_frame)
+
+
+@medir
+def export_blocks_to_pdf(blocks: Iterable[Dict[str, Any]], output_path: str = "document.pdf",
+                         title: str = None, page_size=letter,
+                         on_progress: Callable[[int, int], None] = None,
+                         streaming: bool = False) -> None:
+    """
+    Maqueta y escribe el PDF a partir de los bloques ya extraídos.
+    No toca ningún widget, así que puede ejecutarse fuera del hilo de Tk.
+
+    Args:
+        blocks: Bloques en el formato de document_to_blocks (lista o, en
+            flujo, cualquier iterable, p. ej. iter_document_blocks).
         output_path: Ruta del archivo PDF de salida.
         title: Título opcional del documento.
         page_size: Tamaño de página (por defecto letter).
+        on_progress: Callback opcional `(bloques_maquetados, paginas)` que se
+            invoca con frecuencia durante la exportación. Puede lanzar
+            ExportCancelled para abortarla; en ese caso no se escribe el archivo.
+        streaming: Construir los flowables de cada bloque justo antes de
+            maquetarlo en lugar de construir la story entera antes de empezar.
+            El PDF es el mismo, pero la memoria ya no crece con la story: los
+            bloques nuevos tampoco se guardan en la caché de flowables (ReportLab
+            sigue guardando las páginas, comprimidas, hasta el final).
     """
-    blocks = extract_document_structure(scrollable_frame)
-
     doc = SimpleDocTemplate(
         output_path,
         pagesize=page_size,
@@ -238,195 +698,69 @@ def export_to_pdf(scrollable_frame: tk.Frame, output_path: str = "document.pdf",
         bottomMargin=20 * mm,
     )
 
-    styles = getSampleStyleSheet()
-    normal = styles["Normal"]
-    normal.fontName = "Helvetica"
-    normal.fontSize = 12
-    normal.leading = 14
-
-    story = []
-
-    if title:
-        title_style = styles.get("Title", normal)
-        story.append(Paragraph(title, title_style))
-        story.append(Spacer(1, 8))
-
-    for block in blocks:
-        if block['type'] == 'text':
-            text = block['content'].strip()
-            if not text:
-                continue
-            para = Paragraph(text.replace('\n', '<br/>'), normal)
-            story.append(para)
-            story.append(Spacer(1, 10))
-            continue
+    styles = paragraph_styles()
+    normal = styles['normal']
+
+    usable_width = page_size[0] - 40 * mm
+    state = {'blocks': 0, 'pages': 0}
+
+    def _flowables() -> Iterator[Tuple[int, Any]]:
+        # Pares (bloques completos cuando se ha maquetado el flowable, flowable)
+        if title:
+            yield 0, Paragraph(title, styles['title'])
+            yield 0, Spacer(1, 8)
+        for index, block in enumerate(blocks):
+            if on_progress is not None:
+                on_progress(state['blocks'], state['pages'])
+            key = _block_key(block, usable_width)
+            flowables = flowable_cache.get_or_build(
+                key, lambda: _build_block_flowables(block, normal, usable_width), store=not streaming)
+            for flowable in flowables:
+                yield index + 1, flowable
+
+    if streaming:
+        story = _StreamingStory(_flowables())
+        owners = None
+    else:
+        # owners[i] = número de bloques completos cuando se ha maquetado story[i]
+        pairs = list(_flowables())
+        story = [flowable for _, flowable in pairs]
+        owners = [owner for owner, _ in pairs]
+        del pairs
+
+    if on_progress is not None:
+        def _on_build_progress(kind: str, value: int) -> None:
+            if kind == 'PROGRESS':
+                if owners is None:
+                    state['blocks'] = story.blocks_done
+                elif 0 < value <= len(owners):
+                    state['blocks'] = owners[value - 1]
+            elif kind == 'PAGE':
+                state['pages'] = value
+            on_progress(state['blocks'], state['pages'])
+
+        doc.setProgressCallBack(_on_build_progress)
+
+    with tramo("export_pdf.maquetar"):
+        doc.build(story)
 
-        if block['type'] != 'table':
-            continue
 
-        data = block['content'] or []
-        if not data:
-            continue
+def export_to_pdf(scrollable_frame: tk.Frame, output_path: str = "document.pdf",
+                  title: str = None, page_size=letter, streaming: bool = False) -> None:
+    """
+    Exporta el contenido del frame scrollable a un archivo PDF.
 
-        is_division = block.get('division', False)
-        is_suma = block.get('suma', False)
-        is_resta = block.get('resta', False)
-        is_factorial = block.get('factorial', False)
-        is_raiz = block.get('raiz', False)
-        is_binario = block.get('binario', False)
-        is_multiplicacion = block.get('multiplicacion', False)
-
-        # Asegurar strings
-        table_data = [[("" if cell is None else str(cell)) for cell in row] for row in data]
-
-        usable_width = page_size[0] - 40 * mm
-        num_cols = max(1, len(table_data[0]))
-        num_rows = len(table_data)
-
-        def col_widths(nc: int):
-            w = usable_width / nc
-            return [w] * nc
-
-        # División
-        if is_division:
-            colw = [usable_width / 2.0, usable_width / 2.0]
-            table = Table(table_data, colWidths=colw, hAlign='CENTER')
-            table.setStyle(TableStyle([
-                ('BOX', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEAFTER', (0, 0), (0, 0), 1.2, colors.black),
-                ('LINEBELOW', (1, 0), (1, 0), 1.2, colors.black),
-                ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ]))
-        # Suma/Resta
-        elif is_suma or is_resta:
-            table = Table(table_data, colWidths=col_widths(num_cols), hAlign='CENTER')
-            table.setStyle(TableStyle([
-                ('BOX', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ]))
-        # Multiplicación
-        elif is_multiplicacion:
-            table = Table(table_data, colWidths=col_widths(num_cols), hAlign='CENTER')
-            table.setStyle(TableStyle([
-                ('BOX', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEBELOW', (0, 2), (-1, 2), 1, colors.black),
-                ('LINEABOVE', (0, num_rows - 1), (-1, num_rows - 1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ]))
-        # Factorial
-        elif is_factorial:
-            table = Table(table_data, colWidths=col_widths(num_cols), hAlign='CENTER')
-            table.setStyle(TableStyle([
-                ('BOX', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEABOVE', (0, 0), (-1, 0), 1, colors.black),
-                ('LINEBELOW', (0, num_rows - 1), (-1, num_rows - 1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ]))
-        # Raíz
-        elif is_raiz:
-            table = Table(table_data, colWidths=col_widths(num_cols), hAlign='CENTER')
-            table.setStyle(TableStyle([
-                ('BOX', (0, 0), (-1, -1), 0, colors.white),
-                ('GRID', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEABOVE', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEBELOW', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEBEFORE', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEAFTER', (0, 0), (-1, -1), 0, colors.white),
-
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-                ('TOPPADDING', (0, 0), (-1, -1), 2),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-
-                ('LINEAFTER', (0, 0), (0, 0), 1.2, colors.black),
-                ('LINEABOVE', (1, 0), (1, 0), 1.2, colors.black),
-                ('LINEBEFORE', (2, 0), (2, -1), 1.2, colors.black),
-            ]))
-        # Binario: sin ningún borde (Paso 1)
-        # --- Binario: solo borde inferior en celdas con "2" (dividendo) ---
-        # --- Binario: borde inferior en celdas "2" y borde derecho en la celda de su izquierda ---
-        elif is_binario:
-            table = Table(table_data, colWidths=col_widths(num_cols), hAlign='CENTER')
-
-            base_styles = [
-                # Sin bordes globales
-                ('BOX', (0, 0), (-1, -1), 0, colors.white),
-                ('GRID', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEABOVE', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEBELOW', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEBEFORE', (0, 0), (-1, -1), 0, colors.white),
-                ('LINEAFTER', (0, 0), (-1, -1), 0, colors.white),
-
-                # Tipografía y alineación
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-
-                # Paddings compactos
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-                ('TOPPADDING', (0, 0), (-1, -1), 2),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-            ]
-
-            line_width = 1.0
-            line_color = colors.black
-
-            for r in range(num_rows):
-                for c in range(num_cols):
-                    if str(table_data[r][c]).strip() == '2':
-                        # 1) Línea inferior en la celda del "2"
-                        base_styles.append(('LINEBELOW', (c, r), (c, r), line_width, line_color))
-                        # 2) Borde derecho en la celda a la izquierda (si existe)
-                        left_c = c - 1
-                        if left_c >= 0:
-                            base_styles.append(('LINEAFTER', (left_c, r), (left_c, r), line_width, line_color))
-
-            table.setStyle(TableStyle(base_styles))
-        # Tabla normal (fallback)
-        else:
-            table = Table(table_data, colWidths=col_widths(num_cols), hAlign='CENTER')
-            table.setStyle(TableStyle([
-                ('GRID', (0, 0), (-1, -1), 0.6, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-                ('WORDWRAP', (0, 0), (-1, -1), 'CJK'),
-            ]))
-
-        story.append(table)
-        story.append(Spacer(1, 10))
-
-    doc.build(story)
\ No newline at end of file
+    Args:
+        scrollable_frame: Frame de Tkinter con el contenido a exportar.
+        output_path: Ruta del archivo PDF de salida.
+        title: Título opcional del documento.
+        page_size: Tamaño de página (por defecto letter).
+        streaming: Exportar en flujo, leyendo cada bloque del modelo justo
+            antes de maquetarlo (ver export_blocks_to_pdf).
+    """
+    documento = documento_registrado(scrollable_frame)
+    if streaming and documento is not None:
+        blocks = iter_document_blocks(documento)
+    else:
+        blocks = snapshot_blocks(scrollable_frame)
+    export_blocks_to_pdf(blocks, output_path, title, page_size, streaming=streaming)
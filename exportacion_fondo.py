@@ -0,0 +1,171 @@
+"""
+Exportación a PDF en segundo plano.
+
+La instantánea del documento se toma en el hilo de Tk (es rápida: solo copia
+el modelo en memoria) y la maquetación con ReportLab se hace en un hilo de
+trabajo. El progreso llega a la interfaz sondeando con `after()`, la
+exportación se puede cancelar y una segunda exportación al mismo archivo
+mientras la primera sigue en curso se agrupa en una sola repetición.
+
+`export_pdf` (y con él ReportLab) no se importa al cargar este módulo sino al
+exportar, para no retrasar el arranque (ver `arranque`).
+
+Los documentos de `BLOQUES_EN_FLUJO` bloques o más se exportan en flujo
+(export_blocks_to_pdf(..., streaming=True)): el mismo PDF con la memoria
+acotada, y la instantánea se va soltando a medida que se maqueta.
+"""
+
+import os
+import threading
+import tkinter as tk
+from collections import deque
+from typing import Callable, Dict, Iterator, Optional
+
+BLOQUES_EN_FLUJO = 2000
+
+
+def _consumir(cola: deque) -> Iterator[dict]:
+    """Entrega los bloques de la cola soltándolos a medida que se piden."""
+    while cola:
+        yield cola.popleft()
+
+
+class TrabajoExportacion:
+    """Estado de una exportación; el hilo de trabajo escribe y Tk lee."""
+
+    def __init__(self, output_path: str, blocks: list, title: Optional[str],
+                 on_progress: Callable[[int, int, int], None] = None,
+                 on_done: Callable[[Optional[BaseException], bool], None] = None) -> None:
+        self.output_path = output_path
+        self.blocks = blocks
+        self.title = title
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.bloques_total = len(blocks)
+        self.bloques_hechos = 0
+        self.paginas = 0
+        self.error: Optional[BaseException] = None
+        self.terminado = False
+        self.cancelar = threading.Event()
+        self.cancelado = False
+        # Exportación posterior al mismo archivo que se lanzará al terminar esta
+        self.pendiente: Optional["TrabajoExportacion"] = None
+
+    def _progreso(self, bloques: int, paginas: int) -> None:
+        if self.cancelar.is_set():
+            from export_pdf import ExportCancelled
+            self.cancelado = True
+            raise ExportCancelled()
+        self.bloques_hechos = bloques
+        self.paginas = paginas
+
+    def ejecutar(self) -> None:
+        try:
+            from export_pdf import export_blocks_to_pdf
+            if self.bloques_total >= BLOQUES_EN_FLUJO:
+                blocks, self.blocks = _consumir(deque(self.blocks)), None
+                export_blocks_to_pdf(blocks, self.output_path, title=self.title,
+                                     on_progress=self._progreso, streaming=True)
+            else:
+                export_blocks_to_pdf(self.blocks, self.output_path, title=self.title,
+                                     on_progress=self._progreso)
+        except BaseException as e:  # se informa a la interfaz desde el hilo de Tk
+            self.error = e
+        finally:
+            self.terminado = True
+
+
+class ExportadorFondo:
+    """
+    Lanza exportaciones en hilos de trabajo y notifica a la interfaz.
+
+    Los callbacks `on_progress(bloques_hechos, bloques_total, paginas)` y
+    `on_done(error, cancelado)` se invocan siempre en el hilo de Tk.
+    """
+
+    def __init__(self, root: tk.Misc, intervalo_ms: int = 100) -> None:
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self._trabajos: Dict[str, TrabajoExportacion] = {}
+        self._sondeando = False
+
+    @property
+    def ocupado(self) -> bool:
+        return bool(self._trabajos)
+
+    def exportar(self, scrollable_frame: tk.Frame, output_path: str, title: str = None,
+                 on_progress: Callable[[int, int, int], None] = None,
+                 on_done: Callable[[Optional[BaseException], bool], None] = None,
+                 blocks: list = None) -> TrabajoExportacion:
+        """
+        Toma la instantánea del documento y lanza su exportación. Si ya hay una
+        exportación en curso al mismo archivo, la nueva sustituye a cualquier
+        repetición pendiente y se ejecutará una sola vez cuando aquella acabe;
+        la repetición sustituida termina como cancelada (`on_done(None, True)`).
+        Con `blocks` se exportan esos bloques en lugar de los del documento
+        (p. ej. el solucionario).
+        """
+        clave = os.path.abspath(output_path)
+        if blocks is None:
+            from export_pdf import snapshot_blocks
+            blocks = snapshot_blocks(scrollable_frame)
+        trabajo = TrabajoExportacion(output_path, blocks, title, on_progress, on_done)
+        actual = self._trabajos.get(clave)
+        if actual is not None:
+            sustituido, actual.pendiente = actual.pendiente, trabajo
+            if sustituido is not None:
+                self._terminar_cancelado(sustituido)
+            return trabajo
+
+        self._lanzar(clave, trabajo)
+        return trabajo
+
+    def cancelar(self, output_path: str = None) -> None:
+        """Cancela la exportación al archivo indicado, o todas si no se indica."""
+        if output_path is None:
+            trabajos = list(self._trabajos.values())
+        else:
+            trabajo = self._trabajos.get(os.path.abspath(output_path))
+            trabajos = [trabajo] if trabajo is not None else []
+        for trabajo in trabajos:
+            pendiente, trabajo.pendiente = trabajo.pendiente, None
+            if pendiente is not None:
+                self._terminar_cancelado(pendiente)
+            trabajo.cancelar.set()
+
+    @staticmethod
+    def _terminar_cancelado(trabajo: TrabajoExportacion) -> None:
+        """Avisa del fin de una repetición que ya no se va a lanzar."""
+        trabajo.cancelado = True
+        trabajo.terminado = True
+        if trabajo.on_done is not None:
+            trabajo.on_done(None, True)
+
+    def _lanzar(self, clave: str, trabajo: TrabajoExportacion) -> None:
+        self._trabajos[clave] = trabajo
+        hilo = threading.Thread(target=trabajo.ejecutar, name="exportar-pdf", daemon=True)
+        hilo.start()
+        if not self._sondeando:
+            self._sondeando = True
+            self.root.after(self.intervalo_ms, self._sondear)
+
+    def _sondear(self) -> None:
+        for clave, trabajo in list(self._trabajos.items()):
+            if trabajo.on_progress is not None:
+                trabajo.on_progress(trabajo.bloques_hechos, trabajo.bloques_total, trabajo.paginas)
+            if not trabajo.terminado:
+                continue
+
+            del self._trabajos[clave]
+            # La repetición se lanza antes de avisar, para que `ocupado` siga
+            # siendo cierto en on_done mientras quede trabajo
+            if trabajo.pendiente is not None:
+                self._lanzar(clave, trabajo.pendiente)
+            cancelado = trabajo.cancelado
+            if trabajo.on_done is not None:
+                trabajo.on_done(None if cancelado else trabajo.error, cancelado)
+
+        if self._trabajos:
+            self.root.after(self.intervalo_ms, self._sondear)
+        else:
+            self._sondeando = False
@@ -0,0 +1,164 @@
+"""
+Factorización de enteros para las tablas de descomposición factorial y raíz.
+
+Combina tres técnicas:
+- división de prueba por una tabla de primos pequeños (rueda de primos < 1000),
+- test de primalidad de Miller–Rabin (determinista por debajo de 3,3·10^24),
+- método rho de Pollard con la variante de Brent para los cofactores compuestos.
+
+Los resultados se memorizan en una caché acotada, así que volver a pedir la
+descomposición de un número reciente es inmediato.
+
+`factorizar` se llama desde los diálogos, en el hilo de Tk, así que rho tiene
+un presupuesto de `MAX_PASOS_RHO` pasos (~0,5 s) por cofactor compuesto: los
+factores primos pequeños y los números primos se resuelven siempre, de
+cualquier tamaño, y solo se rechazan (ValueError) los números con dos factores
+primos grandes, p. ej. el producto de dos primos de 12 cifras o más.
+"""
+
+import random
+from functools import lru_cache
+from math import gcd, isqrt
+from typing import Dict, List, Tuple
+
+LIMITE_RUEDA = 1000
+# Pasos de rho por cofactor antes de rendirse (ver el docstring del módulo)
+MAX_PASOS_RHO = 1 << 19
+
+
+def _criba(limite: int) -> List[int]:
+    es_primo_tabla = bytearray([1]) * limite
+    es_primo_tabla[0:2] = b"\x00\x00"
+    for p in range(2, isqrt(limite - 1) + 1):
+        if es_primo_tabla[p]:
+            es_primo_tabla[p * p::p] = bytearray(len(range(p * p, limite, p)))
+    return [p for p in range(limite) if es_primo_tabla[p]]
+
+
+_PRIMOS_PEQUENOS = _criba(LIMITE_RUEDA)
+
+# Con estas bases Miller–Rabin es determinista para n < 3.317.044.064.679.887.385.961.981;
+# por encima el error es inferior a 4^-20.
+_BASES_MR = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_BASES_MR_EXTRA = (43, 47, 53, 59, 61, 67, 71)
+_LIMITE_DETERMINISTA = 3317044064679887385961981
+
+
+def es_primo(n: int) -> bool:
+    """Indica si `n` es primo."""
+    if n < 2:
+        return False
+    for p in _PRIMOS_PEQUENOS:
+        if n % p == 0:
+            return n == p
+    if n < LIMITE_RUEDA * LIMITE_RUEDA:
+        return True
+
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    bases = _BASES_MR if n < _LIMITE_DETERMINISTA else _BASES_MR + _BASES_MR_EXTRA
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _pollard_brent(n: int) -> int:
+    """
+    Devuelve un divisor propio de `n`, que debe ser compuesto e impar. Lanza
+    ValueError si no lo encuentra en `MAX_PASOS_RHO` pasos.
+    """
+    rng = random.Random(n)
+    pasos = 0
+    while True:
+        y = rng.randrange(1, n)
+        c = rng.randrange(1, n)
+        m = 128
+        g = r = q = 1
+        x = ys = y
+        while g == 1:
+            if pasos > MAX_PASOS_RHO:
+                raise ValueError(f"{n} no se ha podido descomponer a tiempo")
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * (x - y) % n
+                g = gcd(q, n)
+                k += m
+            pasos += 2 * r
+            r *= 2
+        if g == n:
+            # El producto acumulado se pasó: repetir paso a paso desde el último punto
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+
+
+def _factores_grandes(n: int, factores: Dict[int, int]) -> None:
+    pila = [n]
+    while pila:
+        m = pila.pop()
+        if m == 1:
+            continue
+        if es_primo(m):
+            factores[m] = factores.get(m, 0) + 1
+            continue
+        raiz = isqrt(m)
+        if raiz * raiz == m:
+            pila.extend((raiz, raiz))
+            continue
+        d = _pollard_brent(m)
+        pila.extend((d, m // d))
+
+
+@lru_cache(maxsize=4096)
+def _factorizar(n: int) -> Tuple[Tuple[int, int], ...]:
+    factores: Dict[int, int] = {}
+    for p in _PRIMOS_PEQUENOS:
+        if p * p > n:
+            break
+        while n % p == 0:
+            n //= p
+            factores[p] = factores.get(p, 0) + 1
+    if n > 1:
+        _factores_grandes(n, factores)
+    return tuple(sorted(factores.items()))
+
+
+def factorizar(n: int) -> Dict[int, int]:
+    """
+    Devuelve la descomposición en primos de `n` como {primo: exponente},
+    ordenada de menor a mayor primo. Para n < 2 devuelve {}. Lanza
+    ValueError si `n` tiene dos factores primos demasiado grandes para
+    separarlos con rho dentro de su presupuesto.
+    """
+    if n < 2:
+        return {}
+    try:
+        return dict(_factorizar(n))
+    except ValueError:
+        raise ValueError(f"{n} tiene factores primos demasiado grandes para descomponerlo") from None
+
+
+def descomposicion(n: int) -> List[int]:
+    """Factores primos de `n` repetidos según su multiplicidad, en orden creciente."""
+    return [p for p, e in factorizar(n).items() for _ in range(e)]
@@ -0,0 +1,381 @@
+"""
+Generador de problemas al azar para las fichas, sin Tkinter.
+
+`Generador` saca operandos por lotes de un `random.Random` con semilla, se
+queda con los que cumplen las restricciones de dificultad y descarta los
+repetidos con un conjunto de claves (en la suma y la multiplicación, 3 + 4 y
+4 + 3 son el mismo problema). Con la misma semilla se obtienen siempre los
+mismos problemas; pidiendo más al mismo generador no se repite ninguno de
+los anteriores, lo que sirve para hacer variantes por alumno.
+
+Restricciones (todas opcionales):
+    cifras    cifras de los operandos: un número para todos o una tupla
+              (en la división, el divisor tiene 1 cifra si no se indica)
+    llevadas  suma, resta y multiplicación: número de llevadas, exacto o
+              (mínimo, máximo) con máximo None para "sin límite"
+    resto     división: True con resto, False exacta, None da igual
+    primo     descomposición y raíz: número primo (True) o compuesto (False)
+    factores  descomposición: número de factores primos, exacto o (mín., máx.)
+    exacta    raíz: radicando potencia exacta del índice
+    indice    raíz: índice (2 por defecto)
+
+`DIFICULTADES` da restricciones ya hechas para los niveles 1, 2 y 3 de cada
+operación; las que se pasen explícitamente tienen prioridad.
+
+Los problemas son tuplas de operandos como texto, las mismas que acepta
+`operaciones.plantilla_problema`.
+"""
+
+import random
+from math import isqrt
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from factorizacion import es_primo, factorizar
+from operaciones import MAX_CIFRAS_DIVIDENDO
+
+OPERACIONES = ("suma", "resta", "multiplicacion", "division", "factorial", "raiz", "binario")
+
+# Candidatos que se sacan de una vez
+LOTE = 1024
+# Se deja de buscar tras tantos lotes seguidos sin ningún problema nuevo
+LOTES_SIN_NOVEDAD = 64
+
+CIFRAS = {
+    "suma": (3, 3), "resta": (3, 3), "multiplicacion": (3, 1), "division": (4, 1),
+    "factorial": (3,), "raiz": (3,), "binario": (2,),
+}
+
+DIFICULTADES: Dict[str, Dict[int, dict]] = {
+    "suma": {1: {"llevadas": 0}, 2: {"llevadas": 1}, 3: {"llevadas": (2, None)}},
+    "resta": {1: {"llevadas": 0}, 2: {"llevadas": 1}, 3: {"llevadas": (2, None)}},
+    "multiplicacion": {1: {"llevadas": 0}, 2: {"llevadas": (1, 2)}, 3: {"llevadas": (3, None)}},
+    "division": {1: {"resto": False}, 2: {"resto": True}, 3: {"resto": True, "cifras": (5, 2)}},
+    "factorial": {1: {"factores": (2, 3)}, 2: {"factores": (4, 5)}, 3: {"factores": (6, None)}},
+    "raiz": {1: {"exacta": True}, 2: {"exacta": False, "primo": False}, 3: {"primo": True}},
+    "binario": {1: {"cifras": 2}, 2: {"cifras": 3}, 3: {"cifras": 4}},
+}
+
+Problema = Tuple[str, ...]
+Rango = Tuple[int, Optional[int]]
+
+
+# ====
+# Cifras y llevadas
+# ====
+
+# Suma de las cifras de cada número de 0 a 9999
+_SUMA_CIFRAS = bytes(sum(map(int, str(n))) for n in range(10000))
+
+
+def _suma_cifras(n: int) -> int:
+    tabla = _SUMA_CIFRAS
+    total = 0
+    while n:
+        n, resto = divmod(n, 10000)
+        total += tabla[resto]
+    return total
+
+
+def llevadas_suma(a: int, b: int) -> int:
+    """Llevadas de a + b: cada llevada resta 9 a la suma de las cifras del resultado."""
+    return (_suma_cifras(a) + _suma_cifras(b) - _suma_cifras(a + b)) // 9
+
+
+def llevadas_resta(a: int, b: int) -> int:
+    """Llevadas de a - b (a >= b): las mismas que al sumar b + (a - b)."""
+    return llevadas_suma(b, a - b)
+
+
+def llevadas_multiplicacion(a: int, b: int) -> int:
+    """Cifras con llevada distinta de cero en los productos parciales de a × b."""
+    cifras_a = [int(c) for c in reversed(str(a))]
+    total = 0
+    for d in map(int, str(b)):
+        llevada = 0
+        for c in cifras_a:
+            llevada = (c * d + llevada) // 10
+            total += llevada > 0
+    return total
+
+
+def _rango_cifras(cifras: int, minimo: int = 1) -> Tuple[int, int]:
+    """[desde, hasta) de los números de `cifras` cifras (sin bajar de `minimo`)."""
+    if cifras < 1:
+        raise ValueError("Los operandos necesitan al menos una cifra")
+    return max(minimo, 10 ** (cifras - 1) if cifras > 1 else 0), 10 ** cifras
+
+
+def _rango(valor: Union[int, Rango, None]) -> Optional[Rango]:
+    if valor is None or isinstance(valor, tuple):
+        return valor
+    return (valor, valor)
+
+
+def _dentro(n: Optional[int], rango: Optional[Rango]) -> bool:
+    if n is None:
+        return False
+    return rango is None or (rango[0] <= n and (rango[1] is None or n <= rango[1]))
+
+
+# ====
+# Muestreo por operación: cada uno devuelve un lote de candidatos ya filtrado
+# ====
+
+
+def _muestreo_suma(rng: random.Random, n: int, r: dict) -> List[Tuple[int, int]]:
+    (desde_a, hasta_a), (desde_b, hasta_b) = r["rangos"]
+    azar = rng.randrange
+    pares = [(azar(desde_a, hasta_a), azar(desde_b, hasta_b)) for _ in range(n)]
+    llevadas = r["llevadas"]
+    if llevadas is None:
+        return pares
+    minimo, maximo = llevadas
+    maximo = 10 ** 9 if maximo is None else maximo
+    return [(a, b) for a, b in pares if minimo <= llevadas_suma(a, b) <= maximo]
+
+
+def _muestreo_resta(rng: random.Random, n: int, r: dict) -> List[Tuple[int, int]]:
+    (desde_a, hasta_a), (desde_b, hasta_b) = r["rangos"]
+    azar = rng.randrange
+    pares = []
+    for _ in range(n):
+        # El sustraendo se sortea por debajo del minuendo, cada uno en su rango
+        a = azar(desde_a, hasta_a)
+        if a >= desde_b:
+            pares.append((a, azar(desde_b, min(hasta_b, a + 1))))
+    llevadas = r["llevadas"]
+    if llevadas is None:
+        return pares
+    minimo, maximo = llevadas
+    maximo = 10 ** 9 if maximo is None else maximo
+    return [(a, b) for a, b in pares if minimo <= llevadas_resta(a, b) <= maximo]
+
+
+def _muestreo_multiplicacion(rng: random.Random, n: int, r: dict) -> List[Tuple[int, int]]:
+    (desde_a, hasta_a), (desde_b, hasta_b) = r["rangos"]
+    azar = rng.randrange
+    pares = [(azar(desde_a, hasta_a), azar(desde_b, hasta_b)) for _ in range(n)]
+    llevadas = r["llevadas"]
+    if llevadas is None:
+        return pares
+    minimo, maximo = llevadas
+    maximo = 10 ** 9 if maximo is None else maximo
+    return [(a, b) for a, b in pares if minimo <= llevadas_multiplicacion(a, b) <= maximo]
+
+
+def _muestreo_division(rng: random.Random, n: int, r: dict) -> List[Tuple[int, int]]:
+    (desde_a, hasta_a), (desde_b, hasta_b) = r["rangos"]
+    azar = rng.randrange
+    if r["resto"] is False:
+        # Exactas: se construyen como divisor × cociente
+        pares = []
+        for _ in range(n):
+            divisor = azar(desde_b, hasta_b)
+            desde_q, hasta_q = -(-desde_a // divisor), (hasta_a - 1) // divisor
+            if desde_q <= hasta_q:
+                pares.append((divisor * azar(desde_q, hasta_q + 1), divisor))
+        return pares
+    pares = [(azar(desde_a, hasta_a), azar(desde_b, hasta_b)) for _ in range(n)]
+    if r["resto"]:
+        return [(a, b) for a, b in pares if a >= b and a % b]
+    return [(a, b) for a, b in pares if a >= b]
+
+
+# Por debajo, los factores primos de un compuesto tienen como mucho 9 cifras y
+# rho los separa muy lejos de agotar MAX_PASOS_RHO: factorizar nunca falla
+_SIEMPRE_FACTORIZABLE = 10 ** 18
+
+
+def _num_factores(x: int) -> Optional[int]:
+    """Factores primos de `x` con su multiplicidad; None si `factorizar` lo rechaza."""
+    try:
+        return sum(factorizar(x).values())
+    except ValueError:
+        return None
+
+
+def _muestreo_factorial(rng: random.Random, n: int, r: dict) -> List[Tuple[int]]:
+    ((desde, hasta),) = r["rangos"]
+    azar = rng.randrange
+    numeros = [azar(desde, hasta) for _ in range(n)]
+    if r["primo"] is not None:
+        numeros = [x for x in numeros if es_primo(x) == r["primo"]]
+    if r["factores"] is not None:
+        numeros = [x for x in numeros if _dentro(_num_factores(x), r["factores"])]
+    elif hasta > _SIEMPRE_FACTORIZABLE:
+        # La plantilla descompone el número: fuera los que factorizar no puede separar
+        numeros = [x for x in numeros if _num_factores(x) is not None]
+    return [(x,) for x in numeros]
+
+
+def _muestreo_raiz(rng: random.Random, n: int, r: dict) -> List[Tuple[int, int]]:
+    ((desde, hasta),) = r["rangos"]
+    indice = r["indice"]
+    azar = rng.randrange
+    if r["exacta"]:
+        # Potencias exactas: se sortea la raíz
+        raiz_desde = _raiz_entera(desde - 1, indice) + 1
+        raiz_hasta = _raiz_entera(hasta - 1, indice)
+        if raiz_desde > raiz_hasta:
+            return []
+        numeros = [azar(raiz_desde, raiz_hasta + 1) ** indice for _ in range(n)]
+    else:
+        numeros = [azar(desde, hasta) for _ in range(n)]
+        if r["exacta"] is False:
+            numeros = [x for x in numeros if _raiz_entera(x, indice) ** indice != x]
+    if r["primo"] is not None:
+        numeros = [x for x in numeros if es_primo(x) == r["primo"]]
+    if hasta > _SIEMPRE_FACTORIZABLE:
+        numeros = [x for x in numeros if _num_factores(x) is not None]
+    return [(indice, x) for x in numeros]
+
+
+def _raiz_entera(n: int, indice: int) -> int:
+    """Mayor k con k ** indice <= n."""
+    if n < 1:
+        return 0
+    if indice == 2:
+        return isqrt(n)
+    k = int(round(n ** (1.0 / indice)))
+    while k ** indice > n:
+        k -= 1
+    while (k + 1) ** indice <= n:
+        k += 1
+    return k
+
+
+def _muestreo_binario(rng: random.Random, n: int, r: dict) -> List[Tuple[int]]:
+    ((desde, hasta),) = r["rangos"]
+    azar = rng.randrange
+    return [(azar(max(desde, 2), hasta),) for _ in range(n)]
+
+
+_MUESTREOS: Dict[str, Callable[[random.Random, int, dict], list]] = {
+    "suma": _muestreo_suma,
+    "resta": _muestreo_resta,
+    "multiplicacion": _muestreo_multiplicacion,
+    "division": _muestreo_division,
+    "factorial": _muestreo_factorial,
+    "raiz": _muestreo_raiz,
+    "binario": _muestreo_binario,
+}
+
+# En estas operaciones el orden de los operandos no cambia el problema
+_CONMUTATIVAS = {"suma", "multiplicacion"}
+
+
+# ====
+# Generador
+# ====
+
+
+class Generador:
+    """
+    Problemas distintos de `operacion` con las restricciones dadas (ver el
+    docstring del módulo). `candidatos` cuenta los operandos sorteados y
+    `problemas` los aceptados hasta ahora.
+    """
+
+    def __init__(self, operacion: str, dificultad: Optional[int] = None, semilla=None,
+                 **restricciones) -> None:
+        if operacion not in _MUESTREOS:
+            raise ValueError(f"Operación desconocida: {operacion!r}")
+        if dificultad is not None:
+            if dificultad not in DIFICULTADES[operacion]:
+                raise ValueError(f"Dificultad {dificultad!r} no válida (1, 2 o 3)")
+            restricciones = {**DIFICULTADES[operacion][dificultad], **restricciones}
+        self.operacion = operacion
+        self.restricciones = self._preparar(operacion, restricciones)
+        self._rng = random.Random(semilla)
+        self._vistos: Set[tuple] = set()
+        self.candidatos = 0
+        self.problemas = 0
+
+    @staticmethod
+    def _preparar(operacion: str, restricciones: dict) -> dict:
+        desconocidas = set(restricciones) - {"cifras", "llevadas", "resto", "primo", "factores", "exacta", "indice"}
+        if desconocidas:
+            raise ValueError(f"Restricciones desconocidas: {', '.join(sorted(desconocidas))}")
+        por_defecto = CIFRAS[operacion]
+        cifras = restricciones.get("cifras", por_defecto)
+        if isinstance(cifras, int):
+            # Un número: para todos los operandos, salvo el divisor
+            cifras = (cifras, por_defecto[1]) if operacion == "division" else (cifras,) * len(por_defecto)
+        if len(cifras) != len(por_defecto):
+            raise ValueError(f"'{operacion}' necesita {len(por_defecto)} número(s) de cifras")
+        if operacion == "resta" and cifras[0] < cifras[1]:
+            raise ValueError("El minuendo no puede tener menos cifras que el sustraendo")
+        if operacion == "division" and cifras[0] > MAX_CIFRAS_DIVIDENDO:
+            raise ValueError(f"El dividendo puede tener como mucho {MAX_CIFRAS_DIVIDENDO} cifras")
+        # Sin el 0 ni el 1 como divisor, multiplicador o número a descomponer
+        minimo = 0 if operacion in ("suma", "resta") else 2
+        rangos = [_rango_cifras(c, minimo) for c in cifras]
+        r = {
+            "rangos": rangos,
+            "llevadas": _rango(restricciones.get("llevadas")),
+            "resto": restricciones.get("resto"),
+            "primo": restricciones.get("primo"),
+            "factores": _rango(restricciones.get("factores")),
+            "exacta": restricciones.get("exacta"),
+            "indice": int(restricciones.get("indice", 2)),
+        }
+        if operacion == "raiz":
+            if r["indice"] < 2:
+                raise ValueError("El índice de la raíz debe ser al menos 2")
+            if r["exacta"] and r["primo"]:
+                raise ValueError("Una potencia exacta no puede ser un número primo")
+        if operacion == "factorial" and r["primo"] and r["factores"] and r["factores"][0] > 1:
+            raise ValueError("Un número primo tiene un solo factor")
+        return r
+
+    def _clave(self, operandos: tuple) -> tuple:
+        if self.operacion in _CONMUTATIVAS and operandos[0] > operandos[1]:
+            return (operandos[1], operandos[0])
+        return operandos
+
+    def excluir(self, problemas: Iterable[Problema]) -> None:
+        """No volverá a dar estos problemas (p. ej. los que ya hay en el documento)."""
+        for problema in problemas:
+            self._vistos.add(self._clave(tuple(int(o) for o in problema)))
+
+    def generar(self, cantidad: int) -> List[Problema]:
+        """
+        `cantidad` problemas nuevos. Lanza ValueError si con estas restricciones
+        no quedan tantos problemas distintos.
+        """
+        muestreo = _MUESTREOS[self.operacion]
+        restricciones = self.restricciones
+        vistos = self._vistos
+        clave = self._clave
+        problemas: List[Problema] = []
+        sin_novedad = 0
+        while len(problemas) < cantidad:
+            lote = muestreo(self._rng, LOTE, restricciones)
+            self.candidatos += LOTE
+            antes = len(problemas)
+            for operandos in lote:
+                k = clave(operandos)
+                if k in vistos:
+                    continue
+                vistos.add(k)
+                problemas.append(tuple(map(str, operandos)))
+                if len(problemas) == cantidad:
+                    break
+            if len(problemas) > antes:
+                sin_novedad = 0
+            else:
+                sin_novedad += 1
+                if sin_novedad >= LOTES_SIN_NOVEDAD:
+                    self.problemas += len(problemas)
+                    raise ValueError(
+                        f"Solo hay {len(problemas)} problemas distintos de '{self.operacion}' "
+                        f"con estas restricciones (se pidieron {cantidad})"
+                    )
+        self.problemas += len(problemas)
+        return problemas
+
+
+def generar(operacion: str, cantidad: int, dificultad: Optional[int] = None, semilla=None,
+            **restricciones) -> List[Problema]:
+    """Atajo de `Generador(...).generar(cantidad)`."""
+    return Generador(operacion, dificultad, semilla, **restricciones).generar(cantidad)
@@ -0,0 +1,200 @@
+"""
+Deshacer y rehacer a nivel de documento.
+
+El historial guarda cambios, no copias del documento. Cada entrada es una
+tupla de cambios elementales, cada uno con lo justo para aplicarlo en los dos
+sentidos:
+- ("insertar", bloque, antes_de) y ("eliminar", bloque, antes_de): el bloque
+  (el mismo objeto, que conserva su contenido) y el id del que lo sigue;
+- ("mover", bloque_id, antes_era, antes_de): de dónde a dónde se movió;
+- ("celda", tabla_id, fila, col, anterior, nuevo): lo que cambió una celda.
+
+Así la memoria es proporcional a lo que cambió y deshacer o rehacer una entrada
+cuesta lo que sus cambios, sea cual sea el tamaño del documento (el orden de
+los bloques es una lista enlazada, ver `documento.Documento`).
+
+El documento anota solo las inserciones, eliminaciones y movimientos; la
+rejilla anota lo que se escribe en las celdas con `celda`, y las pulsaciones
+seguidas en una misma celda forman una sola entrada. Lo que se escribe en los
+bloques de texto lo deshace el propio Text.
+
+`oyentes` reciben cada cambio en el momento en que se hace, también los que
+hacen deshacer y rehacer, cada pulsación en una celda y ("texto", bloque)
+cuando cambia el texto de un bloque (lo usa `autoguardado`).
+
+No depende de Tkinter: bloques.deshacer / bloques.rehacer aplican el cambio y
+actualizan los widgets.
+"""
+
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+from documento import Documento, documento_de
+
+# Entradas que se guardan como máximo; las más antiguas se olvidan
+LIMITE = 500
+
+Cambio = Tuple
+Entrada = Tuple[Cambio, ...]
+
+
+def invertir(cambio: Cambio) -> Cambio:
+    """El cambio que deshace `cambio`."""
+    tipo = cambio[0]
+    if tipo == "insertar":
+        return ("eliminar",) + cambio[1:]
+    if tipo == "eliminar":
+        return ("insertar",) + cambio[1:]
+    if tipo == "mover":
+        _, bloque_id, antes_era, antes_de = cambio
+        return ("mover", bloque_id, antes_de, antes_era)
+    _, tabla_id, fila, col, anterior, nuevo = cambio
+    return ("celda", tabla_id, fila, col, nuevo, anterior)
+
+
+class Historial:
+    """
+    Historial de deshacer/rehacer de `documento` (se engancha a él al crearse).
+    Guarda como máximo `limite` entradas.
+    """
+
+    def __init__(self, documento: Documento, limite: int = LIMITE) -> None:
+        self.documento = documento
+        self._deshacer: Deque[Entrada] = deque(maxlen=limite)
+        self._rehacer: List[Entrada] = []
+        # Cambios de la agrupación abierta (None si no hay) y su profundidad
+        self._grupo: Optional[List[Cambio]] = None
+        self._profundidad = 0
+        # (tabla_id, fila, col) de la última entrada si admite más pulsaciones
+        self._celda_abierta: Optional[Tuple[int, int, int]] = None
+        self._aplicando = False
+        self.oyentes: List[Callable[[Cambio], None]] = []
+        documento.historial = self
+
+    @property
+    def limite(self) -> int:
+        return self._deshacer.maxlen
+
+    def puede_deshacer(self) -> bool:
+        return bool(self._deshacer)
+
+    def puede_rehacer(self) -> bool:
+        return bool(self._rehacer)
+
+    def __len__(self) -> int:
+        return len(self._deshacer)
+
+    # ---- Anotación ----
+
+    def _avisar(self, cambio: Cambio) -> None:
+        for oyente in self.oyentes:
+            oyente(cambio)
+
+    def anotar(self, cambio: Cambio) -> None:
+        """Añade un cambio ya hecho en el documento (lo llama el documento)."""
+        self._avisar(cambio)
+        if not self._aplicando:
+            self._guardar(cambio)
+
+    def _guardar(self, cambio: Cambio) -> None:
+        self._celda_abierta = None
+        self._rehacer.clear()
+        if self._grupo is not None:
+            self._grupo.append(cambio)
+        else:
+            self._deshacer.append((cambio,))
+
+    def celda(self, tabla, fila: int, col: int, anterior: str, nuevo: str) -> None:
+        """Anota que la celda (fila, col) de `tabla` pasó de `anterior` a `nuevo`."""
+        if anterior == nuevo:
+            return
+        cambio = ("celda", tabla.id, fila, col, anterior, nuevo)
+        self._avisar(cambio)
+        if self._aplicando:
+            return
+        clave = (tabla.id, fila, col)
+        if clave == self._celda_abierta and self._grupo is None:
+            # Otra pulsación en la misma celda: se actualiza la entrada
+            _, _, _, _, primero, _ = self._deshacer[-1][0]
+            self._deshacer[-1] = (("celda", tabla.id, fila, col, primero, nuevo),)
+            return
+        self._guardar(cambio)
+        if self._grupo is None:
+            self._celda_abierta = clave
+
+    def texto(self, bloque) -> None:
+        """Avisa de que ha cambiado el texto de `bloque` (no se deshace aquí: lo hace el Text)."""
+        self._avisar(("texto", bloque))
+
+    def cortar(self) -> None:
+        """La siguiente pulsación empieza una entrada nueva (p. ej. al cerrar el editor)."""
+        self._celda_abierta = None
+
+    def abrir_grupo(self) -> None:
+        """Lo que se anote hasta `cerrar_grupo` se deshace de una vez. Se pueden anidar."""
+        if self._profundidad == 0:
+            self._grupo = []
+        self._profundidad += 1
+
+    def cerrar_grupo(self) -> None:
+        self._profundidad -= 1
+        if self._profundidad:
+            return
+        grupo, self._grupo = self._grupo, None
+        if grupo:
+            self._deshacer.append(tuple(grupo))
+
+    # ---- Deshacer / rehacer ----
+
+    def _aplicar(self, cambio: Cambio) -> None:
+        documento = self.documento
+        tipo = cambio[0]
+        if tipo == "insertar":
+            documento.insertar(cambio[1], cambio[2])
+        elif tipo == "eliminar":
+            documento.eliminar(cambio[1].id)
+        elif tipo == "mover":
+            documento.mover(cambio[1], cambio[3])
+        else:
+            _, tabla_id, fila, col, _, nuevo = cambio
+            tabla = documento.get(tabla_id)
+            if tabla is not None:
+                tabla.set(fila, col, nuevo)
+                self._avisar(cambio)
+
+    def _aplicar_todos(self, cambios: Entrada) -> Entrada:
+        self._aplicando = True
+        try:
+            for cambio in cambios:
+                self._aplicar(cambio)
+        finally:
+            self._aplicando = False
+        self._celda_abierta = None
+        return cambios
+
+    def deshacer(self) -> Entrada:
+        """
+        Deshace la última entrada y devuelve los cambios aplicados para ello
+        (vacío si no había nada que deshacer).
+        """
+        if not self._deshacer or self._grupo is not None:
+            return ()
+        entrada = self._deshacer.pop()
+        self._rehacer.append(entrada)
+        return self._aplicar_todos(tuple(invertir(c) for c in reversed(entrada)))
+
+    def rehacer(self) -> Entrada:
+        """Vuelve a hacer la última entrada deshecha y devuelve sus cambios."""
+        if not self._rehacer or self._grupo is not None:
+            return ()
+        entrada = self._rehacer.pop()
+        self._deshacer.append(entrada)
+        return self._aplicar_todos(entrada)
+
+
+def historial_de(scrollable_frame) -> Historial:
+    """Devuelve el historial del documento del frame, creándolo si aún no tiene."""
+    documento = documento_de(scrollable_frame)
+    if documento.historial is None:
+        Historial(documento)
+    return documento.historial
@@ -0,0 +1,216 @@
+"""
+Índice de búsqueda de los bloques del documento.
+
+Asocia términos a conjuntos de ids de bloque:
+
+    op:<tipo>     tipo de operación de una tabla ("op:division")
+    tipo:<tipo>   "tipo:text" o "tipo:table"
+    num:<número>  operandos de las tablas y números escritos en los textos
+    cifras:<n>    número de cifras de cada operando ("cifras:7")
+    pal:<palabra> palabras de los textos, en minúsculas y sin tildes
+
+El documento avisa al índice (con `marcar`) de cada bloque que se inserta o se
+elimina, y el vínculo de los bloques de texto de cada edición; el índice solo
+vuelve a leer esos bloques, la próxima vez que se consulta o cuando la
+interfaz le da un rato (`actualizar(max_bloques)`), nunca el documento entero.
+
+`buscar` interpreta una consulta como "división 7 cifras", "1234" o
+"fracciones": cada palabra se convierte en uno o varios términos (la unión de
+sus bloques) y el resultado es la intersección de todas, en orden de
+documento. La última palabra también vale como prefijo de palabras de texto,
+para poder buscar mientras se escribe.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set
+
+from documento import BloquePendiente
+
+# Números (con decimales con coma o punto) o palabras
+_TOKEN = re.compile(r"\d+(?:[.,]\d+)?|[^\W\d_]+")
+
+# Palabras de la consulta que nombran una operación (sin tildes)
+_OPERACIONES = {
+    "suma": "suma", "sumas": "suma", "+": "suma",
+    "resta": "resta", "restas": "resta", "−": "resta",
+    "multiplicacion": "multiplicacion", "multiplicaciones": "multiplicacion", "x": "multiplicacion",
+    "division": "division", "divisiones": "division", "÷": "division",
+    "factorial": "factorial", "descomposicion": "factorial", "|": "factorial",
+    "raiz": "raiz", "raices": "raiz", "√": "raiz",
+    "binario": "binario", "binaria": "binario", "binarios": "binario",
+}
+_TIPOS = {"texto": "text", "textos": "text", "tabla": "table", "tablas": "table"}
+_CIFRAS = {"cifras", "cifra", "digitos", "digito"}
+
+
+def normalizar(palabra: str) -> str:
+    """Minúsculas y sin tildes ("División" -> "division")."""
+    descompuesta = unicodedata.normalize("NFD", palabra.lower())
+    return "".join(c for c in descompuesta if not unicodedata.combining(c))
+
+
+def _numero(texto: str) -> str:
+    """Forma común de un número: sin ceros a la izquierda y con coma decimal."""
+    texto = texto.strip().replace(".", ",")
+    entero, coma, decimales = texto.partition(",")
+    return (entero.lstrip("0") or "0") + (coma + decimales if coma else "")
+
+
+def terminos_bloque(bloque) -> Set[str]:
+    """Términos con los que se indexa un bloque (texto o tabla)."""
+    terminos = {f"tipo:{bloque.tipo}"}
+    if bloque.tipo == "text":
+        for token in _TOKEN.findall(normalizar(bloque.texto)):
+            terminos.add(f"num:{_numero(token)}" if token[0].isdigit() else f"pal:{token}")
+        return terminos
+    operacion = getattr(bloque, "operacion", None)
+    if operacion is not None:
+        terminos.add(f"op:{operacion.tipo}")
+        for operando in operacion.operandos:
+            operando = str(operando).strip()
+            if _TOKEN.fullmatch(operando) and operando[0].isdigit():
+                terminos.add(f"num:{_numero(operando)}")
+            cifras = sum(c.isdigit() for c in operando)
+            if cifras:
+                terminos.add(f"cifras:{cifras}")
+    return terminos
+
+
+class IndiceBloques:
+    """
+    Índice invertido término -> ids de bloque de un documento (ver el
+    docstring del módulo). Al crearlo se engancha a `documento.indice` y
+    marca todos los bloques que ya hay.
+    """
+
+    __slots__ = ("documento", "_bloques", "_de_bloque", "_sucios", "_vocabulario",
+                 "_posiciones", "_version")
+
+    def __init__(self, documento) -> None:
+        self.documento = documento
+        self._bloques: Dict[str, Set[int]] = {}
+        self._de_bloque: Dict[int, Set[str]] = {}
+        self._sucios: Set[int] = set(documento.ids())
+        # Términos ordenados para buscar por prefijo (None: hay que rehacerlo)
+        self._vocabulario: Optional[List[str]] = None
+        self._posiciones: Dict[int, int] = {}
+        self._version = -1
+        documento.indice = self
+
+    def marcar(self, bloque_id: int) -> None:
+        """El bloque ha cambiado (o se ha insertado o eliminado): volver a leerlo."""
+        self._sucios.add(bloque_id)
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._sucios)
+
+    def actualizar(self, max_bloques: Optional[int] = None) -> int:
+        """
+        Vuelve a indexar los bloques marcados (como mucho `max_bloques`).
+        Devuelve cuántos quedan por indexar.
+        """
+        documento = self.documento
+        bloques = self._bloques
+        hechos = 0
+        while self._sucios and (max_bloques is None or hechos < max_bloques):
+            bloque_id = self._sucios.pop()
+            hechos += 1
+            for termino in self._de_bloque.pop(bloque_id, ()):
+                ids = bloques[termino]
+                ids.discard(bloque_id)
+                if not ids:
+                    del bloques[termino]
+                    self._vocabulario = None
+            bloque = documento.vistazo(bloque_id)
+            if bloque is None:
+                continue
+            if isinstance(bloque, BloquePendiente):
+                # Se lee del archivo sin guardarlo en el documento, como en `recorrer`
+                bloque = bloque.cargar()
+            terminos = terminos_bloque(bloque)
+            self._de_bloque[bloque_id] = terminos
+            for termino in terminos:
+                ids = bloques.get(termino)
+                if ids is None:
+                    bloques[termino] = {bloque_id}
+                    self._vocabulario = None
+                else:
+                    ids.add(bloque_id)
+        return len(self._sucios)
+
+    def bloques(self, termino: str) -> Set[int]:
+        """Ids de los bloques con el término exacto (p. ej. "op:division")."""
+        self.actualizar()
+        return self._bloques.get(termino, set())
+
+    def _con_prefijo(self, prefijo: str) -> Set[int]:
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self._bloques)
+        vocabulario = self._vocabulario
+        ids: Set[int] = set()
+        i = bisect_left(vocabulario, prefijo)
+        while i < len(vocabulario) and vocabulario[i].startswith(prefijo):
+            ids |= self._bloques[vocabulario[i]]
+            i += 1
+        return ids
+
+    def _candidatos(self, palabras: List[str]) -> List[Set[int]]:
+        """Un conjunto de ids por palabra (o par "N cifras") de la consulta."""
+        conjuntos = []
+        i = 0
+        while i < len(palabras):
+            palabra = palabras[i]
+            ultima = i == len(palabras) - 1
+            if palabra[0].isdigit():
+                if i + 1 < len(palabras) and palabras[i + 1] in _CIFRAS:
+                    conjuntos.append(self._bloques.get(f"cifras:{palabra}", set()))
+                    i += 2
+                    continue
+                conjuntos.append(self._bloques.get(f"num:{_numero(palabra)}", set()))
+            else:
+                partes = [self._bloques.get(f"pal:{palabra}", set())]
+                if palabra in _OPERACIONES:
+                    partes.append(self._bloques.get(f"op:{_OPERACIONES[palabra]}", set()))
+                if palabra in _TIPOS:
+                    partes.append(self._bloques.get(f"tipo:{_TIPOS[palabra]}", set()))
+                if ultima:
+                    partes.append(self._con_prefijo(f"pal:{palabra}"))
+                partes = [p for p in partes if p]
+                # Sin copiar cuando la palabra corresponde a un solo término
+                if len(partes) == 1:
+                    conjuntos.append(partes[0])
+                else:
+                    conjuntos.append(set().union(*partes))
+            i += 1
+        return conjuntos
+
+    def buscar(self, consulta: str, limite: Optional[int] = None) -> List[int]:
+        """Ids de los bloques que cumplen toda la consulta, en orden de documento."""
+        self.actualizar()
+        # Los símbolos de operación delante: la última palabra es la que se está escribiendo
+        palabras = [c for c in consulta if c in "+−÷√|"] + _TOKEN.findall(normalizar(consulta))
+        if not palabras:
+            return []
+        conjuntos = sorted(self._candidatos(palabras), key=len)
+        resultado = conjuntos[0].intersection(*conjuntos[1:])
+        posiciones = self._orden()
+        encontrados = sorted(resultado, key=posiciones.__getitem__)
+        return encontrados if limite is None else encontrados[:limite]
+
+    def _orden(self) -> Dict[int, int]:
+        """Posición de cada bloque en el documento (se rehace al cambiar el orden)."""
+        if self._version != self.documento.version:
+            self._posiciones = {b: i for i, b in enumerate(self.documento.ids())}
+            self._version = self.documento.version
+        return self._posiciones
+
+
+def indice_de(documento) -> IndiceBloques:
+    """Devuelve el índice del documento, creándolo si aún no tiene."""
+    if documento.indice is None:
+        IndiceBloques(documento)
+    return documento.indice
+
@@ -1,11 +1,36 @@
+import arranque
+arranque.iniciar()  # antes de cualquier otra importación, para medirlas todas
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
-from bloques import agregar_bloque_texto, mover_botones_abajo
+from bloques import agregar_bloque_texto, deshacer, mover_botones_abajo, pool_de, reemplazar_documento, rehacer
+from archivo_documento import EXTENSION, FormatoInvalido, abrir_documento, guardar_documento, liberar_archivos
+from documento import documento_de
 from submenu import abrir_submenu
-from export_pdf import export_to_pdf  # ✅ Import correcto
+from exportacion_fondo import ExportadorFondo
+from vista_perezosa import VistaPerezosa
+from perfilado import abrir_menu_perfilado, instalar_contador_tcl, medir
+from solucionario import documento_solucionario
+from correccion import Corrector
+from historial import Historial, historial_de
+from autoguardado import ACTIVADO as AUTOGUARDAR, Autoguardado, recuperar
+from busqueda import BarraBusqueda
 
 root = tk.Tk()
 root.title("QuicKual")
+# Con QUICKUAL_PERFIL=1, cuenta las llamadas a Tcl de todos los widgets
+instalar_contador_tcl(root)
+
+# Un bloque dañado de un .qkl salta al leerlo (al desplazarse, buscar, deshacer…)
+_informar_excepcion = root.report_callback_exception
+
+def _excepcion_en_callback(tipo, valor, traza):
+    if isinstance(valor, FormatoInvalido):
+        messagebox.showerror("Error", f"No se pudo leer el documento:\n{valor}")
+    else:
+        _informar_excepcion(tipo, valor, traza)
+
+root.report_callback_exception = _excepcion_en_callback
 
 # --- Maximizar según sistema ---
 window_system = root.tk.call('tk', 'windowingsystem')
@@ -33,6 +58,7 @@ canvas.pack(side="left", fill="both", expand=True)
 scrollable_frame = tk.Frame(canvas, bg="#f0f0f0")
 canvas_window = canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
 
+@medir("main.actualizar_scroll")
 def actualizar_scroll(_=None):
     canvas.update_idletasks()
     canvas.configure(scrollregion=canvas.bbox("all"))
@@ -56,6 +82,28 @@ btn_submenu = tk.Button(
 btn_texto.pack(side="left", padx=5)
 btn_submenu.pack(side="left", padx=5)
 
+# --- Solo se crean los widgets de los bloques cercanos a la zona visible ---
+vista = VistaPerezosa(scrollable_frame, botones_frame, canvas, scrollbar)
+
+# --- Búsqueda de bloques (Ctrl+F) ---
+barra_busqueda = BarraBusqueda(root, scrollable_frame, canvas)
+barra_busqueda.pack(side="top", fill="x", pady=(5, 0), before=main_frame)
+root.bind_all("<Control-f>", lambda e: barra_busqueda.enfocar())
+
+# --- Deshacer / rehacer de bloques y celdas ---
+historial_de(scrollable_frame)
+
+def _deshacer(_=None, rehaciendo=False):
+    # En un bloque de texto, Ctrl+Z es el deshacer del propio Text
+    if isinstance(root.focus_get(), tk.Text):
+        return
+    (rehacer if rehaciendo else deshacer)(scrollable_frame, botones_frame, canvas)
+    return "break"
+
+root.bind_all("<Control-z>", _deshacer)
+root.bind_all("<Control-y>", lambda e: _deshacer(e, rehaciendo=True))
+root.bind_all("<Control-Z>", lambda e: _deshacer(e, rehaciendo=True))
+
 # --- Scroll con rueda del ratón ---
 def _on_mousewheel(event):
     if window_system == 'aqua':
@@ -68,6 +116,27 @@ canvas.bind_all("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))
 canvas.bind_all("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))
 
 # ---- Función para exportar a PDF ----
+exportador = ExportadorFondo(root)
+
+def _progreso_exportacion(bloques_hechos, bloques_total, paginas):
+    estado_label.config(text=f"Exportando… {bloques_hechos}/{bloques_total} bloques, {paginas} páginas")
+
+def _fin_exportacion(archivo_destino):
+    def _on_done(error, cancelado):
+        if not exportador.ocupado:
+            cancel_btn.pack_forget()
+            estado_label.config(text="")
+        if cancelado:
+            return
+        if error is not None:
+            messagebox.showerror("Error", f"Ocurrió un problema al exportar:\n{error}")
+            return
+        messagebox.showinfo(
+            "Exportar a PDF",
+            f"El documento se ha exportado correctamente como:\n{archivo_destino}"
+        )
+    return _on_done
+
 def exportar_pdf():
     """Solicita ruta de destino, pregunta por título opcional y exporta a PDF."""
     archivo_destino = filedialog.asksaveasfilename(
@@ -95,29 +164,199 @@ def exportar_pdf():
             if titulo is not None:
                 titulo = titulo.strip() or None
 
-        # 3) Exportar con el título proporcionado (o sin título si None)
-        export_to_pdf(scrollable_frame, archivo_destino, title=titulo)
-        messagebox.showinfo(
-            "Exportar a PDF",
-            f"El documento se ha exportado correctamente como:\n{archivo_destino}"
+        # 3) Exportar en segundo plano con el título proporcionado (o sin título si None)
+        exportador.exportar(
+            scrollable_frame, archivo_destino, title=titulo,
+            on_progress=_progreso_exportacion,
+            on_done=_fin_exportacion(archivo_destino)
         )
+        cancel_btn.pack(side="left", padx=5)
     except Exception as e:
         messagebox.showerror("Error", f"Ocurrió un problema al exportar:\n{e}")
 
+def exportar_solucionario():
+    """Resuelve todas las tablas del documento y exporta las soluciones a otro PDF."""
+    archivo_destino = filedialog.asksaveasfilename(
+        defaultextension=".pdf",
+        filetypes=[("Archivos PDF", "*.pdf")],
+        title="Guardar solucionario como..."
+    )
+    if not archivo_destino:
+        return
+    try:
+        from export_pdf import document_to_blocks
+        blocks = document_to_blocks(documento_solucionario(documento_de(scrollable_frame)))
+        exportador.exportar(
+            scrollable_frame, archivo_destino, title="Solucionario",
+            on_progress=_progreso_exportacion,
+            on_done=_fin_exportacion(archivo_destino),
+            blocks=blocks
+        )
+        cancel_btn.pack(side="left", padx=5)
+    except Exception as e:
+        messagebox.showerror("Error", f"Ocurrió un problema al exportar:\n{e}")
+
+# ---- Guardar y abrir documentos ----
+def guardar_archivo():
+    """Guarda el documento actual en el formato nativo (.qkl)."""
+    archivo_destino = filedialog.asksaveasfilename(
+        defaultextension=EXTENSION,
+        filetypes=[("Documentos QuicKual", "*" + EXTENSION)],
+        title="Guardar documento como..."
+    )
+    if not archivo_destino:
+        return
+    try:
+        guardar_documento(documento_de(scrollable_frame), archivo_destino)
+    except Exception as e:
+        messagebox.showerror("Error", f"No se pudo guardar el documento:\n{e}")
+
+def abrir_archivo():
+    """Abre un documento .qkl en lugar del actual (los bloques se leen al verse)."""
+    archivo_origen = filedialog.askopenfilename(
+        filetypes=[("Documentos QuicKual", "*" + EXTENSION)],
+        title="Abrir documento"
+    )
+    if not archivo_origen:
+        return
+    if len(documento_de(scrollable_frame)) and not messagebox.askyesno(
+        "Abrir documento", "Se cerrará el documento actual. ¿Continuar?"
+    ):
+        return
+    try:
+        documento = abrir_documento(archivo_origen)
+    except Exception as e:
+        messagebox.showerror("Error", f"No se pudo abrir el documento:\n{e}")
+        return
+    Historial(documento)  # el historial empieza de nuevo con cada documento
+    reemplazar_documento(scrollable_frame, botones_frame, canvas, documento)
+    if autoguardado is not None:
+        autoguardado.documento_nuevo()
+    if corregir_var.get():
+        alternar_correccion()
+    liberar_archivos()  # el documento anterior ya no se usa: se cierra su .qkl
+    _programar_vista_previa()
+
+# ---- Corrección en vivo de las celdas rellenadas ----
+def _mostrar_puntuacion_total(corrector):
+    puntuacion_label.config(text=f"Aciertos: {corrector.correctas}/{corrector.total}"
+                                 f"  Errores: {corrector.incorrectas}")
+
+def alternar_correccion():
+    """Activa o desactiva la corrección de las celdas mientras se escriben."""
+    pool = pool_de(scrollable_frame)
+    if not corregir_var.get():
+        pool.corregir(None)
+        puntuacion_label.config(text="")
+        return
+    corrector = Corrector(documento_de(scrollable_frame))
+    corrector.preparar()
+    corrector.oyentes.append(lambda _bloque_id: _mostrar_puntuacion_total(corrector))
+    pool.corregir(corrector)
+    _mostrar_puntuacion_total(corrector)
+
+# ---- Vista previa del PDF en un panel lateral ----
+vista_previa_var = tk.BooleanVar(value=False)
+panel_vista_previa = None
+
+def _programar_vista_previa(_=None):
+    if vista_previa_var.get():
+        panel_vista_previa.programar()
+
+def alternar_vista_previa():
+    """Muestra u oculta el panel con la vista previa de las páginas del PDF."""
+    global panel_vista_previa
+    if not vista_previa_var.get():
+        panel_vista_previa.pack_forget()
+        return
+    if panel_vista_previa is None:
+        from vista_previa import PanelVistaPrevia  # importa ReportLab: solo al abrirla
+        panel_vista_previa = PanelVistaPrevia(main_frame, scrollable_frame)
+    panel_vista_previa.pack(side="right", fill="y", before=scrollbar)
+    panel_vista_previa.actualizar()
+
+# Cualquier tecla o clic puede cambiar el documento; la vista previa espera a que paren
+root.bind_all("<KeyRelease>", _programar_vista_previa, add="+")
+root.bind_all("<ButtonRelease-1>", _programar_vista_previa, add="+")
+
+# ---- Autoguardado de la sesión y recuperación al arrancar ----
+autoguardado = None
+
+def _ofrecer_recuperacion():
+    """Ofrece recuperar la sesión anterior, si la hay, y empieza a autoguardar."""
+    global autoguardado
+    try:
+        documento = recuperar()
+        autoguardado = Autoguardado(root, scrollable_frame)
+    except OSError:
+        return  # sin carpeta de autoguardado se sigue sin él
+    if documento is not None and len(documento) and messagebox.askyesno(
+        "Recuperar sesión",
+        f"La última sesión tenía {len(documento)} bloques. ¿Recuperarla?"
+    ):
+        Historial(documento)
+        reemplazar_documento(scrollable_frame, botones_frame, canvas, documento)
+        autoguardado.iniciar()
+    else:
+        autoguardado.iniciar(descartar_anterior=True)
+
+if AUTOGUARDAR and not arranque.salir:
+    root.after(200, _ofrecer_recuperacion)  # ya con la ventana dibujada
+
+def _al_cerrar():
+    if autoguardado is not None:
+        autoguardado.cerrar()  # lleva a disco los últimos cambios
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", _al_cerrar)
+
 # ---- Apartado fijo inferior con botón centrado ----
 bottom_frame = tk.Frame(root, bg="#f0f0f0", height=60)
 bottom_frame.pack(side="bottom", fill="x")
 bottom_frame.pack_propagate(False)
 
+export_row = tk.Frame(bottom_frame, bg="#f0f0f0")
+export_row.pack(anchor="center", pady=8)
+
 export_btn = tk.Button(
-    bottom_frame,
+    export_row,
     text="Exportar a PDF",
     font=("Arial", 14),
     padx=20,
     pady=6,
     command=exportar_pdf  # ✅ Llamada a la función
 )
-export_btn.pack(anchor="center", pady=8)
+export_btn.pack(side="left")
+
+tk.Button(export_row, text="Solucionario", font=("Arial", 12), command=exportar_solucionario).pack(side="left", padx=(10, 0))
+tk.Button(export_row, text="Guardar", font=("Arial", 12), command=guardar_archivo).pack(side="left", padx=(10, 0))
+tk.Button(export_row, text="Abrir", font=("Arial", 12), command=abrir_archivo).pack(side="left", padx=5)
+tk.Button(export_row, text="↶", font=("Arial", 12),
+          command=lambda: deshacer(scrollable_frame, botones_frame, canvas)).pack(side="left", padx=(10, 0))
+tk.Button(export_row, text="↷", font=("Arial", 12),
+          command=lambda: rehacer(scrollable_frame, botones_frame, canvas)).pack(side="left")
+
+corregir_var = tk.BooleanVar(value=False)
+tk.Checkbutton(export_row, text="Corregir", font=("Arial", 12), bg="#f0f0f0",
+               variable=corregir_var, command=alternar_correccion).pack(side="left", padx=(10, 0))
+puntuacion_label = tk.Label(export_row, text="", font=("Arial", 11), bg="#f0f0f0")
+puntuacion_label.pack(side="left", padx=5)
+tk.Checkbutton(export_row, text="Vista previa", font=("Arial", 12), bg="#f0f0f0",
+               variable=vista_previa_var, command=alternar_vista_previa).pack(side="left", padx=(10, 0))
+
+# Solo visible mientras hay una exportación en curso
+cancel_btn = tk.Button(
+    export_row, text="Cancelar", font=("Arial", 12),
+    command=lambda: exportador.cancelar()
+)
+estado_label = tk.Label(export_row, text="", font=("Arial", 11), bg="#f0f0f0")
+estado_label.pack(side="right", padx=10)
+
+# Menú oculto de perfilado
+root.bind_all("<Control-Shift-P>", lambda e: abrir_menu_perfilado(root))
+
+# Tiempo hasta el primer dibujo y, después, precarga de la exportación en segundo plano
+arranque.al_primer_dibujo(root)
 
 # ----
 root.mainloop()
\ No newline at end of file
@@ -0,0 +1,329 @@
+"""
+Disposición de las tablas de cada operación, sin Tkinter.
+
+Cada función `plantilla_*` calcula el tamaño de la tabla y las celdas fijas
+(operandos y símbolos, que se muestran bloqueadas) exactamente igual que los
+constructores `dialogs.dibujar_tabla_*`. La usan tanto esos constructores como
+el compilador de fichas por lotes, que no crea ningún widget.
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional, Sequence, Set, Tuple, Union
+
+from division_larga import Escalera, dividir
+from documento import BloqueTabla, Documento, Operacion
+from factorizacion import factorizar
+
+
+class Plantilla:
+    """
+    Tamaño de una tabla, valores de sus celdas fijas, celdas bloqueadas y
+    descriptor de la operación que representa.
+    """
+
+    __slots__ = ("filas", "columnas", "valores", "bloqueadas", "operacion")
+
+    def __init__(self, filas: int, columnas: int) -> None:
+        self.filas = max(0, filas)
+        self.columnas = max(0, columnas)
+        self.valores: Dict[Tuple[int, int], str] = {}
+        self.bloqueadas: Set[Tuple[int, int]] = set()
+        self.operacion: Optional[Operacion] = None
+
+    def etiquetar(self, tipo: str, *operandos) -> "Plantilla":
+        """Fija el descriptor de operación con la forma actual de la tabla."""
+        self.operacion = Operacion(tipo, tuple(str(o) for o in operandos), (self.filas, self.columnas))
+        return self
+
+    def fijar(self, fila: int, col: int, valor: str, bloquear: bool = True) -> None:
+        """Escribe `valor` en la celda (si existe) y opcionalmente la bloquea."""
+        if not (0 <= fila < self.filas and 0 <= col < self.columnas):
+            return
+        if valor:
+            self.valores[(fila, col)] = valor
+        if bloquear:
+            self.bloqueadas.add((fila, col))
+
+    def en_documento(self, documento: Documento) -> BloqueTabla:
+        """Crea en `documento` una tabla con esta disposición y sus valores."""
+        tabla = documento.nueva_tabla(self.filas, self.columnas)
+        for (fila, col), valor in self.valores.items():
+            tabla.set(fila, col, valor)
+        tabla.operacion = self.operacion
+        return tabla
+
+
+# ====
+# Utilidades para + y -
+# ====
+
+
+def _normalize_decimal_input(text: str) -> str:
+    """
+    Normaliza la entrada:
+    - trim
+    - reemplaza ',' por '.'
+    """
+    if text is None:
+        return None
+    text = text.strip()
+    if not text:
+        return None
+    return text.replace(",", ".")
+
+
+def _parse_decimal(text: str) -> Decimal:
+    """Parsea a Decimal tras normalizar. Lanza InvalidOperation si no es válido."""
+    norm = _normalize_decimal_input(text)
+    if norm is None:
+        raise InvalidOperation("Entrada vacía")
+    return Decimal(norm)
+
+
+def _split_parts_for_display(original_text: str) -> tuple[str, str, bool]:
+    """
+    Devuelve (entera, decimal, has_decimal) respetando lo que escribió el usuario.
+    Se usa coma para la visualización.
+    """
+    if original_text is None:
+        return "", "", False
+    txt = original_text.strip()
+    if not txt:
+        return "", "", False
+
+    # Mostrar coma en la UI
+    txt = txt.replace(".", ",")
+
+    if "," in txt:
+        left, right = txt.split(",", 1)
+        # Si left es "" o solo signo, convertimos a ±0
+        if left in ("", "+", "-"):
+            left = f"{'-' if left=='-' else ('+' if left=='+' else '')}0"
+        return left, right, True
+    return txt, "", False
+
+
+def _compute_widths_for_two_numbers(
+    a_ent: str, a_dec: str, a_has_dec: bool, b_ent: str, b_dec: str, b_has_dec: bool
+) -> tuple[int, int, bool]:
+    max_entera = max(len(a_ent), len(b_ent))
+    max_decimal = max(len(a_dec), len(b_dec))
+    show_comma = a_has_dec or b_has_dec
+    return max_entera, max_decimal, show_comma
+
+
+def _colocar_numero(
+    plantilla: Plantilla,
+    fila: int,
+    entera: str,
+    decimal: str,
+    max_entera: int,
+    max_decimal: int,
+    show_comma: bool,
+    has_decimal: bool,
+    start_col: int = 0,
+) -> None:
+    """
+    Coloca un número en la fila `fila` y bloquea las celdas que ocupa.
+
+    Convenciones:
+    - columna `start_col` se reserva para el símbolo de operación (por eso las partes comienzan en start_col + 1).
+    - la parte entera se alinea a la derecha ocupando `max_entera` columnas.
+    - si `show_comma` y `has_decimal` es True, se inserta la coma en la columna correspondiente.
+    - los decimales se colocan a la derecha de la coma hasta `max_decimal` posiciones.
+    """
+    # Normaliza la parte entera mínima
+    ent_str = entera
+    if ent_str in ("", "+", "-"):
+        ent_str = "0" if ent_str == "" else ent_str + "0"
+
+    # Parte entera alineada a la derecha
+    for i in range(max_entera):
+        idx_ent = len(ent_str) - (max_entera - i)
+        ch = ent_str[idx_ent] if 0 <= idx_ent < len(ent_str) else ""
+        plantilla.fijar(fila, start_col + 1 + i, ch)
+
+    # Columna de la coma (si corresponde)
+    comma_col = start_col + 1 + max_entera
+    if show_comma and has_decimal:
+        plantilla.fijar(fila, comma_col, ",")
+
+    # Decimales: a la derecha de la coma (si existe) o a continuación de la parte entera
+    for d in range(max_decimal):
+        if show_comma:
+            col = comma_col + 1 + d
+        else:
+            col = start_col + 1 + max_entera + d
+        ch = decimal[d] if d < len(decimal) else ""
+        plantilla.fijar(fila, col, ch)
+
+
+def _plantilla_addsub(a_text: str, b_text: str, simbolo: str) -> Plantilla:
+    a_ent, a_dec, a_has_dec = _split_parts_for_display(a_text)
+    b_ent, b_dec, b_has_dec = _split_parts_for_display(b_text)
+
+    max_ent, max_dec, show_comma = _compute_widths_for_two_numbers(
+        a_ent, a_dec, a_has_dec, b_ent, b_dec, b_has_dec
+    )
+
+    columnas = 1 + max_ent + (1 if show_comma else 0) + max_dec
+    plantilla = Plantilla(4, columnas)
+
+    # Fila 1: primer operando
+    _colocar_numero(plantilla, 1, a_ent, a_dec, max_ent, max_dec, show_comma, a_has_dec)
+
+    # Fila 2: símbolo y segundo operando, toda la fila bloqueada
+    plantilla.fijar(2, 0, simbolo)
+    _colocar_numero(plantilla, 2, b_ent, b_dec, max_ent, max_dec, show_comma, b_has_dec)
+    for col in range(columnas):
+        plantilla.fijar(2, col, "")
+
+    # Fila 3: vacía (no mostramos resultado)
+    return plantilla
+
+
+# ====
+# Plantillas por operación
+# ====
+
+
+def plantilla_suma(a_text: str, b_text: str) -> Plantilla:
+    """Suma con decimales: 4 filas, sin resultado, fila 2 bloqueada."""
+    return _plantilla_addsub(a_text, b_text, "+").etiquetar("suma", a_text, b_text)
+
+
+def plantilla_resta(a_text: str, b_text: str) -> Plantilla:
+    """Resta con decimales: 4 filas, sin resultado, fila 2 bloqueada."""
+    return _plantilla_addsub(a_text, b_text, "-").etiquetar("resta", a_text, b_text)
+
+
+def plantilla_multiplicacion(a: int, b: int) -> Plantilla:
+    filas = 4
+    if len(str(b)) > 1:
+        filas += len(str(b))
+    columnas = len(str(a * b)) + 1
+    plantilla = Plantilla(filas, columnas)
+
+    a_str = str(a)
+    b_str = str(b)
+
+    start_col_a = columnas - len(a_str)
+    for j in range(columnas):
+        plantilla.fijar(1, j, a_str[j - start_col_a] if j >= start_col_a else "")
+
+    start_col_b = columnas - len(b_str)
+    for j in range(columnas):
+        if j == 0:
+            plantilla.fijar(2, j, "X")
+        else:
+            plantilla.fijar(2, j, b_str[j - start_col_b] if j >= start_col_b else "")
+
+    if len(b_str) > 1:
+        plantilla.fijar(filas - 2, 0, "+")
+    return plantilla.etiquetar("multiplicacion", a, b)
+
+
+# La escalera ocupa unas (2·cifras + 1) × (cifras + 2) celdas y la tabla es
+# densa: con 100 cifras son ~17.000 celdas; con 10^4 serían ~2·10^8
+MAX_CIFRAS_DIVIDENDO = 100
+
+
+def plantilla_division(dividendo: Union[str, int], divisor: Union[str, int], resuelta: bool = False) -> Plantilla:
+    """
+    División larga en escalera (ver `division_larga.Escalera`): dividendo,
+    divisor y signos de las restas bloqueados; productos, restos y cociente
+    vacíos, salvo con `resuelta`. El dividendo puede ser una cadena de
+    cifras (hasta `MAX_CIFRAS_DIVIDENDO`). Lanza ValueError si los operandos
+    no son válidos.
+    """
+    cifras = len(str(dividendo).strip().lstrip("0"))
+    if cifras > MAX_CIFRAS_DIVIDENDO:
+        raise ValueError(
+            f"El dividendo tiene {cifras} cifras; como mucho puede tener {MAX_CIFRAS_DIVIDENDO}"
+        )
+    division = dividir(dividendo, divisor)
+    disposicion = Escalera(division)
+    plantilla = Plantilla(disposicion.filas, disposicion.columnas)
+    for (fila, col), valor in disposicion.fijas.items():
+        plantilla.fijar(fila, col, valor)
+    if resuelta:
+        for (fila, col), valor in disposicion.respuestas.items():
+            plantilla.fijar(fila, col, valor)
+    return plantilla.etiquetar("division", division.dividendo, division.divisor)
+
+
+def contar_filas(numero: int) -> int:
+    """Filas de la tabla de descomposición: una por factor primo más la final."""
+    if numero < 1:
+        return 1
+    return sum(factorizar(numero).values()) + 1
+
+
+def plantilla_factorial(numero: int) -> Plantilla:
+    plantilla = Plantilla(contar_filas(numero), 2)
+    plantilla.fijar(0, 0, str(numero))
+    return plantilla.etiquetar("factorial", numero)
+
+
+def plantilla_raiz(indice: int, radicando: int) -> Plantilla:
+    """La celda (0, 0) lleva el índice; la columna 0 del resto de filas va bloqueada."""
+    filas = contar_filas(radicando)
+    plantilla = Plantilla(filas, 3)
+    plantilla.fijar(0, 0, str(indice))
+    for i in range(1, filas):
+        plantilla.fijar(i, 0, "")
+    plantilla.fijar(0, 1, str(radicando))
+    return plantilla.etiquetar("raiz", indice, radicando)
+
+
+def plantilla_binaria(numero_str: str) -> Plantilla:
+    """Divisiones sucesivas entre 2. Lanza ValueError si `numero_str` no es entero."""
+    valor = int(numero_str)
+    filas = 1
+    while valor > 1:
+        valor //= 2
+        filas += 1
+    columnas = filas
+
+    plantilla = Plantilla(filas, columnas)
+    plantilla.fijar(0, 0, numero_str)
+    plantilla.fijar(0, 1, "2")
+    for i in range(1, filas):
+        plantilla.fijar(i, i + 1, "2")
+    return plantilla.etiquetar("binario", numero_str)
+
+
+# ====
+# Plantilla de un problema por nombre de operación
+# ====
+
+
+def plantilla_problema(operacion: str, operandos: Sequence[str]) -> Plantilla:
+    """
+    Plantilla del problema `operacion` ("suma", "resta", "multiplicacion",
+    "division", "factorial", "raiz" o "binario") con sus operandos como
+    texto. Lanza ValueError si la operación o los operandos no son válidos.
+    """
+    if operacion in ('suma', 'resta'):
+        try:
+            _parse_decimal(operandos[0])
+            _parse_decimal(operandos[1])
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"Operandos no numéricos para '{operacion}': {list(operandos)}")
+        return (plantilla_suma if operacion == 'suma' else plantilla_resta)(*operandos)
+    if operacion == 'binario':
+        return plantilla_binaria(operandos[0])
+    if operacion == 'division':
+        # Cadenas de cifras: el dividendo puede tener miles de cifras
+        return plantilla_division(*operandos)
+
+    valores = [int(o) for o in operandos]
+    if operacion == 'multiplicacion':
+        return plantilla_multiplicacion(*valores)
+    if operacion == 'factorial':
+        return plantilla_factorial(*valores)
+    if operacion == 'raiz':
+        if not valores[0] or not valores[1]:
+            raise ValueError("La raíz necesita índice y radicando distintos de cero")
+        return plantilla_raiz(*valores)
+    raise ValueError(f"Operación desconocida: {operacion!r}")
@@ -0,0 +1,249 @@
+"""
+Instrumentación ligera de los caminos críticos de QuicKual.
+
+Las funciones decoradas con `@medir` (y los tramos `with tramo(...)`) registran
+número de llamadas, tiempo acumulado, percentiles 50/99 y cuántas llamadas a
+Tcl hacen. Mientras el perfilado está desactivado el decorador solo añade una
+comprobación de un booleano por llamada.
+
+Activación:
+- variable de entorno QUICKUAL_PERFIL=1 al arrancar: perfilado activo desde el
+  principio y, además, recuento de llamadas a Tcl (ver `instalar_contador_tcl`);
+- menú oculto de la aplicación (Ctrl+Mayús+P): activar/desactivar, ver la
+  tabla, reiniciar y guardar en JSON.
+
+Al salir, si se midió algo, los resultados se escriben en el JSON indicado por
+QUICKUAL_PERFIL_JSON (por defecto, quickual_perfil.json en la carpeta actual).
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+# Muestras que se guardan por función para calcular percentiles
+MAX_MUESTRAS = 10000
+
+activo = os.environ.get("QUICKUAL_PERFIL", "") not in ("", "0")
+ruta_json = os.environ.get("QUICKUAL_PERFIL_JSON", "quickual_perfil.json")
+
+_lock = threading.Lock()
+_hilo = threading.local()
+_NULO = nullcontext()
+
+
+class _Registro:
+    __slots__ = ("llamadas", "total", "maximo", "tcl", "muestras")
+
+    def __init__(self) -> None:
+        self.llamadas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.tcl = 0
+        self.muestras: deque = deque(maxlen=MAX_MUESTRAS)
+
+
+_registros: Dict[str, _Registro] = {}
+
+
+def _llamadas_tcl() -> int:
+    return getattr(_hilo, "tcl", 0)
+
+
+def _anotar(nombre: str, segundos: float, tcl: int) -> None:
+    with _lock:
+        registro = _registros.get(nombre)
+        if registro is None:
+            registro = _registros[nombre] = _Registro()
+        registro.llamadas += 1
+        registro.total += segundos
+        registro.maximo = max(registro.maximo, segundos)
+        registro.tcl += tcl
+        registro.muestras.append(segundos)
+
+
+class _Tramo:
+    __slots__ = ("nombre", "inicio", "tcl")
+
+    def __init__(self, nombre: str) -> None:
+        self.nombre = nombre
+
+    def __enter__(self) -> "_Tramo":
+        self.tcl = _llamadas_tcl()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        _anotar(self.nombre, time.perf_counter() - self.inicio, _llamadas_tcl() - self.tcl)
+        return False
+
+
+def tramo(nombre: str):
+    """Contexto que mide el bloque de código como una llamada a `nombre`."""
+    return _Tramo(nombre) if activo else _NULO
+
+
+def medir(funcion_o_nombre=None):
+    """
+    Decorador que mide cada llamada. Se usa como `@medir` (nombre
+    módulo.función) o `@medir("nombre")`.
+    """
+    def decorar(funcion: Callable, nombre: Optional[str] = None) -> Callable:
+        nombre = nombre or f"{funcion.__module__}.{funcion.__name__}"
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not activo:
+                return funcion(*args, **kwargs)
+            tcl = _llamadas_tcl()
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                _anotar(nombre, time.perf_counter() - inicio, _llamadas_tcl() - tcl)
+
+        return envoltura
+
+    if callable(funcion_o_nombre):
+        return decorar(funcion_o_nombre)
+    return lambda funcion: decorar(funcion, funcion_o_nombre)
+
+
+# ====
+# Recuento de llamadas a Tcl
+# ====
+
+
+class _TclContado:
+    """Envuelve el intérprete de Tcl de la raíz y cuenta call/eval por hilo."""
+
+    def __init__(self, interprete) -> None:
+        self._interprete = interprete
+
+    def call(self, *args):
+        _hilo.tcl = getattr(_hilo, "tcl", 0) + 1
+        return self._interprete.call(*args)
+
+    def eval(self, script):
+        _hilo.tcl = getattr(_hilo, "tcl", 0) + 1
+        return self._interprete.eval(script)
+
+    def __getattr__(self, nombre):
+        return getattr(self._interprete, nombre)
+
+
+def instalar_contador_tcl(root) -> bool:
+    """
+    Hace que los widgets creados a partir de ahora cuenten sus llamadas a Tcl.
+    Solo se instala si el perfilado está activo al arrancar, porque cada
+    llamada a Tcl pasa a costar una llamada de Python más.
+    """
+    if not activo or isinstance(root.tk, _TclContado):
+        return False
+    root.tk = _TclContado(root.tk)
+    return True
+
+
+# ====
+# Resultados
+# ====
+
+
+def estadisticas() -> Dict[str, Dict[str, Any]]:
+    """{nombre: {llamadas, total_ms, media_ms, p50_ms, p99_ms, max_ms, tcl}}, de más a menos tiempo."""
+    with _lock:
+        copia = [(n, r.llamadas, r.total, r.maximo, r.tcl, sorted(r.muestras)) for n, r in _registros.items()]
+    resultado = {}
+    for nombre, llamadas, total, maximo, tcl, muestras in sorted(copia, key=lambda x: -x[2]):
+        resultado[nombre] = {
+            "llamadas": llamadas,
+            "total_ms": 1000 * total,
+            "media_ms": 1000 * total / llamadas,
+            "p50_ms": 1000 * muestras[len(muestras) // 2],
+            "p99_ms": 1000 * muestras[min(len(muestras) - 1, int(len(muestras) * 0.99))],
+            "max_ms": 1000 * maximo,
+            "tcl": tcl,
+        }
+    return resultado
+
+
+def reiniciar() -> None:
+    with _lock:
+        _registros.clear()
+
+
+def volcar_json(ruta: str) -> None:
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"fecha": time.strftime("%Y-%m-%dT%H:%M:%S"), "funciones": estadisticas()}, f, indent=2)
+
+
+def como_texto() -> str:
+    """Tabla de texto con las estadísticas, para mostrarla o pegarla en un informe."""
+    lineas = [f"{'función':42s} {'llamadas':>8s} {'total ms':>10s} {'p50 ms':>8s} {'p99 ms':>8s} {'tcl':>8s}"]
+    for nombre, e in estadisticas().items():
+        lineas.append(f"{nombre:42s} {e['llamadas']:8d} {e['total_ms']:10.2f} "
+                      f"{e['p50_ms']:8.3f} {e['p99_ms']:8.3f} {e['tcl']:8d}")
+    return "\n".join(lineas)
+
+
+@atexit.register
+def _volcar_al_salir() -> None:
+    if _registros and ruta_json:
+        try:
+            volcar_json(ruta_json)
+        except OSError:
+            pass
+
+
+# ====
+# Menú oculto
+# ====
+
+
+def abrir_menu_perfilado(root) -> None:
+    """Ventana con las estadísticas y los controles del perfilado."""
+    import tkinter as tk
+    from tkinter import filedialog
+
+    ventana = tk.Toplevel(root)
+    ventana.title("QuicKual - Perfilado")
+
+    texto = tk.Text(ventana, width=100, height=25, font=("Courier", 10))
+    texto.pack(fill="both", expand=True, padx=5, pady=5)
+    botones = tk.Frame(ventana)
+    botones.pack(fill="x", pady=5)
+
+    def _refrescar():
+        texto.delete("1.0", "end")
+        estado = "activo" if activo else "desactivado"
+        texto.insert("1.0", f"Perfilado {estado}\n\n{como_texto()}")
+        boton_activar.config(text="Desactivar" if activo else "Activar")
+
+    def _alternar():
+        global activo
+        activo = not activo
+        _refrescar()
+
+    def _reiniciar():
+        reiniciar()
+        _refrescar()
+
+    def _guardar():
+        ruta = filedialog.asksaveasfilename(
+            parent=ventana, defaultextension=".json", filetypes=[("JSON", "*.json")],
+            title="Guardar perfil como..."
+        )
+        if ruta:
+            volcar_json(ruta)
+
+    boton_activar = tk.Button(botones, command=_alternar)
+    boton_activar.pack(side="left", padx=5)
+    tk.Button(botones, text="Actualizar", command=_refrescar).pack(side="left", padx=5)
+    tk.Button(botones, text="Reiniciar", command=_reiniciar).pack(side="left", padx=5)
+    tk.Button(botones, text="Guardar JSON…", command=_guardar).pack(side="left", padx=5)
+    _refrescar()
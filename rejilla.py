@@ -0,0 +1,384 @@
+"""
+Rejilla virtual dibujada sobre un único Canvas.
+
+Sustituye a la rejilla de un `tk.Entry` por celda: las líneas de la tabla, los
+fondos de las celdas bloqueadas y los textos son elementos del Canvas, y solo
+existe un Entry flotante que se coloca encima de la celda que se está editando.
+Los valores y los estilos de celda viven en la `BloqueTabla` del modelo del
+documento, así que la exportación los lee sin tocar la rejilla y la rejilla se
+puede reconstruir desde el modelo.
+
+El coste de crear y redibujar la rejilla crece con filas + columnas + celdas
+con contenido, no con filas * columnas.
+
+Con la corrección en vivo activa (`corrector`, ver `correccion`), cada valor
+escrito se corrige al momento y el fondo de la celda indica si es correcto.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional, Tuple
+
+from documento import BloqueTabla
+
+# Colores por defecto de un Entry deshabilitado en X11
+DISABLED_BG = "#d9d9d9"
+DISABLED_FG = "#a3a3a3"
+LINE_COLOR = "#b0b0b0"
+# Fondo de las celdas corregidas
+CORRECTA_BG = "#d4f5d4"
+INCORRECTA_BG = "#f8d0d0"
+
+_TAG_DIBUJO = "dibujo"
+
+
+class CeldaVirtual:
+    """
+    Celda de la rejilla con la parte de la API de `tk.Entry` que usan los
+    constructores: insert, delete, get, config/configure y cget.
+    """
+
+    __slots__ = ("_rejilla", "fila", "col")
+
+    def __init__(self, rejilla: "RejillaCanvas", fila: int, col: int) -> None:
+        self._rejilla = rejilla
+        self.fila = fila
+        self.col = col
+
+    def get(self) -> str:
+        return self._rejilla.tabla.get(self.fila, self.col)
+
+    def _indice(self, index, valor: str) -> int:
+        if index == "end":
+            return len(valor)
+        return max(0, min(len(valor), int(index)))
+
+    def insert(self, index, texto: str) -> None:
+        # Como un Entry deshabilitado, una celda bloqueada ignora las inserciones
+        if self.cget("state") == "disabled":
+            return
+        valor = self.get()
+        i = self._indice(index, valor)
+        self._rejilla._escribir(self.fila, self.col, valor[:i] + texto + valor[i:])
+
+    def delete(self, first, last=None) -> None:
+        if self.cget("state") == "disabled":
+            return
+        valor = self.get()
+        i = self._indice(first, valor)
+        j = i + 1 if last is None else self._indice(last, valor)
+        self._rejilla._escribir(self.fila, self.col, valor[:i] + valor[j:])
+
+    def config(self, **opciones) -> None:
+        self._rejilla._configurar_celda(self.fila, self.col, opciones)
+
+    configure = config
+
+    def cget(self, opcion: str):
+        return self._rejilla._opcion_celda(self.fila, self.col, opcion)
+
+
+class _Celdas(Mapping):
+    """Mapa perezoso (fila, col) -> CeldaVirtual; no guarda un objeto por celda."""
+
+    def __init__(self, rejilla: "RejillaCanvas") -> None:
+        self._rejilla = rejilla
+
+    def __getitem__(self, clave: Tuple[int, int]) -> CeldaVirtual:
+        fila, col = clave
+        tabla = self._rejilla.tabla
+        if not (0 <= fila < tabla.filas and 0 <= col < tabla.columnas):
+            raise KeyError(clave)
+        return CeldaVirtual(self._rejilla, fila, col)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        tabla = self._rejilla.tabla
+        return ((i, j) for i in range(tabla.filas) for j in range(tabla.columnas))
+
+    def __len__(self) -> int:
+        return self._rejilla.tabla.filas * self._rejilla.tabla.columnas
+
+
+class RejillaCanvas(tk.Canvas):
+    """
+    Tabla editable de `tabla.filas` x `tabla.columnas` celdas sobre un Canvas.
+    `celdas` da acceso a cada celda con la API de un Entry.
+    """
+
+    def __init__(self, master, tabla: BloqueTabla, font_size: int = 16, padding: int = 4,
+                 ancho_min_celda: int = 36) -> None:
+        self.tabla = tabla
+        self.fuente = ("Arial", font_size)
+        self.padding = padding
+        self.ancho_min_celda = ancho_min_celda
+        self.alto_celda = tkfont.Font(master, font=self.fuente).metrics("linespace") + 2 * padding + 4
+        self.ancho_celda = ancho_min_celda
+
+        super().__init__(
+            master, bg="white", highlightthickness=0, bd=0,
+            width=max(1, tabla.columnas) * ancho_min_celda,
+            height=tabla.filas * self.alto_celda + 1,
+        )
+
+        self._textos: Dict[Tuple[int, int], int] = {}
+        self._fondos: Dict[Tuple[int, int], int] = {}
+        # correccion.Corrector activo (lo asigna el pool de bloques)
+        self.corrector = None
+        # historial.Historial del documento, donde se anota lo que se escribe
+        self.historial = None
+
+        self.celdas = _Celdas(self)
+
+        # Editor flotante único
+        self._editor_var = tk.StringVar(self)
+        self._editor = tk.Entry(
+            self, textvariable=self._editor_var, font=self.fuente, justify="center",
+            bd=2, relief="groove"
+        )
+        self._editor_item: Optional[int] = None
+        self._editando: Optional[Tuple[int, int]] = None
+        self._editor_var.trace_add("write", self._on_editor_write)
+        self._editor.bind("<Return>", lambda e: self._mover_editor(0, 1, siguiente=True))
+        self._editor.bind("<Tab>", lambda e: self._mover_editor(0, 1, siguiente=True))
+        self._editor.bind("<Shift-Tab>", lambda e: self._mover_editor(0, -1, siguiente=True))
+        self._editor.bind("<ISO_Left_Tab>", lambda e: self._mover_editor(0, -1, siguiente=True))
+        self._editor.bind("<Up>", lambda e: self._mover_editor(-1, 0))
+        self._editor.bind("<Down>", lambda e: self._mover_editor(1, 0))
+        self._editor.bind("<Escape>", lambda e: self.cerrar_editor())
+        self._editor.bind("<FocusOut>", lambda e: self.cerrar_editor())
+
+        self.bind("<Configure>", self._on_configure)
+        self.bind("<Button-1>", self._on_click)
+        self._dibujar()
+
+    def reiniciar(self, tabla: BloqueTabla, font_size: int = None, padding: int = None) -> None:
+        """
+        Reutiliza la rejilla para mostrar otra tabla: ajusta el tamaño y
+        redibuja con los valores y estilos de `tabla`.
+        """
+        self.cerrar_editor()
+        self.tabla = tabla
+        if padding is not None:
+            self.padding = padding
+        if font_size is not None and ("Arial", font_size) != self.fuente:
+            self.fuente = ("Arial", font_size)
+            self._editor.config(font=self.fuente)
+        self.alto_celda = tkfont.Font(self, font=self.fuente).metrics("linespace") + 2 * self.padding + 4
+
+        columnas = max(1, tabla.columnas)
+        self.ancho_celda = max(self.ancho_min_celda, self.winfo_width() // columnas)
+        self.config(width=columnas * self.ancho_min_celda, height=tabla.filas * self.alto_celda + 1)
+        self._dibujar()
+
+    # ---- Geometría ----
+
+    def _caja(self, fila: int, col: int) -> Tuple[int, int, int, int]:
+        x0 = col * self.ancho_celda
+        y0 = fila * self.alto_celda
+        return x0, y0, x0 + self.ancho_celda, y0 + self.alto_celda
+
+    def celda_en(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        fila = int(y // self.alto_celda)
+        col = int(x // self.ancho_celda)
+        if 0 <= fila < self.tabla.filas and 0 <= col < self.tabla.columnas:
+            return fila, col
+        return None
+
+    # ---- Dibujo ----
+
+    def _dibujar(self) -> None:
+        self.delete(_TAG_DIBUJO)
+        self._textos.clear()
+        self._fondos.clear()
+
+        filas, columnas = self.tabla.filas, self.tabla.columnas
+        ancho = columnas * self.ancho_celda
+        alto = filas * self.alto_celda
+        for i in range(filas + 1):
+            y = min(i * self.alto_celda, alto - 1) if alto else 0
+            self.create_line(0, y, ancho, y, fill=LINE_COLOR, tags=_TAG_DIBUJO)
+        for j in range(columnas + 1):
+            x = min(j * self.ancho_celda, ancho - 1) if ancho else 0
+            self.create_line(x, 0, x, alto, fill=LINE_COLOR, tags=_TAG_DIBUJO)
+
+        for (fila, col) in self.tabla.estilos:
+            self._dibujar_fondo(fila, col)
+        for (fila, col) in self.tabla.marcas:
+            if (fila, col) not in self.tabla.estilos:
+                self._dibujar_fondo(fila, col)
+        cols = columnas
+        for indice, valor in enumerate(self.tabla.celdas):
+            if valor:
+                self._dibujar_texto(indice // cols, indice % cols)
+
+        if self._editando is not None:
+            self._colocar_editor(*self._editando)
+
+    def _dibujar_fondo(self, fila: int, col: int) -> None:
+        item = self._fondos.pop((fila, col), None)
+        if item is not None:
+            self.delete(item)
+        opciones = self.tabla.estilos.get((fila, col), {})
+        if opciones.get("state") == "disabled":
+            fondo = opciones.get("disabledbackground", DISABLED_BG)
+        else:
+            fondo = self._color_marca(fila, col) or opciones.get("background")
+        if not fondo:
+            return
+        x0, y0, x1, y1 = self._caja(fila, col)
+        item = self.create_rectangle(x0 + 1, y0 + 1, x1 - 1, y1 - 1, fill=fondo, outline="",
+                                     tags=_TAG_DIBUJO)
+        self.tag_lower(item)
+        self._fondos[(fila, col)] = item
+
+    def _dibujar_texto(self, fila: int, col: int) -> None:
+        item = self._textos.pop((fila, col), None)
+        if item is not None:
+            self.delete(item)
+        valor = self.tabla.get(fila, col)
+        if not valor or self._editando == (fila, col):
+            return
+        opciones = self.tabla.estilos.get((fila, col), {})
+        if opciones.get("state") == "disabled":
+            color = opciones.get("disabledforeground", DISABLED_FG)
+        else:
+            color = opciones.get("foreground", "black")
+        x0, y0, x1, y1 = self._caja(fila, col)
+        if opciones.get("anchor") == "ne":
+            x, y, anchor = x1 - self.padding, y0 + self.padding, "ne"
+        else:
+            x, y, anchor = (x0 + x1) / 2, (y0 + y1) / 2, "center"
+        self._textos[(fila, col)] = self.create_text(
+            x, y, text=valor, font=self.fuente, fill=color, anchor=anchor, tags=_TAG_DIBUJO
+        )
+
+    def _color_marca(self, fila: int, col: int) -> Optional[str]:
+        if self.corrector is None:
+            return None
+        marca = self.tabla.marcas.get((fila, col))
+        if marca is None:
+            return None
+        return CORRECTA_BG if marca else INCORRECTA_BG
+
+    def _on_configure(self, event) -> None:
+        columnas = max(1, self.tabla.columnas)
+        ancho = max(self.ancho_min_celda, event.width // columnas)
+        if ancho != self.ancho_celda:
+            self.ancho_celda = ancho
+            self._dibujar()
+
+    # ---- Modelo ----
+
+    def _escribir(self, fila: int, col: int, valor: str) -> None:
+        self.tabla.set(fila, col, valor)
+        if self._editando == (fila, col):
+            if self._editor_var.get() != valor:
+                self._editor_var.set(valor)
+        else:
+            self._dibujar_texto(fila, col)
+            if self.corrector is not None:
+                self.corrector.anotar(self.tabla, fila, col, valor, preparar=False)
+                self._dibujar_fondo(fila, col)
+
+    def _corregir_editor(self, fila: int, col: int, valor: str) -> None:
+        """Corrige el valor del editor y solo cambia su color si cambia la marca."""
+        anterior = self.tabla.marcas.get((fila, col))
+        if self.corrector.anotar(self.tabla, fila, col, valor) is not anterior:
+            self._editor.config(bg=self._color_marca(fila, col) or "white")
+
+    def _configurar_celda(self, fila: int, col: int, opciones: Dict[str, str]) -> None:
+        if "bg" in opciones:
+            opciones["background"] = opciones.pop("bg")
+        if "fg" in opciones:
+            opciones["foreground"] = opciones.pop("fg")
+        actuales = self.tabla.estilos.setdefault((fila, col), {})
+        actuales.update(opciones)
+        if actuales.get("state") == "disabled" and self._editando == (fila, col):
+            self.cerrar_editor()
+        self._dibujar_fondo(fila, col)
+        self._dibujar_texto(fila, col)
+
+    def _opcion_celda(self, fila: int, col: int, opcion: str):
+        valor = self.tabla.estilos.get((fila, col), {}).get(opcion)
+        if valor is None and opcion == "state":
+            return "normal"
+        return valor
+
+    def editable(self, fila: int, col: int) -> bool:
+        return self._opcion_celda(fila, col, "state") != "disabled"
+
+    # ---- Editor flotante ----
+
+    def _on_click(self, event) -> None:
+        celda = self.celda_en(event.x, event.y)
+        if celda is not None and self.editable(*celda):
+            self.abrir_editor(*celda)
+
+    def _colocar_editor(self, fila: int, col: int) -> None:
+        x0, y0, _, _ = self._caja(fila, col)
+        if self._editor_item is None:
+            self._editor_item = self.create_window(
+                x0, y0, window=self._editor, anchor="nw",
+                width=self.ancho_celda, height=self.alto_celda
+            )
+        else:
+            self.coords(self._editor_item, x0, y0)
+            self.itemconfig(self._editor_item, width=self.ancho_celda, height=self.alto_celda,
+                            state="normal")
+
+    def abrir_editor(self, fila: int, col: int) -> None:
+        """Coloca el Entry flotante sobre la celda y le da el foco."""
+        if self._editando is not None:
+            self.cerrar_editor()
+        self._editando = (fila, col)
+        self._editor.config(bg=self._color_marca(fila, col) or "white")
+        self._editor_var.set(self.tabla.get(fila, col))
+        self._dibujar_texto(fila, col)  # oculta el texto bajo el editor
+        self._colocar_editor(fila, col)
+        self._editor.focus_set()
+        self._editor.icursor("end")
+
+    def cerrar_editor(self) -> None:
+        """Oculta el editor y vuelve a dibujar el valor de la celda editada."""
+        if self._editando is None:
+            return
+        fila, col = self._editando
+        self._editando = None
+        if self.historial is not None:
+            self.historial.cortar()
+        if self._editor_item is not None:
+            self.itemconfig(self._editor_item, state="hidden")
+        if self.corrector is not None:
+            self._dibujar_fondo(fila, col)
+        self._dibujar_texto(fila, col)
+
+    def _on_editor_write(self, *_) -> None:
+        if self._editando is not None:
+            fila, col = self._editando
+            valor = self._editor_var.get()
+            if self.historial is not None:
+                self.historial.celda(self.tabla, fila, col, self.tabla.get(fila, col), valor)
+            self.tabla.set(fila, col, valor)
+            if self.corrector is not None:
+                self._corregir_editor(fila, col, valor)
+
+    def _mover_editor(self, d_fila: int, d_col: int, siguiente: bool = False) -> str:
+        """Lleva el editor a la siguiente celda editable en la dirección indicada."""
+        if self._editando is None:
+            return "break"
+        filas, columnas = self.tabla.filas, self.tabla.columnas
+        fila, col = self._editando
+        for _ in range(filas * columnas):
+            fila, col = fila + d_fila, col + d_col
+            if siguiente and col >= columnas:
+                fila, col = fila + 1, 0
+            elif siguiente and col < 0:
+                fila, col = fila - 1, columnas - 1
+            if not (0 <= fila < filas and 0 <= col < columnas):
+                break
+            if self.editable(fila, col):
+                self.abrir_editor(fila, col)
+                return "break"
+        self.cerrar_editor()
+        return "break"
@@ -0,0 +1,367 @@
+"""
+Servicio HTTP local que genera fichas PDF bajo demanda (solo biblioteca estándar).
+
+Recibe especificaciones de fichas en el mismo JSON que `compilar_fichas` y
+devuelve el PDF, maquetado con los estilos de `export_pdf` en un pool de
+procesos que arrancan ya calientes: cada trabajador importa ReportLab y
+maqueta una ficha de prueba antes de aceptar trabajo. El bucle de asyncio solo
+lee peticiones, consulta la caché y espera al pool, así que nunca se bloquea
+maquetando.
+
+Las especificaciones idénticas (mismo JSON, en cualquier orden de claves, y
+misma variante) comparten resultado: se identifican por el SHA-256 del JSON
+canónico, se guardan en una caché LRU acotada en bytes y, si llegan mientras
+la primera sigue en el pool, esperan a esa misma maquetación.
+
+Rutas:
+    POST /fichas[?variante=N]  cuerpo JSON -> application/pdf
+                               (cabeceras ETag y X-Cache: hit, compartida o miss)
+    GET  /metricas             JSON con cola, caché y latencias (p50/p95/p99)
+    GET  /salud                "ok"
+
+Con más de `--cola` fichas esperando al pool se responde 503 en lugar de
+encolar sin límite. Errores de la especificación: 400 con el motivo.
+
+Uso:
+    python servidor_fichas.py [--puerto 8765] [-j 4] [--cache-mb 256]
+    curl --data @ficha.json http://127.0.0.1:8765/fichas -o ficha.pdf
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+MAX_CUERPO = 4 * 1024 * 1024
+MAX_COLA = 256
+CACHE_BYTES = 256 * 1024 * 1024
+MUESTRAS_LATENCIA = 2048
+
+_RAZONES = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+# ====
+# Trabajadores del pool
+# ====
+
+
+def _calentar() -> None:
+    """Inicializador de cada trabajador: importa ReportLab y maqueta una ficha pequeña."""
+    _renderizar({'title': "Prueba", 'problems': [{'operation': 'suma', 'operands': ['12', '3']}]}, None)
+
+
+def _renderizar(datos, variante: Optional[int]) -> Tuple[bytes, int, float]:
+    """Maqueta la ficha en memoria. Devuelve (pdf, problemas, segundos)."""
+    from compilar_fichas import construir_documento, interpretar_especificacion
+    from export_pdf import document_to_blocks, export_blocks_to_pdf
+
+    inicio = time.perf_counter()
+    titulo, entradas = interpretar_especificacion(datos)
+    documento, problemas = construir_documento(entradas, variante)
+    salida = io.BytesIO()
+    export_blocks_to_pdf(document_to_blocks(documento), salida, title=titulo)
+    return salida.getvalue(), problemas, time.perf_counter() - inicio
+
+
+def _pid() -> int:
+    return os.getpid()
+
+
+# ====
+# Caché y métricas
+# ====
+
+
+def clave_especificacion(datos, variante: Optional[int]) -> str:
+    """SHA-256 del JSON canónico de la especificación y la variante."""
+    canonico = json.dumps([datos, variante], sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+class CachePDF:
+    """LRU de PDFs por clave, acotada por el total de bytes."""
+
+    __slots__ = ("max_bytes", "bytes", "_pdfs")
+
+    def __init__(self, max_bytes: int = CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._pdfs: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._pdfs)
+
+    def get(self, clave: str) -> Optional[bytes]:
+        pdf = self._pdfs.get(clave)
+        if pdf is not None:
+            self._pdfs.move_to_end(clave)
+        return pdf
+
+    def put(self, clave: str, pdf: bytes) -> None:
+        if len(pdf) > self.max_bytes:
+            return
+        anterior = self._pdfs.pop(clave, None)
+        if anterior is not None:
+            self.bytes -= len(anterior)
+        self._pdfs[clave] = pdf
+        self.bytes += len(pdf)
+        while self.bytes > self.max_bytes:
+            _, viejo = self._pdfs.popitem(last=False)
+            self.bytes -= len(viejo)
+
+
+def _percentiles(muestras: Deque[float]) -> Dict[str, float]:
+    if not muestras:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    orden = sorted(muestras)
+    n = len(orden)
+
+    def _p(q: float) -> float:
+        return round(1000 * orden[min(n - 1, int(q * n))], 3)
+
+    return {'p50_ms': _p(0.50), 'p95_ms': _p(0.95), 'p99_ms': _p(0.99), 'max_ms': round(1000 * orden[-1], 3)}
+
+
+# ====
+# Servidor
+# ====
+
+
+class ServidorFichas:
+    """
+    Servidor HTTP/1.1 (con keep-alive) sobre asyncio. `iniciar` arranca y
+    calienta el pool y abre el puerto; `cerrar` lo detiene todo.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", puerto: int = 8765, trabajadores: int = None,
+                 max_cola: int = MAX_COLA, cache_bytes: int = CACHE_BYTES) -> None:
+        self.host = host
+        self.puerto = puerto
+        self.trabajadores = max(1, trabajadores or os.cpu_count() or 1)
+        self.max_cola = max_cola
+        self.cache = CachePDF(cache_bytes)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        # Maquetaciones en curso por clave, para compartirlas
+        self._en_curso: Dict[str, asyncio.Future] = {}
+        self.en_cola = 0
+        self.contadores = {'peticiones': 0, 'fichas': 0, 'hit': 0, 'compartida': 0, 'miss': 0,
+                           'rechazadas': 0, 'errores': 0}
+        self._latencia_peticion: Deque[float] = deque(maxlen=MUESTRAS_LATENCIA)
+        self._latencia_espera: Deque[float] = deque(maxlen=MUESTRAS_LATENCIA)
+        self._latencia_maquetar: Deque[float] = deque(maxlen=MUESTRAS_LATENCIA)
+        self._inicio = time.monotonic()
+
+    async def iniciar(self) -> None:
+        self._pool = ProcessPoolExecutor(max_workers=self.trabajadores, initializer=_calentar)
+        bucle = asyncio.get_running_loop()
+        # Un encargo por trabajador a la vez: el pool arranca todos los procesos
+        # y no se abre el puerto hasta que han terminado de calentarse
+        await asyncio.gather(*(bucle.run_in_executor(self._pool, _pid) for _ in range(self.trabajadores)))
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+
+    async def servir(self) -> None:
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    async def cerrar(self) -> None:
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    # -- Fichas --
+
+    async def ficha(self, datos, variante: Optional[int] = None) -> Tuple[bytes, str, str]:
+        """
+        PDF de la especificación: (pdf, clave, origen) con origen "hit",
+        "compartida" o "miss". Lanza ValueError si la especificación no es
+        válida y OverflowError si la cola del pool está llena.
+        """
+        clave = clave_especificacion(datos, variante)
+        pdf = self.cache.get(clave)
+        if pdf is not None:
+            self.contadores['hit'] += 1
+            return pdf, clave, "hit"
+        futuro = self._en_curso.get(clave)
+        if futuro is not None:
+            self.contadores['compartida'] += 1
+            return await asyncio.shield(futuro), clave, "compartida"
+        if self.en_cola >= self.max_cola:
+            self.contadores['rechazadas'] += 1
+            raise OverflowError("Demasiadas fichas en cola")
+
+        self.contadores['miss'] += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_curso[clave] = futuro
+        self.en_cola += 1
+        encolada = time.perf_counter()
+        try:
+            pdf, _, segundos = await asyncio.get_running_loop().run_in_executor(
+                self._pool, _renderizar, datos, variante)
+        except BaseException as e:
+            futuro.set_exception(e)
+            # Nadie más la espera: que asyncio no avise de una excepción sin recoger
+            futuro.exception()
+            raise
+        finally:
+            self.en_cola -= 1
+            del self._en_curso[clave]
+        self._latencia_maquetar.append(segundos)
+        self._latencia_espera.append(max(0.0, time.perf_counter() - encolada - segundos))
+        self.cache.put(clave, pdf)
+        futuro.set_result(pdf)
+        return pdf, clave, "miss"
+
+    def metricas(self) -> dict:
+        return {
+            'activo_s': round(time.monotonic() - self._inicio, 3),
+            'trabajadores': self.trabajadores,
+            'cola': {'en_cola': self.en_cola, 'maxima': self.max_cola, 'distintas_en_curso': len(self._en_curso)},
+            'cache': {'fichas': len(self.cache), 'bytes': self.cache.bytes, 'max_bytes': self.cache.max_bytes},
+            'contadores': dict(self.contadores),
+            'latencia': {
+                'peticion': _percentiles(self._latencia_peticion),
+                'espera_pool': _percentiles(self._latencia_espera),
+                'maquetar': _percentiles(self._latencia_maquetar),
+            },
+        }
+
+    # -- HTTP --
+
+    async def _atender(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    linea = await lector.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not linea.strip():
+                    break
+                inicio = time.perf_counter()
+                estado, cabeceras, cuerpo, seguir = await self._peticion(linea, lector)
+                self.contadores['peticiones'] += 1
+                if estado >= 500 and estado != 503:
+                    self.contadores['errores'] += 1
+                cabeceras['Content-Length'] = str(len(cuerpo))
+                cabeceras['Connection'] = 'keep-alive' if seguir else 'close'
+                cabecera = f"HTTP/1.1 {estado} {_RAZONES.get(estado, '')}\r\n" + "".join(
+                    f"{k}: {v}\r\n" for k, v in cabeceras.items()) + "\r\n"
+                escritor.write(cabecera.encode('latin-1') + cuerpo)
+                await escritor.drain()
+                self._latencia_peticion.append(time.perf_counter() - inicio)
+                if not seguir:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _peticion(self, linea: bytes, lector: asyncio.StreamReader) -> Tuple[int, dict, bytes, bool]:
+        """Lee el resto de la petición y la atiende: (estado, cabeceras, cuerpo, keep-alive)."""
+        try:
+            metodo, objetivo, version = linea.decode('latin-1').split()
+        except ValueError:
+            return _texto(400, "Línea de petición no válida") + (False,)
+        cabeceras = {}
+        while True:
+            h = await lector.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = h.decode('latin-1').partition(':')
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        seguir = (cabeceras.get('connection', '').lower() != 'close') and version == "HTTP/1.1"
+
+        cuerpo = b""
+        if 'content-length' in cabeceras:
+            try:
+                largo = int(cabeceras['content-length'])
+            except ValueError:
+                return _texto(400, "Content-Length no válido") + (False,)
+            if largo > MAX_CUERPO:
+                return _texto(413, f"Especificación de más de {MAX_CUERPO} bytes") + (False,)
+            cuerpo = await lector.readexactly(largo)
+        elif metodo == "POST":
+            return _texto(411, "Falta Content-Length") + (False,)
+
+        url = urlsplit(objetivo)
+        if url.path == "/salud":
+            return _texto(200, "ok") + (seguir,)
+        if url.path == "/metricas":
+            if metodo != "GET":
+                return _texto(405, "Usa GET") + (seguir,)
+            return (200, {'Content-Type': 'application/json'},
+                    json.dumps(self.metricas(), indent=2).encode('utf-8'), seguir)
+        if url.path != "/fichas":
+            return _texto(404, "Rutas: POST /fichas, GET /metricas, GET /salud") + (seguir,)
+        if metodo != "POST":
+            return _texto(405, "Usa POST con la especificación JSON") + (seguir,)
+
+        try:
+            datos = json.loads(cuerpo)
+            variante = parse_qs(url.query).get('variante', [None])[0]
+            variante = None if variante is None else int(variante)
+        except ValueError as e:
+            return _texto(400, f"JSON o variante no válidos: {e}") + (seguir,)
+        try:
+            pdf, clave, origen = await self.ficha(datos, variante)
+        except ValueError as e:
+            return _texto(400, str(e)) + (seguir,)
+        except OverflowError as e:
+            return _texto(503, str(e)) + (seguir,)
+        except Exception as e:
+            return _texto(500, f"{type(e).__name__}: {e}") + (seguir,)
+        self.contadores['fichas'] += 1
+        return (200, {'Content-Type': 'application/pdf', 'ETag': f'"{clave}"', 'X-Cache': origen},
+                pdf, seguir)
+
+
+def _texto(estado: int, mensaje: str) -> Tuple[int, dict, bytes]:
+    return estado, {'Content-Type': 'text/plain; charset=utf-8'}, (mensaje + "\n").encode('utf-8')
+
+
+async def _principal(args) -> None:
+    servidor = ServidorFichas(args.host, args.puerto, args.jobs, args.cola, args.cache_mb * 1024 * 1024)
+    inicio = time.perf_counter()
+    await servidor.iniciar()
+    print(f"{servidor.trabajadores} trabajadores listos en {time.perf_counter() - inicio:.2f} s; "
+          f"escuchando en http://{servidor.host}:{servidor.puerto}/fichas", flush=True)
+    try:
+        await servidor.servir()
+    finally:
+        await servidor.cerrar()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de fichas PDF de QuicKual.")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help="Procesos de maquetación (por defecto, todos los núcleos)")
+    parser.add_argument('--cola', type=int, default=MAX_COLA,
+                        help="Fichas distintas esperando al pool antes de responder 503")
+    parser.add_argument('--cache-mb', type=int, default=CACHE_BYTES // (1024 * 1024))
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_principal(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+Solucionario: resuelve todas las tablas de un documento y genera su PDF aparte.
+
+Las tablas se crean sin resultado (ver `operaciones.plantilla_*`); aquí se
+rellenan las celdas vacías con la solución completa: resultado y llevadas de
+sumas y restas, productos parciales de la multiplicación, productos, restos y
+cociente de la división larga, descomposición en primos, extracción de la raíz y
+cifras del binario.
+
+Los problemas se agrupan por tipo de operación (según su descriptor
+`documento.Operacion`) y cada grupo se resuelve en una sola pasada sobre
+listas: primero todos los resultados del grupo, después la colocación en las
+celdas. Las factorizaciones de números repetidos se calculan una sola vez.
+Las tablas sin descriptor no se pueden resolver y se indican como tales.
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from division_larga import Escalera, dividir
+from documento import BloqueTabla, Documento
+from factorizacion import descomposicion, factorizar
+from operaciones import _compute_widths_for_two_numbers, _parse_decimal, _split_parts_for_display
+
+# Celdas de la solución de una tabla y, opcionalmente, una línea de resultado
+Solucion = Tuple[Dict[Tuple[int, int], str], Optional[str]]
+
+
+def _derecha(celdas: Dict[Tuple[int, int], str], fila: int, ultima_col: int, texto: str) -> None:
+    """Escribe `texto` en `fila` alineado a la derecha, terminando en `ultima_col`."""
+    for j, ch in enumerate(reversed(texto)):
+        if ultima_col - j < 0:
+            break
+        celdas[(fila, ultima_col - j)] = ch
+
+
+# ====
+# Resolvedores por tipo de operación (reciben todas las tablas del tipo)
+# ====
+
+
+def _resolver_suma_resta(tablas: List[BloqueTabla]) -> List[Solucion]:
+    operandos = [t.operacion.operandos for t in tablas]
+    a = [_parse_decimal(o[0]) for o in operandos]
+    b = [_parse_decimal(o[1]) for o in operandos]
+    resultados = [x + y if t.operacion.tipo == "suma" else x - y for t, x, y in zip(tablas, a, b)]
+
+    soluciones = []
+    for tabla, (a_text, b_text), x, y, r in zip(tablas, operandos, a, b, resultados):
+        a_ent, a_dec, a_has_dec = _split_parts_for_display(a_text)
+        b_ent, b_dec, b_has_dec = _split_parts_for_display(b_text)
+        max_ent, max_dec, show_comma = _compute_widths_for_two_numbers(
+            a_ent, a_dec, a_has_dec, b_ent, b_dec, b_has_dec
+        )
+        ultima = tabla.columnas - 1
+        celdas: Dict[Tuple[int, int], str] = {}
+
+        # Fila 3: resultado con tantos decimales como el operando más largo
+        texto = format(r.quantize(Decimal(1).scaleb(-max_dec)), "f")
+        entera, _, decimal = texto.partition(".")
+        _derecha(celdas, 3, max_ent, entera)
+        if max_dec:
+            comma_col = 1 + max_ent
+            if show_comma:
+                celdas[(3, comma_col)] = ","
+                comma_col += 1
+            for d, ch in enumerate(decimal):
+                celdas[(3, comma_col + d)] = ch
+
+        # Fila 0: llevadas de la suma de dos números no negativos
+        if tabla.operacion.tipo == "suma" and x >= 0 and y >= 0:
+            escala = Decimal(1).scaleb(max_dec)
+            xa, ya = int(x * escala), int(y * escala)
+            llevada, posicion = 0, 0
+            while xa or ya:
+                llevada = (xa % 10 + ya % 10 + llevada) // 10
+                xa //= 10
+                ya //= 10
+                posicion += 1
+                if llevada:
+                    col = ultima - posicion if posicion < max_dec else max_ent - (posicion - max_dec)
+                    if col >= 0:
+                        celdas[(0, col)] = "1"
+        soluciones.append((celdas, None))
+    return soluciones
+
+
+def _resolver_multiplicacion(tablas: List[BloqueTabla]) -> List[Solucion]:
+    pares = [(int(t.operacion.operandos[0]), int(t.operacion.operandos[1])) for t in tablas]
+    productos = [a * b for a, b in pares]
+    parciales = [[a * int(d) for d in reversed(str(abs(b)))] for a, b in pares]
+
+    soluciones = []
+    for tabla, (a, b), producto, filas_parciales in zip(tablas, pares, productos, parciales):
+        celdas: Dict[Tuple[int, int], str] = {}
+        ultima = tabla.columnas - 1
+        if len(str(b)) > 1:
+            # Un producto parcial por cifra del multiplicador, desplazado una columna
+            for k, parcial in enumerate(filas_parciales):
+                _derecha(celdas, 3 + k, ultima - k, str(parcial))
+        _derecha(celdas, tabla.filas - 1, ultima, str(producto))
+        soluciones.append((celdas, f"{a} × {b} = {producto}"))
+    return soluciones
+
+
+def _pasos_division(dividendo: int, divisor: int) -> List[int]:
+    """Restos parciales con la cifra siguiente bajada; el último es el resto final."""
+    cifras = str(dividendo)
+    m = len(str(divisor))
+    tomadas = m if int(cifras[:m]) >= divisor else m + 1
+    parcial = int(cifras[:tomadas])
+    pasos = []
+    for cifra in cifras[tomadas:]:
+        parcial = (parcial % divisor) * 10 + int(cifra)
+        pasos.append(parcial)
+    pasos.append(parcial % divisor)
+    return pasos
+
+
+def _resolver_division(tablas: List[BloqueTabla]) -> List[Solucion]:
+    soluciones = []
+    for tabla in tablas:
+        dividendo, divisor = tabla.operacion.operandos
+        if tabla.columnas == 2:
+            soluciones.append(_resolver_division_antigua(tabla, int(dividendo), int(divisor)))
+            continue
+        # Escalera de division_larga: una sola pasada por las cifras del dividendo
+        division = dividir(dividendo, divisor)
+        soluciones.append((Escalera(division).respuestas,
+                           f"{division.dividendo} : {division.divisor} = {division.cociente}, resto {division.resto}"))
+    return soluciones
+
+
+def _resolver_division_antigua(tabla: BloqueTabla, dividendo: int, divisor: int) -> Solucion:
+    """Tablas de dos columnas de versiones anteriores: restos parciales y cociente."""
+    if divisor <= 0 or dividendo < 0:
+        return {}, "Sin solución: el divisor debe ser positivo y el dividendo no negativo"
+    cociente, resto = divmod(dividendo, divisor)
+    celdas: Dict[Tuple[int, int], str] = {}
+    if dividendo >= divisor:
+        for i, paso in enumerate(_pasos_division(dividendo, divisor), start=1):
+            celdas[(i, 0)] = str(paso)
+        celdas[(1, 1)] = str(cociente)
+    return celdas, f"{dividendo} : {divisor} = {cociente}, resto {resto}"
+
+
+def _descomposiciones(numeros: List[int]) -> Dict[int, List[int]]:
+    """Factorización de cada número distinto, una sola vez."""
+    return {n: descomposicion(n) for n in set(numeros)}
+
+
+def _columnas_factores(celdas, numero: int, primos: List[int], col: int) -> None:
+    """Columna de cocientes en `col` y de primos en `col + 1`, como en la tabla de descomposición."""
+    for i, p in enumerate(primos):
+        celdas[(i, col)] = str(numero)
+        celdas[(i, col + 1)] = str(p)
+        numero //= p
+    celdas[(len(primos), col)] = str(numero)
+
+
+def _resolver_factorial(tablas: List[BloqueTabla]) -> List[Solucion]:
+    numeros = [int(t.operacion.operandos[0]) for t in tablas]
+    factores = _descomposiciones(numeros)
+
+    soluciones = []
+    for numero in numeros:
+        celdas: Dict[Tuple[int, int], str] = {}
+        primos = factores[numero]
+        if numero >= 2:
+            _columnas_factores(celdas, numero, primos, 0)
+        potencias = " · ".join(f"{p}^{e}" if e > 1 else str(p) for p, e in factorizar(numero).items())
+        soluciones.append((celdas, f"{numero} = {potencias}" if potencias else None))
+    return soluciones
+
+
+def _resolver_raiz(tablas: List[BloqueTabla]) -> List[Solucion]:
+    pares = [(int(t.operacion.operandos[0]), int(t.operacion.operandos[1])) for t in tablas]
+    factores = _descomposiciones([r for _, r in pares])
+
+    soluciones = []
+    for indice, radicando in pares:
+        celdas: Dict[Tuple[int, int], str] = {}
+        if radicando >= 2:
+            _columnas_factores(celdas, radicando, factores[radicando], 1)
+
+        # Extraer de la raíz los factores con exponente >= índice
+        fuera, dentro = 1, 1
+        if indice > 0:
+            for p, e in factorizar(radicando).items():
+                fuera *= p ** (e // indice)
+                dentro *= p ** (e % indice)
+        simbolo = "√" if indice == 2 else f"{indice}√"
+        if indice <= 0 or radicando < 1:
+            resultado = None
+        elif dentro == 1:
+            resultado = f"{simbolo}{radicando} = {fuera}"
+        elif fuera == 1:
+            resultado = f"{simbolo}{radicando} no tiene factores que extraer"
+        else:
+            resultado = f"{simbolo}{radicando} = {fuera}·{simbolo}{dentro}"
+        soluciones.append((celdas, resultado))
+    return soluciones
+
+
+def _resolver_binario(tablas: List[BloqueTabla]) -> List[Solucion]:
+    numeros = [int(t.operacion.operandos[0]) for t in tablas]
+
+    soluciones = []
+    for numero in numeros:
+        celdas: Dict[Tuple[int, int], str] = {}
+        # Fila i: resto de la división i en la columna i-1 y cociente en la columna i
+        valor, fila = numero, 1
+        while valor > 1:
+            celdas[(fila, fila - 1)] = str(valor % 2)
+            valor //= 2
+            celdas[(fila, fila)] = str(valor)
+            fila += 1
+        soluciones.append((celdas, f"{numero} = {format(numero, 'b')} en binario" if numero >= 0 else None))
+    return soluciones
+
+
+RESOLVEDORES = {
+    "suma": _resolver_suma_resta,
+    "resta": _resolver_suma_resta,
+    "multiplicacion": _resolver_multiplicacion,
+    "division": _resolver_division,
+    "factorial": _resolver_factorial,
+    "raiz": _resolver_raiz,
+    "binario": _resolver_binario,
+}
+
+
+# ====
+# Documento y PDF del solucionario
+# ====
+
+
+def resolver(documento: Documento) -> Dict[int, Optional[Solucion]]:
+    """
+    Resuelve todas las tablas del documento. Devuelve {id de tabla: solución},
+    con None para las tablas que no se pueden resolver (sin descriptor o con
+    operandos no válidos).
+    """
+    return resolver_tablas(bloque for bloque in documento if bloque.tipo == "table")
+
+
+def resolver_tablas(tablas: Iterable[BloqueTabla]) -> Dict[int, Optional[Solucion]]:
+    """Como `resolver`, pero solo para las tablas indicadas."""
+    grupos: Dict[str, List[BloqueTabla]] = {}
+    soluciones: Dict[int, Optional[Solucion]] = {}
+    for bloque in tablas:
+        operacion = bloque.operacion
+        if operacion is None or operacion.tipo not in RESOLVEDORES \
+                or operacion.forma != (bloque.filas, bloque.columnas):
+            soluciones[bloque.id] = None
+            continue
+        grupos.setdefault(RESOLVEDORES[operacion.tipo], []).append(bloque)
+
+    for resolvedor, grupo in grupos.items():
+        try:
+            resultados = resolvedor(grupo)
+        except (ValueError, InvalidOperation, ZeroDivisionError):
+            # Algún operando no válido: se resuelven una a una para aislarlo
+            resultados = []
+            for tabla in grupo:
+                try:
+                    resultados.extend(resolvedor([tabla]))
+                except (ValueError, InvalidOperation, ZeroDivisionError):
+                    resultados.append(None)
+        for tabla, solucion in zip(grupo, resultados):
+            soluciones[tabla.id] = solucion
+    return soluciones
+
+
+def documento_solucionario(documento: Documento) -> Documento:
+    """
+    Construye el documento del solucionario: para cada tabla, su número de
+    ejercicio, la tabla con la solución rellena y la línea de resultado.
+    """
+    soluciones = resolver(documento)
+    salida = Documento()
+    numero = 0
+    for bloque in documento:
+        if bloque.tipo != "table":
+            continue
+        numero += 1
+        salida.nuevo_texto(f"Ejercicio {numero}")
+        solucion = soluciones.get(bloque.id)
+        tabla = salida.nueva_tabla(bloque.filas, bloque.columnas)
+        tabla.celdas = list(bloque.celdas)
+        tabla.operacion = bloque.operacion
+        tabla.presentacion = bloque.presentacion
+        if solucion is None:
+            salida.nuevo_texto("Sin solución automática para esta tabla.")
+            continue
+        celdas, resultado = solucion
+        for (fila, col), valor in celdas.items():
+            if 0 <= fila < tabla.filas and 0 <= col < tabla.columnas and not tabla.get(fila, col):
+                tabla.set(fila, col, valor)
+        if resultado:
+            salida.nuevo_texto(resultado)
+    return salida
+
+
+def exportar_solucionario(documento: Documento, output_path: str, title: str = "Solucionario",
+                          on_progress=None) -> None:
+    """Escribe el PDF del solucionario de `documento`."""
+    from export_pdf import document_to_blocks, export_blocks_to_pdf
+    export_blocks_to_pdf(document_to_blocks(documento_solucionario(documento)), output_path,
+                         title=title, on_progress=on_progress)
@@ -3,9 +3,15 @@ from dialogs import (
     dibujar_tabla_suma, dibujar_tabla_resta,
     dibujar_tabla_multiplicacion, dibujar_tabla_division,
     dibujar_tabla_factorial, dibujar_tabla_raiz,
-    dibujar_tabla_binaria
+    dibujar_tabla_binaria, generar_ficha
 )
 
+# Operación de cada botón, para el generador de fichas al azar
+OPERACION_DE_SIMBOLO = {
+    '+': 'suma', '−': 'resta', 'X': 'multiplicacion', '÷': 'division',
+    '|': 'factorial', '√': 'raiz', '01\n10': 'binario',
+}
+
 def abrir_submenu(scrollable_frame, botones_frame, canvas):
     popup = tk.Toplevel(scrollable_frame)
     popup.title("QuicKual - Operaciones")
@@ -15,21 +21,28 @@ def abrir_submenu(scrollable_frame, botones_frame, canvas):
     mid_font = ("Arial", 18, "bold")
     small_font = ("Arial", 12, "bold")
 
+    # Marcada, el botón genera una ficha de problemas al azar de esa operación
+    al_azar = tk.BooleanVar(popup, value=False)
+
     # Botones principales
     for i, simbolo in enumerate(['+','−','X','÷']):
         btn = tk.Button(popup, text=simbolo, font=("Arial",24,"bold"), width=5, height=2,
-                        command=lambda s=simbolo: accion_operacion(s, scrollable_frame, botones_frame, canvas, popup))
+                        command=lambda s=simbolo: accion_operacion(s, scrollable_frame, botones_frame, canvas, popup, al_azar.get()))
         btn.grid(row=0, column=i, padx=10, pady=10)
 
     # Botones adicionales
     for i, simbolo in enumerate(['|','√','01\n10']):
         btn = tk.Button(popup, text=simbolo, font=mid_font, width=5, height=2,
-                        command=lambda s=simbolo: accion_operacion(s, scrollable_frame, botones_frame, canvas, popup))
+                        command=lambda s=simbolo: accion_operacion(s, scrollable_frame, botones_frame, canvas, popup, al_azar.get()))
         btn.grid(row=1, column=i, padx=10, pady=10)
 
-def accion_operacion(simbolo, scrollable_frame, botones_frame, canvas, popup):
+    tk.Checkbutton(popup, text="Generar ficha al azar", font=small_font, variable=al_azar).grid(
+        row=2, column=0, columnspan=4, sticky="w", padx=10, pady=(0, 10))
+
+def accion_operacion(simbolo, scrollable_frame, botones_frame, canvas, popup, al_azar=False):
     popup.destroy()
-    if simbolo=='+': dibujar_tabla_suma(scrollable_frame, botones_frame, canvas)
+    if al_azar: generar_ficha(OPERACION_DE_SIMBOLO[simbolo], scrollable_frame, botones_frame, canvas)
+    elif simbolo=='+': dibujar_tabla_suma(scrollable_frame, botones_frame, canvas)
     elif simbolo=='−': dibujar_tabla_resta(scrollable_frame, botones_frame, canvas)
     elif simbolo=='X': dibujar_tabla_multiplicacion(scrollable_frame, botones_frame, canvas)
     elif simbolo=='÷': dibujar_tabla_division(scrollable_frame, botones_frame, canvas)
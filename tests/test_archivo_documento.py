@@ -0,0 +1,121 @@
+"""
+Ida y vuelta del formato .qkl: lo que escribe `guardar_documento` lo lee
+igual `abrir_documento`, y los archivos truncados o dañados se rechazan con
+FormatoInvalido.
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archivo_documento import (  # noqa: E402
+    FormatoInvalido, _CABECERA, _ENTRADA, abrir_documento, guardar_documento, liberar_archivos,
+)
+from documento import BloquePendiente, Documento  # noqa: E402
+from operaciones import plantilla_division, plantilla_suma  # noqa: E402
+
+
+def _documento() -> Documento:
+    documento = Documento()
+    documento.nuevo_texto("Fichas de división\ncon tildes y ñ: ÷ √")
+    plantilla_division("987654", "32").en_documento(documento)
+    tabla = plantilla_suma("12,5", "3").en_documento(documento)
+    tabla.estilos[(0, 1)] = {"state": "disabled", "disabledbackground": "#f0f0f0"}
+    tabla.presentacion = (18, 2, 2)
+    documento.nuevo_texto("")
+    a_mano = documento.nueva_tabla(2, 3)
+    a_mano.set(1, 2, "7")
+    return documento
+
+
+def _resumen(documento: Documento) -> list:
+    resumen = []
+    for bloque in documento:
+        if bloque.tipo == "text":
+            resumen.append((bloque.id, "text", bloque.texto))
+            continue
+        op = bloque.operacion
+        resumen.append((
+            bloque.id, "table", bloque.filas, bloque.columnas, bloque.celdas, bloque.estilos,
+            bloque.presentacion, None if op is None else (op.tipo, op.operandos, tuple(op.forma)),
+        ))
+    return resumen
+
+
+class ArchivoDocumentoTest(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.directorio.name, "ficha.qkl")
+
+    def tearDown(self):
+        liberar_archivos()  # cierra los .qkl antes de borrar la carpeta (Windows)
+        self.directorio.cleanup()
+
+    def test_ida_y_vuelta(self):
+        original = _documento()
+        guardar_documento(original, self.ruta)
+        abierto = abrir_documento(self.ruta)
+        self.assertEqual(abierto.ids(), original.ids())
+        self.assertEqual(abierto.pendientes(), len(original))
+        self.assertEqual(_resumen(abierto), _resumen(original))
+
+    def test_guardar_sin_leer_los_pendientes(self):
+        original = _documento()
+        guardar_documento(original, self.ruta)
+        copia = os.path.join(self.directorio.name, "copia.qkl")
+        abierto = abrir_documento(self.ruta)
+        guardar_documento(abierto, copia)
+        # Los bloques se copian comprimidos, sin leerlos
+        self.assertTrue(all(isinstance(abierto.vistazo(b), BloquePendiente) for b in abierto.ids()))
+        self.assertEqual(_resumen(abrir_documento(copia)), _resumen(original))
+
+    def test_sobrescribir_el_archivo_abierto(self):
+        original = _documento()
+        guardar_documento(original, self.ruta)
+        abierto = abrir_documento(self.ruta)
+        abierto.nuevo_texto("otro bloque")
+        guardar_documento(abierto, self.ruta)
+        self.assertEqual(_resumen(abrir_documento(self.ruta)), _resumen(abierto))
+
+    def test_archivo_truncado(self):
+        guardar_documento(_documento(), self.ruta)
+        with open(self.ruta, "rb") as f:
+            datos = f.read()
+        for longitud in (0, _CABECERA.size - 1, _CABECERA.size + _ENTRADA.size):
+            with self.subTest(longitud=longitud):
+                with open(self.ruta, "wb") as f:
+                    f.write(datos[:longitud])
+                with self.assertRaises(FormatoInvalido):
+                    abrir_documento(self.ruta)
+
+    def test_bloque_truncado(self):
+        guardar_documento(_documento(), self.ruta)
+        with open(self.ruta, "r+b") as f:
+            f.truncate(os.path.getsize(self.ruta) - 5)
+        documento = abrir_documento(self.ruta)
+        with self.assertRaises(FormatoInvalido):
+            list(documento)
+
+    def test_id_repetido(self):
+        guardar_documento(_documento(), self.ruta)
+        with open(self.ruta, "r+b") as f:
+            f.seek(_CABECERA.size)
+            primero = struct.unpack("<I", f.read(4))
+            f.seek(_CABECERA.size + _ENTRADA.size)
+            f.write(struct.pack("<I", *primero))
+        with self.assertRaises(FormatoInvalido):
+            abrir_documento(self.ruta)
+
+    def test_no_es_un_documento(self):
+        with open(self.ruta, "wb") as f:
+            f.write(b"%PDF-1.4" + bytes(64))
+        with self.assertRaises(FormatoInvalido):
+            abrir_documento(self.ruta)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Recuperación de la sesión desde el diario del autoguardado: `recuperar`
+rehace el documento hasta el último registro completo y con CRC válido.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archivo_documento import guardar_documento, liberar_archivos  # noqa: E402
+from autoguardado import _registro, _ruta_diario, _ruta_instantanea, recuperar  # noqa: E402
+from documento import BloqueTexto, Documento  # noqa: E402
+from historial import Historial  # noqa: E402
+from operaciones import plantilla_suma  # noqa: E402
+
+
+def _resumen(documento: Documento) -> list:
+    return [(b.id, b.texto) if b.tipo == "text" else (b.id, b.filas, b.columnas, b.celdas, b.estilos)
+            for b in documento]
+
+
+def _sesion(documento: Documento):
+    """
+    Hace una serie de cambios en `documento` y devuelve, por cada uno, su
+    registro del diario y el documento tal como quedó después.
+    """
+    historial = Historial(documento)
+    cambios = []
+    historial.oyentes.append(cambios.append)
+    pasos = []
+
+    def paso():
+        registros = b"".join(r for r in map(_registro, cambios) if r is not None)
+        cambios.clear()
+        pasos.append((registros, _resumen(documento)))
+
+    texto = documento.nuevo_texto("Sumas")
+    paso()
+    tabla = plantilla_suma("12,5", "3").en_documento(documento)
+    paso()
+    historial.celda(tabla, tabla.filas - 1, 1, "", "5")
+    tabla.set(tabla.filas - 1, 1, "5")
+    paso()
+    texto.texto = "Sumas con decimales"
+    historial.texto(texto)
+    paso()
+    otro = documento.nuevo_texto("al final")
+    paso()
+    documento.mover(otro.id, texto.id)
+    paso()
+    documento.eliminar(texto.id)
+    paso()
+    return pasos
+
+
+class RecuperarTest(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.carpeta = self.directorio.name
+
+    def tearDown(self):
+        liberar_archivos()
+        self.directorio.cleanup()
+
+    def _escribir_diario(self, generacion: int, datos: bytes) -> str:
+        ruta = _ruta_diario(self.carpeta, generacion)
+        with open(ruta, "wb") as f:
+            f.write(datos)
+        return ruta
+
+    def test_sin_nada_guardado(self):
+        self.assertIsNone(recuperar(self.carpeta))
+
+    def test_diario_completo(self):
+        pasos = _sesion(Documento())
+        self._escribir_diario(0, b"".join(r for r, _ in pasos))
+        self.assertEqual(_resumen(recuperar(self.carpeta)), pasos[-1][1])
+
+    def test_ultimo_registro_truncado(self):
+        pasos = _sesion(Documento())
+        datos = b"".join(r for r, _ in pasos)
+        ultimo = len(pasos[-1][0])
+        for cortados in (1, ultimo // 2, ultimo - 1):
+            with self.subTest(cortados=cortados):
+                self._escribir_diario(0, datos[:-cortados])
+                self.assertEqual(_resumen(recuperar(self.carpeta)), pasos[-2][1])
+
+    def test_registro_danado(self):
+        pasos = _sesion(Documento())
+        hasta = sum(len(r) for r, _ in pasos[:3])
+        datos = bytearray(b"".join(r for r, _ in pasos))
+        # El cuarto registro sigue siendo JSON válido, pero ya no cuadra con su CRC
+        i = datos.index(b"decimales", hasta)
+        datos[i] ^= 0x20
+        self._escribir_diario(0, bytes(datos))
+        self.assertEqual(_resumen(recuperar(self.carpeta)), pasos[2][1])
+
+    def test_instantanea_y_diario_posterior(self):
+        documento = Documento()
+        documento.nuevo_texto("ya guardado")
+        guardar_documento(documento, _ruta_instantanea(self.carpeta, 1))
+        # Un diario anterior a la instantánea no se aplica
+        self._escribir_diario(0, _registro(("insertar", BloqueTexto(99, "viejo"), None)))
+        pasos = _sesion(documento)
+        self._escribir_diario(1, b"".join(r for r, _ in pasos)[:-3])
+        self.assertEqual(_resumen(recuperar(self.carpeta)), pasos[-2][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Las tablas de los diálogos (`_nueva_tabla` + `_rellenar_desde_plantilla`)
+deben quedar igual que las del lote (`LoteBloques.tabla`): cada valor fijo una
+sola vez y las celdas fijas bloqueadas.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogs import _nueva_tabla, _rellenar_desde_plantilla  # noqa: E402
+from documento import Documento  # noqa: E402
+from operaciones import (  # noqa: E402
+    plantilla_binaria, plantilla_division, plantilla_factorial, plantilla_multiplicacion,
+    plantilla_raiz, plantilla_resta, plantilla_suma,
+)
+from rejilla import CeldaVirtual, RejillaCanvas  # noqa: E402
+
+
+def _plantillas():
+    return {
+        "suma": plantilla_suma("12,5", "3"),
+        "resta": plantilla_resta("100", "7,25"),
+        "multiplicacion": plantilla_multiplicacion(123, 45),
+        "division": plantilla_division("987654", "32"),
+        "factorial": plantilla_factorial(360),
+        "raiz": plantilla_raiz(2, 1521),
+        "binario": plantilla_binaria("13"),
+    }
+
+
+class _RejillaSinTk:
+    """Las partes de RejillaCanvas que usan las celdas, sin Canvas ni editor."""
+
+    _escribir = RejillaCanvas._escribir
+    _configurar_celda = RejillaCanvas._configurar_celda
+    _opcion_celda = RejillaCanvas._opcion_celda
+
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self._editando = None
+        self.corrector = None
+
+    def _dibujar_texto(self, fila, col):
+        pass
+
+    def _dibujar_fondo(self, fila, col):
+        pass
+
+
+class RellenarDesdePlantillaTest(unittest.TestCase):
+    def test_valores_una_sola_vez(self):
+        for nombre, plantilla in _plantillas().items():
+            with self.subTest(operacion=nombre):
+                esperada = plantilla.en_documento(Documento()).matriz()
+                tabla = plantilla.en_documento(Documento())
+                rejilla = _RejillaSinTk(tabla)
+                entries = {(f, c): CeldaVirtual(rejilla, f, c)
+                           for f in range(tabla.filas) for c in range(tabla.columnas)}
+                _rellenar_desde_plantilla(entries, plantilla, disabledbackground="#f0f0f0")
+                self.assertEqual(tabla.matriz(), esperada)
+                for key in plantilla.bloqueadas:
+                    self.assertEqual(tabla.estilos[key]["state"], "disabled")
+
+    def test_suma_sin_duplicar(self):
+        plantilla = plantilla_suma("12,5", "3")
+        tabla = plantilla.en_documento(Documento())
+        rejilla = _RejillaSinTk(tabla)
+        entries = {key: CeldaVirtual(rejilla, *key) for key in plantilla.valores}
+        _rellenar_desde_plantilla(entries, plantilla)
+        celdas = [v for fila in tabla.matriz() for v in fila if v]
+        self.assertTrue(all(len(v) == 1 for v in celdas), celdas)
+
+
+@unittest.skipUnless(os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"),
+                     "necesita servidor gráfico")
+class NuevaTablaTkTest(unittest.TestCase):
+    def test_tabla_del_dialogo_igual_que_la_del_lote(self):
+        import tkinter as tk
+
+        root = tk.Tk()
+        try:
+            canvas = tk.Canvas(root)
+            scrollable_frame = tk.Frame(canvas)
+            botones_frame = tk.Frame(scrollable_frame)
+            for nombre, plantilla in _plantillas().items():
+                with self.subTest(operacion=nombre):
+                    _, _, tabla, entries = _nueva_tabla(scrollable_frame, botones_frame, canvas, plantilla)
+                    _rellenar_desde_plantilla(entries, plantilla)
+                    self.assertEqual(tabla.matriz(), plantilla.en_documento(Documento()).matriz())
+        finally:
+            root.destroy()
+
+
+if __name__ == "__main__":
+    unittest.main()
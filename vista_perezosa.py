@@ -0,0 +1,225 @@
+"""
+Realización perezosa de los bloques del documento según la zona visible.
+
+El frame scrollable solo contiene widgets para los bloques que están en
+pantalla (más un margen). El resto se representa con espaciadores de la altura
+conocida del bloque —la última que se midió o una estimación a partir del
+modelo—, de modo que la barra de scroll sigue siendo correcta. Los bloques
+consecutivos fuera de pantalla comparten un único espaciador, así que el número
+de widgets empaquetados no depende de la longitud del documento.
+
+Los bloques que se alejan más de `margen_lejano` pantallas se devuelven al pool
+(bloques.PoolBloques) y se vuelven a crear desde el modelo cuando regresan.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from bloques import pool_de, realizar_bloque
+from documento import documento_de
+
+# Separación vertical que deja pack entre bloques (pady=5 arriba y abajo)
+SEPARACION = 10
+# Altura de la cabecera con la papelera
+ALTO_CABECERA = 30
+# Altura de un bloque de texto que aún no se ha medido
+ALTO_TEXTO = 150
+
+
+class VistaPerezosa:
+    """
+    Mantiene realizados solo los bloques cercanos a la zona visible del canvas.
+
+    Se engancha al `yscrollcommand` del canvas: cada vez que cambia la vista o
+    la región de scroll se programa (una sola vez por ciclo de eventos) una
+    sincronización que crea los bloques que entran y libera los que salen.
+    """
+
+    def __init__(self, scrollable_frame: tk.Frame, botones_frame: tk.Frame, canvas: tk.Canvas,
+                 scrollbar: tk.Scrollbar, margen: float = 1.0, margen_lejano: float = 3.0) -> None:
+        self.scrollable_frame = scrollable_frame
+        self.botones_frame = botones_frame
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.margen = margen
+        self.margen_lejano = margen_lejano
+
+        self.documento = documento_de(scrollable_frame)
+        self.pool = pool_de(scrollable_frame)
+        self.pool.vista = self
+
+        # Orden de los bloques, cacheado por documento y versión (el documento
+        # cambia al abrir un archivo)
+        self._version = -1
+        self._ids: List[int] = []
+        self._indices: Dict[int, int] = {}
+        # Altura medida (o estimada) de cada bloque y sumas prefijas de posición
+        self._altos: Dict[int, int] = {}
+        self._inicios: List[int] = [0]
+        self._inicios_validos = False
+
+        self._espaciadores: List[tk.Frame] = []
+        self._secuencia: List[Tuple[tk.Widget, int]] = []
+        self._alto_linea: Dict[int, int] = {}
+        self._programado = None
+
+        canvas.configure(yscrollcommand=self._on_yscroll)
+
+    # ---- Programación ----
+
+    def _on_yscroll(self, first, last) -> None:
+        self.scrollbar.set(first, last)
+        self.programar()
+
+    def programar(self) -> None:
+        """Agrupa todas las peticiones de un mismo ciclo en una sola sincronización."""
+        if self._programado is None:
+            self._programado = self.canvas.after_idle(self.sincronizar)
+
+    # ---- Alturas ----
+
+    def _alto_estimado(self, modelo) -> int:
+        # `modelo` puede ser un bloque pendiente de leer: solo se usa su forma
+        if modelo.tipo == "table":
+            font_size, padding, bd = modelo.presentacion
+            linea = self._alto_linea.get(font_size)
+            if linea is None:
+                linea = tkfont.Font(self.canvas, font=("Arial", font_size)).metrics("linespace")
+                self._alto_linea[font_size] = linea
+            alto_celda = linea + 2 * padding + 4
+            return ALTO_CABECERA + modelo.filas * alto_celda + 1 + 2 * padding + 2 * bd
+        return ALTO_TEXTO
+
+    def _alto(self, bloque_id: int) -> int:
+        alto = self._altos.get(bloque_id)
+        if alto is None:
+            alto = self._alto_estimado(self.documento.vistazo(bloque_id))
+            self._altos[bloque_id] = alto
+        return alto
+
+    def _medir_activos(self) -> None:
+        for bloque_id, cascaron in self.pool.activos.items():
+            alto = cascaron.bloque.winfo_height()
+            if alto > 1 and self._altos.get(bloque_id) != alto:
+                self._altos[bloque_id] = alto
+                self._inicios_validos = False
+
+    def _actualizar_indice(self) -> None:
+        documento = documento_de(self.scrollable_frame)
+        if documento is not self.documento:
+            self.documento = documento
+            self._version = -1
+            self._altos.clear()
+        if self.documento.version != self._version:
+            self._version = self.documento.version
+            self._ids = self.documento.ids()
+            self._indices = {b: i for i, b in enumerate(self._ids)}
+            for bloque_id in [b for b in self._altos if b not in self._indices]:
+                del self._altos[bloque_id]
+            self._inicios_validos = False
+        if not self._inicios_validos:
+            inicios = [0] * (len(self._ids) + 1)
+            acumulado = 0
+            for i, bloque_id in enumerate(self._ids):
+                acumulado += self._alto(bloque_id) + SEPARACION
+                inicios[i + 1] = acumulado
+            self._inicios = inicios
+            self._inicios_validos = True
+
+    def _rango(self, arriba: float, abajo: float) -> Tuple[int, int]:
+        """Índices [desde, hasta) de los bloques que tocan la franja vertical dada."""
+        desde = max(0, bisect_right(self._inicios, arriba) - 1)
+        hasta = min(len(self._ids), bisect_left(self._inicios, abajo))
+        return desde, hasta
+
+    def posicion(self, bloque_id: int) -> Optional[int]:
+        """
+        Coordenada y, dentro del frame scrollable, donde empieza el bloque
+        (con las alturas medidas o estimadas); None si no está en el documento.
+        """
+        self._medir_activos()
+        self._actualizar_indice()
+        i = self._indices.get(bloque_id)
+        return None if i is None else self._inicios[i]
+
+    # ---- Sincronización ----
+
+    def _tiene_foco(self, cascaron) -> bool:
+        foco = self.canvas.focus_get()
+        if foco is None:
+            return False
+        # Rutas de Tk: ".!frame1" no contiene a ".!frame12", solo a ".!frame1.…"
+        ruta, bloque = str(foco), str(cascaron.bloque)
+        return ruta == bloque or ruta.startswith(bloque + ".")
+
+    def sincronizar(self) -> None:
+        """Crea los bloques que entran en la zona visible y libera los lejanos."""
+        self._programado = None
+        self._medir_activos()
+        self._actualizar_indice()
+
+        alto_vista = max(1, self.canvas.winfo_height())
+        arriba = self.canvas.canvasy(0)
+        abajo = arriba + alto_vista
+        cerca = self._rango(arriba - self.margen * alto_vista, abajo + self.margen * alto_vista)
+        lejos = self._rango(arriba - self.margen_lejano * alto_vista, abajo + self.margen_lejano * alto_vista)
+
+        activos = self.pool.activos
+        for bloque_id, cascaron in list(activos.items()):
+            posicion = self._indices.get(bloque_id)
+            fuera = posicion is None or not (lejos[0] <= posicion < lejos[1])
+            if fuera and not self._tiene_foco(cascaron):
+                self.pool.devolver(cascaron)
+
+        for i in range(*cerca):
+            bloque_id = self._ids[i]
+            if bloque_id not in activos:
+                realizar_bloque(self.scrollable_frame, self.botones_frame, self.canvas,
+                                self.documento.get(bloque_id), alto=self._altos.get(bloque_id))
+
+        self._reempaquetar()
+
+    def _reempaquetar(self) -> None:
+        """
+        Empaqueta en orden los bloques realizados y, entre ellos, un espaciador
+        por cada tramo de bloques sin realizar. Solo toca pack si la secuencia
+        cambió desde la última vez.
+        """
+        secuencia: List[Tuple[tk.Widget, int]] = []
+        usados = 0
+
+        def _hueco(desde: int, hasta: int) -> None:
+            # Un espaciador ocupa lo mismo que los bloques del tramo y sus separaciones
+            nonlocal usados
+            if usados == len(self._espaciadores):
+                espaciador = tk.Frame(self.scrollable_frame, bg=self.scrollable_frame.cget("bg"), height=1)
+                self._espaciadores.append(espaciador)
+            alto = self._inicios[hasta] - self._inicios[desde] - SEPARACION
+            secuencia.append((self._espaciadores[usados], max(1, alto)))
+            usados += 1
+
+        # Solo se recorren los bloques realizados, no el documento entero
+        realizados = sorted(
+            (self._indices[b], c.bloque) for b, c in self.pool.activos.items() if b in self._indices
+        )
+        anterior = 0
+        for posicion, bloque in realizados:
+            if posicion > anterior:
+                _hueco(anterior, posicion)
+            secuencia.append((bloque, 0))
+            anterior = posicion + 1
+        if anterior < len(self._ids):
+            _hueco(anterior, len(self._ids))
+
+        if secuencia == self._secuencia:
+            return
+        self._secuencia = secuencia
+        antes = {"before": self.botones_frame} if self.botones_frame.winfo_manager() == "pack" else {}
+        for widget, alto in secuencia:
+            if alto:
+                widget.config(height=alto)
+            widget.pack(side="top", fill="x", pady=5, **antes)
+        for espaciador in self._espaciadores[usados:]:
+            espaciador.pack_forget()
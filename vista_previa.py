@@ -0,0 +1,469 @@
+"""
+Vista previa de la maquetación del PDF en un panel lateral.
+
+La maquetación es la de la exportación: los mismos flowables (de la caché de
+export_pdf), el mismo tamaño de página y márgenes y el mismo `Frame` de
+ReportLab, que decide dónde cabe cada flowable y cómo se parte entre páginas.
+En lugar de dibujar en un PDF, cada flowable colocado se convierte en unas
+pocas operaciones de dibujo (textos y líneas) que se rasterizan con Pillow.
+
+`Maquetador` es incremental: compara el hash de cada bloque con el de la
+pasada anterior, conserva las páginas anteriores al primer bloque cambiado y
+vuelve a maquetar desde ahí solo hasta que una página nueva empieza en el
+mismo bloque que una antigua y el resto del documento no ha cambiado; a partir
+de ese punto reutiliza las páginas antiguas.
+
+`PanelVistaPrevia` espera a que el usuario deje de escribir (`espera_ms`),
+maqueta y rasteriza la página visible en un hilo de trabajo y recoge el
+resultado sondeando con `after()`, así que el bucle de Tk nunca espera a
+ReportLab.
+"""
+
+import base64
+import hashlib
+import io
+import threading
+import tkinter as tk
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import mm
+from reportlab.platypus import Flowable, Frame, Paragraph, Table
+
+from documento import documento_de
+from export_pdf import _block_key, _build_block_flowables, document_to_blocks, flowable_cache, paragraph_styles
+from perfilado import medir
+
+# Márgenes de export_pdf.export_blocks_to_pdf
+MARGEN = 20 * mm
+
+# Parte de un bloque: (índice del flowable en el bloque, alto ya colocado de ese flowable)
+Parte = Tuple[int, float]
+
+# Operación de dibujo: ("texto", x, y_base, texto, tamaño, centrado) o ("linea", x0, y0, x1, y1, grosor)
+Operacion = Tuple[Any, ...]
+
+
+class Pagina:
+    """Una página maquetada: bloques que contiene y operaciones de dibujo."""
+
+    __slots__ = ("primer_bloque", "inicio", "pendientes", "ultimo_bloque", "operaciones", "firma")
+
+    def __init__(self, primer_bloque: int, inicio: Parte, pendientes: Tuple["_Colocado", ...]) -> None:
+        self.primer_bloque = primer_bloque
+        # Parte del primer bloque con que empieza ((0, 0.0) si empieza con el bloque entero)
+        self.inicio = inicio
+        # Lo que quedaba por colocar del primer bloque: para volver a maquetar desde aquí
+        self.pendientes = pendientes
+        self.ultimo_bloque = primer_bloque
+        self.operaciones: List[Operacion] = []
+        # Identifica el contenido de la página (para la caché de imágenes)
+        self.firma = b""
+
+    def desplazada(self, delta: int) -> "Pagina":
+        """Copia de la página con los índices de bloque desplazados `delta`."""
+        pendientes = tuple(c.desplazado(delta) for c in self.pendientes) if delta else self.pendientes
+        copia = Pagina(self.primer_bloque + delta, self.inicio, pendientes)
+        copia.ultimo_bloque = self.ultimo_bloque + delta
+        copia.operaciones = self.operaciones
+        copia.firma = self.firma
+        return copia
+
+
+# ====
+# Conversión de flowables en operaciones de dibujo
+# ====
+
+
+def _operaciones_parrafo(parrafo: Paragraph, x: float, y: float, alto: float) -> List[Operacion]:
+    estilo = parrafo.style
+    lineas = getattr(parrafo, "blPara", None)
+    if lineas is None:
+        return []
+    operaciones = []
+    base = y + alto - estilo.fontSize
+    for linea in lineas.lines:
+        if lineas.kind == 0:
+            texto = " ".join(linea[1])
+        else:
+            texto = "".join(getattr(palabra, "text", "") for palabra in linea.words)
+        if texto.strip():
+            operaciones.append(("texto", x, base, texto, estilo.fontSize, False))
+        base -= estilo.leading
+    return operaciones
+
+
+def _operaciones_tabla(tabla: Table, x: float, y: float) -> List[Operacion]:
+    anchos, altos = tabla._colWidths, tabla._rowHeights
+    filas, columnas = len(altos), len(anchos)
+    if not filas or not columnas:
+        return []
+    xs = [x]
+    for ancho in anchos:
+        xs.append(xs[-1] + ancho)
+    ys = [y + sum(altos)]  # borde superior de cada fila, de arriba abajo
+    for alto in altos:
+        ys.append(ys[-1] - alto)
+
+    operaciones: List[Operacion] = []
+    for f, fila in enumerate(tabla._cellvalues):
+        for c, valor in enumerate(fila):
+            texto = "" if valor is None else str(valor)
+            if not texto.strip():
+                continue
+            tamano = tabla._cellStyles[f][c].fontsize
+            operaciones.append(("texto", (xs[c] + xs[c + 1]) / 2, (ys[f] + ys[f + 1]) / 2 - tamano * 0.35,
+                                texto, tamano, True))
+
+    for comando in tabla._linecmds:
+        op, (c0, f0), (c1, f1), grosor, color = comando[:5]
+        if not grosor or (color.red, color.green, color.blue) == (1, 1, 1):
+            continue
+        c0, c1 = c0 % columnas, c1 % columnas
+        f0, f1 = f0 % filas, f1 % filas
+        if op in ("GRID", "BOX", "OUTLINE"):
+            operaciones += [
+                ("linea", xs[c0], ys[f0], xs[c1 + 1], ys[f0], grosor),
+                ("linea", xs[c0], ys[f1 + 1], xs[c1 + 1], ys[f1 + 1], grosor),
+                ("linea", xs[c0], ys[f0], xs[c0], ys[f1 + 1], grosor),
+                ("linea", xs[c1 + 1], ys[f0], xs[c1 + 1], ys[f1 + 1], grosor),
+            ]
+        if op in ("GRID", "INNERGRID"):
+            operaciones += [("linea", xs[c0], ys[f], xs[c1 + 1], ys[f], grosor) for f in range(f0 + 1, f1 + 1)]
+            operaciones += [("linea", xs[c], ys[f0], xs[c], ys[f1 + 1], grosor) for c in range(c0 + 1, c1 + 1)]
+        elif op == "LINEABOVE":
+            operaciones += [("linea", xs[c0], ys[f], xs[c1 + 1], ys[f], grosor) for f in range(f0, f1 + 1)]
+        elif op == "LINEBELOW":
+            operaciones += [("linea", xs[c0], ys[f + 1], xs[c1 + 1], ys[f + 1], grosor) for f in range(f0, f1 + 1)]
+        elif op == "LINEBEFORE":
+            operaciones += [("linea", xs[c], ys[f0], xs[c], ys[f1 + 1], grosor) for c in range(c0, c1 + 1)]
+        elif op == "LINEAFTER":
+            operaciones += [("linea", xs[c + 1], ys[f0], xs[c + 1], ys[f1 + 1], grosor) for c in range(c0, c1 + 1)]
+    return operaciones
+
+
+class _Colocado(Flowable):
+    """
+    Envuelve un flowable de la exportación para que el Frame lo mida y lo
+    parta como siempre, pero al "dibujarlo" solo anote dónde queda. (bloque,
+    inicio) determina qué parte del bloque es, también para los restos de un
+    flowable partido.
+    """
+
+    def __init__(self, interior: Flowable, bloque: int, inicio: Parte, maquetador: "Maquetador") -> None:
+        super().__init__()
+        self.interior = interior
+        self.bloque = bloque
+        self.inicio = inicio
+        self.hAlign = getattr(interior, "hAlign", "LEFT")
+        self._maquetador = maquetador
+
+    def desplazado(self, delta: int) -> "_Colocado":
+        return _Colocado(self.interior, self.bloque + delta, self.inicio, self._maquetador)
+
+    def wrap(self, ancho, alto):
+        self.width, self.height = self.interior.wrap(ancho, alto)
+        return self.width, self.height
+
+    def getSpaceBefore(self):
+        return self.interior.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self.interior.getSpaceAfter()
+
+    def split(self, ancho, alto):
+        partes = []
+        n, colocado = self.inicio
+        for parte in self.interior.split(ancho, alto):
+            partes.append(_Colocado(parte, self.bloque, (n, colocado), self._maquetador))
+            colocado = round(colocado + parte.wrap(ancho, alto)[1], 3)
+        return partes
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self._maquetador._colocar(self, self._hAlignAdjust(x, _sW), y)
+
+
+# ====
+# Maquetación incremental
+# ====
+
+
+class Maquetador:
+    """
+    Reparte los bloques de la exportación en páginas. Cada llamada a
+    `maquetar` solo rehace las páginas afectadas por los bloques que han
+    cambiado desde la anterior; `remaquetadas` dice cuántas fueron.
+    """
+
+    def __init__(self, page_size=letter) -> None:
+        self.page_size = page_size
+        self.usable_width = page_size[0] - 2 * MARGEN
+        self._alto_marco = page_size[1] - 2 * MARGEN
+        self._normal = paragraph_styles()['normal']
+        self._claves: List[bytes] = []
+        self.paginas: List[Pagina] = []
+        self.remaquetadas = 0
+        self._pagina: Optional[Pagina] = None
+
+    def _flowables(self, block: Dict[str, Any], clave: bytes) -> List[Any]:
+        return flowable_cache.get_or_build(
+            clave, lambda: _build_block_flowables(block, self._normal, self.usable_width))
+
+    def _encolar(self, cola: deque, blocks: List[Dict[str, Any]], claves: List[bytes], siguiente: int) -> int:
+        """Añade a `cola` los flowables del siguiente bloque que tenga alguno."""
+        total = len(blocks)
+        while not cola and siguiente < total:
+            block = blocks[siguiente]
+            cola.extend(_Colocado(f, siguiente, (n, 0.0), self)
+                        for n, f in enumerate(self._flowables(block, claves[siguiente])))
+            siguiente += 1
+        return siguiente
+
+    def _colocar(self, colocado: _Colocado, x: float, y: float) -> None:
+        pagina = self._pagina
+        pagina.ultimo_bloque = colocado.bloque
+        interior = colocado.interior
+        if isinstance(interior, Paragraph):
+            pagina.operaciones += _operaciones_parrafo(interior, x, y, colocado.height)
+        elif isinstance(interior, Table):
+            pagina.operaciones += _operaciones_tabla(interior, x, y)
+
+    @medir("vista_previa.maquetar")
+    def maquetar(self, blocks: List[Dict[str, Any]]) -> List[Pagina]:
+        claves = [_block_key(block, self.usable_width) for block in blocks]
+        viejas, paginas = self._claves, self.paginas
+        total = len(claves)
+
+        # Primer bloque distinto y tramo final sin cambios
+        comunes = min(total, len(viejas))
+        i = 0
+        while i < comunes and claves[i] == viejas[i]:
+            i += 1
+        if i == total == len(viejas) and paginas:
+            self.remaquetadas = 0
+            return paginas
+        j = 0
+        while j < comunes - i and claves[total - 1 - j] == viejas[len(viejas) - 1 - j]:
+            j += 1
+        delta = total - len(viejas)
+        fin_cambio = total - j
+
+        # Se rehace desde la última página que empieza antes del bloque
+        # cambiado, con lo que quedaba por colocar al empezarla
+        p = 0
+        while p + 1 < len(paginas) and paginas[p + 1].primer_bloque < i:
+            p += 1
+        nuevas = paginas[:p]
+        cola: deque = deque()
+        siguiente = 0
+        if paginas and paginas[p].primer_bloque < i:
+            cola.extend(paginas[p].pendientes)
+            siguiente = paginas[p].primer_bloque + 1
+        # Páginas antiguas del tramo sin cambios donde se puede retomar: una
+        # página nueva que empieza en la misma parte del mismo bloque es igual
+        retomar = {(pagina.primer_bloque + delta, pagina.inicio): k for k, pagina in enumerate(paginas)
+                   if pagina.primer_bloque + delta >= fin_cambio}
+
+        remaquetadas = 0
+        while True:
+            if not cola and siguiente < total:
+                siguiente = self._encolar(cola, blocks, claves, siguiente)
+            if not cola:
+                break
+            cabeza = cola[0]
+            k = retomar.get((cabeza.bloque, cabeza.inicio)) if remaquetadas else None
+            if k is not None:
+                nuevas += [pagina.desplazada(delta) for pagina in paginas[k:]]
+                break
+
+            self._pagina = pagina = Pagina(cabeza.bloque, cabeza.inicio, tuple(cola))
+            marco = Frame(MARGEN, MARGEN, self.usable_width, self._alto_marco, id='normal')
+            while True:
+                if not cola and siguiente < total:
+                    siguiente = self._encolar(cola, blocks, claves, siguiente)
+                if not cola:
+                    break
+                flowable = cola[0]
+                if marco.add(flowable, None, trySplit=1):
+                    cola.popleft()
+                    continue
+                partes = marco.split(flowable, None)
+                if partes and marco.add(partes[0], None, trySplit=0):
+                    cola.popleft()
+                    cola.extendleft(reversed(partes[1:]))
+                    continue
+                if marco._atTop:
+                    # No cabe ni en una página vacía (la exportación fallaría):
+                    # se muestra igualmente, recortado
+                    cola.popleft()
+                    flowable.wrap(marco._aW, marco._aH)
+                    self._colocar(flowable, marco._x, marco._y - flowable.height)
+                break
+
+            h = hashlib.blake2b(repr(pagina.inicio).encode(), digest_size=16)
+            for clave in claves[pagina.primer_bloque:pagina.ultimo_bloque + 1]:
+                h.update(clave)
+            pagina.firma = h.digest()
+            nuevas.append(pagina)
+            remaquetadas += 1
+
+        self._pagina = None
+        self._claves = claves
+        self.paginas = nuevas
+        self.remaquetadas = remaquetadas
+        return nuevas
+
+
+# ====
+# Rasterizado
+# ====
+
+
+def _fuente(tamano: int):
+    try:
+        return ImageFont.load_default(size=tamano)
+    except TypeError:  # Pillow < 10.1: solo la fuente de mapa de bits
+        return ImageFont.load_default()
+
+
+@medir("vista_previa.rasterizar")
+def rasterizar(pagina: Pagina, ancho_px: int, page_size=letter) -> str:
+    """Dibuja la página con `ancho_px` píxeles de ancho y la devuelve como PNG en base64."""
+    escala = ancho_px / page_size[0]
+    alto_px = int(page_size[1] * escala)
+    imagen = Image.new("RGB", (ancho_px, alto_px), "white")
+    dibujo = ImageDraw.Draw(imagen)
+    fuentes: Dict[int, Any] = {}
+
+    for operacion in pagina.operaciones:
+        if operacion[0] == "linea":
+            _, x0, y0, x1, y1, grosor = operacion
+            dibujo.line([(x0 * escala, alto_px - y0 * escala), (x1 * escala, alto_px - y1 * escala)],
+                        fill="black", width=max(1, round(grosor * escala)))
+            continue
+        _, x, y, texto, tamano, centrado = operacion
+        px = max(6, round(tamano * escala))
+        fuente = fuentes.get(px)
+        if fuente is None:
+            fuente = fuentes[px] = _fuente(px)
+        if centrado:
+            x -= dibujo.textlength(texto, font=fuente) / escala / 2
+        dibujo.text((x * escala, alto_px - y * escala - px * 0.8), texto, fill="black", font=fuente)
+
+    salida = io.BytesIO()
+    imagen.save(salida, format="PNG", compress_level=1)
+    return base64.b64encode(salida.getvalue()).decode("ascii")
+
+
+# ====
+# Panel lateral
+# ====
+
+
+class PanelVistaPrevia(tk.Frame):
+    """
+    Panel con la vista previa de una página del documento de `scrollable_frame`.
+    Hay que llamar a `programar()` después de cada cambio (main.py lo hace con
+    cada pulsación y cada clic); la vista se actualiza `espera_ms` después del
+    último.
+    """
+
+    MAX_IMAGENES = 32
+
+    def __init__(self, master, scrollable_frame: tk.Frame, ancho: int = 360,
+                 espera_ms: int = 400, intervalo_ms: int = 50) -> None:
+        super().__init__(master, bg="#e4e4e4", width=ancho)
+        self.scrollable_frame = scrollable_frame
+        self.ancho = ancho
+        self.espera_ms = espera_ms
+        self.intervalo_ms = intervalo_ms
+        self.maquetador = Maquetador()
+        self.pagina = 0
+        self._programado: Optional[str] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._repetir = False
+        self._resultado = None
+        # firma de página -> PNG en base64; solo la usa el hilo de trabajo
+        self._imagenes: "OrderedDict[bytes, str]" = OrderedDict()
+        self._foto: Optional[tk.PhotoImage] = None
+
+        barra = tk.Frame(self, bg="#e4e4e4")
+        barra.pack(fill="x", pady=(5, 0))
+        tk.Button(barra, text="◀", relief="flat", command=lambda: self.ir(-1)).pack(side="left", padx=5)
+        tk.Button(barra, text="▶", relief="flat", command=lambda: self.ir(1)).pack(side="right", padx=5)
+        self._etiqueta = tk.Label(barra, text="", bg="#e4e4e4", font=("Arial", 11))
+        self._etiqueta.pack(side="left", expand=True)
+
+        alto = int(ancho * letter[1] / letter[0])
+        self._lienzo = tk.Canvas(self, width=ancho, height=alto, bg="#bdbdbd", highlightthickness=0)
+        self._lienzo.pack(padx=5, pady=5)
+        self._imagen = self._lienzo.create_image(0, 0, anchor="nw")
+        self._estado = tk.Label(self, text="", bg="#e4e4e4", fg="#606060", font=("Arial", 9))
+        self._estado.pack(fill="x")
+
+    def programar(self, _=None) -> None:
+        """Actualiza la vista previa cuando pasen `espera_ms` sin más cambios."""
+        if self._programado is not None:
+            self.after_cancel(self._programado)
+        self._programado = self.after(self.espera_ms, self.actualizar)
+
+    def ir(self, desplazamiento: int) -> None:
+        """Muestra otra página."""
+        self.pagina = max(0, self.pagina + desplazamiento)
+        self.actualizar()
+
+    def actualizar(self) -> None:
+        """Lanza ya la maquetación (o la repite al acabar la que está en curso)."""
+        self._programado = None
+        if self._hilo is not None:
+            self._repetir = True
+            return
+        # La instantánea se toma en el hilo de Tk; el resto, en el de trabajo
+        blocks = document_to_blocks(documento_de(self.scrollable_frame))
+        self._hilo = threading.Thread(target=self._trabajar, args=(blocks, self.pagina),
+                                      name="vista-previa", daemon=True)
+        self._hilo.start()
+        self.after(self.intervalo_ms, self._sondear)
+
+    def _trabajar(self, blocks: List[Dict[str, Any]], pagina: int) -> None:
+        try:
+            paginas = self.maquetador.maquetar(blocks)
+            if not paginas:
+                self._resultado = (0, 0, None, None)
+                return
+            pagina = min(pagina, len(paginas) - 1)
+            firma = paginas[pagina].firma
+            imagen = self._imagenes.get(firma)
+            if imagen is None:
+                imagen = self._imagenes[firma] = rasterizar(paginas[pagina], self.ancho)
+                if len(self._imagenes) > self.MAX_IMAGENES:
+                    self._imagenes.popitem(last=False)
+            else:
+                self._imagenes.move_to_end(firma)
+            self._resultado = (pagina, len(paginas), imagen, None)
+        except Exception as e:  # se muestra en el panel desde el hilo de Tk
+            self._resultado = (0, 0, None, e)
+
+    def _sondear(self) -> None:
+        if self._hilo is not None and self._hilo.is_alive():
+            self.after(self.intervalo_ms, self._sondear)
+            return
+        self._hilo = None
+        pagina, total, imagen, error = self._resultado
+        if error is not None:
+            self._estado.config(text=f"Error en la vista previa: {error}")
+        elif imagen is None:
+            self._lienzo.itemconfig(self._imagen, image="")
+            self._etiqueta.config(text="Documento vacío")
+            self._estado.config(text="")
+        else:
+            self.pagina = pagina
+            self._foto = tk.PhotoImage(data=imagen)
+            self._lienzo.itemconfig(self._imagen, image=self._foto)
+            self._etiqueta.config(text=f"Página {pagina + 1} de {total}")
+            self._estado.config(text=f"{self.maquetador.remaquetadas} página(s) maquetadas de nuevo")
+        if self._repetir:
+            self._repetir = False
+            self.actualizar()